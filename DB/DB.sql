@@ -23,6 +23,9 @@ CREATE TABLE IF NOT EXISTS PRODUCTO (
     CONSTRAINT chk_precio CHECK (precio > 0)
 );
 
+-- Paginación keyset del catálogo: WHERE (nombre, idProducto) > (...) ORDER BY nombre, idProducto
+CREATE INDEX IF NOT EXISTS idx_producto_nombre_id ON PRODUCTO (nombre, idProducto);
+
 
 CREATE TABLE IF NOT EXISTS TIPO_COMIDA (
     idTipo INTEGER PRIMARY KEY,
@@ -95,6 +98,52 @@ CREATE TABLE IF NOT EXISTS EXCEPCION_PRODUCTO (
     UNIQUE(idExcepcion, idProducto)
 );
 
+-- ÍNDICES DE LAS CONSULTAS FRECUENTES (ver DB/migraciones/0004_indices_menu_promociones.sql)
+-- Menú del día: WHERE idDiaMenu = %s AND activo, solo filas activas
+CREATE INDEX IF NOT EXISTS idx_menu_producto_dia_activo
+    ON MENU_PRODUCTO (idDiaMenu, idTipo) INCLUDE (idProducto)
+    WHERE activo;
+
+-- Promociones vigentes: WHERE activo AND fecha_inicio <= hoy AND fecha_fin >= hoy
+CREATE INDEX IF NOT EXISTS idx_menu_excepcion_vigente
+    ON MENU_EXCEPCION (fecha_fin, fecha_inicio) INCLUDE (descuento_porcentaje)
+    WHERE activo;
+
+-- Promociones de un producto (UNIQUE(idExcepcion, idProducto) empieza por idExcepcion)
+CREATE INDEX IF NOT EXISTS idx_excepcion_producto_producto
+    ON EXCEPCION_PRODUCTO (idProducto, idExcepcion) INCLUDE (precio_especial);
+
+
+-- REGISTRO DE VENTAS
+-- idVenta lo genera la aplicación (uuid) para que reenviar una venta desde
+-- el WAL local sea idempotente. idProducto no es FK: la venta debe
+-- conservarse aunque el producto se elimine después.
+CREATE TABLE IF NOT EXISTS VENTA (
+    idVenta VARCHAR(36) PRIMARY KEY,
+    fecha TIMESTAMP NOT NULL,
+    cliente VARCHAR(100) NOT NULL,
+    metodo_pago VARCHAR(30) NOT NULL,
+    subtotal DECIMAL(12,2) NOT NULL,
+    impuesto DECIMAL(12,2) NOT NULL,
+    descuento DECIMAL(12,2) NOT NULL DEFAULT 0,
+    total DECIMAL(12,2) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_venta_fecha ON VENTA (fecha);
+
+CREATE TABLE IF NOT EXISTS VENTA_DETALLE (
+    idVenta VARCHAR(36) NOT NULL,
+    linea INTEGER NOT NULL,
+    idProducto VARCHAR(30),
+    nombre VARCHAR(100) NOT NULL,
+    precio DECIMAL(10,2) NOT NULL,
+    cantidad INTEGER NOT NULL,
+    subtotal DECIMAL(12,2) NOT NULL,
+    PRIMARY KEY (idVenta, linea),
+    FOREIGN KEY (idVenta) REFERENCES VENTA(idVenta) ON DELETE CASCADE,
+    CONSTRAINT chk_cantidad_venta CHECK (cantidad > 0)
+);
+
 
 -- TRIGGER PARA CREAR IDPRODUCTO AUTOMATICO
 
@@ -328,3 +377,216 @@ FROM PRODUCTO
 WHERE nombre IN ('Tiramisú', 'Cheesecake de Frutos', 'Brownie con Helado', 'Tres Leches');
 
 
+
+-- NOTIFICACIÓN DE CAMBIOS EN EL CATÁLOGO
+-- Las aplicaciones escuchan el canal 'catalogo_cambios' (LISTEN) para invalidar
+-- su caché; el payload es el nombre de la tabla modificada.
+CREATE OR REPLACE FUNCTION notificar_cambio_catalogo()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('catalogo_cambios', lower(TG_TABLE_NAME));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trgNotificarProducto
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON PRODUCTO
+FOR EACH STATEMENT
+EXECUTE FUNCTION notificar_cambio_catalogo();
+
+CREATE TRIGGER trgNotificarTipoComida
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON TIPO_COMIDA
+FOR EACH STATEMENT
+EXECUTE FUNCTION notificar_cambio_catalogo();
+
+CREATE TRIGGER trgNotificarMenuProducto
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON MENU_PRODUCTO
+FOR EACH STATEMENT
+EXECUTE FUNCTION notificar_cambio_catalogo();
+
+CREATE TRIGGER trgNotificarMenuExcepcion
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON MENU_EXCEPCION
+FOR EACH STATEMENT
+EXECUTE FUNCTION notificar_cambio_catalogo();
+
+CREATE TRIGGER trgNotificarExcepcionProducto
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON EXCEPCION_PRODUCTO
+FOR EACH STATEMENT
+EXECUTE FUNCTION notificar_cambio_catalogo();
+
+
+-- PRECIO EFECTIVO MATERIALIZADO
+-- Precio final de cada producto en cada fecha con promoción, desde ayer
+-- hasta un horizonte de 30 días: la promoción activa que deja el precio más
+-- bajo y ese precio (precio_especial o, si no tiene, el porcentaje sobre el
+-- precio). Los productos sin promoción ese día no tienen fila: su precio es
+-- PRODUCTO.precio. Los triggers de abajo la mantienen al día cuando cambian
+-- precios o promociones, así leer un precio es una sola búsqueda por
+-- (idProducto, fecha).
+CREATE TABLE IF NOT EXISTS PRECIO_EFECTIVO (
+    idProducto VARCHAR(30) NOT NULL,
+    fecha DATE NOT NULL,
+    precio_original DECIMAL(10,2) NOT NULL,
+    precio_final DECIMAL(10,2) NOT NULL,
+    descuento_porcentaje DECIMAL(5,2) NOT NULL,
+    idExcepcion INTEGER NOT NULL,
+    promocion VARCHAR(100) NOT NULL,
+    PRIMARY KEY (idProducto, fecha),
+    FOREIGN KEY (idProducto) REFERENCES PRODUCTO(idProducto) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Promociones del día (obtener_productos_con_descuento)
+CREATE INDEX IF NOT EXISTS idx_precio_efectivo_fecha ON PRECIO_EFECTIVO (fecha, idExcepcion);
+
+-- Último día que se genera en PRECIO_EFECTIVO: solo se leen hoy y los días
+-- cercanos, así una promoción de varios años no crea una fila por día.
+-- extender_precio_efectivo() corre el horizonte cada día.
+CREATE OR REPLACE FUNCTION horizonte_precio_efectivo()
+RETURNS DATE AS $$
+    SELECT CURRENT_DATE + 30;
+$$ LANGUAGE sql STABLE;
+
+-- Hasta qué día se generó PRECIO_EFECTIVO para todas las promociones
+CREATE TABLE IF NOT EXISTS PRECIO_EFECTIVO_HORIZONTE (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    hasta DATE NOT NULL
+);
+
+-- Recalcula las filas de los productos indicados, desde ayer hasta el
+-- horizonte (las ventas ya guardan el precio cobrado). Si varias promociones
+-- cubren el mismo día gana la que deja el precio final más bajo: la misma
+-- que se cobra.
+CREATE OR REPLACE FUNCTION refrescar_precio_efectivo(productos VARCHAR[])
+RETURNS void AS $$
+BEGIN
+    DELETE FROM PRECIO_EFECTIVO WHERE idProducto = ANY(productos);
+
+    INSERT INTO PRECIO_EFECTIVO (idProducto, fecha, precio_original, precio_final,
+                                 descuento_porcentaje, idExcepcion, promocion)
+    SELECT DISTINCT ON (ep.idProducto, dia.fecha)
+           ep.idProducto, dia.fecha::DATE, p.precio, calculo.precio_final,
+           COALESCE(me.descuento_porcentaje, 0), me.idExcepcion, me.nombre
+    FROM EXCEPCION_PRODUCTO ep
+    JOIN MENU_EXCEPCION me ON me.idExcepcion = ep.idExcepcion
+    JOIN PRODUCTO p ON p.idProducto = ep.idProducto
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(ep.precio_especial,
+                        ROUND(p.precio * (100 - COALESCE(me.descuento_porcentaje, 0)) / 100, 2))
+                   AS precio_final
+    ) calculo
+    CROSS JOIN LATERAL generate_series(GREATEST(me.fecha_inicio, CURRENT_DATE - 1),
+                                       LEAST(me.fecha_fin, horizonte_precio_efectivo()),
+                                       INTERVAL '1 day') AS dia(fecha)
+    WHERE ep.idProducto = ANY(productos)
+      AND me.activo = TRUE
+    ORDER BY ep.idProducto, dia.fecha, calculo.precio_final, me.idExcepcion;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Corre el horizonte hasta horizonte_precio_efectivo() y borra los días
+-- viejos. La aplicación la llama una vez por día; si el horizonte ya está al
+-- día no hace nada. FOR UPDATE ordena a los clientes que la llamen a la vez.
+CREATE OR REPLACE FUNCTION extender_precio_efectivo()
+RETURNS void AS $$
+DECLARE
+    anterior DATE;
+BEGIN
+    SELECT hasta INTO anterior FROM PRECIO_EFECTIVO_HORIZONTE WHERE id FOR UPDATE;
+    IF anterior >= horizonte_precio_efectivo() THEN
+        RETURN;
+    END IF;
+
+    DELETE FROM PRECIO_EFECTIVO WHERE fecha < CURRENT_DATE - 1;
+
+    -- Solo las promociones que siguen después del horizonte anterior tienen
+    -- días nuevos
+    PERFORM refrescar_precio_efectivo(ARRAY(
+        SELECT DISTINCT ep.idProducto
+        FROM EXCEPCION_PRODUCTO ep
+        JOIN MENU_EXCEPCION me ON me.idExcepcion = ep.idExcepcion
+        WHERE me.activo = TRUE
+          AND (anterior IS NULL OR me.fecha_fin > anterior)
+    ));
+
+    INSERT INTO PRECIO_EFECTIVO_HORIZONTE (id, hasta)
+    VALUES (TRUE, horizonte_precio_efectivo())
+    ON CONFLICT (id) DO UPDATE SET hasta = EXCLUDED.hasta;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cambio de precio de un producto
+CREATE OR REPLACE FUNCTION precio_efectivo_por_producto()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refrescar_precio_efectivo(ARRAY[NEW.idProducto]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Producto agregado, quitado o cambiado en una promoción
+CREATE OR REPLACE FUNCTION precio_efectivo_por_excepcion_producto()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refrescar_precio_efectivo(ARRAY[NEW.idProducto]);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refrescar_precio_efectivo(ARRAY[OLD.idProducto]);
+    ELSE
+        PERFORM refrescar_precio_efectivo(ARRAY[OLD.idProducto, NEW.idProducto]);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fechas, descuento, nombre o estado de una promoción
+CREATE OR REPLACE FUNCTION precio_efectivo_por_excepcion()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refrescar_precio_efectivo(ARRAY(
+        SELECT idProducto FROM EXCEPCION_PRODUCTO WHERE idExcepcion = NEW.idExcepcion
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TRUNCATE no dispara los triggers por fila
+CREATE OR REPLACE FUNCTION precio_efectivo_vaciar()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM PRECIO_EFECTIVO;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trgPrecioEfectivoProducto ON PRODUCTO;
+CREATE TRIGGER trgPrecioEfectivoProducto
+AFTER UPDATE OF precio ON PRODUCTO
+FOR EACH ROW
+WHEN (OLD.precio IS DISTINCT FROM NEW.precio)
+EXECUTE FUNCTION precio_efectivo_por_producto();
+
+DROP TRIGGER IF EXISTS trgPrecioEfectivoExcepcionProducto ON EXCEPCION_PRODUCTO;
+CREATE TRIGGER trgPrecioEfectivoExcepcionProducto
+AFTER INSERT OR UPDATE OR DELETE ON EXCEPCION_PRODUCTO
+FOR EACH ROW
+EXECUTE FUNCTION precio_efectivo_por_excepcion_producto();
+
+DROP TRIGGER IF EXISTS trgPrecioEfectivoExcepcion ON MENU_EXCEPCION;
+CREATE TRIGGER trgPrecioEfectivoExcepcion
+AFTER UPDATE ON MENU_EXCEPCION
+FOR EACH ROW
+WHEN (OLD.fecha_inicio IS DISTINCT FROM NEW.fecha_inicio
+      OR OLD.fecha_fin IS DISTINCT FROM NEW.fecha_fin
+      OR OLD.descuento_porcentaje IS DISTINCT FROM NEW.descuento_porcentaje
+      OR OLD.activo IS DISTINCT FROM NEW.activo
+      OR OLD.nombre IS DISTINCT FROM NEW.nombre)
+EXECUTE FUNCTION precio_efectivo_por_excepcion();
+
+DROP TRIGGER IF EXISTS trgPrecioEfectivoVaciar ON EXCEPCION_PRODUCTO;
+CREATE TRIGGER trgPrecioEfectivoVaciar
+AFTER TRUNCATE ON EXCEPCION_PRODUCTO
+FOR EACH STATEMENT
+EXECUTE FUNCTION precio_efectivo_vaciar();
+
+-- Carga inicial con las promociones existentes
+SELECT extender_precio_efectivo();
@@ -0,0 +1,2 @@
+-- Paginación keyset del catálogo: WHERE (nombre, idProducto) > (...) ORDER BY nombre, idProducto
+CREATE INDEX IF NOT EXISTS idx_producto_nombre_id ON PRODUCTO (nombre, idProducto);
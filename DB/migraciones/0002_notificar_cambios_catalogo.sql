@@ -0,0 +1,40 @@
+-- NOTIFICACIÓN DE CAMBIOS EN EL CATÁLOGO
+-- Las aplicaciones escuchan el canal 'catalogo_cambios' (LISTEN) para invalidar
+-- su caché; el payload es el nombre de la tabla modificada.
+CREATE OR REPLACE FUNCTION notificar_cambio_catalogo()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('catalogo_cambios', lower(TG_TABLE_NAME));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trgNotificarProducto ON PRODUCTO;
+CREATE TRIGGER trgNotificarProducto
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON PRODUCTO
+FOR EACH STATEMENT
+EXECUTE FUNCTION notificar_cambio_catalogo();
+
+DROP TRIGGER IF EXISTS trgNotificarTipoComida ON TIPO_COMIDA;
+CREATE TRIGGER trgNotificarTipoComida
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON TIPO_COMIDA
+FOR EACH STATEMENT
+EXECUTE FUNCTION notificar_cambio_catalogo();
+
+DROP TRIGGER IF EXISTS trgNotificarMenuProducto ON MENU_PRODUCTO;
+CREATE TRIGGER trgNotificarMenuProducto
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON MENU_PRODUCTO
+FOR EACH STATEMENT
+EXECUTE FUNCTION notificar_cambio_catalogo();
+
+DROP TRIGGER IF EXISTS trgNotificarMenuExcepcion ON MENU_EXCEPCION;
+CREATE TRIGGER trgNotificarMenuExcepcion
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON MENU_EXCEPCION
+FOR EACH STATEMENT
+EXECUTE FUNCTION notificar_cambio_catalogo();
+
+DROP TRIGGER IF EXISTS trgNotificarExcepcionProducto ON EXCEPCION_PRODUCTO;
+CREATE TRIGGER trgNotificarExcepcionProducto
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON EXCEPCION_PRODUCTO
+FOR EACH STATEMENT
+EXECUTE FUNCTION notificar_cambio_catalogo();
@@ -0,0 +1,29 @@
+-- REGISTRO DE VENTAS
+-- idVenta lo genera la aplicación (uuid) para que reenviar una venta desde
+-- el WAL local sea idempotente. idProducto no es FK: la venta debe
+-- conservarse aunque el producto se elimine después.
+CREATE TABLE IF NOT EXISTS VENTA (
+    idVenta VARCHAR(36) PRIMARY KEY,
+    fecha TIMESTAMP NOT NULL,
+    cliente VARCHAR(100) NOT NULL,
+    metodo_pago VARCHAR(30) NOT NULL,
+    subtotal DECIMAL(12,2) NOT NULL,
+    impuesto DECIMAL(12,2) NOT NULL,
+    descuento DECIMAL(12,2) NOT NULL DEFAULT 0,
+    total DECIMAL(12,2) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_venta_fecha ON VENTA (fecha);
+
+CREATE TABLE IF NOT EXISTS VENTA_DETALLE (
+    idVenta VARCHAR(36) NOT NULL,
+    linea INTEGER NOT NULL,
+    idProducto VARCHAR(30),
+    nombre VARCHAR(100) NOT NULL,
+    precio DECIMAL(10,2) NOT NULL,
+    cantidad INTEGER NOT NULL,
+    subtotal DECIMAL(12,2) NOT NULL,
+    PRIMARY KEY (idVenta, linea),
+    FOREIGN KEY (idVenta) REFERENCES VENTA(idVenta) ON DELETE CASCADE,
+    CONSTRAINT chk_cantidad_venta CHECK (cantidad > 0)
+);
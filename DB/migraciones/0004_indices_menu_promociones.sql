@@ -0,0 +1,27 @@
+-- ÍNDICES PARA LAS CONSULTAS FRECUENTES DEL MENÚ Y LAS PROMOCIONES
+
+-- Menú del día (obtener_menu_del_dia, obtener_productos_en_menu_dia):
+--   WHERE mp.idDiaMenu = %s AND mp.activo = TRUE ... ORDER BY tc.idTipo
+-- Parcial: solo las filas activas. Cubre idTipo e idProducto para el JOIN
+-- sin visitar la tabla (index-only scan).
+CREATE INDEX IF NOT EXISTS idx_menu_producto_dia_activo
+    ON MENU_PRODUCTO (idDiaMenu, idTipo) INCLUDE (idProducto)
+    WHERE activo;
+
+-- Promociones vigentes (obtener_excepciones_activas y los JOIN de precios):
+--   WHERE activo = TRUE AND fecha_inicio <= %s AND fecha_fin >= %s
+-- fecha_fin primero: descarta las promociones vencidas, que son la mayoría
+-- con el tiempo. Las inactivas no entran al índice.
+CREATE INDEX IF NOT EXISTS idx_menu_excepcion_vigente
+    ON MENU_EXCEPCION (fecha_fin, fecha_inicio) INCLUDE (descuento_porcentaje)
+    WHERE activo;
+
+-- Promociones de un producto (LATERAL de obtener_precios_productos):
+--   WHERE ep.idProducto = p.idProducto
+-- UNIQUE(idExcepcion, idProducto) no sirve: empieza por idExcepcion.
+CREATE INDEX IF NOT EXISTS idx_excepcion_producto_producto
+    ON EXCEPCION_PRODUCTO (idProducto, idExcepcion) INCLUDE (precio_especial);
+
+ANALYZE MENU_PRODUCTO;
+ANALYZE MENU_EXCEPCION;
+ANALYZE EXCEPCION_PRODUCTO;
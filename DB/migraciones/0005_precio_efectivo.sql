@@ -0,0 +1,123 @@
+-- PRECIO EFECTIVO MATERIALIZADO
+-- Precio final de cada producto en cada fecha con promoción: la promoción
+-- activa de mayor descuento y su precio (precio_especial o, si no tiene, el
+-- porcentaje sobre el precio). Los productos sin promoción ese día no tienen
+-- fila: su precio es PRODUCTO.precio. Los triggers de abajo la mantienen al
+-- día cuando cambian precios o promociones, así leer un precio es una sola
+-- búsqueda por (idProducto, fecha).
+CREATE TABLE IF NOT EXISTS PRECIO_EFECTIVO (
+    idProducto VARCHAR(30) NOT NULL,
+    fecha DATE NOT NULL,
+    precio_original DECIMAL(10,2) NOT NULL,
+    precio_final DECIMAL(10,2) NOT NULL,
+    descuento_porcentaje DECIMAL(5,2) NOT NULL,
+    idExcepcion INTEGER NOT NULL,
+    promocion VARCHAR(100) NOT NULL,
+    PRIMARY KEY (idProducto, fecha),
+    FOREIGN KEY (idProducto) REFERENCES PRODUCTO(idProducto) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Promociones del día (obtener_productos_con_descuento)
+CREATE INDEX IF NOT EXISTS idx_precio_efectivo_fecha ON PRECIO_EFECTIVO (fecha, idExcepcion);
+
+-- Recalcula las filas de los productos indicados. Las fechas anteriores a
+-- ayer no se generan: las ventas ya guardan el precio cobrado.
+CREATE OR REPLACE FUNCTION refrescar_precio_efectivo(productos VARCHAR[])
+RETURNS void AS $$
+BEGIN
+    DELETE FROM PRECIO_EFECTIVO WHERE idProducto = ANY(productos);
+
+    INSERT INTO PRECIO_EFECTIVO (idProducto, fecha, precio_original, precio_final,
+                                 descuento_porcentaje, idExcepcion, promocion)
+    SELECT DISTINCT ON (ep.idProducto, dia.fecha)
+           ep.idProducto, dia.fecha::DATE, p.precio,
+           COALESCE(ep.precio_especial,
+                    ROUND(p.precio * (100 - COALESCE(me.descuento_porcentaje, 0)) / 100, 2)),
+           COALESCE(me.descuento_porcentaje, 0), me.idExcepcion, me.nombre
+    FROM EXCEPCION_PRODUCTO ep
+    JOIN MENU_EXCEPCION me ON me.idExcepcion = ep.idExcepcion
+    JOIN PRODUCTO p ON p.idProducto = ep.idProducto
+    CROSS JOIN LATERAL generate_series(GREATEST(me.fecha_inicio, CURRENT_DATE - 1),
+                                       me.fecha_fin, INTERVAL '1 day') AS dia(fecha)
+    WHERE ep.idProducto = ANY(productos)
+      AND me.activo = TRUE
+    ORDER BY ep.idProducto, dia.fecha, me.descuento_porcentaje DESC NULLS LAST, me.idExcepcion;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cambio de precio de un producto
+CREATE OR REPLACE FUNCTION precio_efectivo_por_producto()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refrescar_precio_efectivo(ARRAY[NEW.idProducto]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Producto agregado, quitado o cambiado en una promoción
+CREATE OR REPLACE FUNCTION precio_efectivo_por_excepcion_producto()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refrescar_precio_efectivo(ARRAY[NEW.idProducto]);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refrescar_precio_efectivo(ARRAY[OLD.idProducto]);
+    ELSE
+        PERFORM refrescar_precio_efectivo(ARRAY[OLD.idProducto, NEW.idProducto]);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fechas, descuento, nombre o estado de una promoción
+CREATE OR REPLACE FUNCTION precio_efectivo_por_excepcion()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refrescar_precio_efectivo(ARRAY(
+        SELECT idProducto FROM EXCEPCION_PRODUCTO WHERE idExcepcion = NEW.idExcepcion
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TRUNCATE no dispara los triggers por fila
+CREATE OR REPLACE FUNCTION precio_efectivo_vaciar()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM PRECIO_EFECTIVO;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trgPrecioEfectivoProducto ON PRODUCTO;
+CREATE TRIGGER trgPrecioEfectivoProducto
+AFTER UPDATE OF precio ON PRODUCTO
+FOR EACH ROW
+WHEN (OLD.precio IS DISTINCT FROM NEW.precio)
+EXECUTE FUNCTION precio_efectivo_por_producto();
+
+DROP TRIGGER IF EXISTS trgPrecioEfectivoExcepcionProducto ON EXCEPCION_PRODUCTO;
+CREATE TRIGGER trgPrecioEfectivoExcepcionProducto
+AFTER INSERT OR UPDATE OR DELETE ON EXCEPCION_PRODUCTO
+FOR EACH ROW
+EXECUTE FUNCTION precio_efectivo_por_excepcion_producto();
+
+DROP TRIGGER IF EXISTS trgPrecioEfectivoExcepcion ON MENU_EXCEPCION;
+CREATE TRIGGER trgPrecioEfectivoExcepcion
+AFTER UPDATE ON MENU_EXCEPCION
+FOR EACH ROW
+WHEN (OLD.fecha_inicio IS DISTINCT FROM NEW.fecha_inicio
+      OR OLD.fecha_fin IS DISTINCT FROM NEW.fecha_fin
+      OR OLD.descuento_porcentaje IS DISTINCT FROM NEW.descuento_porcentaje
+      OR OLD.activo IS DISTINCT FROM NEW.activo
+      OR OLD.nombre IS DISTINCT FROM NEW.nombre)
+EXECUTE FUNCTION precio_efectivo_por_excepcion();
+
+DROP TRIGGER IF EXISTS trgPrecioEfectivoVaciar ON EXCEPCION_PRODUCTO;
+CREATE TRIGGER trgPrecioEfectivoVaciar
+AFTER TRUNCATE ON EXCEPCION_PRODUCTO
+FOR EACH STATEMENT
+EXECUTE FUNCTION precio_efectivo_vaciar();
+
+-- Carga inicial con las promociones existentes
+SELECT refrescar_precio_efectivo(ARRAY(SELECT idProducto FROM PRODUCTO));
@@ -0,0 +1,86 @@
+-- PRECIO EFECTIVO CON HORIZONTE
+-- La 0005 generaba una fila por producto y día hasta el fin de cada
+-- promoción (una promoción de varios años eran cientos de filas por
+-- producto) y elegía la promoción de mayor porcentaje, que no siempre es la
+-- de menor precio cuando hay precio_especial. Ahora las filas llegan hasta
+-- un horizonte de 30 días que se corre cada día y gana el precio final más
+-- bajo.
+-- Último día que se genera en PRECIO_EFECTIVO: solo se leen hoy y los días
+-- cercanos, así una promoción de varios años no crea una fila por día.
+-- extender_precio_efectivo() corre el horizonte cada día.
+CREATE OR REPLACE FUNCTION horizonte_precio_efectivo()
+RETURNS DATE AS $$
+    SELECT CURRENT_DATE + 30;
+$$ LANGUAGE sql STABLE;
+
+-- Hasta qué día se generó PRECIO_EFECTIVO para todas las promociones
+CREATE TABLE IF NOT EXISTS PRECIO_EFECTIVO_HORIZONTE (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    hasta DATE NOT NULL
+);
+
+-- Recalcula las filas de los productos indicados, desde ayer hasta el
+-- horizonte (las ventas ya guardan el precio cobrado). Si varias promociones
+-- cubren el mismo día gana la que deja el precio final más bajo: la misma
+-- que se cobra.
+CREATE OR REPLACE FUNCTION refrescar_precio_efectivo(productos VARCHAR[])
+RETURNS void AS $$
+BEGIN
+    DELETE FROM PRECIO_EFECTIVO WHERE idProducto = ANY(productos);
+
+    INSERT INTO PRECIO_EFECTIVO (idProducto, fecha, precio_original, precio_final,
+                                 descuento_porcentaje, idExcepcion, promocion)
+    SELECT DISTINCT ON (ep.idProducto, dia.fecha)
+           ep.idProducto, dia.fecha::DATE, p.precio, calculo.precio_final,
+           COALESCE(me.descuento_porcentaje, 0), me.idExcepcion, me.nombre
+    FROM EXCEPCION_PRODUCTO ep
+    JOIN MENU_EXCEPCION me ON me.idExcepcion = ep.idExcepcion
+    JOIN PRODUCTO p ON p.idProducto = ep.idProducto
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(ep.precio_especial,
+                        ROUND(p.precio * (100 - COALESCE(me.descuento_porcentaje, 0)) / 100, 2))
+                   AS precio_final
+    ) calculo
+    CROSS JOIN LATERAL generate_series(GREATEST(me.fecha_inicio, CURRENT_DATE - 1),
+                                       LEAST(me.fecha_fin, horizonte_precio_efectivo()),
+                                       INTERVAL '1 day') AS dia(fecha)
+    WHERE ep.idProducto = ANY(productos)
+      AND me.activo = TRUE
+    ORDER BY ep.idProducto, dia.fecha, calculo.precio_final, me.idExcepcion;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Corre el horizonte hasta horizonte_precio_efectivo() y borra los días
+-- viejos. La aplicación la llama una vez por día; si el horizonte ya está al
+-- día no hace nada. FOR UPDATE ordena a los clientes que la llamen a la vez.
+CREATE OR REPLACE FUNCTION extender_precio_efectivo()
+RETURNS void AS $$
+DECLARE
+    anterior DATE;
+BEGIN
+    SELECT hasta INTO anterior FROM PRECIO_EFECTIVO_HORIZONTE WHERE id FOR UPDATE;
+    IF anterior >= horizonte_precio_efectivo() THEN
+        RETURN;
+    END IF;
+
+    DELETE FROM PRECIO_EFECTIVO WHERE fecha < CURRENT_DATE - 1;
+
+    -- Solo las promociones que siguen después del horizonte anterior tienen
+    -- días nuevos
+    PERFORM refrescar_precio_efectivo(ARRAY(
+        SELECT DISTINCT ep.idProducto
+        FROM EXCEPCION_PRODUCTO ep
+        JOIN MENU_EXCEPCION me ON me.idExcepcion = ep.idExcepcion
+        WHERE me.activo = TRUE
+          AND (anterior IS NULL OR me.fecha_fin > anterior)
+    ));
+
+    INSERT INTO PRECIO_EFECTIVO_HORIZONTE (id, hasta)
+    VALUES (TRUE, horizonte_precio_efectivo())
+    ON CONFLICT (id) DO UPDATE SET hasta = EXCLUDED.hasta;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcula con las reglas nuevas y fija el horizonte
+DELETE FROM PRECIO_EFECTIVO_HORIZONTE;
+SELECT extender_precio_efectivo();
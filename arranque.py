@@ -0,0 +1,180 @@
+"""
+Medición del arranque de la aplicación
+
+Importar este módulo lo antes posible (primera línea de main.py): toma la
+referencia de tiempo y permite marcar etapas y medir el tiempo hasta el
+primer cuadro pintado (time-to-first-frame).
+
+Con `activar_perfil()` (main.py --profile-startup) además se mide cuánto
+tarda cada import; al pintarse el primer cuadro se imprime el desglose de
+imports y de etapas de inicialización y la aplicación se cierra.
+"""
+from typing import Dict, List, Tuple
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+INICIO = time.perf_counter()
+
+
+def _segundos_desde_inicio_proceso() -> float:
+    """Tiempo que el proceso llevaba vivo al importar este módulo (Linux)"""
+    try:
+        with open('/proc/self/stat') as f:
+            # El nombre del ejecutable puede tener espacios: cortar tras ')'
+            campos = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        inicio = int(campos[19]) / os.sysconf('SC_CLK_TCK')
+        return max(0.0, uptime - inicio)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+# Arranque del intérprete e imports previos a este módulo
+PREVIO = _segundos_desde_inicio_proceso()
+
+_etapas: List[Tuple[str, float]] = []
+
+
+def transcurrido() -> float:
+    """Segundos desde el inicio del proceso"""
+    return PREVIO + time.perf_counter() - INICIO
+
+
+def marcar(etapa: str):
+    """Registra una etapa del arranque"""
+    _etapas.append((etapa, transcurrido()))
+
+
+def etapas() -> List[Tuple[str, float]]:
+    return list(_etapas)
+
+
+def medir_primer_cuadro(ventana):
+    """
+    Registra el tiempo hasta que la ventana se pinta por primera vez
+
+    Se llama antes del mainloop: el callback corre cuando Tk queda ocioso,
+    después de procesar el mapeo y el primer dibujado de la ventana.
+    """
+    def primer_cuadro():
+        marcar("primer cuadro")
+        if _perfil is not None:
+            print(informe())
+            ventana.destroy()
+            return
+        anterior = 0.0
+        for etapa, segundos in _etapas:
+            logger.info(f"Arranque: {etapa:<22} {segundos * 1000:8.1f} ms  (+{(segundos - anterior) * 1000:.1f})")
+            anterior = segundos
+        logger.info(f"⏱ Primer cuadro a los {transcurrido() * 1000:.0f} ms del inicio del proceso")
+
+    ventana.after_idle(lambda: ventana.after(0, primer_cuadro))
+
+
+# ----------------------------------------------------------------------
+# Perfil de imports
+# ----------------------------------------------------------------------
+
+class _CargadorMedido:
+    """Envuelve el loader de un módulo y mide create_module + exec_module"""
+
+    def __init__(self, perfil: '_PerfilImports', cargador, nombre: str):
+        self._perfil = perfil
+        self._cargador = cargador
+        self._nombre = nombre
+
+    def __getattr__(self, atributo):
+        # get_data, is_package, get_resource_reader, etc. del loader original
+        return getattr(self._cargador, atributo)
+
+    def create_module(self, spec):
+        crear = getattr(self._cargador, 'create_module', None)
+        if crear is None:
+            return None
+        inicio = time.perf_counter()
+        try:
+            return crear(spec)
+        finally:
+            self._perfil.creacion[self._nombre] = time.perf_counter() - inicio
+
+    def exec_module(self, modulo):
+        self._perfil.medir(self._nombre, self._cargador.exec_module, modulo)
+
+
+class _PerfilImports:
+    """
+    Finder que no busca nada por sí mismo: delega en los demás y envuelve
+    el loader encontrado para medir el tiempo de carga de cada módulo.
+
+    (No hereda de importlib.abc.MetaPathFinder: importarlo cuesta más de lo
+    que se quiere medir y sys.meta_path solo necesita find_spec)
+    """
+
+    def __init__(self):
+        self.creacion: Dict[str, float] = {}
+        # (módulo, acumulado, propio) en orden de finalización
+        self.tiempos: List[Tuple[str, float, float]] = []
+        self._pila: List[float] = []
+
+    def find_spec(self, nombre, ruta, objetivo=None):
+        for buscador in sys.meta_path:
+            if buscador is self or not hasattr(buscador, 'find_spec'):
+                continue
+            spec = buscador.find_spec(nombre, ruta, objetivo)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _CargadorMedido(self, spec.loader, nombre)
+        return spec
+
+    def medir(self, nombre: str, ejecutar, modulo):
+        self._pila.append(0.0)
+        inicio = time.perf_counter()
+        try:
+            ejecutar(modulo)
+        finally:
+            total = time.perf_counter() - inicio + self.creacion.pop(nombre, 0.0)
+            hijos = self._pila.pop()
+            if self._pila:
+                self._pila[-1] += total
+            self.tiempos.append((nombre, total, total - hijos))
+
+
+_perfil = None
+
+
+def activar_perfil():
+    """Empieza a medir los imports (llamar antes de importar la aplicación)"""
+    global _perfil
+    if _perfil is None:
+        _perfil = _PerfilImports()
+        sys.meta_path.insert(0, _perfil)
+
+
+def informe(maximo: int = 20) -> str:
+    """Desglose de imports (si el perfil está activo) y de etapas del arranque"""
+    lineas = ["=" * 64, "PERFIL DE ARRANQUE", "=" * 64]
+    lineas.append(f"  Intérprete e imports previos: {PREVIO * 1000:8.1f} ms")
+
+    if _perfil is not None:
+        tiempos = sorted(_perfil.tiempos, key=lambda t: t[2], reverse=True)
+        total_propio = sum(propio for _, _, propio in _perfil.tiempos)
+        lineas += ["", f"  IMPORTS ({len(tiempos)} módulos, {total_propio * 1000:.1f} ms en total)",
+                   f"  {'módulo':<36} {'propio':>10} {'acumulado':>12}", "  " + "-" * 60]
+        for nombre, acumulado, propio in tiempos[:maximo]:
+            lineas.append(f"  {nombre:<36} {propio * 1000:7.1f} ms {acumulado * 1000:9.1f} ms")
+
+    lineas += ["", "  INICIALIZACIÓN (desde el inicio del proceso)",
+               f"  {'etapa':<36} {'momento':>10} {'duración':>12}", "  " + "-" * 60]
+    anterior = PREVIO
+    for etapa, segundos in _etapas:
+        lineas.append(f"  {etapa:<36} {segundos * 1000:7.1f} ms {(segundos - anterior) * 1000:9.1f} ms")
+        anterior = segundos
+    return "\n".join(lineas)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+benchmark_db.py - Micro-benchmarks de acceso a la base de datos
+Mide la latencia de las operaciones más frecuentes del POS contra PostgreSQL
+
+Uso:
+    python3 benchmark_db.py [seccion] [iteraciones]
+
+Secciones disponibles: lectura, lotes, precios, preparadas, flujo, registros, todas (por defecto)
+"""
+
+import sys
+import time
+from datetime import datetime
+from statistics import mean, median
+
+from conexionDB import db_manager
+
+
+def medir(funcion, iteraciones: int) -> dict:
+    """Ejecuta `funcion` varias veces y retorna la latencia en milisegundos"""
+    # Una ejecución de calentamiento (pool, caché de planes)
+    funcion()
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        'promedio': mean(tiempos),
+        'mediana': median(tiempos),
+        'p95': tiempos[int(len(tiempos) * 0.95) - 1],
+    }
+
+
+def imprimir_fila(nombre: str, antes: dict, despues: dict):
+    mejora = (1 - despues['mediana'] / antes['mediana']) * 100 if antes['mediana'] else 0
+    print(f"  {nombre:<28} {antes['mediana']:>8.3f} ms {despues['mediana']:>8.3f} ms"
+          f" {despues['p95']:>8.3f} ms {mejora:>7.1f}%")
+
+
+def benchmark_lectura(iteraciones: int):
+    """Compara el camino transaccional (con COMMIT) contra el modo solo lectura"""
+    fecha = datetime.now().strftime('%Y-%m-%d')
+    dia = datetime.now().isoweekday()
+    
+    consultas = {
+        'menu_del_dia': ("""
+            SELECT DISTINCT p.idProducto, p.nombre, p.precio, p.descripcion, tc.nombre as tipo, tc.idTipo
+            FROM PRODUCTO p
+            INNER JOIN MENU_PRODUCTO mp ON p.idProducto = mp.idProducto
+            INNER JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
+            WHERE mp.idDiaMenu = %s AND mp.activo = TRUE
+            ORDER BY tc.idTipo, p.nombre
+        """, (dia,)),
+        'excepciones_activas': ("""
+            SELECT idExcepcion, nombre, descripcion, descuento_porcentaje
+            FROM MENU_EXCEPCION
+            WHERE activo = TRUE AND fecha_inicio <= %s AND fecha_fin >= %s
+            ORDER BY descuento_porcentaje DESC
+        """, (fecha, fecha)),
+        'precio_producto': ("""
+            SELECT p.precio, ep.precio_especial, me.descuento_porcentaje, me.nombre
+            FROM PRODUCTO p
+            LEFT JOIN EXCEPCION_PRODUCTO ep ON p.idProducto = ep.idProducto
+            LEFT JOIN MENU_EXCEPCION me ON ep.idExcepcion = me.idExcepcion
+                AND me.activo = TRUE AND me.fecha_inicio <= %s AND me.fecha_fin >= %s
+            WHERE p.idProducto = (SELECT MIN(idProducto) FROM PRODUCTO)
+            ORDER BY me.descuento_porcentaje DESC
+            LIMIT 1
+        """, (fecha, fecha)),
+    }
+    
+    print(f"\n📊 Lecturas: transaccional vs solo lectura ({iteraciones} iteraciones)")
+    print(f"  {'consulta':<28} {'antes':>11} {'después':>11} {'p95':>11} {'mejora':>8}")
+    print("  " + "-" * 72)
+    for nombre, (query, params) in consultas.items():
+        antes = medir(lambda: db_manager.ejecutar_query(query, params, fetch=True), iteraciones)
+        despues = medir(lambda: db_manager.ejecutar_query(query, params, fetch=True, solo_lectura=True),
+                        iteraciones)
+        imprimir_fila(nombre, antes, despues)
+
+
+def benchmark_lotes(iteraciones: int):
+    """Compara la inserción fila por fila contra execute_values y COPY"""
+    filas_por_prueba = max(iteraciones * 5, 100)
+    filas = [(i, f"Producto {i}", 1000 + i) for i in range(filas_por_prueba)]
+    columnas = ["id", "nombre", "precio"]
+    
+    db_manager.ejecutar_escritura("""
+        CREATE TABLE IF NOT EXISTS BENCH_LOTE (
+            id INTEGER PRIMARY KEY,
+            nombre VARCHAR(45) NOT NULL,
+            precio DECIMAL(10,2) NOT NULL
+        )
+    """)
+    
+    def por_fila():
+        for fila in filas:
+            db_manager.insertar("BENCH_LOTE", dict(zip(columnas, fila)))
+        return len(filas)
+    
+    estrategias = {
+        'insertar() por fila': por_fila,
+        'insertar_lote (values)': lambda: db_manager.insertar_lote("BENCH_LOTE", columnas, filas),
+        'upsert_lote (values)': lambda: db_manager.upsert_lote("BENCH_LOTE", columnas, filas,
+                                                               conflicto=["id"], actualizar=["precio"]),
+        'copiar_lote (COPY)': lambda: db_manager.copiar_lote("BENCH_LOTE", columnas, filas),
+    }
+    
+    print(f"\n📊 Escrituras por lotes ({filas_por_prueba} filas por estrategia)")
+    print(f"  {'estrategia':<28} {'total':>11} {'por fila':>11} {'filas':>8}")
+    print("  " + "-" * 62)
+    try:
+        for nombre, estrategia in estrategias.items():
+            if not nombre.startswith('upsert'):
+                db_manager.ejecutar_escritura("TRUNCATE BENCH_LOTE")
+            inicio = time.perf_counter()
+            afectadas = estrategia()
+            total_ms = (time.perf_counter() - inicio) * 1000
+            print(f"  {nombre:<28} {total_ms:>8.1f} ms {total_ms / len(filas):>8.3f} ms {afectadas:>8}")
+    finally:
+        db_manager.ejecutar_escritura("DROP TABLE IF EXISTS BENCH_LOTE")
+
+
+def benchmark_precios(iteraciones: int):
+    """Compara el precio calculado al consultar contra la búsqueda en PRECIO_EFECTIVO"""
+    fecha = datetime.now().strftime('%Y-%m-%d')
+    ids = [fila[0] for fila in db_manager.ejecutar_query(
+        "SELECT idProducto FROM PRODUCTO", fetch=True, solo_lectura=True) or []]
+    
+    calculado = """
+        SELECT p.idProducto, p.precio, promo.precio_especial, promo.descuento_porcentaje, promo.nombre
+        FROM PRODUCTO p
+        LEFT JOIN LATERAL (
+            SELECT ep.precio_especial, me.descuento_porcentaje, me.nombre
+            FROM EXCEPCION_PRODUCTO ep
+            JOIN MENU_EXCEPCION me ON ep.idExcepcion = me.idExcepcion
+            WHERE ep.idProducto = p.idProducto
+              AND me.activo = TRUE AND me.fecha_inicio <= %s AND me.fecha_fin >= %s
+            ORDER BY me.descuento_porcentaje DESC
+            LIMIT 1
+        ) promo ON TRUE
+        WHERE p.idProducto = ANY(%s)
+    """
+    materializado = """
+        SELECT p.idProducto, p.precio, pe.precio_final, pe.descuento_porcentaje, pe.promocion
+        FROM PRODUCTO p
+        LEFT JOIN PRECIO_EFECTIVO pe ON pe.idProducto = p.idProducto AND pe.fecha = %s
+        WHERE p.idProducto = ANY(%s)
+    """
+    
+    print(f"\n📊 Precios: calculado vs PRECIO_EFECTIVO ({iteraciones} iteraciones)")
+    print(f"  {'consulta':<28} {'antes':>11} {'después':>11} {'p95':>11} {'mejora':>8}")
+    print("  " + "-" * 72)
+    for nombre, lote in (('precio de 1 producto', ids[:1]), (f'precios de {len(ids)} productos', ids)):
+        antes = medir(lambda: db_manager.ejecutar_query(
+            calculado, (fecha, fecha, lote), fetch=True, solo_lectura=True), iteraciones)
+        despues = medir(lambda: db_manager.ejecutar_query(
+            materializado, (fecha, lote), fetch=True, solo_lectura=True), iteraciones)
+        imprimir_fila(nombre, antes, despues)
+
+
+def benchmark_preparadas(iteraciones: int):
+    """Compara la consulta de texto contra la misma como sentencia preparada"""
+    fecha = datetime.now().strftime('%Y-%m-%d')
+    dia = datetime.now().isoweekday()
+    ids = [fila[0] for fila in db_manager.ejecutar_query(
+        "SELECT idProducto FROM PRODUCTO LIMIT 20", fetch=True, solo_lectura=True) or []]
+    
+    consultas = {
+        'menu_del_dia': ("""
+            SELECT DISTINCT p.idProducto, p.nombre, p.precio, p.descripcion, tc.nombre as tipo, tc.idTipo
+            FROM PRODUCTO p
+            INNER JOIN MENU_PRODUCTO mp ON p.idProducto = mp.idProducto
+            INNER JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
+            WHERE mp.idDiaMenu = %s AND mp.activo = TRUE
+            ORDER BY tc.idTipo, p.nombre
+        """, (dia,)),
+        'excepciones_activas': ("""
+            SELECT idExcepcion, nombre, descripcion, descuento_porcentaje
+            FROM MENU_EXCEPCION
+            WHERE activo = TRUE AND fecha_inicio <= %s AND fecha_fin >= %s
+            ORDER BY descuento_porcentaje DESC
+        """, (fecha, fecha)),
+        'precios_productos': ("""
+            SELECT p.idProducto, p.precio, pe.precio_final, pe.descuento_porcentaje, pe.promocion
+            FROM PRODUCTO p
+            LEFT JOIN PRECIO_EFECTIVO pe ON pe.idProducto = p.idProducto AND pe.fecha = %s
+            WHERE p.idProducto = ANY(%s)
+        """, (fecha, ids)),
+    }
+    
+    print(f"\n📊 Sentencias preparadas: texto vs PREPARE/EXECUTE ({iteraciones} iteraciones)")
+    print(f"  {'consulta':<28} {'antes':>11} {'después':>11} {'p95':>11} {'mejora':>8}")
+    print("  " + "-" * 72)
+    for nombre, (query, params) in consultas.items():
+        sentencia = f"benchmark_{nombre}"
+        db_manager.preparar(sentencia, query)
+        antes = medir(lambda: db_manager.ejecutar_query(query, params, fetch=True, solo_lectura=True),
+                      iteraciones)
+        despues = medir(lambda: db_manager.ejecutar_preparada(sentencia, params), iteraciones)
+        imprimir_fila(nombre, antes, despues)
+    
+    stats = db_manager.estadisticas_sentencias()
+    print(f"  PREPARE enviados: {stats['preparaciones']} (medio {stats['preparacion_media_ms']:.2f} ms), "
+          f"reutilizaciones: {stats['reutilizaciones']}, "
+          f"ahorro estimado: {stats['ahorro_estimado_ms']:.1f} ms")
+
+
+def benchmark_flujo(iteraciones: int):
+    """Compara fetchall contra el cursor del servidor (iterar_query) en memoria y tiempo"""
+    import tracemalloc
+    filas = 100_000
+    # Filas sintéticas con forma de producto: no depende del tamaño del catálogo
+    query = """
+        SELECT 'P' || g, 'Producto ' || md5(g::text), (g %% 5000 + 0.5)::numeric(10,2), NULL, md5(g::text)
+        FROM generate_series(1, %s) g
+    """
+    
+    def con_fetchall():
+        return sum(1 for _ in db_manager.ejecutar_query(query, (filas,), fetch=True, solo_lectura=True))
+    
+    def con_flujo():
+        return sum(1 for _ in db_manager.iterar_query(query, (filas,)))
+    
+    print(f"\n📊 Flujo: fetchall vs cursor del servidor ({filas:,} filas, itersize {db_manager.ITERSIZE})")
+    print(f"  {'modo':<28} {'tiempo':>11} {'pico memoria':>14}")
+    print("  " + "-" * 56)
+    for nombre, funcion in (('fetchall', con_fetchall), ('iterar_query', con_flujo)):
+        funcion()  # Calentamiento
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        funcion()
+        tiempo = (time.perf_counter() - inicio) * 1000
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {nombre:<28} {tiempo:>8.1f} ms {pico / 1024 / 1024:>11.2f} MB")
+
+
+def benchmark_registros(iteraciones: int):
+    """Compara filas copiadas a diccionarios (como antes) contra Registro de CursorCatalogo"""
+    import tracemalloc
+    from conexionDB import ConexionDB, CursorCatalogo
+    filas = 100_000
+    repeticiones = max(1, min(iteraciones, 5))
+    query = """
+        SELECT 'P' || g AS id_producto, 'Producto ' || md5(g::text) AS nombre,
+               (g %% 5000 + 0.5)::numeric(10,2) AS precio, NULL AS imagen, md5(g::text) AS descripcion
+        FROM generate_series(1, %s) g
+    """
+    
+    def con_diccionarios():
+        with ConexionDB.obtener_cursor(solo_lectura=True) as (cursor, _):
+            # Como antes: Decimal y float() en cada fila
+            cursor.execute(query, (filas,))
+            return [{
+                'id_producto': fila[0],
+                'nombre': fila[1],
+                'precio': float(fila[2]),
+                'imagen': fila[3],
+                'descripcion': fila[4]
+            } for fila in cursor.fetchall()]
+    
+    def con_registros():
+        with ConexionDB.obtener_cursor(solo_lectura=True, cursor_factory=CursorCatalogo) as (cursor, _):
+            cursor.execute(query, (filas,))
+            return cursor.fetchall()
+    
+    print(f"\n📊 Filas: diccionarios vs Registro ({filas:,} filas, {repeticiones} repeticiones)")
+    print(f"  {'modo':<28} {'tiempo':>11} {'retenido':>12} {'pico':>12}")
+    print("  " + "-" * 66)
+    for nombre, funcion in (('diccionarios', con_diccionarios), ('Registro', con_registros)):
+        funcion()  # Calentamiento
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        tracemalloc.start()
+        resultado = funcion()
+        retenido, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del resultado
+        print(f"  {nombre:<28} {median(tiempos):>8.1f} ms {retenido / 1024 / 1024:>9.2f} MB "
+              f"{pico / 1024 / 1024:>9.2f} MB")
+
+
+SECCIONES = {
+    'lectura': benchmark_lectura,
+    'lotes': benchmark_lotes,
+    'precios': benchmark_precios,
+    'preparadas': benchmark_preparadas,
+    'flujo': benchmark_flujo,
+    'registros': benchmark_registros,
+}
+
+
+def main():
+    seccion = sys.argv[1] if len(sys.argv) > 1 else 'todas'
+    iteraciones = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    
+    if seccion != 'todas' and seccion not in SECCIONES:
+        print(f"✗ Sección desconocida: {seccion}. Opciones: todas, {', '.join(SECCIONES)}")
+        sys.exit(1)
+    
+    if not db_manager.verificar_conexion():
+        print("✗ No se pudo conectar a PostgreSQL")
+        sys.exit(1)
+    
+    print("=" * 78)
+    print("BENCHMARK DE BASE DE DATOS - RESTAURANTE POS")
+    print("=" * 78)
+    
+    try:
+        for nombre, funcion in SECCIONES.items():
+            if seccion in ('todas', nombre):
+                funcion(iteraciones)
+    finally:
+        print("\n📈 Pool:", db_manager.estadisticas_pool())
+        db_manager.cerrar()
+
+
+if __name__ == "__main__":
+    main()
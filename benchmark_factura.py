@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+benchmark_factura.py - Rendimiento del motor de plantillas de factura
+Compara la construcción anterior del ticket (f-strings con += por item) con
+la plantilla compilada, y mide los backends texto, ESC/POS y PDF.
+No necesita base de datos.
+
+Uso:
+    python3 benchmark_factura.py [lineas] [iteraciones]
+"""
+
+import sys
+import time
+from statistics import median
+
+from plantilla_factura import PLANTILLA_TICKET
+
+
+def ticket_concatenado(items, datos) -> str:
+    """Construcción anterior de InterfazRestaurante._generar_contenido_factura"""
+    contenido = f"""
+{'='*50}
+                    FACTURA
+{'='*50}
+
+Fecha: {datos['fecha']}
+Cliente: {datos['cliente']}
+
+{'-'*50}
+ITEMS:
+{'-'*50}
+"""
+    for item in items:
+        cantidad = item['cantidad']
+        precio = item['precio']
+        subtotal_item = precio * cantidad
+        contenido += f"{item['nombre']:<30} x{cantidad:>2}  ${subtotal_item:>8,.0f}\n"
+
+    contenido += f"""
+{'-'*50}
+Subtotal:          ${datos['subtotal']:>10,.0f}
+ITBMS (19%):       ${datos['itbms']:>10,.0f}
+Descuento:         ${datos['descuento']:>10,.0f}
+{'-'*50}
+TOTAL:             ${datos['total']:>10,.0f}
+{'-'*50}
+
+Método de Pago: {datos['metodo_pago']}
+
+{'='*50}
+         Gracias por su compra
+{'='*50}
+"""
+    return contenido
+
+
+def ticket_plantilla(items, datos) -> str:
+    return PLANTILLA_TICKET.texto(datos, items)
+
+
+def medir(funcion, iteraciones: int) -> float:
+    """Mediana en microsegundos"""
+    funcion()
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+    return median(tiempos)
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    iteraciones = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    items = [{'nombre': f"Plato del día número {i}", 'precio': 2500.0 + 125 * i, 'cantidad': 1 + i % 3}
+             for i in range(cantidad)]
+    subtotal = sum(item['precio'] * item['cantidad'] for item in items)
+    datos = {'fecha': '18/10/2026 12:00', 'cliente': 'Cliente', 'subtotal': subtotal,
+             'itbms': subtotal * 0.19, 'descuento': 0.0, 'total': subtotal * 1.19,
+             'metodo_pago': 'Efectivo'}
+
+    if ticket_concatenado(items, datos) != ticket_plantilla(items, datos):
+        print("✗ La plantilla no produce el mismo texto que la construcción anterior")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("BENCHMARK DE FACTURAS - MOTOR DE PLANTILLAS")
+    print("=" * 60)
+    print(f"  Pedido de {cantidad} líneas, mediana de {iteraciones} iteraciones\n")
+
+    antes = medir(lambda: ticket_concatenado(items, datos), iteraciones)
+    filas = [
+        ('texto (+= por item)', antes),
+        ('texto (plantilla)', medir(lambda: ticket_plantilla(items, datos), iteraciones)),
+        ('escpos (plantilla)', medir(lambda: PLANTILLA_TICKET.escpos(datos, items), iteraciones)),
+        ('pdf (plantilla)', medir(lambda: PLANTILLA_TICKET.pdf(datos, items), iteraciones)),
+    ]
+
+    print(f"  {'construcción':<24} {'mediana':>12} {'vs. anterior':>14}")
+    print("  " + "-" * 52)
+    for nombre, mediana in filas:
+        print(f"  {nombre:<24} {mediana:>9.1f} µs {antes / mediana:>13.2f}x")
+
+
+if __name__ == "__main__":
+    main()
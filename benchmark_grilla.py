@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+benchmark_grilla.py - Redimensionar la grilla del menú con Tk real
+Compara reconstruir todas las tarjetas (como antes de GrillaTarjetas) con
+reubicar las existentes al cambiar el número de columnas. Necesita pantalla
+(DISPLAY); no usa la base de datos.
+
+Uso:
+    python3 benchmark_grilla.py [productos] [iteraciones]
+"""
+
+import sys
+import time
+import tkinter as tk
+from statistics import median
+
+from visor_productos import ElementoGrilla, GrillaTarjetas
+
+OBJETIVO_MS = 16  # Un cuadro a 60 Hz
+
+
+def crear_tarjeta(parent, numero):
+    tarjeta = tk.Frame(parent, bg='#2c3e50', relief='solid', borderwidth=1)
+    tk.Label(tarjeta, text=f"Producto {numero}", fg='white', bg='#2c3e50').pack(padx=6, pady=(6, 0))
+    tk.Label(tarjeta, text=f"${numero * 100:,}", fg='#f1c40f', bg='#2c3e50').pack(padx=6, pady=(0, 6))
+    return tarjeta
+
+
+def elementos(cantidad):
+    return [ElementoGrilla(('producto', n), (n,), lambda parent, n=n: crear_tarjeta(parent, n))
+            for n in range(cantidad)]
+
+
+def medir(ventana, accion, iteraciones):
+    tiempos = []
+    for i in range(iteraciones):
+        inicio = time.perf_counter()
+        accion(i)
+        ventana.update_idletasks()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return median(tiempos)
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    iteraciones = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    try:
+        ventana = tk.Tk()
+    except tk.TclError as e:
+        print(f"✗ Se necesita una pantalla para este benchmark: {e}")
+        sys.exit(2)
+    ventana.geometry("1400x800")
+    columnas = [4, 5, 3, 6]
+
+    print("=" * 60)
+    print("BENCHMARK DE GRILLA - REDIMENSIONAR")
+    print("=" * 60)
+    print(f"  {cantidad} tarjetas, mediana de {iteraciones} cambios de columnas\n")
+
+    # Antes: destruir y crear todas las tarjetas en cada redimensionado
+    frame = tk.Frame(ventana)
+    frame.pack(fill=tk.BOTH, expand=True)
+
+    def reconstruir(i):
+        for widget in frame.winfo_children():
+            widget.destroy()
+        for n in range(cantidad):
+            crear_tarjeta(frame, n).grid(row=n // columnas[i % 4], column=n % columnas[i % 4],
+                                         padx=8, pady=8, sticky='nsew')
+
+    antes = medir(ventana, reconstruir, iteraciones)
+    frame.destroy()
+
+    # Ahora: GrillaTarjetas reubica las tarjetas existentes
+    frame = tk.Frame(ventana)
+    frame.pack(fill=tk.BOTH, expand=True)
+    grilla = GrillaTarjetas(frame)
+    grilla.reconciliar(elementos(cantidad), columnas[0])
+    ventana.update_idletasks()
+    creadas = len(frame.winfo_children())
+
+    despues = medir(ventana, lambda i: grilla.cambiar_columnas(columnas[(i + 1) % 4]), iteraciones)
+    reutilizadas = len(frame.winfo_children()) == creadas
+
+    print(f"  Reconstruir todo:       {antes:>8.1f} ms")
+    print(f"  GrillaTarjetas:         {despues:>8.1f} ms  ({antes / despues:.0f}x)")
+    print(f"  Tarjetas reutilizadas:  {'sí' if reutilizadas else 'no'} ({creadas})")
+    ventana.destroy()
+
+    if despues <= OBJETIVO_MS and reutilizadas:
+        print(f"\n✓ Redimensionar cabe en un cuadro ({OBJETIVO_MS} ms)")
+    else:
+        print(f"\n✗ Redimensionar supera {OBJETIVO_MS} ms o recrea tarjetas")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+benchmark_pdf.py - Rendimiento del generador de PDF de facturas
+Renderiza facturas sintéticas con pdf_factura y reporta facturas por segundo
+en un solo núcleo (objetivo: 1.000/s). No necesita base de datos.
+
+Uso:
+    python3 benchmark_pdf.py [facturas] [items_por_factura]
+"""
+
+import sys
+import time
+
+from pdf_factura import EscritorPDF
+
+OBJETIVO_POR_SEGUNDO = 1000
+
+
+def factura_sintetica(numero: int, items: int) -> str:
+    """Factura con el mismo formato que la de la interfaz"""
+    lineas = [
+        "=" * 50,
+        "                    FACTURA",
+        "=" * 50,
+        "",
+        f"Fecha: 18/10/2026 12:{numero % 60:02d}",
+        f"Cliente: Cliente {numero}",
+        "",
+        "-" * 50,
+        "ITEMS:",
+        "-" * 50,
+    ]
+    subtotal = 0
+    for i in range(items):
+        cantidad = 1 + i % 3
+        precio = 2500 + 125 * i
+        subtotal += cantidad * precio
+        lineas.append(f"{'Plato (especial) ' + str(i):<30} x{cantidad:>2}  ${cantidad * precio:>8,.0f}")
+    itbms = subtotal * 0.19
+    lineas += [
+        "-" * 50,
+        f"Subtotal:          ${subtotal:>10,.0f}",
+        f"ITBMS (19%):       ${itbms:>10,.0f}",
+        f"TOTAL:             ${subtotal + itbms:>10,.0f}",
+        "-" * 50,
+        "Método de Pago: Efectivo",
+        "=" * 50,
+        "         Gracias por su compra",
+        "=" * 50,
+    ]
+    return "\n".join(lineas) + "\n"
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    facturas = [factura_sintetica(n, items) for n in range(cantidad)]
+
+    print("=" * 66)
+    print("BENCHMARK DE PDF - FACTURAS")
+    print("=" * 66)
+    print(f"  {cantidad} facturas de {items} items\n")
+    print(f"  {'papel':<10} {'total':>11} {'por factura':>13} {'facturas/s':>12} {'tamaño':>9}")
+    print("  " + "-" * 59)
+
+    resultado_ok = True
+    for papel in ('A4', 'Recibo80'):
+        escritor = EscritorPDF(papel)
+        escritor.generar(facturas[0])  # Calentamiento
+        inicio = time.perf_counter()
+        total_bytes = 0
+        for contenido in facturas:
+            total_bytes += len(escritor.generar(contenido))
+        segundos = time.perf_counter() - inicio
+        por_segundo = cantidad / segundos
+        resultado_ok = resultado_ok and por_segundo >= OBJETIVO_POR_SEGUNDO
+        print(f"  {papel:<10} {segundos * 1000:>8.1f} ms {segundos * 1e6 / cantidad:>10.1f} µs"
+              f" {por_segundo:>12,.0f} {total_bytes // cantidad:>7} B")
+
+    if resultado_ok:
+        print(f"\n✓ Supera el objetivo de {OBJETIVO_POR_SEGUNDO} facturas/s")
+    else:
+        print(f"\n✗ Por debajo del objetivo de {OBJETIVO_POR_SEGUNDO} facturas/s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Cola de impresión persistente
+
+Los trabajos se guardan en un directorio de spool local (metadatos JSON +
+contenido) y un hilo los envía a CUPS con `lp`, pasando el contenido por
+stdin, o los escribe directo en un dispositivo (ticketera ESC/POS). Si CUPS
+no responde el trabajo se reintenta con espera creciente, y los pendientes
+sobreviven a un cierre de la aplicación. La interfaz nunca
+espera a `lp`: consulta el estado con `trabajos()` y `version`.
+"""
+from typing import Dict, List, Optional, Union
+import json
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_SPOOL = os.environ.get(
+    'PARCIAL2_SPOOL',
+    os.path.join(os.path.expanduser('~'), '.local', 'share', 'parcial2', 'spool')
+)
+
+# Estados de un trabajo
+PENDIENTE = 'pendiente'
+ENVIADO = 'enviado'
+ERROR = 'error'
+CANCELADO = 'cancelado'
+
+
+class ColaImpresion:
+    """
+    Spool persistente con un hilo de envío y reintentos con backoff.
+
+    Cada trabajo es un dict con: id, titulo, impresora, copias, opciones,
+    binario, dispositivo, estado, intentos, proximo_intento, error, id_cups,
+    creado, enviado.
+    """
+
+    ESPERAS = (2, 5, 15, 30, 60)   # Segundos entre reintentos (el último se repite)
+    MAX_INTENTOS = 10
+    MAX_HISTORIAL = 200            # Trabajos enviados que se conservan para reimprimir
+    MAX_ERRORES = 50               # Trabajos con error que se conservan para reintentar
+    SEPARADOR_LOTE = '\f'          # Salto de página entre facturas de una reimpresión
+
+    def __init__(self, directorio: Optional[str] = None, timeout_lp: float = 15):
+        self.directorio = directorio or DIRECTORIO_SPOOL
+        self.timeout_lp = timeout_lp
+        self._trabajos: Dict[str, dict] = {}
+        self._cond = threading.Condition()
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = False
+        self.version = 0
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def iniciar(self):
+        """Recupera el spool del disco y arranca el hilo de envío"""
+        with self._cond:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            os.makedirs(self.directorio, exist_ok=True)
+            self._recuperar()
+            self._detener = False
+            self._hilo = threading.Thread(target=self._procesar, name="cola-impresion", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        with self._cond:
+            self._detener = True
+            self._cond.notify_all()
+
+    def _recuperar(self):
+        """Carga los trabajos del spool (los pendientes se reanudan)"""
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directorio, nombre), encoding='utf-8') as f:
+                    trabajo = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Trabajo de impresión ilegible {nombre}: {e}")
+                continue
+            if trabajo.get('estado') == PENDIENTE:
+                trabajo['proximo_intento'] = 0
+            self._trabajos[trabajo['id']] = trabajo
+        pendientes = sum(1 for t in self._trabajos.values() if t['estado'] == PENDIENTE)
+        if pendientes:
+            logger.info(f"Cola de impresión: {pendientes} trabajo(s) pendiente(s) recuperado(s)")
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    # API para la interfaz
+    # ------------------------------------------------------------------
+
+    def encolar(self, contenido: Union[str, bytes], impresora: str, copias: int = 1,
+                opciones: Optional[List[str]] = None, titulo: str = 'Factura',
+                dispositivo: Optional[str] = None) -> str:
+        """
+        Agrega un trabajo a la cola y retorna su id (no espera a CUPS)
+
+        Args:
+            contenido: Texto o bytes a imprimir (se entrega a lp por stdin);
+                los bytes se envían tal cual (ej. ESC/POS con opciones=['raw'])
+            impresora: Destino CUPS
+            copias: Número de copias
+            opciones: Opciones `-o` de lp (ej. ['media=A4', 'portrait'])
+            titulo: Nombre del trabajo en CUPS
+            dispositivo: Si se indica, el contenido se escribe directo en esa
+                ruta (ej. /dev/usb/lp0) en lugar de pasar por CUPS
+        """
+        trabajo = {
+            'id': time.strftime('%Y%m%d%H%M%S') + '-' + uuid.uuid4().hex[:8],
+            'titulo': titulo,
+            'impresora': impresora,
+            'copias': max(1, int(copias)),
+            'opciones': list(opciones or []),
+            'binario': isinstance(contenido, bytes),
+            'dispositivo': dispositivo,
+            'estado': PENDIENTE,
+            'intentos': 0,
+            'proximo_intento': 0,
+            'error': None,
+            'id_cups': None,
+            'creado': time.time(),
+            'enviado': None,
+        }
+        with self._cond:
+            self._escribir_contenido(trabajo['id'], contenido)
+            self._guardar(trabajo)
+            self._trabajos[trabajo['id']] = trabajo
+            self.version += 1
+            self._cond.notify_all()
+        return trabajo['id']
+
+    def reimprimir(self, ids: List[str], impresora: Optional[str] = None) -> Optional[str]:
+        """
+        Reimprime varios trabajos en un solo envío a CUPS
+
+        Las facturas se concatenan separadas por salto de página, así una
+        reimpresión de N facturas cuesta un único `lp`. Los tickets ESC/POS
+        (binarios) ya traen su corte y se concatenan tal cual; no se mezclan
+        trabajos de texto con binarios (se toma el tipo del primero).
+
+        Returns:
+            Id del nuevo trabajo, o None si ninguno tenía contenido
+        """
+        with self._cond:
+            originales = [self._trabajos[i] for i in ids if i in self._trabajos]
+        if not originales:
+            return None
+        base = originales[0]
+        binario = base.get('binario', False)
+
+        contenidos = []
+        for trabajo in originales:
+            if trabajo.get('binario', False) != binario:
+                continue
+            contenido = self._leer_contenido(trabajo)
+            if contenido is not None:
+                contenidos.append(contenido)
+        if not contenidos:
+            return None
+
+        titulo = base['titulo'] if len(contenidos) == 1 else f"Reimpresión ({len(contenidos)})"
+        separador = b'' if binario else self.SEPARADOR_LOTE
+        return self.encolar(separador.join(contenidos),
+                            impresora or base['impresora'],
+                            opciones=base['opciones'], titulo=titulo,
+                            dispositivo=None if impresora else base.get('dispositivo'))
+
+    def reintentar(self, id_trabajo: str):
+        """Vuelve a poner en cola un trabajo con error o cancelado"""
+        with self._cond:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None or trabajo['estado'] not in (ERROR, CANCELADO):
+                return
+            trabajo.update(estado=PENDIENTE, intentos=0, proximo_intento=0, error=None)
+            self._guardar(trabajo)
+            self.version += 1
+            self._cond.notify_all()
+
+    def cancelar(self, id_trabajo: str):
+        """Cancela un trabajo que aún no se envió"""
+        with self._cond:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None or trabajo['estado'] != PENDIENTE:
+                return
+            trabajo['estado'] = CANCELADO
+            self._guardar(trabajo)
+            self.version += 1
+
+    def trabajos(self) -> List[dict]:
+        """Copia de los trabajos, del más reciente al más antiguo"""
+        with self._cond:
+            return sorted((dict(t) for t in self._trabajos.values()),
+                          key=lambda t: t['creado'], reverse=True)
+
+    def resumen(self) -> Dict[str, int]:
+        """Cantidad de trabajos por estado"""
+        conteo = {PENDIENTE: 0, ENVIADO: 0, ERROR: 0, CANCELADO: 0}
+        with self._cond:
+            for trabajo in self._trabajos.values():
+                conteo[trabajo['estado']] += 1
+        return conteo
+
+    # ------------------------------------------------------------------
+    # Hilo de envío
+    # ------------------------------------------------------------------
+
+    def _procesar(self):
+        while True:
+            with self._cond:
+                trabajo = None
+                while not self._detener:
+                    trabajo, espera = self._siguiente()
+                    if trabajo is not None:
+                        break
+                    self._cond.wait(espera)
+                if self._detener:
+                    return
+                datos = dict(trabajo)
+
+            ok, detalle = self._enviar(datos)
+
+            with self._cond:
+                if trabajo['estado'] != PENDIENTE:
+                    continue  # Cancelado mientras se enviaba
+                trabajo['intentos'] += 1
+                if ok:
+                    trabajo.update(estado=ENVIADO, id_cups=detalle, error=None, enviado=time.time())
+                    logger.info(f"Trabajo {trabajo['id']} enviado a {trabajo['impresora']} ({detalle})")
+                else:
+                    trabajo['error'] = detalle
+                    if trabajo['intentos'] >= self.MAX_INTENTOS:
+                        trabajo['estado'] = ERROR
+                        logger.error(f"Trabajo {trabajo['id']} descartado tras "
+                                     f"{trabajo['intentos']} intentos: {detalle}")
+                    else:
+                        espera = self.ESPERAS[min(trabajo['intentos'], len(self.ESPERAS)) - 1]
+                        trabajo['proximo_intento'] = time.time() + espera
+                        logger.warning(f"Trabajo {trabajo['id']} falló ({detalle}); "
+                                       f"reintento en {espera}s")
+                self._guardar(trabajo)
+                self._podar()
+                self.version += 1
+
+    def _siguiente(self):
+        """Trabajo pendiente más antiguo ya vencido, o (None, segundos a esperar)"""
+        ahora = time.time()
+        pendientes = [t for t in self._trabajos.values() if t['estado'] == PENDIENTE]
+        if not pendientes:
+            return None, None
+        listos = [t for t in pendientes if t['proximo_intento'] <= ahora]
+        if listos:
+            return min(listos, key=lambda t: t['creado']), 0
+        return None, min(t['proximo_intento'] for t in pendientes) - ahora
+
+    def _comando(self, trabajo: dict) -> List[str]:
+        cmd = ['lp', '-d', trabajo['impresora'], '-n', str(trabajo['copias']),
+               '-t', trabajo['titulo']]
+        for opcion in trabajo['opciones']:
+            cmd.extend(['-o', opcion])
+        return cmd
+
+    def _enviar(self, trabajo: dict):
+        """Envía un trabajo con lp; retorna (ok, id_cups | mensaje de error)"""
+        contenido = self._leer_contenido(trabajo)
+        if contenido is None:
+            return False, 'Contenido del trabajo no encontrado en el spool'
+        if trabajo.get('dispositivo'):
+            return self._escribir_dispositivo(trabajo, contenido)
+        try:
+            resultado = subprocess.run(self._comando(trabajo), input=contenido,
+                                       capture_output=True, text=not trabajo.get('binario', False),
+                                       timeout=self.timeout_lp)
+        except (OSError, subprocess.SubprocessError) as e:
+            return False, str(e)
+        salida, errores = resultado.stdout, resultado.stderr
+        if isinstance(salida, bytes):
+            salida = salida.decode('utf-8', 'replace')
+            errores = errores.decode('utf-8', 'replace')
+        if resultado.returncode != 0:
+            return False, (errores or salida).strip() or f"lp salió con {resultado.returncode}"
+        # "request id is HP-42 (0 file(s))"
+        coincidencia = re.search(r'request id is (\S+)', salida)
+        return True, coincidencia.group(1) if coincidencia else ''
+
+    def _escribir_dispositivo(self, trabajo: dict, contenido: Union[str, bytes]):
+        """Escribe el trabajo directo en el dispositivo (sin CUPS ni filtros)"""
+        if isinstance(contenido, str):
+            contenido = contenido.encode('utf-8')
+        try:
+            # 'ab': en un dispositivo real da igual, y un archivo de pruebas acumula los tickets
+            with open(trabajo['dispositivo'], 'ab', buffering=0) as dispositivo:
+                for _ in range(trabajo['copias']):
+                    dispositivo.write(contenido)
+        except OSError as e:
+            return False, str(e)
+        return True, trabajo['dispositivo']
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    def _ruta(self, id_trabajo: str, extension: str) -> str:
+        return os.path.join(self.directorio, f"{id_trabajo}.{extension}")
+
+    def _escribir_atomico(self, ruta: str, datos: Union[str, bytes]):
+        temporal = ruta + '.tmp'
+        if isinstance(datos, str):
+            datos = datos.encode('utf-8')
+        with open(temporal, 'wb') as f:
+            f.write(datos)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+
+    def _escribir_contenido(self, id_trabajo: str, contenido: Union[str, bytes]):
+        os.makedirs(self.directorio, exist_ok=True)
+        extension = 'bin' if isinstance(contenido, bytes) else 'txt'
+        self._escribir_atomico(self._ruta(id_trabajo, extension), contenido)
+
+    def _leer_contenido(self, trabajo: dict) -> Optional[Union[str, bytes]]:
+        try:
+            if trabajo.get('binario', False):
+                with open(self._ruta(trabajo['id'], 'bin'), 'rb') as f:
+                    return f.read()
+            with open(self._ruta(trabajo['id'], 'txt'), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _guardar(self, trabajo: dict):
+        try:
+            self._escribir_atomico(self._ruta(trabajo['id'], 'json'), json.dumps(trabajo))
+        except OSError as e:
+            logger.error(f"No se pudo guardar el trabajo {trabajo['id']} en el spool: {e}")
+
+    def _podar(self):
+        """
+        Borra del spool los trabajos terminados más antiguos
+
+        Los enviados y cancelados comparten MAX_HISTORIAL; los que quedaron
+        en error tienen su propio tope (MAX_ERRORES) para que una impresora
+        caída no llene el spool ni desplace el historial de reimpresión.
+        """
+        self._podar_estados((ENVIADO, CANCELADO), self.MAX_HISTORIAL)
+        self._podar_estados((ERROR,), self.MAX_ERRORES)
+
+    def _podar_estados(self, estados, maximo: int):
+        terminados = sorted((t for t in self._trabajos.values() if t['estado'] in estados),
+                            key=lambda t: t['creado'])
+        for trabajo in terminados[:max(0, len(terminados) - maximo)]:
+            del self._trabajos[trabajo['id']]
+            for extension in ('json', 'txt', 'bin'):
+                try:
+                    os.unlink(self._ruta(trabajo['id'], extension))
+                except OSError:
+                    pass
+
+
+# Cola compartida por toda la aplicación
+cola_impresion = ColaImpresion()
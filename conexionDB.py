@@ -5,28 +5,482 @@ Actualizado: Noviembre 2025
 """
 
 import psycopg2
-from psycopg2 import pool, extras
-from typing import Optional, List, Tuple, Any, Dict
+from psycopg2 import pool, extensions
+from typing import Optional, List, Tuple, Any, Dict, Iterator
 from contextlib import contextmanager
+from collections import deque
+from operator import itemgetter
+import itertools
+import threading
 import logging
+import select
+import io
+import re
+import time
 import sys
 
-# Configurar logging mejorado
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('database.log', encoding='utf-8')
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
+def _configurar_logging():
+    """
+    Logging por defecto (consola + database.log) para los scripts que usan
+    este módulo directamente. Se aplica al crear el pool, no al importar, y
+    no hace nada si la aplicación ya configuró el logging (ej. main.py).
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler('database.log', encoding='utf-8')
+        ]
+    )
+
+
+class PoolAgotadoError(pool.PoolError):
+    """Se agotó el tiempo de espera para obtener una conexión del pool"""
+
+
+# NUMERIC -> float en lugar de Decimal, solo para los cursores del catálogo
+# (CursorCatalogo): los precios del menú se muestran como float y así no hay
+# que convertirlos fila por fila. El resto de la aplicación (ventas, montos)
+# sigue recibiendo Decimal.
+NUMERIC_FLOAT = extensions.new_type(
+    extensions.DECIMAL.values, 'NUMERIC_FLOAT',
+    lambda valor, cursor: float(valor) if valor is not None else None
+)
+
+
+class Registro(tuple):
+    """
+    Fila de una consulta: una tupla con acceso por nombre de columna.
+    
+    No tiene __dict__: ocupa lo mismo que la tupla de psycopg2 y los nombres
+    de las columnas se guardan una sola vez en la clase (ver registro_para).
+    Admite fila['columna'], fila.columna, get(), keys(), items() y
+    'columna' in fila, así reemplaza a los diccionarios que se armaban por
+    cada fila. Diferencias con un dict: iterar da los valores, no se puede
+    modificar y json.dumps() la escribe como lista (usar a_dict()).
+    """
+    
+    __slots__ = ()
+    _campos: Tuple[str, ...] = ()
+    _indices: Dict[str, int] = {}
+    
+    def __getitem__(self, clave):
+        if clave.__class__ is str:
+            return tuple.__getitem__(self, self._indices[clave])
+        return tuple.__getitem__(self, clave)
+    
+    def __contains__(self, clave) -> bool:
+        return clave in self._indices
+    
+    def get(self, clave: str, defecto=None):
+        indice = self._indices.get(clave)
+        return defecto if indice is None else tuple.__getitem__(self, indice)
+    
+    def keys(self) -> Tuple[str, ...]:
+        return self._campos
+    
+    def items(self):
+        return zip(self._campos, self)
+    
+    def a_dict(self) -> Dict[str, Any]:
+        return dict(zip(self._campos, self))
+    
+    @classmethod
+    def convertir(cls, filas) -> List['Registro']:
+        """Lista de registros de esta clase a partir de tuplas (p. ej. de SQLite)"""
+        return [fila if fila.__class__ is cls else cls(fila) for fila in filas or []]
+    
+    def __repr__(self):
+        return "Registro(" + ", ".join(f"{c}={v!r}" for c, v in zip(self._campos, self)) + ")"
+
+
+_clases_registro: Dict[Tuple[str, ...], type] = {}
+
+
+def registro_para(campos) -> type:
+    """
+    Clase de Registro para unas columnas (se crea una vez y se reutiliza)
+    
+    Args:
+        campos: Nombres de las columnas en orden
+    
+    Raises:
+        ValueError: Si un nombre no es un identificador, se repite o choca con
+            un método de Registro o de tuple (p. ej. count, index, keys): usar
+            un alias en el SELECT
+    """
+    campos = tuple(campos)
+    clase = _clases_registro.get(campos)
+    if clase is None:
+        for campo in campos:
+            if not campo.isidentifier() or campo.startswith('_') or hasattr(Registro, campo):
+                raise ValueError(f"Nombre de columna no válido para un Registro: {campo!r}")
+        if len(set(campos)) != len(campos):
+            raise ValueError(f"Columnas repetidas en el Registro: {campos}")
+        atributos = {'__slots__': (), '_campos': campos,
+                     '_indices': {campo: i for i, campo in enumerate(campos)}}
+        for i, campo in enumerate(campos):
+            atributos[campo] = property(itemgetter(i))
+        clase = _clases_registro.setdefault(campos, type('Registro', (Registro,), atributos))
+    return clase
+
+
+class CursorRegistros(extensions.cursor):
+    """
+    Cursor que entrega las filas como Registro con los nombres de columna
+    (usar alias en el SELECT para elegirlos).
+    
+    psycopg2 solo llena filas propias si son mutables (row_factory), así que
+    cada tupla se envuelve al leerla; en fetchall se reemplaza en el lugar
+    para que la tupla original se libere enseguida.
+    """
+    
+    def _clase_registro(self) -> type:
+        return registro_para([columna.name for columna in self.description])
+    
+    def _convertir(self, filas: list) -> list:
+        if filas:
+            clase = self._clase_registro()
+            for i, fila in enumerate(filas):
+                filas[i] = clase(fila)
+        return filas
+    
+    def fetchone(self):
+        fila = super().fetchone()
+        return None if fila is None else self._clase_registro()(fila)
+    
+    def fetchmany(self, size=None):
+        return self._convertir(super().fetchmany() if size is None else super().fetchmany(size))
+    
+    def fetchall(self):
+        return self._convertir(super().fetchall())
+    
+    def __iter__(self):
+        filas = super().__iter__()
+        try:
+            primera = next(filas)
+        except StopIteration:
+            return
+        clase = self._clase_registro()
+        yield clase(primera)
+        for fila in filas:
+            yield clase(fila)
+
+
+class CursorCatalogo(CursorRegistros):
+    """CursorRegistros que además lee NUMERIC como float (consultas del catálogo)"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        extensions.register_type(NUMERIC_FLOAT, self)
+
+
+class ConexionConSentencias(extensions.connection):
+    """
+    Conexión que recuerda las sentencias preparadas (PREPARE) de su sesión.
+    
+    Las sentencias preparadas viven en la sesión del servidor: una conexión
+    nueva (al reconectar o al reciclarla el pool) empieza sin ninguna, así
+    cada sentencia se vuelve a preparar la primera vez que se usa en ella.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones seguro para hilos.
+    
+    A diferencia de SimpleConnectionPool, permite que varios hilos compartan
+    las conexiones: bloquea hasta que haya una libre (con timeout), valida las
+    conexiones antes de entregarlas, recicla las que superan su edad máxima y
+    lleva estadísticas de uso y de esperas.
+    """
+    
+    def __init__(self, minconn: int, maxconn: int, timeout: float = 10.0,
+                 max_edad: float = 1800.0, validar_tras: float = 30.0, **config):
+        """
+        Args:
+            minconn: Conexiones que se abren al arrancar (calentamiento)
+            maxconn: Máximo de conexiones abiertas simultáneamente
+            timeout: Segundos que espera obtener() cuando no hay conexiones libres
+            max_edad: Segundos de vida de una conexión antes de reciclarla
+            validar_tras: Segundos de inactividad tras los cuales se valida con SELECT 1
+            config: Parámetros de psycopg2.connect
+        """
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Se requiere 0 <= minconn <= maxconn y maxconn >= 1")
+        
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_edad = max_edad
+        self.validar_tras = validar_tras
+        self._config = config
+        
+        self._condicion = threading.Condition()
+        # Conexiones libres: (conexion, creada_en, ultimo_uso); se reutiliza la más reciente
+        self._libres: deque = deque()
+        # Conexiones prestadas: id(conexion) -> (conexion, creada_en)
+        self._en_uso: Dict[int, Tuple[Any, float]] = {}
+        # Conexiones abiertas o en proceso de apertura
+        self._total = 0
+        self._cerrado = False
+        
+        self._stats = {
+            'prestamos': 0,
+            'creadas': 0,
+            'recicladas': 0,
+            'descartadas': 0,
+            'esperas': 0,
+            'tiempo_espera_total': 0.0,
+            'tiempo_espera_max': 0.0,
+            'timeouts': 0,
+        }
+        
+        try:
+            self.calentar()
+        except psycopg2.OperationalError as e:
+            # Sin servidor al arrancar: las conexiones se abrirán al usarse
+            # (la aplicación puede trabajar con la copia local mientras tanto)
+            logger.warning(f"No se pudo calentar el pool, se conectará bajo demanda: {e}")
+    
+    def _conectar(self):
+        """Abre una conexión nueva (fuera del lock)"""
+        conexion = psycopg2.connect(**self._config)
+        with self._condicion:
+            self._stats['creadas'] += 1
+        return conexion
+    
+    def calentar(self):
+        """Abre conexiones hasta alcanzar minconn para evitar latencia en el primer uso"""
+        while True:
+            with self._condicion:
+                if self._cerrado or self._total >= self.minconn:
+                    return
+                self._total += 1
+            try:
+                conexion = self._conectar()
+            except Exception:
+                self._liberar_cupo()
+                raise
+            ahora = time.monotonic()
+            with self._condicion:
+                self._libres.append((conexion, ahora, ahora))
+                self._condicion.notify()
+    
+    def _liberar_cupo(self):
+        """Resta una conexión del total y despierta a un hilo en espera"""
+        with self._condicion:
+            self._total -= 1
+            self._condicion.notify()
+    
+    def _cerrar_conexion(self, conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+    
+    def _es_valida(self, conexion, ultimo_uso: float) -> bool:
+        """Comprueba que la conexión siga viva antes de entregarla"""
+        if conexion.closed:
+            return False
+        if time.monotonic() - ultimo_uso < self.validar_tras:
+            return True
+        try:
+            cursor = conexion.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conexion.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def obtener(self, timeout: float = None):
+        """
+        Obtiene una conexión, esperando hasta `timeout` segundos si no hay libres
+        
+        Raises:
+            PoolAgotadoError: si no se liberó ninguna conexión a tiempo
+            psycopg2.pool.PoolError: si el pool está cerrado
+        """
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.monotonic()
+        limite = inicio + timeout
+        espero = False
+        
+        while True:
+            entrada = None
+            with self._condicion:
+                while True:
+                    if self._cerrado:
+                        raise pool.PoolError("El pool de conexiones está cerrado")
+                    if self._libres:
+                        entrada = self._libres.pop()
+                        break
+                    if self._total < self.maxconn:
+                        self._total += 1
+                        break
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolAgotadoError(
+                            f"Sin conexiones libres tras {timeout:.1f}s "
+                            f"({self._total} en uso)")
+                    if not espero:
+                        espero = True
+                        self._stats['esperas'] += 1
+                    self._condicion.wait(restante)
+            
+            if entrada is None:
+                # Hay cupo: abrir una conexión nueva
+                try:
+                    conexion = self._conectar()
+                except Exception:
+                    self._liberar_cupo()
+                    raise
+                creada = time.monotonic()
+            else:
+                conexion, creada, ultimo_uso = entrada
+                if time.monotonic() - creada > self.max_edad:
+                    self._cerrar_conexion(conexion)
+                    with self._condicion:
+                        self._stats['recicladas'] += 1
+                    self._liberar_cupo()
+                    continue
+                if not self._es_valida(conexion, ultimo_uso):
+                    self._cerrar_conexion(conexion)
+                    with self._condicion:
+                        self._stats['descartadas'] += 1
+                    self._liberar_cupo()
+                    logger.warning("Conexión inválida descartada del pool")
+                    continue
+            
+            espera = time.monotonic() - inicio
+            with self._condicion:
+                self._en_uso[id(conexion)] = (conexion, creada)
+                self._stats['prestamos'] += 1
+                if espero:
+                    self._stats['tiempo_espera_total'] += espera
+                    self._stats['tiempo_espera_max'] = max(self._stats['tiempo_espera_max'], espera)
+            return conexion
+    
+    def devolver(self, conexion, descartar: bool = False):
+        """
+        Devuelve una conexión al pool
+        
+        Una conexión que no salió de este pool (p. ej. prestada por un pool
+        anterior que se cerró o reinicializó mientras estaba en uso) se
+        cierra y se registra un aviso: quien la devuelve no puede hacer nada
+        mejor con ella.
+        
+        Args:
+            conexion: Conexión obtenida con obtener()
+            descartar: Si True, la conexión se cierra en lugar de reutilizarse
+        """
+        with self._condicion:
+            entrada = self._en_uso.pop(id(conexion), None)
+        if entrada is None:
+            logger.warning("Se devolvió una conexión que no pertenece al pool actual; se cierra")
+            self._cerrar_conexion(conexion)
+            return
+        _, creada = entrada
+        
+        if not descartar and not conexion.closed:
+            try:
+                # No dejar transacciones abiertas en conexiones libres
+                if conexion.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conexion.rollback()
+            except psycopg2.Error:
+                descartar = True
+        
+        if descartar or conexion.closed or self._cerrado:
+            self._cerrar_conexion(conexion)
+            with self._condicion:
+                if descartar:
+                    self._stats['descartadas'] += 1
+            self._liberar_cupo()
+            return
+        
+        with self._condicion:
+            self._libres.append((conexion, creada, time.monotonic()))
+            self._condicion.notify()
+    
+    def cerrar(self):
+        """Cierra las conexiones libres y rechaza nuevos préstamos"""
+        with self._condicion:
+            self._cerrado = True
+            libres = list(self._libres)
+            self._libres.clear()
+            self._total -= len(libres)
+            self._condicion.notify_all()
+        for conexion, _, _ in libres:
+            self._cerrar_conexion(conexion)
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        """Retorna un resumen del estado del pool"""
+        with self._condicion:
+            stats = dict(self._stats)
+            stats.update({
+                'en_uso': len(self._en_uso),
+                'libres': len(self._libres),
+                'total': self._total,
+                'maxconn': self.maxconn,
+            })
+        esperas = stats['esperas']
+        stats['tiempo_espera_promedio'] = stats['tiempo_espera_total'] / esperas if esperas else 0.0
+        return stats
+
+
+def _ejecutar_values(cursor, query: str, filas: List[Tuple], template: str = None,
+                     tamano_pagina: int = 500) -> int:
+    """
+    Ejecuta `query` (con un único %s en VALUES) por páginas con execute_values
+    y suma las filas afectadas de cada página.
+    """
+    from psycopg2 import extras  # Solo lo necesitan las cargas por lotes
+    
+    total = 0
+    for inicio in range(0, len(filas), tamano_pagina):
+        pagina = filas[inicio:inicio + tamano_pagina]
+        extras.execute_values(cursor, query, pagina, template=template, page_size=len(pagina))
+        total += max(cursor.rowcount, 0)
+    return total
+
+
+def _valor_copy(valor) -> str:
+    """Convierte un valor al formato texto de COPY (\\N para NULL)"""
+    if valor is None:
+        return '\\N'
+    texto = str(valor)
+    return (texto.replace('\\', '\\\\').replace('\t', '\\t')
+                 .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def _copiar_filas(cursor, tabla: str, columnas: List[str], filas) -> int:
+    """Carga filas con COPY ... FROM STDIN en formato texto"""
+    buffer = io.StringIO()
+    cantidad = 0
+    for fila in filas:
+        buffer.write('\t'.join(_valor_copy(v) for v in fila))
+        buffer.write('\n')
+        cantidad += 1
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN", buffer)
+    return cursor.rowcount if cursor.rowcount >= 0 else cantidad
+
+
 class ConexionDB:
     """Clase para manejar la conexión a PostgreSQL"""
     
-    _connection_pool = None
+    _connection_pool: Optional[PoolConexiones] = None
+    _pool_lock = threading.Lock()
     
     # Configuración de la base de datos
     DB_CONFIG = {
@@ -34,76 +488,299 @@ class ConexionDB:
         'port': 5432,
         'database': 'parcial2',
         'user': 'postgres',
-        'password': 'postgres'  # Contraseña de PostgreSQL
+        'password': 'postgres',  # Contraseña de PostgreSQL
+        'connect_timeout': 5     # Sin red no esperar el timeout del sistema
+    }
+    
+    # Configuración del pool
+    POOL_CONFIG = {
+        'timeout': 10.0,       # Espera máxima por una conexión libre (s)
+        'max_edad': 1800.0,    # Reciclar conexiones tras 30 min
+        'validar_tras': 30.0,  # Validar con SELECT 1 si estuvo inactiva 30 s
     }
     
     @classmethod
     def inicializar_pool(cls, minconn=1, maxconn=10):
-        """Inicializa el pool de conexiones"""
-        try:
-            if cls._connection_pool is None:
-                cls._connection_pool = psycopg2.pool.SimpleConnectionPool(
+        """Inicializa el pool de conexiones (seguro para llamadas concurrentes)"""
+        with cls._pool_lock:
+            if cls._connection_pool is not None:
+                return
+            _configurar_logging()
+            try:
+                cls._connection_pool = PoolConexiones(
                     minconn,
                     maxconn,
-                    **cls.DB_CONFIG
+                    **cls.POOL_CONFIG,
+                    **cls.DB_CONFIG,
+                    connection_factory=ConexionConSentencias
                 )
                 logger.info("Pool de conexiones creado exitosamente")
-        except psycopg2.Error as e:
-            logger.error(f"Error al crear pool de conexiones: {e}")
-            raise
+            except psycopg2.Error as e:
+                logger.error(f"Error al crear pool de conexiones: {e}")
+                raise
     
     @classmethod
-    def obtener_conexion(cls):
-        """Obtiene una conexión del pool"""
+    def obtener_conexion(cls, timeout: float = None):
+        """Obtiene una conexión del pool, esperando si todas están en uso"""
         if cls._connection_pool is None:
             cls.inicializar_pool()
-        return cls._connection_pool.getconn()
+        return cls._connection_pool.obtener(timeout)
     
     @classmethod
-    def devolver_conexion(cls, conexion):
-        """Devuelve una conexión al pool"""
+    def devolver_conexion(cls, conexion, descartar: bool = False):
+        """Devuelve una conexión al pool (descartar=True la cierra)"""
         if cls._connection_pool is not None:
-            cls._connection_pool.putconn(conexion)
+            cls._connection_pool.devolver(conexion, descartar=descartar)
+        else:
+            conexion.close()
     
     @classmethod
     def cerrar_pool(cls):
         """Cierra todas las conexiones del pool"""
-        if cls._connection_pool is not None:
-            cls._connection_pool.closeall()
-            cls._connection_pool = None
-            logger.info("Pool de conexiones cerrado")
+        with cls._pool_lock:
+            if cls._connection_pool is not None:
+                cls._connection_pool.cerrar()
+                cls._connection_pool = None
+                logger.info("Pool de conexiones cerrado")
+    
+    @classmethod
+    def estadisticas_pool(cls) -> Dict[str, Any]:
+        """Estadísticas del pool (vacío si aún no se ha creado)"""
+        if cls._connection_pool is None:
+            return {}
+        return cls._connection_pool.estadisticas()
     
     @classmethod
     @contextmanager
-    def obtener_cursor(cls):
-        """Context manager para obtener cursor automáticamente"""
+    def obtener_cursor(cls, solo_lectura: bool = False, cursor_factory=None):
+        """
+        Context manager para obtener cursor automáticamente
+        
+        Args:
+            solo_lectura: Si True, la conexión se usa en modo autocommit: el SELECT
+                no abre transacción y no se envía COMMIT (un round trip menos).
+                Solo debe usarse para consultas que no modifican datos.
+            cursor_factory: Clase de cursor (p. ej. CursorRegistros); None = tuplas
+        """
         conexion = None
         cursor = None
+        rota = False
         try:
             conexion = cls.obtener_conexion()
-            cursor = conexion.cursor()
+            if solo_lectura:
+                conexion.autocommit = True
+            cursor = conexion.cursor(cursor_factory=cursor_factory)
             yield cursor, conexion
-            conexion.commit()
+            if not solo_lectura:
+                conexion.commit()
         except Exception as e:
-            if conexion:
-                conexion.rollback()
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                # Conexión caída: no devolverla al pool
+                rota = True
+            if conexion and not conexion.closed and not solo_lectura:
+                try:
+                    conexion.rollback()
+                except psycopg2.Error:
+                    rota = True
             logger.error(f"Error en transacción: {e}")
             raise
         finally:
-            if cursor:
+            if cursor and not cursor.closed:
                 cursor.close()
             if conexion:
-                cls.devolver_conexion(conexion)
+                if solo_lectura and not conexion.closed:
+                    try:
+                        conexion.autocommit = False
+                    except psycopg2.Error:
+                        rota = True
+                cls.devolver_conexion(conexion, descartar=rota or conexion.closed)
+
+
+class EscuchaNotificaciones(threading.Thread):
+    """
+    Hilo que mantiene una conexión dedicada (fuera del pool) con LISTEN sobre
+    un canal y entrega cada NOTIFY al callback con su payload.
+    
+    Si la conexión se pierde, reintenta cada `reintento` segundos. Tras cada
+    (re)conexión llama al callback con None: las notificaciones emitidas
+    mientras estuvo desconectado se perdieron y el consumidor debe asumir
+    que todo pudo cambiar.
+    """
+    
+    def __init__(self, canal: str, callback, config: Dict[str, Any], reintento: float = 5.0):
+        super().__init__(name=f"listen-{canal}", daemon=True)
+        self.canal = canal
+        self.callback = callback
+        self.reintento = reintento
+        self._config = config
+        self._detener = threading.Event()
+        self.conectado = threading.Event()
+    
+    def _entregar(self, payload):
+        try:
+            self.callback(payload)
+        except Exception as e:
+            logger.error(f"Error en callback de notificación '{self.canal}': {e}")
+    
+    def run(self):
+        while not self._detener.is_set():
+            conexion = None
+            try:
+                conexion = psycopg2.connect(**self._config)
+                conexion.autocommit = True
+                with conexion.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.canal}")
+                self.conectado.set()
+                logger.info(f"Escuchando notificaciones en '{self.canal}'")
+                self._entregar(None)
+                
+                while not self._detener.is_set():
+                    if select.select([conexion], [], [], 1.0) == ([], [], []):
+                        continue
+                    conexion.poll()
+                    while conexion.notifies:
+                        notificacion = conexion.notifies.pop(0)
+                        self._entregar(notificacion.payload)
+            except psycopg2.Error as e:
+                logger.warning(f"Escucha '{self.canal}' desconectada: {e}")
+            finally:
+                self.conectado.clear()
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except Exception:
+                        pass
+            self._detener.wait(self.reintento)
+    
+    def detener(self):
+        """Detiene el hilo (termina en menos de un segundo)"""
+        self._detener.set()
+
+
+def _sql_upsert(tabla: str, columnas: List[str], conflicto: List[str],
+                actualizar: List[str] = None) -> str:
+    """Construye un INSERT ... VALUES %s ON CONFLICT para execute_values"""
+    query = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES %s ON CONFLICT ({', '.join(conflicto)})"
+    if actualizar:
+        query += " DO UPDATE SET " + ', '.join(f"{col} = EXCLUDED.{col}" for col in actualizar)
+    else:
+        query += " DO NOTHING"
+    return query
+
+
+class Transaccion:
+    """
+    Unidad de trabajo: todas las sentencias se ejecutan sobre la misma conexión
+    y se confirman con un único COMMIT al salir de DatabaseManager.transaccion().
+    Si ocurre una excepción dentro del bloque se hace ROLLBACK de todo.
+    """
+    
+    def __init__(self, cursor, conexion):
+        self.cursor = cursor
+        self.conexion = conexion
+    
+    def ejecutar(self, query: str, params: Tuple = None) -> int:
+        """Ejecuta una sentencia de escritura y retorna las filas afectadas"""
+        self.cursor.execute(query, params)
+        return max(self.cursor.rowcount, 0)
+    
+    def consultar(self, query: str, params: Tuple = None) -> List[Tuple]:
+        """Ejecuta una consulta y retorna todas las filas"""
+        self.cursor.execute(query, params)
+        return self.cursor.fetchall()
+    
+    def consultar_uno(self, query: str, params: Tuple = None) -> Optional[Tuple]:
+        """Ejecuta una consulta y retorna la primera fila (o None)"""
+        self.cursor.execute(query, params)
+        return self.cursor.fetchone()
+    
+    def insertar_lote(self, tabla: str, columnas: List[str], filas: List[Tuple],
+                      tamano_pagina: int = 500) -> int:
+        """Inserta muchas filas con execute_values dentro de la transacción"""
+        if not filas:
+            return 0
+        query = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES %s"
+        return _ejecutar_values(self.cursor, query, list(filas), tamano_pagina=tamano_pagina)
+    
+    def upsert_lote(self, tabla: str, columnas: List[str], filas: List[Tuple],
+                    conflicto: List[str], actualizar: List[str] = None,
+                    tamano_pagina: int = 500) -> int:
+        """INSERT ... ON CONFLICT por lotes dentro de la transacción"""
+        if not filas:
+            return 0
+        query = _sql_upsert(tabla, columnas, conflicto, actualizar)
+        return _ejecutar_values(self.cursor, query, list(filas), tamano_pagina=tamano_pagina)
+    
+    def copiar_lote(self, tabla: str, columnas: List[str], filas) -> int:
+        """Carga masiva con COPY dentro de la transacción"""
+        return _copiar_filas(self.cursor, tabla, columnas, filas)
+
+
+_NOMBRE_SENTENCIA = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+def _a_posicionales(query: str) -> Tuple[str, int]:
+    """
+    Convierte los %s de psycopg2 en $1..$n para PREPARE
+    
+    Returns:
+        (query con $n, cantidad de parámetros)
+    """
+    if '%(' in query:
+        raise ValueError("Las sentencias preparadas solo admiten parámetros %s posicionales")
+    cantidad = 0
+    
+    def reemplazar(marca):
+        nonlocal cantidad
+        if marca.group(0) == '%%':
+            return '%'
+        cantidad += 1
+        return f'${cantidad}'
+    
+    return re.sub(r'%%|%s', reemplazar, query), cantidad
 
 
 class DatabaseManager:
-    """Clase para manejar operaciones de base de datos con métodos mejorados"""
+    """
+    Clase para manejar operaciones de base de datos con métodos mejorados
+    
+    Crear la instancia no conecta: el pool se crea con la primera consulta
+    (ConexionDB.obtener_conexion), así importar este módulo es barato.
+    """
+    
+    ITERSIZE = 2000  # Filas por viaje al servidor en iterar_query()
     
     def __init__(self):
-        ConexionDB.inicializar_pool()
-        logger.info("DatabaseManager inicializado correctamente")
+        self._cursores = itertools.count(1)
+        # Sentencias registradas: nombre -> (query original, PREPARE ..., EXECUTE ...)
+        self._sentencias: Dict[str, Tuple[str, str, str]] = {}
+        self._lock_sentencias = threading.Lock()
+        self._stats_sentencias = {
+            'preparaciones': 0,       # PREPARE enviados (uno por sentencia y conexión)
+            're_preparaciones': 0,    # El servidor ya no la tenía y se preparó de nuevo
+            'ejecuciones': 0,
+            'reutilizaciones': 0,     # EXECUTE sobre una sentencia ya preparada
+            'tiempo_preparacion': 0.0,
+        }
+    
+    @contextmanager
+    def transaccion(self):
+        """
+        Abre una unidad de trabajo sobre una sola conexión del pool
+        
+        Uso:
+            with db_manager.transaccion() as tx:
+                tx.ejecutar("DELETE FROM ...", (...))
+                tx.insertar_lote("TABLA", columnas, filas)
+        
+        Todas las sentencias comparten conexión y se confirman con un único
+        COMMIT; cualquier excepción revierte la transacción completa.
+        """
+        with ConexionDB.obtener_cursor() as (cursor, conexion):
+            yield Transaccion(cursor, conexion)
     
-    def ejecutar_query(self, query: str, params: Tuple = None, fetch: bool = True) -> Optional[List[Tuple]]:
+    def ejecutar_query(self, query: str, params: Tuple = None, fetch: bool = True,
+                       solo_lectura: bool = False) -> Optional[List[Tuple]]:
         """
         Ejecuta una query y retorna los resultados usando context manager
         
@@ -111,12 +788,13 @@ class DatabaseManager:
             query: La consulta SQL a ejecutar
             params: Parámetros para la consulta
             fetch: Si True, retorna los resultados (SELECT), si False no retorna nada (INSERT/UPDATE/DELETE)
+            solo_lectura: Si True, ejecuta en autocommit sin COMMIT final (solo para SELECT)
         
         Returns:
             Lista de tuplas con los resultados si fetch=True, None si fetch=False
         """
         try:
-            with ConexionDB.obtener_cursor() as (cursor, conexion):
+            with ConexionDB.obtener_cursor(solo_lectura) as (cursor, conexion):
                 if params:
                     cursor.execute(query, params)
                 else:
@@ -137,13 +815,97 @@ class DatabaseManager:
             logger.error(f"Error inesperado: {e}")
             raise
     
-    def ejecutar_query_uno(self, query: str, params: Tuple = None) -> Optional[Tuple]:
+    def ejecutar_query_uno(self, query: str, params: Tuple = None,
+                           solo_lectura: bool = False) -> Optional[Tuple]:
         """
         Ejecuta una query y retorna solo el primer resultado
         """
-        resultados = self.ejecutar_query(query, params, fetch=True)
+        resultados = self.ejecutar_query(query, params, fetch=True, solo_lectura=solo_lectura)
         return resultados[0] if resultados else None
     
+    def iterar_query(self, query: str, params: Tuple = None, itersize: Optional[int] = None,
+                     cursor_factory=None) -> Iterator[Tuple]:
+        """
+        Recorre el resultado de un SELECT sin cargarlo completo en memoria
+        
+        Usa un cursor con nombre (del lado del servidor): el cliente solo
+        tiene `itersize` filas a la vez, sin importar el tamaño de la tabla.
+        
+        La conexión queda prestada (con una transacción de lectura abierta)
+        mientras se recorre: consumir el iterador completo o cerrarlo, p. ej.
+        con contextlib.closing, y no hacer trabajo lento entre filas.
+        
+        Args:
+            query: La consulta SQL a ejecutar
+            params: Parámetros para la consulta
+            itersize: Filas por viaje al servidor (None = ITERSIZE)
+            cursor_factory: Clase de cursor (p. ej. CursorRegistros); None = tuplas
+        """
+        conexion = ConexionDB.obtener_conexion()
+        cursor = None
+        rota = False
+        try:
+            cursor = conexion.cursor(name=f"flujo_{next(self._cursores)}",
+                                     cursor_factory=cursor_factory)
+            cursor.itersize = itersize or self.ITERSIZE
+            cursor.execute(query, params)
+            yield from cursor
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            rota = True
+            raise
+        except psycopg2.Error as e:
+            logger.error(f"Error recorriendo query: {e}")
+            logger.error(f"Query: {query}")
+            raise
+        finally:
+            try:
+                if cursor is not None and not cursor.closed:
+                    cursor.close()
+                if not conexion.closed:
+                    # Solo se leyó: terminar la transacción sin COMMIT
+                    conexion.rollback()
+            except psycopg2.Error:
+                rota = True
+            ConexionDB.devolver_conexion(conexion, descartar=rota or conexion.closed)
+    
+    def exportar_csv(self, query: str, archivo, encabezados: List[str] = None,
+                     params: Tuple = None, itersize: Optional[int] = None) -> int:
+        """
+        Escribe el resultado de un SELECT como CSV fila por fila (memoria constante)
+        
+        Args:
+            archivo: Objeto de texto abierto (usar newline='')
+            encabezados: Primera fila del CSV (None = sin encabezado)
+        
+        Returns:
+            Número de filas escritas
+        """
+        import csv
+        escritor = csv.writer(archivo)
+        if encabezados:
+            escritor.writerow(encabezados)
+        filas = 0
+        for fila in self.iterar_query(query, params, itersize):
+            escritor.writerow(fila)
+            filas += 1
+        return filas
+    
+    def ejecutar_escritura(self, query: str, params: Tuple = None) -> int:
+        """
+        Ejecuta un INSERT/UPDATE/DELETE en su propia transacción
+        
+        Returns:
+            Número real de filas afectadas (cursor.rowcount)
+        """
+        try:
+            with self.transaccion() as tx:
+                return tx.ejecutar(query, params)
+        except psycopg2.Error as e:
+            logger.error(f"Error ejecutando escritura: {e}")
+            logger.error(f"Query: {query}")
+            logger.error(f"Params: {params}")
+            raise
+    
     def insertar(self, tabla: str, datos: dict) -> int:
         """
         Inserta un registro en una tabla
@@ -159,8 +921,7 @@ class DatabaseManager:
         placeholders = ', '.join(['%s'] * len(datos))
         query = f"INSERT INTO {tabla} ({columnas}) VALUES ({placeholders})"
         
-        self.ejecutar_query(query, tuple(datos.values()), fetch=False)
-        return 1
+        return self.ejecutar_escritura(query, tuple(datos.values()))
     
     def actualizar(self, tabla: str, datos: dict, condicion: str, params_condicion: Tuple = None) -> int:
         """
@@ -182,8 +943,7 @@ class DatabaseManager:
         if params_condicion:
             params += params_condicion
         
-        self.ejecutar_query(query, params, fetch=False)
-        return 1
+        return self.ejecutar_escritura(query, params)
     
     def eliminar(self, tabla: str, condicion: str, params: Tuple = None) -> int:
         """
@@ -198,32 +958,98 @@ class DatabaseManager:
             Número de filas afectadas
         """
         query = f"DELETE FROM {tabla} WHERE {condicion}"
-        self.ejecutar_query(query, params, fetch=False)
-        return 1
+        return self.ejecutar_escritura(query, params)
     
-    def ejecutar_query_dict(self, query: str, params: Tuple = None) -> Optional[List[Dict]]:
+    def insertar_lote(self, tabla: str, columnas: List[str], filas: List[Tuple],
+                      tamano_pagina: int = 500) -> int:
         """
-        Ejecuta una query y retorna los resultados como lista de diccionarios
+        Inserta muchas filas en una sola transacción usando execute_values
+        
+        Args:
+            tabla: Nombre de la tabla
+            columnas: Columnas en el orden de los valores de cada fila
+            filas: Lista de tuplas con los valores
+            tamano_pagina: Filas por sentencia INSERT ... VALUES
+        
+        Returns:
+            Número de filas insertadas
+        """
+        if not filas:
+            return 0
+        try:
+            with self.transaccion() as tx:
+                return tx.insertar_lote(tabla, columnas, filas, tamano_pagina)
+        except psycopg2.Error as e:
+            logger.error(f"Error en inserción por lotes en {tabla}: {e}")
+            raise
+    
+    def upsert_lote(self, tabla: str, columnas: List[str], filas: List[Tuple],
+                    conflicto: List[str], actualizar: List[str] = None,
+                    tamano_pagina: int = 500) -> int:
+        """
+        Inserta o actualiza muchas filas en una sola transacción (INSERT ... ON CONFLICT)
+        
+        Args:
+            tabla: Nombre de la tabla
+            columnas: Columnas en el orden de los valores de cada fila
+            filas: Lista de tuplas con los valores
+            conflicto: Columnas de la restricción UNIQUE/PK que detecta el conflicto
+            actualizar: Columnas a sobrescribir en caso de conflicto (None = DO NOTHING)
+            tamano_pagina: Filas por sentencia
+        
+        Returns:
+            Número de filas insertadas o actualizadas
+        """
+        if not filas:
+            return 0
+        try:
+            with self.transaccion() as tx:
+                return tx.upsert_lote(tabla, columnas, filas, conflicto, actualizar, tamano_pagina)
+        except psycopg2.Error as e:
+            logger.error(f"Error en upsert por lotes en {tabla}: {e}")
+            raise
+    
+    def copiar_lote(self, tabla: str, columnas: List[str], filas) -> int:
+        """
+        Carga masiva con COPY FROM STDIN, para importaciones grandes
+        
+        Args:
+            tabla: Nombre de la tabla
+            columnas: Columnas en el orden de los valores de cada fila
+            filas: Iterable de tuplas (puede ser un generador)
+        
+        Returns:
+            Número de filas cargadas
+        """
+        try:
+            with self.transaccion() as tx:
+                return tx.copiar_lote(tabla, columnas, filas)
+        except psycopg2.Error as e:
+            logger.error(f"Error en COPY hacia {tabla}: {e}")
+            raise
+    
+    def ejecutar_query_dict(self, query: str, params: Tuple = None,
+                            solo_lectura: bool = False) -> Optional[List[Registro]]:
+        """
+        Ejecuta una query y retorna filas con acceso por nombre de columna
         
         Args:
             query: La consulta SQL a ejecutar
             params: Parámetros para la consulta
+            solo_lectura: Si True, ejecuta en autocommit sin COMMIT final (solo para SELECT)
         
         Returns:
-            Lista de diccionarios con los resultados
+            Lista de Registro (fila['columna'], fila.get(), a_dict() si hace
+            falta un diccionario de verdad)
         """
         try:
-            with ConexionDB.obtener_cursor() as (cursor, conexion):
-                # Usar DictCursor para obtener resultados como diccionarios
-                cursor = conexion.cursor(cursor_factory=extras.DictCursor)
-                
+            with ConexionDB.obtener_cursor(solo_lectura, CursorRegistros) as (cursor, conexion):
                 if params:
                     cursor.execute(query, params)
                 else:
                     cursor.execute(query)
                 
-                resultados = cursor.fetchall()
-                return [dict(row) for row in resultados] if resultados else []
+                return cursor.fetchall() or []
                     
         except psycopg2.Error as e:
             logger.error(f"Error ejecutando query_dict: {e}")
@@ -231,6 +1057,152 @@ class DatabaseManager:
             logger.error(f"Params: {params}")
             raise
     
+    def preparar(self, nombre: str, query: str):
+        """
+        Registra una consulta fija para ejecutarla como sentencia preparada
+        
+        No conecta: cada conexión del pool la prepara (PREPARE) la primera
+        vez que se ejecuta en ella y después solo envía EXECUTE, sin que el
+        servidor vuelva a analizar ni planificar la consulta. Registrar de
+        nuevo la misma consulta con el mismo nombre no hace nada.
+        
+        Args:
+            nombre: Identificador de la sentencia (minúsculas, dígitos y _)
+            query: Consulta con parámetros %s posicionales
+        """
+        registrada = self._sentencias.get(nombre)
+        if registrada is not None and registrada[0] == query:
+            return
+        if not _NOMBRE_SENTENCIA.match(nombre):
+            raise ValueError(f"Nombre de sentencia inválido: {nombre!r}")
+        sql, cantidad = _a_posicionales(query)
+        ejecutar = f"EXECUTE {nombre}"
+        if cantidad:
+            ejecutar += " (" + ", ".join(["%s"] * cantidad) + ")"
+        with self._lock_sentencias:
+            anterior = self._sentencias.get(nombre)
+            if anterior is not None and anterior[0] != query:
+                raise ValueError(f"La sentencia '{nombre}' ya está registrada con otra consulta")
+            self._sentencias[nombre] = (query, f"PREPARE {nombre} AS {sql}", ejecutar)
+    
+    def ejecutar_preparada(self, nombre: str, params: Tuple = (), fetch: bool = True,
+                           solo_lectura: bool = True, cursor_factory=None) -> Optional[List[Tuple]]:
+        """
+        Ejecuta una sentencia registrada con preparar()
+        
+        Args:
+            nombre: Nombre con el que se registró
+            params: Parámetros en el orden de los %s de la consulta
+            fetch: Si True, retorna los resultados
+            solo_lectura: Si True, ejecuta en autocommit sin COMMIT final
+            cursor_factory: Clase de cursor (p. ej. CursorRegistros); None = tuplas
+        
+        Returns:
+            Lista de tuplas con los resultados si fetch=True, None si fetch=False
+        """
+        if nombre not in self._sentencias:
+            raise KeyError(f"Sentencia no registrada: {nombre}")
+        try:
+            with ConexionDB.obtener_cursor(solo_lectura, cursor_factory) as (cursor, conexion):
+                self._ejecutar_sentencia(cursor, conexion, nombre, params)
+                return cursor.fetchall() if fetch else None
+        except psycopg2.Error as e:
+            logger.error(f"Error ejecutando sentencia preparada {nombre}: {e}")
+            logger.error(f"Params: {params}")
+            raise
+    
+    def _ejecutar_sentencia(self, cursor, conexion, nombre: str, params: Tuple):
+        query, preparar, ejecutar = self._sentencias[nombre]
+        preparadas = getattr(conexion, 'preparadas', None)
+        if preparadas is None:
+            # Conexión sin registro de sentencias (no viene del pool): consulta normal
+            cursor.execute(query, params or None)
+            return
+        
+        reutilizada = nombre in preparadas
+        if not reutilizada:
+            self._preparar_en(cursor, conexion, nombre, preparar)
+            cursor.execute(ejecutar, params or None)
+        # 26000 invalid_sql_statement_name: la sesión perdió la sentencia
+        # (DISCARD ALL de un pooler externo, reinicio de la sesión...)
+        elif not self._intentar(cursor, conexion, ejecutar, params or None, '26000'):
+            preparadas.discard(nombre)
+            self._preparar_en(cursor, conexion, nombre, preparar)
+            reutilizada = False
+            with self._lock_sentencias:
+                self._stats_sentencias['re_preparaciones'] += 1
+            cursor.execute(ejecutar, params or None)
+        
+        with self._lock_sentencias:
+            self._stats_sentencias['ejecuciones'] += 1
+            if reutilizada:
+                self._stats_sentencias['reutilizaciones'] += 1
+    
+    def _preparar_en(self, cursor, conexion, nombre: str, preparar: str):
+        """Envía el PREPARE en la conexión y lo anota en su registro"""
+        inicio = time.perf_counter()
+        # 42P05 duplicate_prepared_statement: ya existía en la sesión
+        if self._intentar(cursor, conexion, preparar, None, '42P05'):
+            with self._lock_sentencias:
+                self._stats_sentencias['preparaciones'] += 1
+                self._stats_sentencias['tiempo_preparacion'] += time.perf_counter() - inicio
+        conexion.preparadas.add(nombre)
+    
+    @staticmethod
+    def _intentar(cursor, conexion, sql: str, params, codigo: str) -> bool:
+        """
+        Ejecuta sql y tolera un error esperado
+        
+        Dentro de una transacción el intento va entre SAVEPOINT y ROLLBACK TO
+        SAVEPOINT: si falla con `codigo` solo se deshace el intento, no lo
+        que la transacción ya escribió. Los SAVEPOINT usan otro cursor para
+        no pisar el resultado del EXECUTE.
+        
+        Returns:
+            True si se ejecutó, False si falló con `codigo`
+        
+        Raises:
+            psycopg2.Error: Cualquier otro error
+        """
+        if conexion.autocommit:
+            try:
+                cursor.execute(sql, params)
+            except psycopg2.Error as e:
+                if e.pgcode != codigo:
+                    raise
+                return False
+            return True
+        
+        with conexion.cursor() as control:
+            control.execute("SAVEPOINT intento_sentencia")
+            try:
+                cursor.execute(sql, params)
+            except psycopg2.Error as e:
+                if e.pgcode != codigo:
+                    raise
+                control.execute("ROLLBACK TO SAVEPOINT intento_sentencia")
+                control.execute("RELEASE SAVEPOINT intento_sentencia")
+                return False
+            control.execute("RELEASE SAVEPOINT intento_sentencia")
+            return True
+    
+    def estadisticas_sentencias(self) -> Dict[str, Any]:
+        """
+        Contadores de las sentencias preparadas
+        
+        `ahorro_estimado_ms` multiplica el costo medio de un PREPARE (análisis y
+        planificación más un round trip) por las ejecuciones que lo reutilizaron:
+        es una cota superior del tiempo de parseo que se dejó de gastar.
+        """
+        with self._lock_sentencias:
+            datos = dict(self._stats_sentencias)
+            datos['registradas'] = len(self._sentencias)
+        preparaciones = datos['preparaciones']
+        promedio = datos.pop('tiempo_preparacion') / preparaciones if preparaciones else 0.0
+        datos['preparacion_media_ms'] = promedio * 1000
+        datos['ahorro_estimado_ms'] = promedio * datos['reutilizaciones'] * 1000
+        return datos
+    
     def verificar_conexion(self) -> bool:
         """
         Verifica que la conexión a la base de datos funcione
@@ -239,7 +1211,7 @@ class DatabaseManager:
             True si la conexión es exitosa, False en caso contrario
         """
         try:
-            resultado = self.ejecutar_query("SELECT 1", fetch=True)
+            resultado = self.ejecutar_query("SELECT 1", fetch=True, solo_lectura=True)
             return resultado is not None
         except Exception as e:
             logger.error(f"Error al verificar conexión: {e}")
@@ -248,12 +1220,27 @@ class DatabaseManager:
     def obtener_version_db(self) -> Optional[str]:
         """Obtiene la versión de PostgreSQL"""
         try:
-            resultado = self.ejecutar_query("SELECT version()", fetch=True)
+            resultado = self.ejecutar_query("SELECT version()", fetch=True, solo_lectura=True)
             return resultado[0][0] if resultado else None
         except Exception as e:
             logger.error(f"Error al obtener versión: {e}")
             return None
     
+    def estadisticas_pool(self) -> Dict[str, Any]:
+        """Estadísticas del pool: en uso, libres, esperas y tiempo de espera"""
+        return ConexionDB.estadisticas_pool()
+    
+    def escuchar(self, canal: str, callback) -> EscuchaNotificaciones:
+        """
+        Inicia un hilo que llama a callback(payload) por cada NOTIFY en `canal`
+        
+        Returns:
+            El hilo de escucha (usar .detener() para pararlo)
+        """
+        escucha = EscuchaNotificaciones(canal, callback, ConexionDB.DB_CONFIG)
+        escucha.start()
+        return escucha
+    
     def cerrar(self):
         """Cierra el pool de conexiones"""
         ConexionDB.cerrar_pool()
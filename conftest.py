@@ -0,0 +1,5 @@
+"""Configuración de pytest para las pruebas unitarias del proyecto"""
+
+# test_db.py y test_productos.py son scripts de verificación manual que se
+# conectan a PostgreSQL al importarlos: se ejecutan a mano, no con pytest
+collect_ignore = ['test_db.py', 'test_productos.py']
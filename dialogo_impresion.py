@@ -3,63 +3,35 @@ Módulo para manejar el diálogo de impresión tipo Windows
 """
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
-import subprocess
-import tempfile
-import os
+import time
+
+from servicio_impresion import registro_impresoras
+from pdf_factura import generar_pdf, PAPELES
+from impresora_termica import encolar_ticket, DISPOSITIVO_TICKETERA
+from cola_impresion import cola_impresion, PENDIENTE, ENVIADO, ERROR, CANCELADO
 
 
 class DialogoImpresion:
-    def __init__(self, ventana_padre, colores, contenido_factura, cliente):
+    def __init__(self, ventana_padre, colores, contenido_factura, cliente, generar_escpos=None):
         self.ventana_padre = ventana_padre
         self.colores = colores
         self.contenido = contenido_factura
         self.cliente = cliente
-        self.temp_file = None
-        
-        # Crear archivo temporal
-        self._crear_archivo_temporal()
+        # generar_escpos(abrir_cajon) -> bytes; habilita la opción de ticket térmico
+        self.generar_escpos = generar_escpos
         
         # Mostrar diálogo
         self._mostrar_dialogo()
     
-    def _crear_archivo_temporal(self):
-        """Crear archivo temporal con la factura"""
-        try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-                f.write(self.contenido)
-                self.temp_file = f.name
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo crear archivo temporal: {e}")
-    
     def _mostrar_dialogo(self):
         """Crear y mostrar el diálogo de impresión"""
         # Mostrar directamente la pantalla de previsualización/imprimir (estilo Windows):
-        # obtenemos lista de impresoras y la predeterminada (si existe) y abrimos
+        # tomamos lista de impresoras y la predeterminada (si existe) y abrimos
         # el diálogo avanzado. Si no hay impresoras, mostramos diagnóstico y
         # aun así abrimos el diálogo para permitir configuración manual.
-        impresoras = []
-        impresora_default = None
-        try:
-            # Obtener lista de impresoras (lpstat -p muestra todas las impresoras)
-            resultado = subprocess.run(['lpstat', '-p'], capture_output=True, text=True, timeout=5)
-            if resultado.returncode == 0:
-                for linea in resultado.stdout.strip().split('\n'):
-                    # Buscar líneas que empiecen con "printer" (formato: "printer NombreImpresora...")
-                    if linea.startswith('printer '):
-                        partes = linea.split()
-                        if len(partes) > 1:
-                            impresoras.append(partes[1])
-            
-            # Obtener impresora predeterminada
-            resultado_default = subprocess.run(['lpstat', '-d'], capture_output=True, text=True, timeout=5)
-            if resultado_default.returncode == 0:
-                for linea in resultado_default.stdout.strip().split('\n'):
-                    if 'system default' in linea or 'destination' in linea:
-                        partes = linea.split(':')
-                        if len(partes) > 1:
-                            impresora_default = partes[1].strip()
-        except Exception:
-            pass
+        # La lista sale del registro de impresoras (descubierto en segundo
+        # plano al arrancar): abrir el diálogo no ejecuta lpstat.
+        impresoras, impresora_default = registro_impresoras.impresoras()
 
         # Abrir diálogo avanzado (previsualización + opciones)
         # Se mostrará alerta si no hay impresoras dentro del diálogo
@@ -89,44 +61,24 @@ class DialogoImpresion:
         archivo = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("PDF", "*.pdf"), ("Texto", "*.txt"), ("Todos", "*.*")],
-            initialfile=f"factura_{self.cliente}.txt"
+            initialfile=f"factura_{self.cliente}.pdf"
         )
         
         if archivo:
             try:
-                # Guardar como texto (PDF requeriría biblioteca adicional)
-                with open(archivo, 'w', encoding='utf-8') as f:
-                    f.write(self.contenido)
+                if archivo.lower().endswith('.pdf'):
+                    generar_pdf(self.contenido, archivo)
+                else:
+                    with open(archivo, 'w', encoding='utf-8') as f:
+                        f.write(self.contenido)
                 messagebox.showinfo("✅ Éxito", f"Archivo guardado:\n{archivo}")
             except Exception as e:
                 messagebox.showerror("Error", f"Error al guardar: {e}")
-            finally:
-                self._limpiar_temp()
     
     def _enviar_a_impresora(self):
         """Enviar a impresora con selector"""
         try:
-            impresoras = []
-            impresora_default = None
-            
-            # Obtener lista de impresoras (lpstat -p muestra todas las impresoras)
-            resultado = subprocess.run(['lpstat', '-p'], capture_output=True, text=True, timeout=5)
-            if resultado.returncode == 0:
-                for linea in resultado.stdout.strip().split('\n'):
-                    # Buscar líneas que empiecen con "printer" (formato: "printer NombreImpresora...")
-                    if linea.startswith('printer '):
-                        partes = linea.split()
-                        if len(partes) > 1:
-                            impresoras.append(partes[1])
-            
-            # Obtener impresora predeterminada
-            resultado_default = subprocess.run(['lpstat', '-d'], capture_output=True, text=True, timeout=5)
-            if resultado_default.returncode == 0:
-                for linea in resultado_default.stdout.strip().split('\n'):
-                    if 'system default' in linea or 'destination' in linea:
-                        partes = linea.split(':')
-                        if len(partes) > 1:
-                            impresora_default = partes[1].strip()
+            impresoras, impresora_default = registro_impresoras.impresoras()
             
             if not impresoras:
                 # No mostrar ventana de diagnóstico, solo abrir el diálogo avanzado
@@ -138,7 +90,6 @@ class DialogoImpresion:
             
         except Exception as e:
             messagebox.showerror("Error", f"Error: {e}")
-            self._limpiar_temp()
     
     def _mostrar_selector_impresoras(self, impresoras, default):
         """Mostrar diálogo para seleccionar impresora"""
@@ -224,21 +175,20 @@ class DialogoImpresion:
                  font=('Inter', 12, 'bold'), fg=self.colores['acento_dorado'],
                  bg=self.colores['fondo_principal']).pack(pady=12)
 
-        # Mostrar alerta si no hay impresoras detectadas
-        if not impresoras:
-            alert_frame = tk.Frame(dialog, bg='#ff6b6b', relief=tk.RAISED, bd=2)
-            alert_frame.pack(fill=tk.X, padx=12, pady=(0, 10))
-            
-            alert_inner = tk.Frame(alert_frame, bg='#ff6b6b')
-            alert_inner.pack(fill=tk.X, padx=15, pady=10)
-            
-            tk.Label(alert_inner, text="⚠️ No se detectaron impresoras",
-                     font=('Inter', 11, 'bold'), fg='white',
-                     bg='#ff6b6b').pack(side=tk.LEFT)
-            
-            tk.Label(alert_inner, text="Configura una impresora o guarda como PDF",
-                     font=('Inter', 9), fg='white',
-                     bg='#ff6b6b').pack(side=tk.LEFT, padx=(10, 0))
+        # Alerta si no hay impresoras detectadas (o si aún se están buscando)
+        alert_frame = tk.Frame(dialog, bg='#ff6b6b', relief=tk.RAISED, bd=2)
+        alert_inner = tk.Frame(alert_frame, bg='#ff6b6b')
+        alert_inner.pack(fill=tk.X, padx=15, pady=10)
+
+        alert_titulo = tk.Label(alert_inner, text="⚠️ No se detectaron impresoras",
+                                font=('Inter', 11, 'bold'), fg='white',
+                                bg='#ff6b6b')
+        alert_titulo.pack(side=tk.LEFT)
+
+        alert_detalle = tk.Label(alert_inner, text="Configura una impresora o guarda como PDF",
+                                 font=('Inter', 9), fg='white',
+                                 bg='#ff6b6b')
+        alert_detalle.pack(side=tk.LEFT, padx=(10, 0))
 
         # Frame principal
         main = tk.Frame(dialog, bg=self.colores['fondo_principal'])
@@ -250,6 +200,10 @@ class DialogoImpresion:
         printer_var = tk.StringVar(value=default if default else (impresoras[0] if impresoras else ""))
         printer_menu = ttk.Combobox(main, values=impresoras, textvariable=printer_var, state='readonly', width=40)
         printer_menu.grid(row=0, column=1, sticky='ew', padx=8, pady=6)
+        tk.Button(main, text="🔄", font=('Inter', 9), bg=self.colores['fondo_principal'],
+                  fg=self.colores['texto_principal'], relief=tk.FLAT, cursor='hand2',
+                  command=lambda: (registro_impresoras.refrescar(), actualizar_alerta())
+                  ).grid(row=0, column=2, sticky='w')
 
         # Acción: imprimir o guardar como PDF
         tk.Label(main, text="Acción:", font=('Inter', 10),
@@ -259,6 +213,8 @@ class DialogoImpresion:
         action_frame.grid(row=1, column=1, sticky='w', padx=8, pady=6)
         tk.Radiobutton(action_frame, text='Imprimir', value='print', variable=action_var, bg=self.colores['fondo_principal'], fg=self.colores['texto_principal']).pack(side=tk.LEFT)
         tk.Radiobutton(action_frame, text='Guardar como PDF', value='pdf', variable=action_var, bg=self.colores['fondo_principal'], fg=self.colores['texto_principal']).pack(side=tk.LEFT, padx=10)
+        if self.generar_escpos is not None:
+            tk.Radiobutton(action_frame, text='Ticket térmico', value='ticket', variable=action_var, bg=self.colores['fondo_principal'], fg=self.colores['texto_principal']).pack(side=tk.LEFT)
 
         # Copias
         tk.Label(main, text="Copias:", font=('Inter', 10),
@@ -288,11 +244,20 @@ class DialogoImpresion:
         duplex_cb = tk.Checkbutton(main, text='Dúplex (si soporta)', variable=duplex_var, bg=self.colores['fondo_principal'], fg=self.colores['texto_principal'])
         duplex_cb.grid(row=5, column=1, sticky='w', padx=8, pady=6)
 
+        # Cajón de dinero (solo tickets ESC/POS)
+        cajon_var = tk.BooleanVar(value=False)
+        if self.generar_escpos is not None:
+            tk.Checkbutton(main, text='Abrir cajón (ticket térmico)', variable=cajon_var, bg=self.colores['fondo_principal'], fg=self.colores['texto_principal']).grid(row=6, column=1, sticky='w', padx=8, pady=6)
+
         # Make grid columns expand
         main.grid_columnconfigure(1, weight=1)
 
         def confirmar_avanzado():
             impresora = printer_var.get()
+            if action_var.get() == 'ticket' and (impresora or DISPOSITIVO_TICKETERA):
+                self._imprimir_ticket(impresora, copies=int(copies_var.get()), abrir_cajon=cajon_var.get())
+                dialog.destroy()
+                return
             if not impresora:
                 messagebox.showwarning("Error", "Selecciona una impresora")
                 return
@@ -306,7 +271,7 @@ class DialogoImpresion:
                 archivo = filedialog.asksaveasfilename(defaultextension='.pdf', filetypes=[('PDF','*.pdf')], initialfile=f'factura_{self.cliente}.pdf')
                 if not archivo:
                     return
-                ok = self._generar_pdf(archivo)
+                ok = self._generar_pdf(archivo, papel=media)
                 if ok:
                     messagebox.showinfo('✅ Éxito', f'PDF guardado en:\n{archivo}')
                 dialog.destroy()
@@ -318,7 +283,8 @@ class DialogoImpresion:
 
         # Si CUPS está disponible, obtener opciones soportadas por la impresora seleccionada
         def poblar_opciones_por_impresora(printer_name):
-            medias, soporta_duplex = self._obtener_opciones_cups(printer_name)
+            # Capacidades ya descubiertas en segundo plano (sin lpoptions aquí)
+            medias, soporta_duplex = registro_impresoras.capacidades(printer_name) or ([], False)
             if medias:
                 # mantener el valor actual si está disponible, sino usar el primero
                 current = media_var.get()
@@ -350,143 +316,91 @@ class DialogoImpresion:
         if printer_var.get():
             poblar_opciones_por_impresora(printer_var.get())
 
+        def actualizar_alerta():
+            if impresoras and not registro_impresoras.descubriendo:
+                alert_frame.pack_forget()
+                return
+            if registro_impresoras.descubriendo:
+                alert_titulo.config(text="⏳ Buscando impresoras...")
+                alert_detalle.config(text="Puedes guardar como PDF mientras tanto")
+            else:
+                alert_titulo.config(text="⚠️ No se detectaron impresoras")
+                alert_detalle.config(text="Configura una impresora o guarda como PDF")
+            alert_frame.pack(fill=tk.X, padx=12, pady=(0, 10), before=main)
+
+        # Sondear el registro: si termina un descubrimiento mientras el
+        # diálogo está abierto, refrescar lista y opciones en el hilo de Tk
+        version_vista = [registro_impresoras.version]
+
+        def sondear_registro():
+            if not dialog.winfo_exists():
+                return
+            if registro_impresoras.version != version_vista[0]:
+                version_vista[0] = registro_impresoras.version
+                nuevas, nueva_default = registro_impresoras.impresoras()
+                impresoras[:] = nuevas
+                printer_menu['values'] = nuevas
+                if printer_var.get() not in nuevas:
+                    printer_var.set(nueva_default if nueva_default in nuevas else (nuevas[0] if nuevas else ""))
+                if printer_var.get():
+                    poblar_opciones_por_impresora(printer_var.get())
+            actualizar_alerta()
+            dialog.after(300, sondear_registro)
+
+        actualizar_alerta()
+        dialog.after(300, sondear_registro)
+
         btns = tk.Frame(dialog, bg=self.colores['fondo_principal'])
         btns.pack(pady=12)
         tk.Button(btns, text="Imprimir", bg=self.colores['verde_success'], fg='white', command=confirmar_avanzado).pack(side=tk.LEFT, padx=8)
         tk.Button(btns, text="Cancelar", bg=self.colores['rojo_danger'], fg='white', command=dialog.destroy).pack(side=tk.LEFT, padx=8)
 
     def _imprimir_con_lp(self, impresora, copies=1, media='A4', orientation='Portrait', duplex=False):
-        """Enviar el archivo temporal a la impresora usando lp con opciones seleccionadas."""
-        try:
-            cmd = ['lp', '-d', impresora, '-n', str(copies)]
-            # Mapear media a nombres entendibles por CUPS
-            media_map = {'A4': 'A4', 'Letter': 'Letter', 'Legal': 'Legal'}
-            if media in media_map:
-                cmd.extend(['-o', f'media={media_map[media]}'])
-            # Orientación (usar opciones compatibles con CUPS)
-            if orientation == 'Landscape':
-                cmd.extend(['-o', 'landscape'])
-            else:
-                cmd.extend(['-o', 'portrait'])
-            # Duplex
-            if duplex:
-                cmd.extend(['-o', 'sides=two-sided-long-edge'])
-
-            cmd.append(self.temp_file)
-
-            resultado = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-            if resultado.returncode == 0:
-                messagebox.showinfo("✅ Éxito", f"Factura enviada a: {impresora}")
-            else:
-                messagebox.showerror("Error", f"Error al imprimir:\n{resultado.stderr}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al imprimir: {e}")
-        finally:
-            self._limpiar_temp()
-
-    def _generar_pdf(self, ruta_pdf):
-        """Generar PDF con el contenido de la factura.
-        Intentos en orden: reportlab, wkhtmltopdf, fallback a texto.
-        Devuelve True si se guardó correctamente.
+        """Encolar la factura para la impresora con las opciones seleccionadas.
+        El envío a lp lo hace la cola de impresión en segundo plano (con reintentos),
+        así el cajero no espera a CUPS.
         """
-        # Primero intentar reportlab
+        opciones = []
+        # Mapear media a nombres entendibles por CUPS
+        media_map = {'A4': 'A4', 'Letter': 'Letter', 'Legal': 'Legal'}
+        if media in media_map:
+            opciones.append(f'media={media_map[media]}')
+        # Orientación (usar opciones compatibles con CUPS)
+        opciones.append('landscape' if orientation == 'Landscape' else 'portrait')
+        # Duplex
+        if duplex:
+            opciones.append('sides=two-sided-long-edge')
+
         try:
-            from reportlab.pdfgen import canvas  # type: ignore
-            c = canvas.Canvas(ruta_pdf)
-            textobject = c.beginText(40, 800)
-            textobject.setFont('Helvetica', 10)
-            for line in self.contenido.splitlines():
-                textobject.textLine(line)
-            c.drawText(textobject)
-            c.showPage()
-            c.save()
-            return True
-        except Exception:
-            pass
+            cola_impresion.encolar(self.contenido, impresora, copias=copies,
+                                   opciones=opciones, titulo=f"Factura_{self.cliente}")
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo encolar la factura: {e}")
 
-        # Intentar wkhtmltopdf: crear HTML temporal y convertir
+    def _imprimir_ticket(self, impresora, copies=1, abrir_cajon=False):
+        """Encolar el ticket en ESC/POS crudo: `lp -o raw` (sin filtros de CUPS)
+        o directo al dispositivo configurado en PARCIAL2_TICKETERA.
+        """
         try:
-            import html
-            html_body = '<pre style="font-family: monospace; white-space: pre-wrap;">{}</pre>'.format(html.escape(self.contenido))
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as f:
-                f.write('<html><body>{}</body></html>'.format(html_body))
-                html_path = f.name
-            res = subprocess.run(['wkhtmltopdf', html_path, ruta_pdf], capture_output=True, text=True, timeout=15)
-            try:
-                os.unlink(html_path)
-            except:
-                pass
-            return res.returncode == 0
-        except Exception:
-            pass
+            encolar_ticket(self.generar_escpos(abrir_cajon), impresora, copias=copies,
+                           titulo=f"Ticket_{self.cliente}")
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo encolar el ticket: {e}")
 
-        # Fallback: guardar como texto con extensión .pdf (no es PDF real)
+    def _generar_pdf(self, ruta_pdf, papel='A4'):
+        """Generar PDF con el contenido de la factura (escritor propio, sin
+        reportlab ni wkhtmltopdf). Devuelve True si se guardó correctamente.
+        """
         try:
-            with open(ruta_pdf, 'w', encoding='utf-8') as f:
-                f.write(self.contenido)
-            messagebox.showwarning('Atención', 'No se pudo generar PDF nativo (reportlab/wkhtmltopdf no disponibles). Se ha guardado un archivo de texto con extensión .pdf.')
+            generar_pdf(self.contenido, ruta_pdf, papel=papel if papel in PAPELES else 'A4')
             return True
         except Exception as e:
             messagebox.showerror('Error', f'No se pudo guardar PDF: {e}')
             return False
 
-    def _obtener_opciones_cups(self, printer_name):
-        """Consulta CUPS (lpoptions) para obtener medias soportadas y soporte de dúplex.
-        Devuelve (medias_list, soporta_duplex_bool).
-        """
-        medias = []
-        soporta_duplex = False
-        try:
-            resultado = subprocess.run(['lpoptions', '-p', printer_name, '-l'], capture_output=True, text=True, timeout=5)
-            if resultado.returncode != 0:
-                return ([], False)
-
-            for linea in resultado.stdout.splitlines():
-                linea = linea.strip()
-                if not linea or ':' not in linea:
-                    continue
-                left, right = linea.split(':', 1)
-                left = left.strip()
-                right = right.strip()
-
-                # Detectar opción de tamaño de página
-                lname = left.lower()
-                if 'pagesize' in lname or 'page' in lname and ('size' in lname or 'media' in lname) or 'media' in lname:
-                    # right contiene valores como "*A4 Letter Legal"
-                    tokens = [t.strip().lstrip('*') for t in right.split() if t.strip()]
-                    # Filtrar tokens que parezcan media
-                    candidate = [t for t in tokens if any(c.isalpha() for c in t)]
-                    if candidate:
-                        medias = candidate
-
-                # Detectar opción de duplex
-                if 'duplex' in lname or 'sides' in lname:
-                    # Si hay más de una opción y no es solo "None", asumimos soporte
-                    tokens = [t.strip().lstrip('*') for t in right.split() if t.strip()]
-                    if len(tokens) > 1 or any('two' in t.lower() or 'duplex' in t.lower() for t in tokens):
-                        soporta_duplex = True
-
-        except Exception:
-            return ([], False)
-
-        return (medias, soporta_duplex)
-    
     def _enviar_a_impresora_seleccionada(self, impresora):
         """Enviar factura a la impresora seleccionada"""
-        try:
-            resultado = subprocess.run(['lp', '-d', impresora, self.temp_file],
-                                     capture_output=True, text=True, timeout=10)
-            
-            if resultado.returncode == 0:
-                messagebox.showinfo("✅ Éxito", 
-                                 f"Factura enviada a:\n{impresora}")
-            else:
-                messagebox.showerror("Error", 
-                                   f"Error al imprimir:\n{resultado.stderr}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error: {e}")
-        finally:
-            self._limpiar_temp()
+        self._imprimir_con_lp(impresora)
 
     def _imprimir_con_gtk(self):
         """Intentar mostrar el diálogo de impresión nativo usando PyGObject/GTK.
@@ -541,13 +455,93 @@ class DialogoImpresion:
             # Hubo un problema mostrando el diálogo; informar y devolver False para fallback
             messagebox.showwarning("Diálogo nativo no disponible", f"No se pudo abrir diálogo nativo:\n{e}")
             return False
-        finally:
-            self._limpiar_temp()
-    
-    def _limpiar_temp(self):
-        """Limpiar archivo temporal"""
-        try:
-            if self.temp_file and os.path.exists(self.temp_file):
-                os.unlink(self.temp_file)
-        except:
-            pass
+
+
+class DialogoColaImpresion:
+    """Ventana con el estado de la cola de impresión (reintentar, cancelar, reimprimir)"""
+
+    ICONOS = {PENDIENTE: '⏳', ENVIADO: '✅', ERROR: '❌', CANCELADO: '🚫'}
+
+    def __init__(self, ventana_padre, colores):
+        self.colores = colores
+        self._ids = []
+        self._version = None
+
+        self.dialogo = tk.Toplevel(ventana_padre)
+        self.dialogo.title("Cola de impresión")
+        self.dialogo.geometry("640x420")
+        self.dialogo.configure(bg=self.colores['fondo_principal'])
+
+        tk.Label(self.dialogo, text="🖨️ Trabajos de impresión",
+                 font=('Inter', 12, 'bold'), fg=self.colores['acento_dorado'],
+                 bg=self.colores['fondo_principal']).pack(pady=12)
+
+        # Listbox de trabajos (selección múltiple para reimprimir en lote)
+        listbox_frame = tk.Frame(self.dialogo, bg=self.colores['fondo_principal'])
+        listbox_frame.pack(fill=tk.BOTH, expand=True, padx=12, pady=(0, 8))
+
+        scrollbar = tk.Scrollbar(listbox_frame, bg=self.colores['fondo_card'])
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.listbox = tk.Listbox(listbox_frame, bg=self.colores['fondo_card'],
+                                  fg=self.colores['texto_principal'],
+                                  font=('Courier', 9), selectmode=tk.EXTENDED,
+                                  yscrollcommand=scrollbar.set)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.listbox.yview)
+
+        btns = tk.Frame(self.dialogo, bg=self.colores['fondo_principal'])
+        btns.pack(pady=10)
+        tk.Button(btns, text="🔁 Reimprimir selección", bg=self.colores['verde_success'], fg='white',
+                  command=self._reimprimir).pack(side=tk.LEFT, padx=6)
+        tk.Button(btns, text="↻ Reintentar", bg=self.colores['acento_dorado'], fg='black',
+                  command=lambda: self._para_cada(cola_impresion.reintentar)).pack(side=tk.LEFT, padx=6)
+        tk.Button(btns, text="Cancelar trabajo", bg=self.colores['rojo_danger'], fg='white',
+                  command=lambda: self._para_cada(cola_impresion.cancelar)).pack(side=tk.LEFT, padx=6)
+        tk.Button(btns, text="Cerrar", bg=self.colores['fondo_card'], fg=self.colores['texto_principal'],
+                  command=self.dialogo.destroy).pack(side=tk.LEFT, padx=6)
+
+        self._sondear()
+
+    def _seleccion(self):
+        return [self._ids[i] for i in self.listbox.curselection() if i < len(self._ids)]
+
+    def _para_cada(self, accion):
+        for id_trabajo in self._seleccion():
+            accion(id_trabajo)
+
+    def _reimprimir(self):
+        ids = self._seleccion()
+        if not ids:
+            messagebox.showwarning("Error", "Selecciona uno o más trabajos", parent=self.dialogo)
+            return
+        # Orden cronológico: la lista muestra primero los más recientes
+        cola_impresion.reimprimir(list(reversed(ids)))
+
+    def _sondear(self):
+        """Refrescar la lista solo cuando la cola cambió"""
+        if not self.dialogo.winfo_exists():
+            return
+        if cola_impresion.version != self._version:
+            self._version = cola_impresion.version
+            self._pintar()
+        self.dialogo.after(500, self._sondear)
+
+    def _pintar(self):
+        seleccion = set(self._seleccion())
+        self.listbox.delete(0, tk.END)
+        self._ids = []
+        for trabajo in cola_impresion.trabajos():
+            hora = time.strftime('%H:%M:%S', time.localtime(trabajo['creado']))
+            linea = (f"{self.ICONOS.get(trabajo['estado'], '?')} {hora}  "
+                     f"{trabajo['titulo'][:28]:<28} {trabajo['impresora'][:16]:<16}")
+            if trabajo['estado'] == ENVIADO and trabajo['id_cups']:
+                linea += f"  {trabajo['id_cups']}"
+            elif trabajo['error']:
+                linea += f"  intento {trabajo['intentos']}: {trabajo['error'][:40]}"
+            self.listbox.insert(tk.END, linea)
+            if trabajo['estado'] == ERROR:
+                self.listbox.itemconfig(tk.END, {'fg': self.colores['rojo_danger']})
+            if trabajo['id'] in seleccion:
+                self.listbox.selection_set(tk.END)
+            self._ids.append(trabajo['id'])
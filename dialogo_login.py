@@ -6,10 +6,19 @@ from tkinter import messagebox
 
 
 class DialogoLogin:
-    def __init__(self, ventana, colores, callback_login):
+    def __init__(self, ventana, colores, callback_login, menu=None, ejecutor=None):
+        """
+        Args:
+            menu: Menu ya cargado para verificar credenciales (si no se
+                indica se crea uno al iniciar sesión)
+            ejecutor: EjecutorDB para verificar en segundo plano; sin él la
+                verificación bloquea la ventana
+        """
         self.ventana = ventana
         self.colores = colores
         self.callback_login = callback_login
+        self.menu = menu
+        self.ejecutor = ejecutor
         self._mostrar_login()
     
     def _mostrar_login(self):
@@ -92,13 +101,28 @@ class DialogoLogin:
         entry_password.bind('<Return>', lambda e: verificar_login())
         
         def verificar_login():
+            if str(btn_login['state']) == tk.DISABLED:
+                return
             usuario = entry_usuario.get().strip()
             password = entry_password.get().strip()
             
-            # Verificar credenciales desde la base de datos
-            from modelo_restaurante import Menu
-            menu = Menu()
-            usuario_db = menu.verificar_login(usuario, password)
+            if self.menu is None:
+                from modelo_restaurante import Menu
+                self.menu = Menu(revalidar=False)
+            
+            # Verificar credenciales desde la base de datos sin congelar la ventana
+            if self.ejecutor is None:
+                resultado(self.menu.verificar_login(usuario, password))
+                return
+            btn_login.config(state=tk.DISABLED, text="VERIFICANDO...")
+            self.ejecutor.enviar(self.menu.verificar_login, usuario, password,
+                                 al_terminar=resultado, al_fallar=lambda e: resultado(None),
+                                 clave='login')
+        
+        def resultado(usuario_db):
+            if not btn_login.winfo_exists():
+                return
+            btn_login.config(state=tk.NORMAL, text="INICIAR SESIÓN")
             
             if usuario_db:
                 # Login exitoso
@@ -119,7 +143,8 @@ class DialogoLogin:
         btn_frame = tk.Frame(main_frame, bg=self.colores['fondo_principal'])
         btn_frame.pack(fill=tk.X)
         
-        tk.Button(btn_frame, text="INICIAR SESIÓN", font=('Inter', 12, 'bold'),
-                 bg=self.colores['acento_dorado'], fg='#000000',
-                 relief=tk.FLAT, padx=30, pady=12,
-                 command=verificar_login).pack(pady=10, ipady=5)
+        btn_login = tk.Button(btn_frame, text="INICIAR SESIÓN", font=('Inter', 12, 'bold'),
+                              bg=self.colores['acento_dorado'], fg='#000000',
+                              relief=tk.FLAT, padx=30, pady=12,
+                              command=verificar_login)
+        btn_login.pack(pady=10, ipady=5)
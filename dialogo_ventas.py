@@ -0,0 +1,110 @@
+"""
+Diálogo de ventas rechazadas por la base de datos
+
+Las ventas que PostgreSQL no acepta por sus datos quedan en el WAL de
+ventas (ver ventas.RegistroVentas). Esta ventana las lista y permite
+reintentarlas o exportarlas a JSON y quitarlas del WAL.
+"""
+import tkinter as tk
+from tkinter import messagebox, filedialog
+
+from ventas import registro_ventas
+
+
+class DialogoVentasRechazadas:
+    """Ventana con las ventas rechazadas (reintentar, exportar y descartar)"""
+
+    def __init__(self, ventana_padre, colores):
+        self.colores = colores
+        self._ids = []
+
+        self.dialogo = tk.Toplevel(ventana_padre)
+        self.dialogo.title("Ventas rechazadas")
+        self.dialogo.geometry("720x380")
+        self.dialogo.configure(bg=self.colores['fondo_principal'])
+
+        tk.Label(self.dialogo, text="⚠ Ventas que la base de datos no aceptó",
+                 font=('Inter', 12, 'bold'), fg=self.colores['rojo_danger'],
+                 bg=self.colores['fondo_principal']).pack(pady=(12, 2))
+        tk.Label(self.dialogo, text="No figuran en el libro de ventas hasta reintentarlas con éxito",
+                 font=('Inter', 9), fg=self.colores['texto_secundario'],
+                 bg=self.colores['fondo_principal']).pack(pady=(0, 8))
+
+        listbox_frame = tk.Frame(self.dialogo, bg=self.colores['fondo_principal'])
+        listbox_frame.pack(fill=tk.BOTH, expand=True, padx=12, pady=(0, 8))
+
+        scrollbar = tk.Scrollbar(listbox_frame, bg=self.colores['fondo_card'])
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.listbox = tk.Listbox(listbox_frame, bg=self.colores['fondo_card'],
+                                  fg=self.colores['texto_principal'],
+                                  font=('Courier', 9), selectmode=tk.EXTENDED,
+                                  yscrollcommand=scrollbar.set)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.listbox.yview)
+
+        btns = tk.Frame(self.dialogo, bg=self.colores['fondo_principal'])
+        btns.pack(pady=10)
+        tk.Button(btns, text="↻ Reintentar", bg=self.colores['acento_dorado'], fg='black',
+                  command=self._reintentar).pack(side=tk.LEFT, padx=6)
+        tk.Button(btns, text="💾 Exportar y descartar", bg=self.colores['rojo_danger'], fg='white',
+                  command=self._exportar_y_descartar).pack(side=tk.LEFT, padx=6)
+        tk.Button(btns, text="Cerrar", bg=self.colores['fondo_card'], fg=self.colores['texto_principal'],
+                  command=self.dialogo.destroy).pack(side=tk.LEFT, padx=6)
+
+        self._pintar()
+
+    def _seleccion(self):
+        """idVenta seleccionados; sin selección, todos"""
+        seleccion = [self._ids[i] for i in self.listbox.curselection() if i < len(self._ids)]
+        return seleccion or list(self._ids)
+
+    def _reintentar(self):
+        ids = self._seleccion()
+        if not ids:
+            return
+        encoladas = registro_ventas.reintentar_rechazadas(ids)
+        if encoladas < len(ids):
+            messagebox.showwarning("Ventas rechazadas",
+                                   f"{len(ids) - encoladas} venta(s) están incompletas y no se "
+                                   f"pueden reintentar; expórtalas para revisarlas",
+                                   parent=self.dialogo)
+        self._pintar()
+
+    def _exportar_y_descartar(self):
+        ids = self._seleccion()
+        if not ids:
+            return
+        archivo = filedialog.asksaveasfilename(
+            parent=self.dialogo, defaultextension=".json",
+            initialfile="ventas_rechazadas.json",
+            filetypes=[("JSON", "*.json"), ("Todos", "*.*")]
+        )
+        if not archivo:
+            return
+        try:
+            with open(archivo, 'w', encoding='utf-8') as f:
+                exportadas = registro_ventas.exportar_rechazadas(f, ids)
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudo exportar: {e}", parent=self.dialogo)
+            return
+        # Solo se descarta lo que quedó escrito en el archivo
+        registro_ventas.descartar_rechazadas(ids)
+        messagebox.showinfo("Ventas rechazadas",
+                            f"{exportadas} venta(s) exportada(s) a {archivo}", parent=self.dialogo)
+        self._pintar()
+
+    def _pintar(self):
+        self.listbox.delete(0, tk.END)
+        self._ids = []
+        for registro in registro_ventas.ventas_rechazadas():
+            venta = registro.get('venta')
+            if not isinstance(venta, dict):
+                venta = {}  # Registro ilegible: se muestra igual para poder exportarlo
+            total = venta.get('total')
+            if not isinstance(total, (int, float)):
+                total = 0
+            linea = (f"{registro.get('fecha', '')[:19]:<19}  {str(venta.get('cliente', ''))[:20]:<20} "
+                     f"${total:>9,.2f}  {registro.get('error', '')[:60]}")
+            self.listbox.insert(tk.END, linea)
+            self._ids.append(str(venta.get('idVenta')))
@@ -0,0 +1,130 @@
+"""
+Ejecutor de consultas en segundo plano para la interfaz Tkinter
+
+Tkinter no es seguro entre hilos: los widgets solo pueden tocarse desde el
+hilo del mainloop. Este módulo corre las llamadas a la base de datos en un
+pool de hilos y entrega los resultados en el hilo de Tk, sondeando una cola
+con `after`. Así una consulta lenta nunca congela la interfaz.
+"""
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
+from typing import Callable, Dict, Hashable, Optional
+import logging
+import queue
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+class EjecutorDB:
+    """
+    Pool de hilos para llamadas a la BD con callbacks en el hilo de Tk.
+
+    Cada envío puede llevar una `clave`: al enviar otra tarea con la misma
+    clave la anterior queda obsoleta (se cancela si no empezó y su
+    resultado se descarta si ya estaba corriendo). Sirve para que un
+    cambio de filtro a mitad de carga no pinte datos viejos.
+    """
+
+    def __init__(self, widget, max_hilos: int = 4, intervalo_ms: int = 25):
+        """
+        Args:
+            widget: Cualquier widget de Tk (se usa para agendar con after)
+            max_hilos: Hilos del pool (no más que el máximo del pool de conexiones)
+            intervalo_ms: Cada cuánto se revisan los resultados terminados
+        """
+        self._widget = widget
+        self._intervalo_ms = intervalo_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="db")
+        self._terminados = queue.SimpleQueue()
+        self._vigentes: Dict[Hashable, Future] = {}
+        self._cerrado = False
+        self._job = self._widget.after(self._intervalo_ms, self._despachar)
+
+    def enviar(self, funcion: Callable, *args,
+               al_terminar: Optional[Callable] = None,
+               al_fallar: Optional[Callable] = None,
+               clave: Optional[Hashable] = None, **kwargs) -> Future:
+        """
+        Ejecuta funcion(*args, **kwargs) en segundo plano
+
+        Args:
+            al_terminar: al_terminar(resultado), llamado en el hilo de Tk
+            al_fallar: al_fallar(excepcion), llamado en el hilo de Tk
+                (si no se indica, el error se registra en el log)
+            clave: Identifica la petición; una nueva con la misma clave
+                deja obsoleta la anterior
+
+        Returns:
+            Future de la tarea
+        """
+        if clave is not None:
+            self.cancelar(clave)
+
+        futuro = self._pool.submit(funcion, *args, **kwargs)
+        if clave is not None:
+            self._vigentes[clave] = futuro
+
+        # El callback del Future corre en el hilo del pool: solo encolar
+        futuro.add_done_callback(
+            lambda f: self._terminados.put((f, clave, al_terminar, al_fallar))
+        )
+        return futuro
+
+    def cancelar(self, clave: Hashable):
+        """Deja obsoleta la petición pendiente con esa clave (si la hay)"""
+        anterior = self._vigentes.pop(clave, None)
+        if anterior is not None:
+            anterior.cancel()
+
+    def ocupado(self, clave: Hashable) -> bool:
+        """True si hay una petición vigente con esa clave sin entregar"""
+        return clave in self._vigentes
+
+    def _despachar(self):
+        """Entrega en el hilo de Tk los resultados terminados"""
+        while True:
+            try:
+                futuro, clave, al_terminar, al_fallar = self._terminados.get_nowait()
+            except queue.Empty:
+                break
+
+            if clave is not None:
+                if self._vigentes.get(clave) is not futuro:
+                    continue  # Obsoleta: hubo otra petición con la misma clave
+                del self._vigentes[clave]
+
+            try:
+                resultado = futuro.result()
+            except CancelledError:
+                continue
+            except Exception as e:
+                if al_fallar is not None:
+                    self._llamar(al_fallar, e)
+                else:
+                    logger.error("Error en tarea de BD en segundo plano:\n%s",
+                                 "".join(traceback.format_exception(type(e), e, e.__traceback__)))
+                continue
+
+            if al_terminar is not None:
+                self._llamar(al_terminar, resultado)
+
+        if not self._cerrado:
+            self._job = self._widget.after(self._intervalo_ms, self._despachar)
+
+    @staticmethod
+    def _llamar(callback, valor):
+        # Un callback con error no debe detener el despacho de los demás
+        try:
+            callback(valor)
+        except Exception:
+            logger.exception("Error en callback de tarea de BD")
+
+    def cerrar(self):
+        """Detiene el despacho y el pool (las tareas pendientes se cancelan)"""
+        self._cerrado = True
+        try:
+            self._widget.after_cancel(self._job)
+        except Exception:
+            pass
+        self._vigentes.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
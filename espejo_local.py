@@ -0,0 +1,476 @@
+"""
+Copia local del catálogo en SQLite (modo sin conexión)
+
+Mantiene en un archivo SQLite un espejo de PRODUCTO, TIPO_COMIDA,
+MENU_PRODUCTO, MENU_EXCEPCION y EXCEPCION_PRODUCTO. Un hilo lo refresca:
+al arrancar, cada vez que llega un NOTIFY de `catalogo_cambios` (solo la
+tabla notificada) y cada `intervalo` segundos como respaldo. Las tablas no
+tienen marca de modificación, así que cada refresco compara fila por fila
+contra la copia y solo escribe las filas nuevas, cambiadas o borradas.
+
+Si PostgreSQL no responde, `con_respaldo()` sirve la consulta desde la copia
+y las siguientes consultas van directo a la copia hasta que el hilo vuelva a
+sincronizar con éxito (así una caída de red no agrega esperas de conexión a
+cada pantalla). Las ventas no pasan por aquí: su bandeja de salida es el WAL
+de `ventas`, que se reintenta al recuperar la conexión (`al_reconectar`).
+
+El login sin conexión usa las credenciales de los usuarios que ya entraron
+con el servidor disponible, guardadas como hash PBKDF2 (nunca en claro).
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+import psycopg2
+from psycopg2 import pool
+
+from conexionDB import db_manager
+
+logger = logging.getLogger(__name__)
+
+RUTA_ESPEJO = os.environ.get(
+    'PARCIAL2_ESPEJO',
+    os.path.join(os.path.expanduser('~'), '.local', 'share', 'parcial2', 'espejo.sqlite3')
+)
+
+# Errores que indican que el servidor no está disponible (no errores de SQL).
+# pool.PoolError queda afuera: un pool ocupado (PoolAgotadoError) o cerrado no
+# dice nada del servidor y no debe pasar la aplicación a la copia local
+ERRORES_CONEXION = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+# Tablas espejadas: nombre -> columnas (la primera es la clave primaria)
+TABLAS = {
+    'producto': ['idProducto', 'nombre', 'precio', 'imagen', 'descripcion'],
+    'tipo_comida': ['idTipo', 'nombre'],
+    'menu_producto': ['idMenuProducto', 'idProducto', 'idTipo', 'idDiaMenu', 'activo'],
+    'menu_excepcion': ['idExcepcion', 'nombre', 'descripcion', 'fecha_inicio', 'fecha_fin',
+                       'descuento_porcentaje', 'activo'],
+    'excepcion_producto': ['idExcepcionProducto', 'idExcepcion', 'idProducto', 'precio_especial'],
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS producto (
+    idProducto TEXT PRIMARY KEY, nombre TEXT, precio REAL, imagen TEXT, descripcion TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_producto_nombre_id ON producto (nombre, idProducto);
+
+CREATE TABLE IF NOT EXISTS tipo_comida (idTipo INTEGER PRIMARY KEY, nombre TEXT);
+
+CREATE TABLE IF NOT EXISTS menu_producto (
+    idMenuProducto INTEGER PRIMARY KEY, idProducto TEXT, idTipo INTEGER,
+    idDiaMenu INTEGER, activo INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_menu_producto_dia ON menu_producto (idDiaMenu);
+CREATE INDEX IF NOT EXISTS idx_menu_producto_producto ON menu_producto (idProducto);
+
+CREATE TABLE IF NOT EXISTS menu_excepcion (
+    idExcepcion INTEGER PRIMARY KEY, nombre TEXT, descripcion TEXT, fecha_inicio TEXT,
+    fecha_fin TEXT, descuento_porcentaje REAL, activo INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS excepcion_producto (
+    idExcepcionProducto INTEGER PRIMARY KEY, idExcepcion INTEGER, idProducto TEXT,
+    precio_especial REAL
+);
+CREATE INDEX IF NOT EXISTS idx_excepcion_producto_producto ON excepcion_producto (idProducto);
+
+CREATE TABLE IF NOT EXISTS credencial (
+    usuario TEXT PRIMARY KEY, idUsuario TEXT, nombre TEXT, sal BLOB, hash BLOB
+);
+
+CREATE TABLE IF NOT EXISTS sincronizacion (tabla TEXT PRIMARY KEY, filas INTEGER, actualizado TEXT);
+"""
+
+ITERACIONES_PBKDF2 = 100_000
+
+
+def _normalizar(valor):
+    """Convierte un valor de psycopg2 al tipo con que SQLite lo devuelve"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, bool):
+        return int(valor)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+class EspejoLocal:
+    """
+    Espejo SQLite del catálogo con sincronización en segundo plano.
+
+    Args:
+        ruta: Archivo SQLite
+        intervalo: Segundos entre refrescos completos con conexión
+        reintento: Segundos entre intentos de reconexión sin conexión
+    """
+
+    def __init__(self, ruta: Optional[str] = None, intervalo: float = 600, reintento: float = 15):
+        self.ruta = ruta or RUTA_ESPEJO
+        self.intervalo = intervalo
+        self.reintento = reintento
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pendientes = set(TABLAS)
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._conectado: Optional[bool] = None  # None = aún no se sabe
+        self._completo = False
+        self._al_reconectar: List[Callable[[], None]] = []
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def iniciar(self):
+        """Abre la copia local y arranca la sincronización (idempotente)"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._abrir()
+        self._detener.clear()
+        self._despertar.set()
+        self._hilo = threading.Thread(target=self._procesar, name="espejo-local", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=1)
+
+    def _abrir(self):
+        with self._lock:
+            if self._conexion is not None:
+                return
+            os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+            conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.executescript(ESQUEMA)
+            sincronizadas = conexion.execute("SELECT COUNT(*) FROM sincronizacion").fetchone()[0]
+            self._completo = sincronizadas == len(TABLAS)
+            self._conexion = conexion
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+
+    @property
+    def conectado(self) -> Optional[bool]:
+        """True/False según el último intento con el servidor; None si aún no hubo"""
+        return self._conectado
+
+    @property
+    def tiene_datos(self) -> bool:
+        """Si todas las tablas se sincronizaron al menos una vez"""
+        return self._completo
+
+    def al_reconectar(self, callback: Callable[[], None]):
+        """Registra una función a llamar (desde el hilo) al recuperar la conexión"""
+        self._al_reconectar.append(callback)
+
+    def marcar(self, tabla: Optional[str] = None):
+        """
+        Pide refrescar una tabla (None = todas). Sirve de oyente de NOTIFY:
+        None significa que la escucha se (re)conectó y pudo perder avisos.
+        """
+        if tabla is None:
+            pendientes = set(TABLAS)
+        elif tabla.lower() in TABLAS:
+            pendientes = {tabla.lower()}
+        else:
+            return
+        with self._lock:
+            self._pendientes |= pendientes
+        self._despertar.set()
+
+    def con_respaldo(self, remota: Callable, local: Callable):
+        """
+        Ejecuta `remota()` contra PostgreSQL; si el servidor no está
+        disponible y la copia está completa, retorna `local()`.
+        """
+        if self._conectado is False and self._completo:
+            return local()
+        try:
+            return remota()
+        except ERRORES_CONEXION as e:
+            if not self._completo:
+                raise
+            self._perder_conexion(e)
+            return local()
+
+    def _perder_conexion(self, error):
+        if self._conectado is not False:
+            logger.warning(f"Sin conexión con PostgreSQL, usando la copia local: {error}")
+        self._conectado = False
+
+    # ------------------------------------------------------------------
+    # Sincronización
+    # ------------------------------------------------------------------
+
+    def _procesar(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo if self._conectado is not False else self.reintento)
+            self._despertar.clear()
+            if self._detener.is_set():
+                return
+
+            with self._lock:
+                # Sin avisos pendientes (venció el intervalo): refresco completo
+                tablas, self._pendientes = self._pendientes or set(TABLAS), set()
+            try:
+                while tablas:
+                    tabla = next(iter(tablas))
+                    self.sincronizar_tabla(tabla)
+                    tablas.discard(tabla)
+            except ERRORES_CONEXION as e:
+                with self._lock:
+                    self._pendientes |= tablas
+                self._perder_conexion(e)
+                continue
+            except pool.PoolError as e:
+                # Pool ocupado: se reintenta en la próxima vuelta sin perder la conexión
+                with self._lock:
+                    self._pendientes |= tablas
+                logger.warning(f"Sincronización de la copia local postergada: {e}")
+                continue
+            except Exception as e:
+                logger.error(f"Error al sincronizar la copia local: {e}")
+                continue
+
+            reconectado = self._conectado is False
+            self._conectado = True
+            if reconectado:
+                logger.info("Conexión con PostgreSQL recuperada")
+                for callback in self._al_reconectar:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.error(f"Error en callback de reconexión: {e}")
+
+    def sincronizar_tabla(self, tabla: str) -> Tuple[int, int]:
+        """
+        Trae la tabla del servidor y aplica solo las diferencias
+
+        Returns:
+            (filas nuevas o cambiadas, filas borradas)
+        """
+        columnas = TABLAS[tabla]
+        lista = ', '.join(columnas)
+        filas = db_manager.ejecutar_query(f"SELECT {lista} FROM {tabla.upper()}",
+                                          fetch=True, solo_lectura=True)
+        remotas = {}
+        for fila in filas or []:
+            fila = tuple(_normalizar(valor) for valor in fila)
+            remotas[fila[0]] = fila
+
+        with self._lock:
+            locales = {fila[0]: fila for fila in self._conexion.execute(f"SELECT {lista} FROM {tabla}")}
+            cambios = [fila for clave, fila in remotas.items() if locales.get(clave) != fila]
+            borrados = [(clave,) for clave in locales.keys() - remotas.keys()]
+
+            with self._conexion:
+                if cambios:
+                    self._conexion.executemany(
+                        f"INSERT OR REPLACE INTO {tabla} ({lista}) VALUES ({', '.join('?' * len(columnas))})",
+                        cambios)
+                if borrados:
+                    self._conexion.executemany(f"DELETE FROM {tabla} WHERE {columnas[0]} = ?", borrados)
+                self._conexion.execute(
+                    "INSERT OR REPLACE INTO sincronizacion (tabla, filas, actualizado) VALUES (?, ?, ?)",
+                    (tabla, len(remotas), datetime.now().isoformat(timespec='seconds')))
+            if not self._completo:
+                sincronizadas = self._conexion.execute("SELECT COUNT(*) FROM sincronizacion").fetchone()[0]
+                self._completo = sincronizadas == len(TABLAS)
+
+        if cambios or borrados:
+            logger.info(f"Copia local: {tabla} +{len(cambios)} -{len(borrados)}")
+        return len(cambios), len(borrados)
+
+    # ------------------------------------------------------------------
+    # Consultas locales (mismas columnas que las consultas de Menu)
+    # ------------------------------------------------------------------
+
+    def _consultar(self, query: str, params: tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conexion.execute(query, params).fetchall()
+
+    def productos(self) -> List[Tuple]:
+        """(idProducto, nombre, precio, imagen, descripcion) ordenados por nombre"""
+        return self._consultar("""
+            SELECT idProducto, nombre, precio, imagen, descripcion
+            FROM producto ORDER BY nombre, idProducto
+        """)
+
+    def pagina_productos(self, despues_de: Optional[tuple], limite: int) -> List[Tuple]:
+        if despues_de is None:
+            return self._consultar("""
+                SELECT idProducto, nombre, precio, imagen, descripcion
+                FROM producto ORDER BY nombre, idProducto LIMIT ?
+            """, (limite,))
+        return self._consultar("""
+            SELECT idProducto, nombre, precio, imagen, descripcion
+            FROM producto WHERE (nombre, idProducto) > (?, ?)
+            ORDER BY nombre, idProducto LIMIT ?
+        """, (despues_de[0], despues_de[1], limite))
+
+    def buscar_productos(self, patron: str, tipo: Optional[str], limite: int) -> List[Tuple]:
+        """Como Menu.buscar_productos; `patron` es el LIKE ya armado (escape con \\)"""
+        return self._consultar("""
+            SELECT idProducto, nombre, precio, imagen, descripcion
+            FROM producto p
+            WHERE nombre LIKE ? ESCAPE '\\'
+              AND (? IS NULL OR EXISTS (
+                  SELECT 1 FROM menu_producto mp JOIN tipo_comida tc ON mp.idTipo = tc.idTipo
+                  WHERE mp.idProducto = p.idProducto AND tc.nombre = ?))
+            ORDER BY nombre, idProducto LIMIT ?
+        """, (patron, tipo, tipo, limite))
+
+    def contar_productos(self) -> Tuple:
+        return self._consultar("SELECT COUNT(*) FROM producto")[0]
+
+    def indice_tipos(self) -> List[Tuple]:
+        """(idProducto, tipo) con el tipo de menor idTipo de cada producto"""
+        # En SQLite las columnas sueltas con MIN() salen de la fila del mínimo
+        return [(id_producto, tipo) for id_producto, tipo, _ in self._consultar("""
+            SELECT mp.idProducto, tc.nombre, MIN(tc.idTipo)
+            FROM menu_producto mp JOIN tipo_comida tc ON mp.idTipo = tc.idTipo
+            GROUP BY mp.idProducto
+        """)]
+
+    def productos_en_menu_dia(self, dia_id: int) -> List[Tuple]:
+        return self._consultar("""
+            SELECT p.idProducto, p.nombre, p.precio, tc.nombre
+            FROM menu_producto mp
+            JOIN producto p ON mp.idProducto = p.idProducto
+            JOIN tipo_comida tc ON mp.idTipo = tc.idTipo
+            WHERE mp.idDiaMenu = ? AND mp.activo = 1
+            ORDER BY tc.idTipo, p.nombre
+        """, (dia_id,))
+
+    def menu_del_dia(self, dia_semana: int, tipo_comida: Optional[str]) -> List[Tuple]:
+        query = """
+            SELECT DISTINCT p.idProducto, p.nombre, p.precio, p.descripcion, tc.nombre, tc.idTipo
+            FROM producto p
+            JOIN menu_producto mp ON p.idProducto = mp.idProducto
+            JOIN tipo_comida tc ON mp.idTipo = tc.idTipo
+            WHERE mp.idDiaMenu = ? AND mp.activo = 1
+        """
+        params = [dia_semana]
+        if tipo_comida is not None:
+            query += " AND tc.nombre = ?"
+            params.append(tipo_comida)
+        return self._consultar(query + " ORDER BY tc.idTipo, p.nombre", tuple(params))
+
+    def tipos_comida(self) -> List[Tuple]:
+        return self._consultar("SELECT nombre FROM tipo_comida ORDER BY idTipo")
+
+    def excepciones_activas(self, fecha: str) -> List[Tuple]:
+        return self._consultar("""
+            SELECT idExcepcion, nombre, descripcion, descuento_porcentaje
+            FROM menu_excepcion
+            WHERE activo = 1 AND fecha_inicio <= ? AND fecha_fin >= ?
+            ORDER BY descuento_porcentaje DESC
+        """, (fecha, fecha))
+
+    # Equivalente local de PRECIO_EFECTIVO para una fecha: la promoción que
+    # deja el precio final más bajo de cada producto y ese precio (mismas
+    # reglas que refrescar_precio_efectivo en DB.sql)
+    _PRECIO_EFECTIVO = """
+        WITH candidata AS (
+            SELECT ep.idProducto, me.idExcepcion, me.descuento_porcentaje, me.nombre,
+                   COALESCE(ep.precio_especial,
+                            ROUND(p.precio * (100 - COALESCE(me.descuento_porcentaje, 0)) / 100, 2))
+                       AS precio_final
+            FROM excepcion_producto ep
+            JOIN menu_excepcion me ON ep.idExcepcion = me.idExcepcion
+            JOIN producto p ON p.idProducto = ep.idProducto
+            WHERE me.activo = 1 AND me.fecha_inicio <= ? AND me.fecha_fin >= ?
+        ), promo AS (
+            SELECT candidata.*,
+                   ROW_NUMBER() OVER (PARTITION BY idProducto
+                                      ORDER BY precio_final, idExcepcion) AS orden
+            FROM candidata
+        )
+    """
+
+    def productos_con_descuento(self, id_excepcion: Optional[int], fecha: str) -> List[Tuple]:
+        # Con id_excepcion, todos los productos de esa promoción (no solo
+        # aquellos en los que gana), igual que Menu.obtener_productos_con_descuento
+        condicion = "promo.idExcepcion = ?" if id_excepcion else "promo.orden = 1"
+        query = self._PRECIO_EFECTIVO + f"""
+            SELECT p.idProducto, p.nombre, p.precio,
+                   promo.precio_final, promo.descuento_porcentaje, promo.nombre,
+                   COALESCE(NULLIF(tc.nombre, ''), 'General')
+            FROM promo
+            JOIN producto p ON p.idProducto = promo.idProducto
+            LEFT JOIN menu_producto mp ON p.idProducto = mp.idProducto
+            LEFT JOIN tipo_comida tc ON mp.idTipo = tc.idTipo
+            WHERE {condicion}
+            GROUP BY p.idProducto, p.nombre, p.precio, promo.precio_final,
+                     promo.descuento_porcentaje, promo.nombre, tc.nombre
+        """
+        params = (fecha, fecha)
+        if id_excepcion:
+            query += " ORDER BY p.nombre"
+            params += (id_excepcion,)
+        else:
+            query += " ORDER BY promo.descuento_porcentaje DESC, p.nombre"
+        return self._consultar(query, params)
+
+    def precios_productos(self, ids_productos: List[str], fecha: str) -> List[Tuple]:
+        """(idProducto, precio, precio_final o None, descuento, promocion, tipo)"""
+        return self._consultar(self._PRECIO_EFECTIVO + """
+            SELECT p.idProducto, p.precio, promo.precio_final,
+                   promo.descuento_porcentaje, promo.nombre,
+                   (SELECT tc.nombre
+                    FROM menu_producto mp JOIN tipo_comida tc ON mp.idTipo = tc.idTipo
+                    WHERE mp.idProducto = p.idProducto
+                    ORDER BY tc.idTipo LIMIT 1)
+            FROM producto p
+            LEFT JOIN promo ON promo.idProducto = p.idProducto AND promo.orden = 1
+            WHERE p.idProducto IN (SELECT value FROM json_each(?))
+        """, (fecha, fecha, json.dumps(list(ids_productos))))
+
+    # ------------------------------------------------------------------
+    # Credenciales para login sin conexión
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _hash(contrasena: str, sal: bytes) -> bytes:
+        return hashlib.pbkdf2_hmac('sha256', contrasena.encode('utf-8'), sal, ITERACIONES_PBKDF2)
+
+    def guardar_credencial(self, usuario: str, contrasena: str, datos: Dict):
+        """Recuerda un login válido para poder verificarlo sin conexión"""
+        if self._conexion is None:
+            return
+        sal = os.urandom(16)
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO credencial (usuario, idUsuario, nombre, sal, hash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (usuario, datos['id'], datos['nombre'], sal, self._hash(contrasena, sal)))
+
+    def verificar_credencial(self, usuario: str, contrasena: str) -> Optional[Dict]:
+        """Mismo formato que Menu.verificar_login; None si no coincide o no se conoce"""
+        if self._conexion is None:
+            return None
+        filas = self._consultar("SELECT idUsuario, nombre, sal, hash FROM credencial WHERE usuario = ?",
+                                (usuario,))
+        if not filas:
+            return None
+        id_usuario, nombre, sal, esperado = filas[0]
+        if not hmac.compare_digest(self._hash(contrasena, sal), esperado):
+            return None
+        return {"id": id_usuario, "usuario": usuario, "nombre": nombre}
+
+
+# Copia local compartida por toda la aplicación
+espejo_local = EspejoLocal()
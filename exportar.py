@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+exportar.py - Exportaciones CSV del catálogo y de las ventas
+Leen con un cursor del servidor: la memoria no depende del tamaño de la base
+
+Uso:
+    python3 exportar.py productos [archivo.csv]
+    python3 exportar.py ventas DESDE HASTA [archivo.csv]
+
+    productos  Catálogo completo (Menu.exportar_productos_csv)
+    ventas     Líneas vendidas entre dos fechas YYYY-MM-DD, ambas incluidas
+               (ventas.exportar_ventas_csv)
+
+Sin archivo (o con '-') el CSV sale por la salida estándar.
+"""
+
+from datetime import date
+import sys
+
+import psycopg2
+
+from modelo_restaurante import exportar_productos_csv
+from ventas import exportar_ventas_csv
+
+
+def _abrir(ruta):
+    if ruta in (None, '-'):
+        sys.stdout.reconfigure(newline='')
+        return sys.stdout, False
+    return open(ruta, 'w', encoding='utf-8', newline=''), True
+
+
+def exportar(argumentos) -> int:
+    """
+    Ejecuta la exportación pedida en `argumentos` (sys.argv sin el programa)
+
+    Returns:
+        Código de salida: 0 si se exportó, 2 si los argumentos no son válidos
+    """
+    if argumentos[:1] == ['productos'] and len(argumentos) <= 2:
+        archivo, propio = _abrir(argumentos[1] if len(argumentos) > 1 else None)
+        try:
+            total = exportar_productos_csv(archivo)
+        finally:
+            if propio:
+                archivo.close()
+        print(f"✓ {total} productos exportados", file=sys.stderr)
+        return 0
+
+    if argumentos[:1] == ['ventas'] and 3 <= len(argumentos) <= 4:
+        try:
+            desde, hasta = (date.fromisoformat(fecha).isoformat() for fecha in argumentos[1:3])
+        except ValueError:
+            print("✗ Las fechas deben tener el formato YYYY-MM-DD", file=sys.stderr)
+            return 2
+        archivo, propio = _abrir(argumentos[3] if len(argumentos) > 3 else None)
+        try:
+            total = exportar_ventas_csv(archivo, desde, hasta)
+        finally:
+            if propio:
+                archivo.close()
+        print(f"✓ {total} líneas de venta exportadas ({desde} a {hasta})", file=sys.stderr)
+        return 0
+
+    print(__doc__, file=sys.stderr)
+    return 2
+
+
+def main():
+    try:
+        sys.exit(exportar(sys.argv[1:]))
+    except (OSError, psycopg2.Error) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
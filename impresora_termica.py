@@ -0,0 +1,125 @@
+"""
+Impresión directa en ticketeras térmicas (ESC/POS)
+
+Los tickets se codifican como flujo ESC/POS (ver plantilla_factura) y se
+envían sin pasar por los filtros de texto de CUPS: con `lp -o raw` a una
+cola de CUPS, o escribiendo los bytes directo en el dispositivo
+(ej. /dev/usb/lp0) si se configura PARCIAL2_TICKETERA.
+
+Para probar sin hardware, `DispositivoFalso` crea un archivo que hace de
+dispositivo y traduce lo recibido a texto legible:
+
+    with DispositivoFalso() as falso:
+        encolar_ticket(datos, 'Ticketera', dispositivo=falso.ruta)
+        ...
+        print(falso.texto())
+"""
+from typing import List, Optional
+import os
+import tempfile
+
+from cola_impresion import cola_impresion
+from plantilla_factura import (ESC_INICIAR, ESC_PAGINA_858, ESC_NEGRITA_ON, ESC_NEGRITA_OFF,
+                               GS_CORTE_PARCIAL, ESC_ABRIR_CAJON)
+
+# Ruta del dispositivo de la ticketera; si no se define se usa CUPS en modo raw
+DISPOSITIVO_TICKETERA = os.environ.get('PARCIAL2_TICKETERA') or None
+
+OPCIONES_RAW = ['raw']
+
+
+def encolar_ticket(datos: bytes, impresora: str, copias: int = 1,
+                   titulo: str = 'Ticket', dispositivo: Optional[str] = None) -> str:
+    """
+    Encola un ticket ESC/POS sin filtros de CUPS
+
+    Args:
+        datos: Flujo ESC/POS ya codificado
+        impresora: Cola de CUPS (se envía con `lp -o raw`)
+        dispositivo: Ruta del dispositivo; por defecto PARCIAL2_TICKETERA.
+            Si hay dispositivo, se escribe directo y no se usa CUPS
+
+    Returns:
+        Id del trabajo en la cola de impresión
+    """
+    dispositivo = dispositivo or DISPOSITIVO_TICKETERA
+    return cola_impresion.encolar(datos, dispositivo or impresora, copias=copias,
+                                  opciones=OPCIONES_RAW, titulo=titulo,
+                                  dispositivo=dispositivo)
+
+
+# Comandos reconocidos por decodificar_escpos, del más largo al más corto
+_COMANDOS = (
+    (ESC_ABRIR_CAJON, '[CAJÓN]\n'),
+    (GS_CORTE_PARCIAL, '[CORTE]\n'),
+    (ESC_NEGRITA_ON, '[N]'),
+    (ESC_NEGRITA_OFF, '[/N]'),
+    (ESC_PAGINA_858, ''),
+    (ESC_INICIAR, '[INICIO]\n'),
+)
+
+
+def decodificar_escpos(datos: bytes) -> str:
+    """
+    Traduce un flujo ESC/POS a texto legible (para pruebas y vista previa)
+
+    El texto va en PC858; los comandos conocidos se muestran como marcas
+    ([N]...[/N] negrita, [CORTE], [CAJÓN]) y los desconocidos en hexadecimal.
+    """
+    partes: List[str] = []
+    texto = bytearray()
+    i = 0
+    while i < len(datos):
+        byte = datos[i]
+        if byte in (0x1b, 0x1d):
+            for comando, marca in _COMANDOS:
+                if datos.startswith(comando, i):
+                    break
+            else:
+                comando, marca = datos[i:i + 2], f'[{datos[i:i + 2].hex()}]'
+            if texto:
+                partes.append(texto.decode('cp858', 'replace'))
+                texto = bytearray()
+            partes.append(marca)
+            i += len(comando)
+        else:
+            texto.append(byte)
+            i += 1
+    if texto:
+        partes.append(texto.decode('cp858', 'replace'))
+    return "".join(partes)
+
+
+class DispositivoFalso:
+    """
+    Archivo temporal que hace de ticketera para probar sin hardware.
+
+    Se usa como `dispositivo` de encolar_ticket (o PARCIAL2_TICKETERA); lo
+    escrito queda disponible con `datos()` y `texto()`.
+    """
+
+    def __init__(self, directorio: Optional[str] = None):
+        descriptor, self.ruta = tempfile.mkstemp(prefix='ticketera-', suffix='.escpos', dir=directorio)
+        os.close(descriptor)
+
+    def datos(self) -> bytes:
+        with open(self.ruta, 'rb') as f:
+            return f.read()
+
+    def texto(self) -> str:
+        return decodificar_escpos(self.datos())
+
+    def limpiar(self):
+        open(self.ruta, 'wb').close()
+
+    def cerrar(self):
+        try:
+            os.unlink(self.ruta)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
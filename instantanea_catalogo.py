@@ -0,0 +1,140 @@
+"""
+Instantánea del catálogo en disco para arrancar sin esperar a la BD
+
+Formato binario compacto y versionado, pensado para leerse con mmap:
+
+    encabezado  <4sHHIId   'P2CT', formato, reservado, registros, crc32 del cuerpo, generada (epoch)
+    entradas    <dIHIHIHIH precio + (desplazamiento, largo) de id, nombre, categoría y descripción
+    textos      UTF-8 concatenados (los desplazamientos son relativos a este bloque)
+
+Las entradas tienen tamaño fijo, así el registro i se lee sin recorrer los
+anteriores. El crc32 del cuerpo detecta archivos cortados o dañados y sirve
+además de firma: si el catálogo de la BD produce la misma firma, no cambió.
+"""
+from typing import Iterable, Iterator, Optional, Tuple
+import mmap
+import os
+import struct
+import time
+import zlib
+
+RUTA_INSTANTANEA = os.environ.get(
+    'PARCIAL2_INSTANTANEA',
+    os.path.join(os.path.expanduser('~'), '.local', 'share', 'parcial2', 'catalogo.snap')
+)
+
+MAGIA = b'P2CT'
+FORMATO = 1
+ENCABEZADO = struct.Struct('<4sHHIId')
+ENTRADA = struct.Struct('<dIHIHIHIH')
+
+# (id, nombre, precio, categoria, descripcion)
+Registro = Tuple[str, str, float, str, str]
+
+
+def serializar(registros: Iterable[Registro], generada: float = None) -> bytes:
+    """Arma el contenido completo de una instantánea"""
+    entradas = []
+    textos = bytearray()
+    for id_producto, nombre, precio, categoria, descripcion in registros:
+        campos = []
+        for texto in (id_producto, nombre, categoria, descripcion or ''):
+            datos = texto.encode('utf-8')
+            if len(datos) > 0xFFFF:
+                raise ValueError(f"Texto demasiado largo para la instantánea: {texto[:30]}...")
+            campos += (len(textos), len(datos))
+            textos += datos
+        entradas.append(ENTRADA.pack(float(precio), *campos))
+
+    cuerpo = b"".join(entradas) + bytes(textos)
+    encabezado = ENCABEZADO.pack(MAGIA, FORMATO, 0, len(entradas), zlib.crc32(cuerpo),
+                                 time.time() if generada is None else generada)
+    return encabezado + cuerpo
+
+
+def firma(registros: Iterable[Registro]) -> int:
+    """Firma (crc32 del cuerpo) que tendría la instantánea de estos registros"""
+    return ENCABEZADO.unpack_from(serializar(registros, 0.0))[4]
+
+
+def escribir_instantanea(registros: Iterable[Registro], ruta: Optional[str] = None) -> int:
+    """
+    Guarda la instantánea de forma atómica (nunca queda a medio escribir)
+
+    Returns:
+        Firma de la instantánea escrita
+    """
+    ruta = ruta or RUTA_INSTANTANEA
+    datos = serializar(registros)
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+    return ENCABEZADO.unpack_from(datos)[4]
+
+
+class InstantaneaCatalogo:
+    """
+    Lectura de una instantánea mapeada en memoria.
+
+    Se comporta como una secuencia de registros (id, nombre, precio,
+    categoria, descripcion) que se decodifican al accederlos.
+    """
+
+    def __init__(self, mapa: mmap.mmap, registros: int, firma: int, generada: float):
+        self._mapa = mapa
+        self._registros = registros
+        self._textos = ENCABEZADO.size + registros * ENTRADA.size
+        self.firma = firma
+        self.generada = generada
+
+    @classmethod
+    def abrir(cls, ruta: Optional[str] = None) -> Optional['InstantaneaCatalogo']:
+        """
+        Abre y valida la instantánea
+
+        Returns:
+            None si no existe, es de otro formato o está dañada
+        """
+        ruta = ruta or RUTA_INSTANTANEA
+        try:
+            with open(ruta, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < ENCABEZADO.size:
+                    return None
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        magia, formato, _, registros, crc, generada = ENCABEZADO.unpack_from(mapa)
+        if (magia != MAGIA or formato != FORMATO
+                or len(mapa) < ENCABEZADO.size + registros * ENTRADA.size
+                or zlib.crc32(memoryview(mapa)[ENCABEZADO.size:]) != crc):
+            mapa.close()
+            return None
+        return cls(mapa, registros, crc, generada)
+
+    def __len__(self) -> int:
+        return self._registros
+
+    def __getitem__(self, indice: int) -> Registro:
+        if not 0 <= indice < self._registros:
+            raise IndexError(indice)
+        (precio, id_ini, id_largo, nombre_ini, nombre_largo, cat_ini, cat_largo,
+         desc_ini, desc_largo) = ENTRADA.unpack_from(self._mapa, ENCABEZADO.size + indice * ENTRADA.size)
+        base = self._textos
+        return (
+            self._mapa[base + id_ini:base + id_ini + id_largo].decode('utf-8'),
+            self._mapa[base + nombre_ini:base + nombre_ini + nombre_largo].decode('utf-8'),
+            precio,
+            self._mapa[base + cat_ini:base + cat_ini + cat_largo].decode('utf-8'),
+            self._mapa[base + desc_ini:base + desc_ini + desc_largo].decode('utf-8'),
+        )
+
+    def __iter__(self) -> Iterator[Registro]:
+        return (self[indice] for indice in range(self._registros))
+
+    def cerrar(self):
+        self._mapa.close()
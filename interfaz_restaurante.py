@@ -1,15 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import subprocess
-import tempfile
 import datetime
 import os
 import json
 from modelo_restaurante import MenuItem, PedidoRestaurante, Menu
-from dialogo_impresion import DialogoImpresion
+from ejecutor_db import EjecutorDB
+from servicio_impresion import registro_impresoras
+from cola_impresion import cola_impresion
+from ventas import registro_ventas, nueva_venta
+from espejo_local import espejo_local
+from plantilla_factura import PLANTILLA_TICKET
 from dialogo_login import DialogoLogin
-from conexionDB import db_manager
+import arranque
 class InterfazRestaurante:
+    LIMITE_SELECTOR = 50  # Productos por búsqueda en el selector del menú del día
+    
     def __init__(self):
         self.ventana = tk.Tk()
         self.ventana.title("POS RESTAURANT Premium")
@@ -27,17 +32,35 @@ class InterfazRestaurante:
         }
         
         self.ventana.configure(bg=self.COLORES['fondo_principal'])
+        arranque.marcar("ventana Tk")
         
-        # Datos
+        # Datos (el catálogo sale de la instantánea en disco y se revalida en segundo plano)
         self.menu = Menu()
         self.pedido = PedidoRestaurante()
+        arranque.marcar("catálogo cargado")
+        
+        # Todas las consultas de la interfaz corren en segundo plano
+        self.ejecutor = EjecutorDB(self.ventana)
+        
+        # Descubrir impresoras CUPS en segundo plano desde el arranque
+        registro_impresoras.iniciar()
+        # Reanudar trabajos de impresión que quedaron pendientes en el spool
+        cola_impresion.iniciar()
+        # Ventas: reenviar las que no llegaron a la BD y arrancar el escritor
+        registro_ventas.iniciar()
+        # Al volver el servidor, enviar las ventas hechas sin conexión sin esperar el reintento
+        espejo_local.al_reconectar(registro_ventas.reintentar_ahora)
+        arranque.marcar("servicios iniciados")
         
         # Variables
         self.descuento_var = tk.StringVar(value="0")
         self.metodo_pago_var = tk.StringVar(value="Efectivo")
         
         # Mostrar login primero usando módulo separado
-        DialogoLogin(self.ventana, self.COLORES, self._login_exitoso)
+        DialogoLogin(self.ventana, self.COLORES, self._login_exitoso,
+                     menu=self.menu, ejecutor=self.ejecutor)
+        arranque.marcar("login construido")
+        arranque.medir_primer_cuadro(self.ventana)
     
     def _login_exitoso(self):
         """Callback cuando el login es exitoso"""
@@ -50,6 +73,9 @@ class InterfazRestaurante:
         self.ventana.title("POS RESTAURANT Premium")
         self._crear_notebook()
         
+        if self.menu.aviso_catalogo:
+            messagebox.showwarning("Catálogo vacío", self.menu.aviso_catalogo)
+        
 
     
     def _crear_notebook(self):
@@ -79,6 +105,8 @@ class InterfazRestaurante:
                        darkcolor=self.COLORES['fondo_card'],
                        lightcolor=self.COLORES['fondo_card'])
         
+        self._crear_barra_estado()
+        
         notebook = ttk.Notebook(self.ventana)
         notebook.pack(fill=tk.BOTH, expand=True, padx=0, pady=0)
         
@@ -97,8 +125,80 @@ class InterfazRestaurante:
         notebook.add(frame_productos, text="⚙️ Productos")
         self._crear_tab_productos(frame_productos)
     
+    def _crear_barra_estado(self):
+        """Barra inferior con el estado de la cola de impresión"""
+        barra = tk.Frame(self.ventana, bg=self.COLORES['fondo_card'])
+        barra.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        self.cola_estado_label = tk.Label(barra, text="🖨️ Cola de impresión vacía",
+                                          font=('Inter', 9), cursor='hand2',
+                                          fg=self.COLORES['texto_secundario'],
+                                          bg=self.COLORES['fondo_card'])
+        self.cola_estado_label.pack(side=tk.RIGHT, padx=15, pady=4)
+        self.cola_estado_label.bind("<Button-1>", lambda e: self._abrir_cola_impresion())
+        
+        self.conexion_estado_label = tk.Label(barra, text="", font=('Inter', 9),
+                                              fg=self.COLORES['texto_secundario'],
+                                              bg=self.COLORES['fondo_card'])
+        self.conexion_estado_label.pack(side=tk.LEFT, padx=15, pady=4)
+        
+        # Ventas que la BD no aceptó: no llegan al libro hasta resolverlas
+        self.rechazadas_label = tk.Label(barra, text="", font=('Inter', 9, 'bold'), cursor='hand2',
+                                         fg=self.COLORES['rojo_danger'],
+                                         bg=self.COLORES['fondo_card'])
+        self.rechazadas_label.pack(side=tk.LEFT, padx=15, pady=4)
+        self.rechazadas_label.bind("<Button-1>", lambda e: self._abrir_ventas_rechazadas())
+        
+        self._cola_version = None
+        self._actualizar_estado_cola()
+        self._actualizar_estado_conexion()
+    
+    def _actualizar_estado_cola(self):
+        """Sondear la cola de impresión (el envío ocurre en otro hilo)"""
+        if cola_impresion.version != self._cola_version:
+            self._cola_version = cola_impresion.version
+            resumen = cola_impresion.resumen()
+            if resumen['error']:
+                texto, color = f"🖨️ {resumen['error']} trabajo(s) con error", self.COLORES['rojo_danger']
+            elif resumen['pendiente']:
+                texto, color = f"🖨️ Imprimiendo... {resumen['pendiente']} en cola", self.COLORES['acento_dorado']
+            else:
+                texto, color = "🖨️ Cola de impresión al día", self.COLORES['texto_secundario']
+            self.cola_estado_label.config(text=texto, fg=color)
+        self.ventana.after(1000, self._actualizar_estado_cola)
+    
+    def _actualizar_estado_conexion(self):
+        """Indicar el modo sin conexión, las ventas por sincronizar y las rechazadas"""
+        pendientes = registro_ventas.pendientes
+        if espejo_local.conectado is False:
+            texto = "⚠ Sin conexión: usando copia local"
+            if pendientes:
+                texto += f" · {pendientes} venta(s) por sincronizar"
+            color = self.COLORES['rojo_danger']
+        elif pendientes:
+            texto, color = f"💾 Sincronizando {pendientes} venta(s)...", self.COLORES['acento_dorado']
+        else:
+            texto, color = "", self.COLORES['texto_secundario']
+        self.conexion_estado_label.config(text=texto, fg=color)
+        
+        rechazadas = len(registro_ventas.ventas_rechazadas())
+        self.rechazadas_label.config(
+            text=f"⚠ {rechazadas} venta(s) rechazada(s) por la BD" if rechazadas else "")
+        self.ventana.after(2000, self._actualizar_estado_conexion)
+    
+    def _abrir_ventas_rechazadas(self):
+        from dialogo_ventas import DialogoVentasRechazadas
+        DialogoVentasRechazadas(self.ventana, self.COLORES)
+    
+    def _abrir_cola_impresion(self):
+        # Los diálogos de impresión se importan al usarlos (arrastran pdf_factura)
+        from dialogo_impresion import DialogoColaImpresion
+        DialogoColaImpresion(self.ventana, self.COLORES)
+    
     def _crear_tab_menu(self, parent):
         """Pestaña con menú de items"""
+        # visor_productos se importa recién después del login
+        from visor_productos import VisorProductosOptimizado
         # Panel superior con filtros - diseño mejorado
         header_frame = tk.Frame(parent, bg=self.COLORES['fondo_card'], height=80)
         header_frame.pack(fill=tk.X, padx=15, pady=12)
@@ -115,13 +215,13 @@ class InterfazRestaurante:
                 font=('Inter', 11, 'bold')).pack(side=tk.LEFT, padx=(0, 10))
         
         self.tipo_comida_var = tk.StringVar(value="Todos")
-        tipos_comida = ["Todos"] + self.menu.obtener_tipos_comida()
         
         combo_tipo = ttk.Combobox(inner_frame, textvariable=self.tipo_comida_var, 
-                                 values=tipos_comida, state="readonly", width=18,
+                                 values=["Todos"], state="readonly", width=18,
                                  font=('Inter', 10))
         combo_tipo.pack(side=tk.LEFT, padx=5)
         combo_tipo.bind("<<ComboboxSelected>>", lambda e: self._actualizar_grid_menu())
+        self._cargar_tipos_combo(combo_tipo, con_todos=True)
         
         # Separador
         tk.Frame(inner_frame, bg=self.COLORES['texto_secundario'], width=2).pack(side=tk.LEFT, fill=tk.Y, padx=15)
@@ -141,175 +241,170 @@ class InterfazRestaurante:
         combo_dia.pack(side=tk.LEFT, padx=5)
         combo_dia.bind("<<ComboboxSelected>>", lambda e: self._actualizar_grid_menu())
         
+        # Indicador de carga
+        self.menu_estado_label = tk.Label(inner_frame, text="", 
+                                         bg=self.COLORES['fondo_card'],
+                                         fg=self.COLORES['texto_secundario'], 
+                                         font=('Inter', 10))
+        self.menu_estado_label.pack(side=tk.RIGHT, padx=10)
+        
         # Panel principal con grid
         main_frame = tk.Frame(parent, bg=self.COLORES['fondo_principal'])
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Canvas con scroll
-        canvas = tk.Canvas(main_frame, bg=self.COLORES['fondo_principal'], highlightthickness=0)
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
-        
-        self.menu_frame = tk.Frame(canvas, bg=self.COLORES['fondo_principal'])
-        # Cuando el contenido cambie, actualizar scrollregion
-        self.menu_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        # Insertar frame en canvas y mantener referencia al id de ventana
-        self.menu_window_id = canvas.create_window((0, 0), window=self.menu_frame, anchor="nw")
-        # Guardar referencia al canvas para recalcular columnas dinámicas
-        self.menu_canvas = canvas
-
-        # Parámetro de ancho mínimo estimado por tarjeta (incluye paddings)
-        # Ajusta este valor si tus cards son más anchas/estrechas
+        # Grilla con scroll: columnas según el ancho y tarjetas creadas por lotes
+        # (menu_min_card_width: ancho mínimo estimado por tarjeta, incluye paddings)
         self.menu_min_card_width = 360
-
-        # Asegurar que el frame interno siempre tenga el mismo ancho que el canvas
-        # y re-calcular la grilla cuando el canvas cambie de tamaño
-        def _on_canvas_configure(event):
-            try:
-                canvas.itemconfig(self.menu_window_id, width=event.width)
-            except Exception:
-                pass
-            # Recalcular y re-layout de las tarjetas según el nuevo ancho
-            try:
-                # Llamamos a la actualización de la grilla (usa el ancho del canvas internamente)
-                self._actualizar_grid_menu()
-            except Exception:
-                pass
-
-        canvas.bind('<Configure>', _on_canvas_configure)
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.visor_menu = VisorProductosOptimizado(main_frame, self.COLORES,
+                                                   ancho_tarjeta=self.menu_min_card_width)
+        self.menu_frame = self.visor_menu.frame
         
         self._actualizar_grid_menu()
     
+    def _cargar_tipos_combo(self, combo, con_todos=False, al_cargar=None):
+        """Llena un combobox con los tipos de comida consultados en segundo plano"""
+        def llenar(tipos):
+            if not combo.winfo_exists():
+                return
+            combo.configure(values=(["Todos"] if con_todos else []) + tipos)
+            if al_cargar is not None:
+                al_cargar(tipos)
+        
+        self.ejecutor.enviar(self.menu.obtener_tipos_comida, al_terminar=llenar)
+    
+    def _crear_placeholder_carga(self, parent, texto="⏳ Cargando..."):
+        """Mensaje mientras llegan los datos de la BD"""
+        frame = tk.Frame(parent, bg=self.COLORES['fondo_principal'])
+        tk.Label(frame, text=texto, font=('Inter', 14),
+                fg=self.COLORES['texto_secundario'],
+                bg=self.COLORES['fondo_principal']).pack()
+        return frame
+    
     def _actualizar_grid_menu(self):
         """Actualizar grid de menú de forma optimizada con secciones profesionales"""
-        # Limpiar widgets previos
-        for widget in self.menu_frame.winfo_children():
-            widget.destroy()
-        
+        from visor_productos import ElementoGrilla
         tipo_comida = self.tipo_comida_var.get()
         dia_semana = self.dia_semana_var.get()
         
-        # Calcular dinámicamente el número de columnas según el ancho disponible
-        try:
-            available_width = self.menu_canvas.winfo_width() if hasattr(self, 'menu_canvas') else None
-        except Exception:
-            available_width = None
-
-        # Ancho mínimo por tarjeta (incluye paddings/margins)
-        card_min = getattr(self, 'menu_min_card_width', 360)
-
-        if available_width and available_width > 0:
-            max_columns = 6
-            columnas = max(1, min(max_columns, int(available_width // card_min)))
+        # Obtener menú del día desde la base de datos
+        if dia_semana == "Todos":
+            # Usar día actual
+            dia_id = datetime.datetime.now().isoweekday()  # 1=Lunes, 7=Domingo
         else:
-            columnas = 3
-
-        # Asegurar que las columnas se expandan uniformemente
-        for i in range(columnas):
-            try:
-                self.menu_frame.grid_columnconfigure(i, weight=1, uniform='col')
-            except Exception:
-                pass
+            dias_map = {"Lunes": 1, "Martes": 2, "Miércoles": 3, "Jueves": 4, 
+                       "Viernes": 5, "Sábado": 6, "Domingo": 7}
+            dia_id = dias_map.get(dia_semana, 1)
         
-        current_row = 0
-        items_encontrados = 0
+        # La primera vez no hay tarjetas: mostrar un placeholder en la grilla
+        if len(self.visor_menu.grilla) == 0:
+            self.visor_menu.mostrar([ElementoGrilla(('cargando',), None, self._crear_placeholder_carga,
+                                                    ancho_completo=True, pady=50)])
+        self.menu_estado_label.config(text="⏳ Cargando...")
         
-        # ============ SECCIÓN 1: PROMOCIONES ACTIVAS ============
+        def pintar(datos):
+            self.menu_estado_label.config(text="")
+            self._pintar_grid_menu(tipo_comida, dia_semana, *datos)
+        
+        def fallar(error):
+            self.menu_estado_label.config(text="❌ Sin conexión")
+            print(f"✗ Error al cargar el menú: {error}")
+        
+        # Clave fija: si el filtro cambia a mitad de carga, la petición vieja se descarta
+        self.ejecutor.enviar(self._consultar_grid_menu, tipo_comida, dia_id,
+                             al_terminar=pintar, al_fallar=fallar, clave='grid_menu')
+    
+    def _consultar_grid_menu(self, tipo_comida, dia_id):
+        """Consultas del grid del menú (corre en segundo plano: no tocar widgets)"""
         excepciones = self.menu.obtener_excepciones_activas()
         
+        productos_promocion = []
         if excepciones:
-            # Título de sección: Promociones
-            titulo_promo = tk.Frame(self.menu_frame, bg=self.COLORES['rojo_danger'], height=50)
-            titulo_promo.grid(row=current_row, column=0, columnspan=columnas, sticky='ew', pady=(10, 15), padx=10)
-            
-            tk.Label(titulo_promo, text="🎁 PROMOCIONES ESPECIALES", 
-                    font=('Inter', 14, 'bold'), fg='white',
-                    bg=self.COLORES['rojo_danger']).pack(expand=True)
-            
-            current_row += 1
-            col = 0
-            
             # Obtener productos con descuento
             productos_promocion = self.menu.obtener_productos_con_descuento()
             
+            # Cada fila ya trae el tipo del producto: se filtra sin otra consulta
+            if tipo_comida != "Todos":
+                productos_promocion = [
+                    producto for producto in productos_promocion
+                    if producto['tipo'] == tipo_comida
+                ]
+        
+        # Obtener productos del menú del día filtrados por tipo
+        if tipo_comida == "Todos":
+            productos_dia = self.menu.obtener_menu_del_dia(dia_id)
+        else:
+            productos_dia = self.menu.obtener_menu_del_dia(dia_id, tipo_comida)
+        
+        return excepciones, productos_promocion, productos_dia
+    
+    def _pintar_grid_menu(self, tipo_comida, dia_semana, excepciones, productos_promocion, productos_dia):
+        """Dibuja el grid del menú con los datos ya consultados"""
+        from visor_productos import ElementoGrilla
+        elementos = []
+        items_encontrados = 0
+        
+        # ============ SECCIÓN 1: PROMOCIONES ACTIVAS ============
+        if excepciones:
+            # Título de sección: Promociones
+            def crear_titulo_promo(parent):
+                titulo_promo = tk.Frame(parent, bg=self.COLORES['rojo_danger'], height=50)
+                tk.Label(titulo_promo, text="🎁 PROMOCIONES ESPECIALES", 
+                        font=('Inter', 14, 'bold'), fg='white',
+                        bg=self.COLORES['rojo_danger']).pack(expand=True)
+                return titulo_promo
+            
+            elementos.append(ElementoGrilla(('titulo', 'promo'), None, crear_titulo_promo,
+                                            ancho_completo=True, sticky='ew', pady=(10, 15), padx=10))
+            
+            # Productos con descuento (ya filtrados por tipo)
             for producto in productos_promocion:
-                # Aplicar filtro de tipo si está seleccionado
-                if tipo_comida != "Todos":
-                    # Obtener el tipo del producto desde la BD
-                    info_prod = self.menu.obtener_precio_producto(producto['id_producto'])
-                    if info_prod and info_prod.get('tipo') != tipo_comida:
-                        continue
-                
-                self._crear_card_promocion(self.menu_frame, producto, current_row, col)
+                elementos.append(ElementoGrilla(
+                    ('promo', producto['id_producto'], producto['promocion'], producto['tipo']),
+                    producto,  # Registro: tupla inmutable, sirve de firma tal cual
+                    lambda parent, p=producto: self._crear_card_promocion(parent, p)
+                ))
                 items_encontrados += 1
-                col += 1
-                if col >= columnas:
-                    col = 0
-                    current_row += 1
-            
-            # Si hay items en la última fila, avanzar
-            if col > 0:
-                current_row += 1
         
         # ============ SECCIÓN 2: MENÚ DEL DÍA ============
         # Título de sección: Menú del Día
-        titulo_menu = tk.Frame(self.menu_frame, bg=self.COLORES['acento_dorado'], height=50)
-        titulo_menu.grid(row=current_row, column=0, columnspan=columnas, sticky='ew', pady=(20, 15), padx=10)
-        
         dia_texto = dia_semana if dia_semana != "Todos" else datetime.datetime.now().strftime("%A").capitalize()
-        tk.Label(titulo_menu, text=f"🍽️ MENÚ DEL DÍA - {dia_texto}", 
-                font=('Inter', 14, 'bold'), fg='black',
-                bg=self.COLORES['acento_dorado']).pack(expand=True)
         
-        current_row += 1
-        col = 0
+        def crear_titulo_menu(parent):
+            titulo_menu = tk.Frame(parent, bg=self.COLORES['acento_dorado'], height=50)
+            tk.Label(titulo_menu, text=f"🍽️ MENÚ DEL DÍA - {dia_texto}", 
+                    font=('Inter', 14, 'bold'), fg='black',
+                    bg=self.COLORES['acento_dorado']).pack(expand=True)
+            return titulo_menu
         
-        # Obtener menú del día desde la base de datos
-        if dia_semana == "Todos":
-            # Usar día actual
-            dia_id = datetime.datetime.now().isoweekday()  # 1=Lunes, 7=Domingo
-        else:
-            dias_map = {"Lunes": 1, "Martes": 2, "Miércoles": 3, "Jueves": 4, 
-                       "Viernes": 5, "Sábado": 6, "Domingo": 7}
-            dia_id = dias_map.get(dia_semana, 1)
-        
-        # Obtener productos del menú del día filtrados por tipo
-        if tipo_comida == "Todos":
-            productos_dia = self.menu.obtener_menu_del_dia(dia_id)
-        else:
-            productos_dia = self.menu.obtener_menu_del_dia(dia_id, tipo_comida)
+        elementos.append(ElementoGrilla(('titulo', 'menu'), dia_texto, crear_titulo_menu,
+                                        ancho_completo=True, sticky='ew', pady=(20, 15), padx=10))
         
         # Mostrar productos del menú del día
-        if productos_dia:
-            for producto in productos_dia:
-                self._crear_card_menu_dia(self.menu_frame, producto, current_row, col)
-                items_encontrados += 1
-                col += 1
-                if col >= columnas:
-                    col = 0
-                    current_row += 1
-        
-
+        for producto in productos_dia or []:
+            elementos.append(ElementoGrilla(
+                ('dia', producto['id_producto'], producto['tipo']),
+                tuple(sorted(producto.items())),
+                lambda parent, p=producto: self._crear_card_menu_dia(parent, p)
+            ))
+            items_encontrados += 1
         
         # Si no hay items, mostrar mensaje
         if items_encontrados == 0:
-            msg_frame = tk.Frame(self.menu_frame, bg=self.COLORES['fondo_principal'])
-            msg_frame.grid(row=0, column=0, columnspan=columnas, pady=50)
-            tk.Label(msg_frame, text="❌ Sin productos en esta categoría",
-                    font=('Inter', 14), fg=self.COLORES['texto_secundario'],
-                    bg=self.COLORES['fondo_principal']).pack()
+            def crear_mensaje_vacio(parent):
+                msg_frame = tk.Frame(parent, bg=self.COLORES['fondo_principal'])
+                tk.Label(msg_frame, text="❌ Sin productos en esta categoría",
+                        font=('Inter', 14), fg=self.COLORES['texto_secundario'],
+                        bg=self.COLORES['fondo_principal']).pack()
+                return msg_frame
+            
+            elementos.append(ElementoGrilla(('vacio',), None, crear_mensaje_vacio,
+                                            ancho_completo=True, pady=50))
+        
+        self.visor_menu.mostrar(elementos)
     
-    def _crear_card_promocion(self, parent, producto, row, col):
+    def _crear_card_promocion(self, parent, producto):
         """Crear card de producto en promoción con diseño especial"""
         card = tk.Frame(parent, bg='#8B0000', relief=tk.RAISED, bd=3)  # Rojo oscuro
-        card.grid(row=row, column=col, padx=8, pady=8, sticky="nsew")
 
         # Banner de promoción
         banner = tk.Frame(card, bg=self.COLORES['rojo_danger'], height=35)
@@ -356,11 +451,11 @@ class InterfazRestaurante:
                  padx=15, pady=12,
                  command=lambda: self._agregar_producto_promocion(producto)).pack(
                      fill=tk.X, padx=20, pady=(10, 14))
+        return card
 
-    def _crear_card_menu_dia(self, parent, producto, row, col):
+    def _crear_card_menu_dia(self, parent, producto):
         """Crear card de producto del menú del día"""
         card = tk.Frame(parent, bg=self.COLORES['fondo_card'], relief=tk.RAISED, bd=2)
-        card.grid(row=row, column=col, padx=8, pady=8, sticky="nsew")
 
         # Nombre
         tk.Label(card, text=producto['nombre'], font=('Inter', 14, 'bold'),
@@ -407,6 +502,7 @@ class InterfazRestaurante:
                  fg='white', font=('Inter', 11, 'bold'), relief='flat', 
                  padx=15, pady=12,
                  command=lambda: self._agregar_producto_dia(producto)).pack(fill=tk.X, padx=20, pady=(10, 14))
+        return card
 
     def _crear_card_menu(self, parent, item, row, col):
         """Crear card de un item del menú - lado a lado"""
@@ -488,7 +584,8 @@ class InterfazRestaurante:
         self.pedido.agregar_item(
             f"{producto['nombre']} 🎁",
             float(producto['precio_especial']), 
-            1
+            1,
+            producto['id_producto']
         )
         self._actualizar_carrito()
         self._mostrar_notificacion(
@@ -497,19 +594,19 @@ class InterfazRestaurante:
 
     def _agregar_producto_dia(self, producto):
         """Agregar producto del menú del día al carrito"""
-        self.pedido.agregar_item(producto['nombre'], float(producto['precio']), 1)
+        self.pedido.agregar_item(producto['nombre'], float(producto['precio']), 1, producto['id_producto'])
         self._actualizar_carrito()
         self._mostrar_notificacion(f"✓ {producto['nombre']} agregado")
 
     def _agregar_al_carrito(self, item):
         """Agregar item al carrito"""
-        self.pedido.agregar_item(item.nombre, item.precio, 1)
+        self.pedido.agregar_item(item.nombre, item.precio, 1, item.id)
         self._actualizar_carrito()
         self._mostrar_notificacion(f"✓ {item.nombre} agregado")
     
     def _agregar_producto_custom_al_carrito(self, producto):
         """Agregar producto personalizado al carrito"""
-        self.pedido.agregar_item(producto['nombre'], float(producto['precio']), 1)
+        self.pedido.agregar_item(producto['nombre'], float(producto['precio']), 1, producto['id_producto'])
         self._actualizar_carrito()
         self._mostrar_notificacion(f"✓ {producto['nombre']} agregado")
     
@@ -793,6 +890,7 @@ class InterfazRestaurante:
                 return
             
             descuento = float(self.descuento_var.get() or 0)
+            self._registrar_venta(cliente, metodo_var.get(), descuento)
             self._mostrar_factura_final(cliente, metodo_var.get(), descuento)
             ventana.destroy()
         
@@ -804,6 +902,16 @@ class InterfazRestaurante:
                  fg='white', font=('Inter', 11, 'bold'), relief='flat', padx=30, pady=10,
                  command=ventana.destroy).pack(side=tk.LEFT, padx=10)
     
+    def _registrar_venta(self, cliente, metodo_pago, descuento):
+        """Guardar la venta (en disco al instante; en la BD en segundo plano)"""
+        datos = self._datos_factura(cliente, metodo_pago, descuento)
+        venta = nueva_venta(cliente, metodo_pago, self.pedido.items, datos['subtotal'],
+                            datos['itbms'], datos['descuento'], datos['total'])
+        try:
+            registro_ventas.registrar(venta)
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudo registrar la venta: {e}")
+    
     def _mostrar_factura_final(self, cliente, metodo_pago, descuento):
         """Mostrar factura final"""
         factura = tk.Toplevel(self.ventana)
@@ -858,55 +966,46 @@ class InterfazRestaurante:
     def _generar_contenido_factura(self, cliente, metodo_pago, descuento):
         """Generar contenido de factura"""
         try:
-            subtotal = self.pedido.calcular_total()
-            itbms = subtotal * 0.19
-            total = subtotal + itbms - descuento
-            
-            fecha = datetime.datetime.now().strftime("%d/%m/%Y %H:%M")
-            
-            contenido = f"""
-{'='*50}
-                    FACTURA
-{'='*50}
-
-Fecha: {fecha}
-Cliente: {cliente}
-
-{'-'*50}
-ITEMS:
-{'-'*50}
-"""
-            for item in self.pedido.items:
-                cantidad = item['cantidad']
-                precio = item['precio']
-                subtotal_item = precio * cantidad
-                contenido += f"{item['nombre']:<30} x{cantidad:>2}  ${subtotal_item:>8,.0f}\n"
-            
-            contenido += f"""
-{'-'*50}
-Subtotal:          ${subtotal:>10,.0f}
-ITBMS (19%):       ${itbms:>10,.0f}
-Descuento:         ${descuento:>10,.0f}
-{'-'*50}
-TOTAL:             ${total:>10,.0f}
-{'-'*50}
-
-Método de Pago: {metodo_pago}
-
-{'='*50}
-         Gracias por su compra
-{'='*50}
-"""
+            # La plantilla calcula el subtotal de cada item (precio * cantidad)
+            contenido = PLANTILLA_TICKET.texto(self._datos_factura(cliente, metodo_pago, descuento),
+                                               self.pedido.items)
             return contenido
         except Exception as e:
             return f"Error al generar factura: {str(e)}"
     
+    def _datos_factura(self, cliente, metodo_pago, descuento):
+        """Campos del encabezado y pie del ticket"""
+        subtotal = self.pedido.calcular_total()
+        itbms = subtotal * 0.19
+        total = subtotal + itbms - descuento
+        
+        return {
+            'fecha': datetime.datetime.now().strftime("%d/%m/%Y %H:%M"),
+            'cliente': cliente,
+            'subtotal': subtotal,
+            'itbms': itbms,
+            'descuento': descuento,
+            'total': total,
+            'metodo_pago': metodo_pago,
+        }
+    
     def _imprimir_factura_linux(self, cliente, metodo_pago, descuento):
         """Abrir diálogo de impresión tipo Windows"""
+        from dialogo_impresion import DialogoImpresion
         try:
             contenido = self._generar_contenido_factura(cliente, metodo_pago, descuento)
+            
+            # Copia del pedido: el carrito se limpia al cerrar la factura y el
+            # ticket ESC/POS se genera recién al confirmar la impresión
+            datos = self._datos_factura(cliente, metodo_pago, descuento)
+            items = [dict(item) for item in self.pedido.items]
+            
+            def generar_escpos(abrir_cajon):
+                return PLANTILLA_TICKET.escpos(datos, items, cortar=True, abrir_cajon=abrir_cajon)
+            
             # Usar el módulo separado de diálogo de impresión
-            DialogoImpresion(self.ventana, self.COLORES, contenido, cliente)
+            DialogoImpresion(self.ventana, self.COLORES, contenido, cliente,
+                             generar_escpos=generar_escpos)
         except Exception as e:
             messagebox.showerror("❌ Error de Impresión", f"Error: {str(e)}")
     
@@ -923,8 +1022,29 @@ Método de Pago: {metodo_pago}
                 f.write(contenido)
             messagebox.showinfo("Éxito", f"Factura guardada: {archivo}")
     
+    def _exportar_productos_csv(self):
+        """Exporta el catálogo a CSV en segundo plano (cursor del servidor, memoria constante)"""
+        archivo = filedialog.asksaveasfilename(
+            defaultextension=".csv", initialfile="productos.csv",
+            filetypes=[("CSV", "*.csv"), ("Todos", "*.*")]
+        )
+        if not archivo:
+            return
+        
+        def exportar():
+            with open(archivo, 'w', encoding='utf-8', newline='') as f:
+                return self.menu.exportar_productos_csv(f)
+        
+        self.ejecutor.enviar(
+            exportar,
+            al_terminar=lambda total: messagebox.showinfo("✓ Éxito", f"{total} productos exportados a {archivo}"),
+            al_fallar=lambda e: messagebox.showerror("✗ Error", f"No se pudo exportar: {e}"),
+            clave='exportar_productos'
+        )
+    
     def _crear_tab_productos(self, parent):
         """Pestaña para gestionar productos personalizados - MUESTRA TODOS"""
+        from visor_productos import VisorProductosOptimizado
         # Panel superior con botones y título
         toolbar = tk.Frame(parent, bg=self.COLORES['fondo_card'], height=70)
         toolbar.pack(fill=tk.X, padx=10, pady=10)
@@ -945,44 +1065,32 @@ Método de Pago: {metodo_pago}
                  fg='white', font=('Inter', 10, 'bold'), relief='flat', padx=15, pady=10,
                  command=self._crear_producto_dialog).pack(side=tk.RIGHT, padx=5, pady=10)
         
+        tk.Button(toolbar, text="📤 Exportar CSV", bg=self.COLORES['fondo_principal'],
+                 fg=self.COLORES['texto_principal'], font=('Inter', 10, 'bold'), relief='flat',
+                 padx=15, pady=10,
+                 command=self._exportar_productos_csv).pack(side=tk.RIGHT, padx=5, pady=10)
+        
+        # Encabezado de la lista (contador y mensajes), fuera del scroll
+        self.productos_lista_frame = tk.Frame(parent, bg=self.COLORES['fondo_principal'])
+        self.productos_lista_frame.pack(fill=tk.X, padx=10)
+        
         # Lista de productos con scroll mejorado
         lista_frame = tk.Frame(parent, bg=self.COLORES['fondo_principal'])
         lista_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Canvas con scroll
-        self.productos_canvas = tk.Canvas(lista_frame, bg=self.COLORES['fondo_principal'], 
-                                         highlightthickness=0)
-        scrollbar = ttk.Scrollbar(lista_frame, orient="vertical", 
-                                 command=self.productos_canvas.yview)
-        
-        self.productos_lista_frame = tk.Frame(self.productos_canvas, 
-                                             bg=self.COLORES['fondo_principal'])
-        
-        # Bind para actualizar el scroll region
-        self.productos_lista_frame.bind(
-            "<Configure>",
-            lambda e: self.productos_canvas.configure(scrollregion=self.productos_canvas.bbox("all"))
+        # Lista virtualizada: solo existen las filas visibles, que se reutilizan al
+        # desplazarse; los productos se piden por páginas al acercarse al final
+        self.visor_productos = VisorProductosOptimizado(
+            lista_frame, self.COLORES,
+            fila_lista=(100, self._crear_fila_producto, self._llenar_fila_producto),
+            ejecutor=self.ejecutor
         )
+        self.productos_canvas = self.visor_productos.canvas
         
         # Bind para scroll con rueda del mouse
         self.productos_canvas.bind_all("<MouseWheel>", 
             lambda e: self.productos_canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
         
-        # Crear ventana del canvas con ancho dinámico
-        canvas_window = self.productos_canvas.create_window((0, 0), 
-                                                            window=self.productos_lista_frame, 
-                                                            anchor="nw")
-        
-        # Ajustar ancho del frame al ancho del canvas
-        def configurar_ancho(event):
-            self.productos_canvas.itemconfig(canvas_window, width=event.width)
-        
-        self.productos_canvas.bind('<Configure>', configurar_ancho)
-        self.productos_canvas.configure(yscrollcommand=scrollbar.set)
-        
-        self.productos_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
         print("📋 Inicializando pestaña de productos...")
         self._actualizar_lista_productos()
     
@@ -993,22 +1101,32 @@ Método de Pago: {metodo_pago}
         
         for widget in self.productos_lista_frame.winfo_children():
             widget.destroy()
+        self._crear_placeholder_carga(self.productos_lista_frame,
+                                      "⏳ Cargando productos...").pack(pady=20)
         
-        # Obtener todos los productos de la BD
-        try:
-            productos_bd = self.menu.obtener_todos_productos()
-            print(f"✓ Productos obtenidos: {len(productos_bd) if productos_bd else 0}")
-        except Exception as e:
+        def fallar(e):
+            for widget in self.productos_lista_frame.winfo_children():
+                widget.destroy()
             print(f"✗ Error al obtener productos: {e}")
-            import traceback
-            traceback.print_exc()
+            self.visor_productos.mostrar([])
             tk.Label(self.productos_lista_frame, 
                     text=f"❌ Error al cargar productos:\n{str(e)}",
                     font=('Inter', 11), fg=self.COLORES['rojo_danger'],
                     bg=self.COLORES['fondo_principal']).pack(pady=40)
-            return
         
-        if not productos_bd or len(productos_bd) == 0:
+        # Contar los productos de la BD; las filas se cargan por páginas al desplazarse
+        self.ejecutor.enviar(self.menu.contar_productos, al_terminar=self._mostrar_lista_productos,
+                             al_fallar=fallar, clave='lista_productos')
+    
+    def _mostrar_lista_productos(self, total_productos):
+        """Muestra el contador y empieza a paginar la lista de productos"""
+        from visor_productos import PaginadorKeyset
+        print(f"✓ Productos en la base de datos: {total_productos}")
+        for widget in self.productos_lista_frame.winfo_children():
+            widget.destroy()
+        
+        if not total_productos:
+            self.visor_productos.mostrar([])
             tk.Label(self.productos_lista_frame, 
                     text="⚠️ Sin productos en la base de datos\n\nHaz clic en '+ Nuevo Producto' para agregar",
                     font=('Inter', 11), fg=self.COLORES['texto_secundario'],
@@ -1020,7 +1138,7 @@ Método de Pago: {metodo_pago}
         contador_frame.pack(fill=tk.X, pady=(0, 10), padx=10)
         
         tk.Label(contador_frame, 
-                text=f"📦 Mostrando TODOS los productos: {len(productos_bd)}", 
+                text=f"📦 Mostrando TODOS los productos: {total_productos}", 
                 font=('Inter', 12, 'bold'),
                 fg=self.COLORES['acento_dorado'],
                 bg=self.COLORES['fondo_card']).pack(pady=10)
@@ -1032,48 +1150,65 @@ Método de Pago: {metodo_pago}
                 fg=self.COLORES['texto_secundario'],
                 bg=self.COLORES['fondo_principal']).pack(pady=(0, 10))
         
-        # Iterar sobre TODOS los productos
-        for idx, prod in enumerate(productos_bd, 1):
-            prod_frame = tk.Frame(self.productos_lista_frame, bg=self.COLORES['fondo_card'], 
-                                 relief=tk.RAISED, bd=2)
-            prod_frame.pack(fill=tk.X, pady=5, padx=10)
-            
-            # Info con número
-            info = tk.Frame(prod_frame, bg=self.COLORES['fondo_card'])
-            info.pack(fill=tk.X, padx=10, pady=10)
-            
-            # Número del producto
-            tk.Label(info, text=f"{idx}.", font=('Inter', 10, 'bold'),
-                    fg=self.COLORES['acento_dorado'],
-                    bg=self.COLORES['fondo_card']).pack(side=tk.LEFT, padx=(0, 5))
-            
-            tk.Label(info, text=prod['nombre'], font=('Inter', 11, 'bold'),
-                    fg=self.COLORES['texto_principal'],
-                    bg=self.COLORES['fondo_card']).pack(side=tk.LEFT)
-            
-            tk.Label(info, text=f"${float(prod['precio']):,.0f}", font=('Inter', 11, 'bold'),
-                    fg=self.COLORES['acento_dorado'],
-                    bg=self.COLORES['fondo_card']).pack(side=tk.RIGHT, padx=(0, 20))
-            
-            tk.Label(info, text=f"ID: {prod['id_producto']}", font=('Inter', 8),
-                    fg=self.COLORES['texto_secundario'],
-                    bg=self.COLORES['fondo_card']).pack(side=tk.RIGHT, padx=(0, 20))
-            
-            # Botones
-            btn = tk.Frame(prod_frame, bg=self.COLORES['fondo_card'])
-            btn.pack(fill=tk.X, padx=10, pady=(0, 10))
-            
-            tk.Button(btn, text="Editar", bg=self.COLORES['acento_dorado'],
-                     fg='black', relief='flat', font=('Inter', 9), width=10,
-                     command=lambda p=prod: self._editar_producto_dialog(p)).pack(side=tk.LEFT, padx=2)
-            
-            tk.Button(btn, text="Eliminar", bg=self.COLORES['rojo_danger'],
-                     fg='white', relief='flat', font=('Inter', 9), width=10,
-                     command=lambda p=prod: self._eliminar_producto(p)).pack(side=tk.LEFT, padx=2)
-        
-        print(f"✓ Se crearon {len(productos_bd)} widgets de productos en la interfaz")
+        paginador = PaginadorKeyset(self.menu.obtener_pagina_productos,
+                                    clave=Menu.clave_producto,
+                                    tamano=100)
+        self.visor_productos.mostrar_paginado(paginador)
         print("=" * 60)
     
+    def _crear_fila_producto(self, parent):
+        """Crea una fila vacía de la lista de productos (se reutiliza al desplazarse)"""
+        prod_frame = tk.Frame(parent, bg=self.COLORES['fondo_card'], 
+                             relief=tk.RAISED, bd=2)
+        
+        # Info con número
+        info = tk.Frame(prod_frame, bg=self.COLORES['fondo_card'])
+        info.pack(fill=tk.X, padx=10, pady=10)
+        
+        # Número del producto
+        prod_frame.lbl_numero = tk.Label(info, font=('Inter', 10, 'bold'),
+                                        fg=self.COLORES['acento_dorado'],
+                                        bg=self.COLORES['fondo_card'])
+        prod_frame.lbl_numero.pack(side=tk.LEFT, padx=(0, 5))
+        
+        prod_frame.lbl_nombre = tk.Label(info, font=('Inter', 11, 'bold'),
+                                        fg=self.COLORES['texto_principal'],
+                                        bg=self.COLORES['fondo_card'])
+        prod_frame.lbl_nombre.pack(side=tk.LEFT)
+        
+        prod_frame.lbl_precio = tk.Label(info, font=('Inter', 11, 'bold'),
+                                        fg=self.COLORES['acento_dorado'],
+                                        bg=self.COLORES['fondo_card'])
+        prod_frame.lbl_precio.pack(side=tk.RIGHT, padx=(0, 20))
+        
+        prod_frame.lbl_id = tk.Label(info, font=('Inter', 8),
+                                    fg=self.COLORES['texto_secundario'],
+                                    bg=self.COLORES['fondo_card'])
+        prod_frame.lbl_id.pack(side=tk.RIGHT, padx=(0, 20))
+        
+        # Botones
+        btn = tk.Frame(prod_frame, bg=self.COLORES['fondo_card'])
+        btn.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        prod_frame.btn_editar = tk.Button(btn, text="Editar", bg=self.COLORES['acento_dorado'],
+                                         fg='black', relief='flat', font=('Inter', 9), width=10)
+        prod_frame.btn_editar.pack(side=tk.LEFT, padx=2)
+        
+        prod_frame.btn_eliminar = tk.Button(btn, text="Eliminar", bg=self.COLORES['rojo_danger'],
+                                           fg='white', relief='flat', font=('Inter', 9), width=10)
+        prod_frame.btn_eliminar.pack(side=tk.LEFT, padx=2)
+        
+        return prod_frame
+    
+    def _llenar_fila_producto(self, prod_frame, indice, prod):
+        """Muestra el producto `prod` en una fila reutilizada"""
+        prod_frame.lbl_numero.configure(text=f"{indice + 1}.")
+        prod_frame.lbl_nombre.configure(text=prod['nombre'])
+        prod_frame.lbl_precio.configure(text=f"${float(prod['precio']):,.0f}")
+        prod_frame.lbl_id.configure(text=f"ID: {prod['id_producto']}")
+        prod_frame.btn_editar.configure(command=lambda p=prod: self._editar_producto_dialog(p))
+        prod_frame.btn_eliminar.configure(command=lambda p=prod: self._eliminar_producto(p))
+    
     def _crear_producto_dialog(self):
         """Diálogo para crear nuevo producto"""
         self._mostrar_form_producto(None, None)
@@ -1188,13 +1323,16 @@ Método de Pago: {metodo_pago}
                 fg=self.COLORES['texto_principal'],
                 bg=self.COLORES['fondo_principal']).pack(pady=(15, 5), padx=20, anchor=tk.W)
         
-        tipos_comida = self.menu.obtener_tipos_comida()
-        combo_cat = ttk.Combobox(ventana, values=tipos_comida, state="readonly", width=27)
+        combo_cat = ttk.Combobox(ventana, values=[], state="readonly", width=27)
         combo_cat.pack(pady=5, padx=20)
-        if producto:
-            combo_cat.set(producto.get('tipo', tipos_comida[0] if tipos_comida else 'Desayuno'))
-        else:
-            combo_cat.current(0) if tipos_comida else None
+        
+        def seleccionar_tipo(tipos_comida):
+            if producto:
+                combo_cat.set(producto.get('tipo', tipos_comida[0] if tipos_comida else 'Desayuno'))
+            else:
+                combo_cat.current(0) if tipos_comida else None
+        
+        self._cargar_tipos_combo(combo_cat, al_cargar=seleccionar_tipo)
         
         # Imagen
         tk.Label(ventana, text="Imagen:", font=('Inter', 11),
@@ -1255,37 +1393,55 @@ Método de Pago: {metodo_pago}
             
             imagen = imagen_actual[0] if imagen_actual[0] else "sin_imagen.png"
             
-            # Guardar en la base de datos
-            try:
+            # Guardar en la base de datos (en segundo plano)
+            def guardar_en_bd():
                 if id_producto is not None:
                     # Actualizar producto existente
-                    exito = self.menu.actualizar_producto(id_producto, nombre, precio, descripcion, imagen)
-                    if exito:
+                    resultado = self.menu.actualizar_producto(id_producto, nombre, precio, descripcion, imagen)
+                else:
+                    # Crear nuevo producto
+                    resultado = self.menu.crear_producto(nombre, precio, tipo, descripcion, imagen)
+                
+                # Recargar productos desde la BD
+                if resultado:
+                    self.menu.recargar_catalogo()
+                return resultado
+            
+            def al_guardar(resultado):
+                if ventana.winfo_exists():
+                    btn_guardar.config(state=tk.NORMAL, text="Guardar")
+                
+                if id_producto is not None:
+                    if resultado:
                         messagebox.showinfo("✓ Éxito", "Producto actualizado en la base de datos")
                     else:
                         messagebox.showerror("✗ Error", "No se pudo actualizar el producto")
                         return
                 else:
-                    # Crear nuevo producto
-                    nuevo_id = self.menu.crear_producto(nombre, precio, tipo, descripcion, imagen)
-                    if nuevo_id:
-                        messagebox.showinfo("✓ Éxito", f"Producto creado con ID: {nuevo_id}")
+                    if resultado:
+                        messagebox.showinfo("✓ Éxito", f"Producto creado con ID: {resultado}")
                     else:
                         messagebox.showerror("✗ Error", "No se pudo crear el producto")
                         return
                 
-                # Recargar productos desde la BD
-                self.menu._cargar_menu_desde_db()
                 self._actualizar_lista_productos()
-                ventana.destroy()
+                if ventana.winfo_exists():
+                    ventana.destroy()
                 self._actualizar_grid_menu()
-                
-            except Exception as e:
+            
+            def al_fallar(e):
+                if ventana.winfo_exists():
+                    btn_guardar.config(state=tk.NORMAL, text="Guardar")
                 messagebox.showerror("✗ Error", f"Error al guardar en BD: {str(e)}")
+            
+            # Evitar doble envío mientras se guarda
+            btn_guardar.config(state=tk.DISABLED, text="⏳ Guardando...")
+            self.ejecutor.enviar(guardar_en_bd, al_terminar=al_guardar, al_fallar=al_fallar)
         
-        tk.Button(btn_frame, text="Guardar", bg=self.COLORES['verde_success'],
-                 fg='white', font=('Inter', 11, 'bold'), relief='flat', padx=30, pady=10,
-                 command=guardar).pack(side=tk.LEFT, padx=10)
+        btn_guardar = tk.Button(btn_frame, text="Guardar", bg=self.COLORES['verde_success'],
+                               fg='white', font=('Inter', 11, 'bold'), relief='flat', padx=30, pady=10,
+                               command=guardar)
+        btn_guardar.pack(side=tk.LEFT, padx=10)
         
         tk.Button(btn_frame, text="Cancelar", bg=self.COLORES['rojo_danger'],
                  fg='white', font=('Inter', 11, 'bold'), relief='flat', padx=30, pady=10,
@@ -1294,18 +1450,23 @@ Método de Pago: {metodo_pago}
     def _eliminar_producto(self, producto):
         """Eliminar producto de la base de datos"""
         if messagebox.askyesno("Confirmar", f"¿Eliminar '{producto['nombre']}'?\n\nEsta acción no se puede deshacer."):
-            try:
+            def eliminar_en_bd():
                 exito = self.menu.eliminar_producto(producto['id_producto'])
                 if exito:
-                    messagebox.showinfo("✓ Éxito", "Producto eliminado de la base de datos")
                     # Recargar productos
-                    self.menu._cargar_menu_desde_db()
+                    self.menu.recargar_catalogo()
+                return exito
+            
+            def al_eliminar(exito):
+                if exito:
+                    messagebox.showinfo("✓ Éxito", "Producto eliminado de la base de datos")
                     self._actualizar_lista_productos()
                     self._actualizar_grid_menu()
                 else:
                     messagebox.showerror("✗ Error", "No se pudo eliminar el producto")
-            except Exception as e:
-                messagebox.showerror("✗ Error", f"Error al eliminar: {str(e)}")
+            
+            self.ejecutor.enviar(eliminar_en_bd, al_terminar=al_eliminar,
+                                 al_fallar=lambda e: messagebox.showerror("✗ Error", f"Error al eliminar: {str(e)}"))
     
     def _crear_tab_menu_dias(self, parent):
         """Pestaña para gestionar menús por día - con selección múltiple"""
@@ -1364,13 +1525,13 @@ Método de Pago: {metodo_pago}
                 bg=self.COLORES['fondo_card']).pack(side=tk.LEFT, padx=(0, 10))
         
         self.tipo_filtro_var = tk.StringVar(value="Todos")
-        tipos = ["Todos"] + self.menu.obtener_tipos_comida()
         
         combo_tipo = ttk.Combobox(tipo_frame, textvariable=self.tipo_filtro_var,
-                                 values=tipos, state="readonly", width=20,
+                                 values=["Todos"], state="readonly", width=20,
                                  font=('Inter', 11))
         combo_tipo.pack(side=tk.LEFT, padx=5)
-        combo_tipo.bind("<<ComboboxSelected>>", lambda e: self._filtrar_productos_por_tipo())
+        combo_tipo.bind("<<ComboboxSelected>>", lambda e: self._buscar_productos_disponibles())
+        self._cargar_tipos_combo(combo_tipo, con_todos=True)
         
         # Fila 3: Agregar producto al menú temporal
         agregar_frame = tk.Frame(inner_frame, bg=self.COLORES['fondo_card'])
@@ -1381,13 +1542,15 @@ Método de Pago: {metodo_pago}
                 fg=self.COLORES['texto_principal'],
                 bg=self.COLORES['fondo_card']).pack(side=tk.LEFT, padx=(0, 10))
         
-        # Combobox de productos disponibles
+        # Combobox de productos disponibles: se escribe para buscar y la lista
+        # trae como mucho LIMITE_SELECTOR coincidencias (no todo el catálogo)
         self.producto_agregar_var = tk.StringVar()
         self.combo_productos = ttk.Combobox(agregar_frame, 
                                            textvariable=self.producto_agregar_var,
-                                           state="readonly", width=35,
-                                           font=('Inter', 10))
+                                           width=35, font=('Inter', 10))
         self.combo_productos.pack(side=tk.LEFT, padx=5)
+        self.combo_productos.bind("<KeyRelease>", self._programar_busqueda_productos)
+        self._busqueda_productos_job = None
         
         tk.Button(agregar_frame, text="➕ Agregar a Lista", 
                  bg=self.COLORES['verde_success'],
@@ -1461,45 +1624,58 @@ Método de Pago: {metodo_pago}
         
         # Inicializar lista temporal
         self.productos_menu_temporal = []
+        # Copia del índice producto -> tipo para agrupar la lista temporal en
+        # el hilo de Tk; se carga en segundo plano
+        self.tipos_por_producto = {}
         
         # Cargar datos iniciales
         self._cargar_menu_dia_simple()
         self._cargar_menu_dia_actual()
     
     def _cargar_menu_dia_simple(self):
-        """Carga los productos disponibles"""
-        # Guardar todos los productos para filtrado
-        self.todos_productos_disponibles = self.menu.obtener_todos_productos()
+        """Carga el índice de tipos y la primera página del selector de productos"""
+        self.productos_ref = {}
         
-        # Filtrar por tipo seleccionado
-        self._filtrar_productos_por_tipo()
+        def cargar():
+            return self.menu.obtener_indice_tipos()
+        
+        def mostrar(tipos):
+            # Índice de tipos para agrupar la lista temporal en el hilo de Tk
+            self.tipos_por_producto = tipos
+        
+        self.ejecutor.enviar(cargar, al_terminar=mostrar, clave='indice_tipos_menu_dia')
+        self._buscar_productos_disponibles()
+    
+    def _programar_busqueda_productos(self, evento):
+        """Busca al dejar de escribir (una consulta por pausa, no por tecla)"""
+        if evento.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        if self._busqueda_productos_job is not None:
+            self.ventana.after_cancel(self._busqueda_productos_job)
+        self._busqueda_productos_job = self.ventana.after(250, self._buscar_productos_disponibles)
     
-    def _filtrar_productos_por_tipo(self):
-        """Filtra los productos según el tipo seleccionado"""
+    def _buscar_productos_disponibles(self):
+        """Busca productos por el texto escrito y el tipo seleccionado (en segundo plano)"""
+        self._busqueda_productos_job = None
+        texto = self.producto_agregar_var.get()
+        if texto in self.productos_ref:
+            texto = ''  # Es una opción ya elegida, no un texto de búsqueda
         tipo_seleccionado = self.tipo_filtro_var.get()
-        
-        # Filtrar productos
-        if tipo_seleccionado == "Todos":
-            productos_filtrados = self.todos_productos_disponibles
-        else:
-            productos_filtrados = []
-            for p in self.todos_productos_disponibles:
-                tipo_producto = self.menu.obtener_tipo_producto(p['id_producto'])
-                if tipo_producto == tipo_seleccionado:
-                    productos_filtrados.append(p)
-        
-        # Crear lista con formato "nombre - $precio"
-        productos_lista = [f"{p['nombre']} - ${p['precio']:.2f}" for p in productos_filtrados]
-        self.combo_productos['values'] = productos_lista
-        
-        # Guardar referencia a productos para búsqueda
-        self.productos_ref = {f"{p['nombre']} - ${p['precio']:.2f}": p 
-                             for p in productos_filtrados}
-        
-        if productos_lista:
-            self.combo_productos.set(productos_lista[0])
-        else:
-            self.combo_productos.set("")
+        tipo = None if tipo_seleccionado == "Todos" else tipo_seleccionado
+        
+        def mostrar(productos):
+            # Crear lista con formato "nombre - $precio"
+            self.productos_ref = {f"{p['nombre']} - ${p['precio']:.2f}": p for p in productos}
+            productos_lista = list(self.productos_ref)
+            if len(productos) == self.LIMITE_SELECTOR:
+                productos_lista.append(f"… escribe para ver más (primeros {self.LIMITE_SELECTOR})")
+            self.combo_productos['values'] = productos_lista
+            if not texto:
+                self.combo_productos.set(productos_lista[0] if self.productos_ref else "")
+        
+        # Una búsqueda nueva deja obsoleta la anterior (misma clave)
+        self.ejecutor.enviar(self.menu.buscar_productos, texto.strip(), tipo, self.LIMITE_SELECTOR,
+                             al_terminar=mostrar, clave='productos_disponibles')
     
     def _agregar_a_lista_temporal(self):
         """Agrega un producto a la lista temporal (sin guardar aún)"""
@@ -1511,7 +1687,7 @@ Método de Pago: {metodo_pago}
         
         producto = self.productos_ref.get(seleccion)
         if not producto:
-            messagebox.showerror("Error", "Producto no encontrado")
+            messagebox.showwarning("Advertencia", "Elige un producto de la lista (escribe para buscarlo)")
             return
         
         # Verificar que no esté ya en la lista temporal
@@ -1541,15 +1717,16 @@ Método de Pago: {metodo_pago}
             return
         
         # Agrupar por tipo
+        tipos = self.tipos_por_producto
         productos_por_tipo = {}
         for producto in self.productos_menu_temporal:
-            tipo = self.menu.obtener_tipo_producto(producto['id_producto'])
+            tipo = tipos.get(producto['id_producto'])
             if tipo not in productos_por_tipo:
                 productos_por_tipo[tipo] = []
             productos_por_tipo[tipo].append(producto)
         
-        # Mostrar por tipo
-        for tipo, prods in sorted(productos_por_tipo.items()):
+        # Mostrar por tipo (los productos sin tipo al final)
+        for tipo, prods in sorted(productos_por_tipo.items(), key=lambda item: (item[0] is None, item[0] or "")):
             # Header del tipo
             tipo_frame = tk.Frame(self.menu_temporal_frame, bg='#27ae60')
             tipo_frame.pack(fill=tk.X, pady=(10, 0), padx=10)
@@ -1628,20 +1805,20 @@ Método de Pago: {metodo_pago}
         if not messagebox.askyesno("Confirmar Guardado", msg):
             return
         
-        # Primero eliminar el menú actual de ese día
-        try:
-            query_delete = "DELETE FROM MENU_PRODUCTO WHERE idDiaMenu = %s"
-            db_manager.ejecutar_query(query_delete, (dia_id,), fetch=False)
-            
-            # Guardar cada producto
-            productos_guardados = 0
-            for producto in self.productos_menu_temporal:
-                tipo = self.menu.obtener_tipo_producto(producto['id_producto'])
-                if tipo:
-                    if self.menu.agregar_producto_a_menu_dia(producto['id_producto'], tipo, dia_id):
-                        productos_guardados += 1
+        # Reemplazar el menú del día en una sola carga por lotes (en segundo plano)
+        productos_menu = list(self.productos_menu_temporal)
+        
+        def guardar_en_bd():
+            # En el hilo del ejecutor: índice al día, no la copia de la interfaz
+            tipos = self.menu.obtener_indice_tipos()
+            productos_con_tipo = [(producto['id_producto'], tipos[producto['id_producto']])
+                                  for producto in productos_menu
+                                  if tipos.get(producto['id_producto'])]
             
-            if productos_guardados == len(self.productos_menu_temporal):
+            return self.menu.reemplazar_menu_dia(dia_id, productos_con_tipo)
+        
+        def al_guardar(productos_guardados):
+            if productos_guardados == len(productos_menu):
                 messagebox.showinfo("Éxito", 
                     f"✓ Menú guardado correctamente\n\n{productos_guardados} productos guardados en {dia}")
                 
@@ -1656,10 +1833,10 @@ Método de Pago: {metodo_pago}
                 self._actualizar_grid_menu()
             else:
                 messagebox.showwarning("Advertencia", 
-                    f"Solo se guardaron {productos_guardados} de {len(self.productos_menu_temporal)} productos")
+                    f"Solo se guardaron {productos_guardados} de {len(productos_menu)} productos")
         
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al guardar el menú: {str(e)}")
+        self.ejecutor.enviar(guardar_en_bd, al_terminar=al_guardar,
+                             al_fallar=lambda e: messagebox.showerror("Error", f"Error al guardar el menú: {str(e)}"))
     
     def _cargar_menu_dia_actual(self):
         """Carga y muestra el menú actual de la base de datos"""
@@ -1670,7 +1847,16 @@ Método de Pago: {metodo_pago}
         dia = self.dia_menu_var.get()
         dia_id = self._get_dia_id(dia)
         
-        productos = self.menu.obtener_productos_en_menu_dia(dia_id)
+        self._crear_placeholder_carga(self.menu_actual_frame).pack(pady=30)
+        # Cambiar de día a mitad de carga descarta la consulta anterior
+        self.ejecutor.enviar(self.menu.obtener_productos_en_menu_dia, dia_id,
+                             al_terminar=lambda productos: self._mostrar_menu_dia_actual(dia, productos),
+                             clave='menu_dia_actual')
+    
+    def _mostrar_menu_dia_actual(self, dia, productos):
+        """Muestra el menú guardado de un día con los datos ya consultados"""
+        for widget in self.menu_actual_frame.winfo_children():
+            widget.destroy()
         
         if not productos:
             tk.Label(self.menu_actual_frame,
@@ -1739,7 +1925,16 @@ Método de Pago: {metodo_pago}
     
     def ejecutar(self):
         """Ejecutar aplicación"""
-        self.ventana.mainloop()
+        try:
+            self.ventana.mainloop()
+        finally:
+            # No esperar consultas pendientes al cerrar
+            self.ejecutor.cerrar()
+            # Los trabajos sin enviar quedan en el spool para el próximo arranque
+            cola_impresion.detener()
+            # Lo que no alcance a confirmarse queda en el WAL de ventas
+            registro_ventas.detener()
+            espejo_local.detener()
 
 
 if __name__ == "__main__":
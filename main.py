@@ -6,9 +6,17 @@ Optimizado para Linux con soporte de impresion CUPS
 Actualizado: Noviembre 2025
 """
 
+# Primero: referencia de tiempo para medir el arranque
+import sys
+import arranque
+
+if '--profile-startup' in sys.argv:
+    # Medir cada import desde aquí; se imprime el desglose al primer cuadro
+    arranque.activar_perfil()
+
 import tkinter as tk
 from tkinter import messagebox
-import sys
+import importlib.util
 import os
 import logging
 
@@ -26,12 +34,9 @@ logger = logging.getLogger(__name__)
 # Agregar el directorio actual al path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Usar interfaz del restaurante con pestañas
-from interfaz_restaurante import InterfazRestaurante
-
 
 def verificar_dependencias():
-    """Verifica que todas las dependencias necesarias estén instaladas"""
+    """Verifica que todas las dependencias necesarias estén instaladas (sin importarlas)"""
     dependencias = {
         'psycopg2': 'psycopg2-binary',
         'tkinter': 'python3-tkinter (viene con Python)'
@@ -39,13 +44,9 @@ def verificar_dependencias():
     
     faltantes = []
     for modulo, paquete in dependencias.items():
-        try:
-            if modulo == 'tkinter':
-                import tkinter
-            else:
-                __import__(modulo)
+        if importlib.util.find_spec(modulo) is not None:
             logger.info(f"✓ {modulo} disponible")
-        except ImportError:
+        else:
             faltantes.append(paquete)
             logger.error(f"✗ {modulo} no encontrado")
     
@@ -75,6 +76,11 @@ def main():
         
         logger.info("Todas las dependencias están disponibles")
         
+        # Importar la interfaz recién ahora: si falta una dependencia el
+        # error se muestra arriba en vez de fallar al importar main.py
+        from interfaz_restaurante import InterfazRestaurante
+        arranque.marcar("imports")
+        
         # Crear e inicializar la interfaz del POS
         logger.info("Creando interfaz principal...")
         app = InterfazRestaurante()
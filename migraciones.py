@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+migraciones.py - Migraciones versionadas del esquema
+Aplica cambios incrementales a una base existente sin perder datos
+
+setup_database.py borra y recrea la base completa desde DB/DB.sql. Este
+script, en cambio, ejecuta en orden los archivos DB/migraciones/NNNN_*.sql
+que todavía no figuran en la tabla ESQUEMA_MIGRACION, cada uno en su propia
+transacción. Las migraciones son idempotentes (IF NOT EXISTS, CREATE OR
+REPLACE), así también se pueden registrar sobre una base recién creada con
+DB.sql, que ya contiene el esquema completo.
+
+Las migraciones 0001 a 0003 se escribieron después de los cambios que
+describen: el índice de paginación, los avisos NOTIFY del catálogo y las
+tablas VENTA / VENTA_DETALLE se habían agregado antes solo a DB.sql. Sirven
+para llevar bases creadas antes de esos cambios al esquema actual. Desde la
+0004 cada cambio de esquema se escribe primero como migración.
+
+Uso:
+    python3 migraciones.py [estado|aplicar|verificar]
+
+    estado     Lista las migraciones aplicadas y pendientes
+    aplicar    Aplica las pendientes (por defecto)
+    verificar  Comprueba con EXPLAIN que las consultas frecuentes usan sus
+               índices; termina con código 1 si alguna cae en Seq Scan
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from typing import Dict, List
+import hashlib
+import json
+import os
+import re
+import sys
+
+import psycopg2
+
+from conexionDB import ConexionDB
+from modelo_restaurante import (
+    CONSULTA_EXCEPCIONES_ACTIVAS, CONSULTA_MENU_DEL_DIA, CONSULTA_PRECIOS_PRODUCTOS,
+    CONSULTA_PRODUCTOS_CON_DESCUENTO, CONSULTA_PRODUCTOS_CON_DESCUENTO_EXCEPCION,
+    CONSULTA_PRODUCTOS_EN_MENU_DIA,
+)
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DB', 'migraciones')
+
+# Clave del advisory lock: dos terminales que arrancan a la vez no aplican
+# la misma migración dos veces
+CLAVE_BLOQUEO = 0x50324D47  # 'P2MG'
+
+Migracion = namedtuple('Migracion', ['version', 'nombre', 'ruta', 'checksum'])
+
+_PATRON_ARCHIVO = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+
+class MigracionError(Exception):
+    """Una migración falló o no coincide con la que se aplicó"""
+
+
+def listar_migraciones(directorio: str = DIRECTORIO) -> List[Migracion]:
+    """Migraciones disponibles en disco, ordenadas por versión"""
+    migraciones = {}
+    for archivo in sorted(os.listdir(directorio)):
+        coincidencia = _PATRON_ARCHIVO.match(archivo)
+        if not coincidencia:
+            continue
+        version = int(coincidencia.group(1))
+        if version in migraciones:
+            raise MigracionError(f"Versión {version:04d} repetida: {archivo} y {migraciones[version].ruta}")
+        ruta = os.path.join(directorio, archivo)
+        with open(ruta, 'rb') as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        migraciones[version] = Migracion(version, coincidencia.group(2), ruta, checksum)
+    return [migraciones[version] for version in sorted(migraciones)]
+
+
+def conectar():
+    """Conexión dedicada (fuera del pool) con la configuración de la aplicación"""
+    return psycopg2.connect(**ConexionDB.DB_CONFIG)
+
+
+def _asegurar_tabla(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ESQUEMA_MIGRACION (
+            version INTEGER PRIMARY KEY,
+            nombre VARCHAR(100) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            aplicada TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """)
+
+
+def migraciones_aplicadas(cursor) -> Dict[int, tuple]:
+    """{version: (nombre, checksum, aplicada)} según ESQUEMA_MIGRACION"""
+    cursor.execute("SELECT version, nombre, checksum, aplicada FROM ESQUEMA_MIGRACION ORDER BY version")
+    return {fila[0]: fila[1:] for fila in cursor.fetchall()}
+
+
+def aplicar_migraciones(conexion=None, directorio: str = DIRECTORIO) -> List[Migracion]:
+    """
+    Aplica las migraciones pendientes en orden
+
+    Cada archivo corre en una transacción junto con su registro en
+    ESQUEMA_MIGRACION: si falla, la base queda como estaba antes de ese
+    archivo y no se sigue con los siguientes. (Por eso las migraciones no
+    pueden usar CREATE INDEX CONCURRENTLY.)
+
+    Returns:
+        Migraciones aplicadas en esta ejecución
+
+    Raises:
+        MigracionError: si una migración falla o si un archivo ya aplicado
+            cambió en disco
+    """
+    propia = conexion is None
+    conexion = conexion or conectar()
+    disponibles = listar_migraciones(directorio)
+    nuevas = []
+    try:
+        cursor = conexion.cursor()
+        cursor.execute("SELECT pg_advisory_lock(%s)", (CLAVE_BLOQUEO,))
+        try:
+            _asegurar_tabla(cursor)
+            conexion.commit()
+            aplicadas = migraciones_aplicadas(cursor)
+
+            for migracion in disponibles:
+                if migracion.version in aplicadas:
+                    if aplicadas[migracion.version][1] != migracion.checksum:
+                        raise MigracionError(
+                            f"La migración {migracion.version:04d}_{migracion.nombre} cambió "
+                            f"después de aplicarse; crea una migración nueva en lugar de editarla"
+                        )
+                    continue
+
+                with open(migracion.ruta, encoding='utf-8') as f:
+                    sql = f.read()
+                try:
+                    cursor.execute(sql)
+                    cursor.execute(
+                        "INSERT INTO ESQUEMA_MIGRACION (version, nombre, checksum) VALUES (%s, %s, %s)",
+                        (migracion.version, migracion.nombre, migracion.checksum)
+                    )
+                    conexion.commit()
+                except psycopg2.Error as e:
+                    conexion.rollback()
+                    raise MigracionError(f"Falló {migracion.version:04d}_{migracion.nombre}: {e}") from e
+                print(f"✓ Migración {migracion.version:04d}_{migracion.nombre} aplicada")
+                nuevas.append(migracion)
+        finally:
+            conexion.rollback()
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (CLAVE_BLOQUEO,))
+            conexion.commit()
+            cursor.close()
+    finally:
+        if propia:
+            conexion.close()
+    return nuevas
+
+
+def mostrar_estado(conexion=None, directorio: str = DIRECTORIO):
+    """Imprime qué migraciones están aplicadas y cuáles faltan"""
+    propia = conexion is None
+    conexion = conexion or conectar()
+    try:
+        cursor = conexion.cursor()
+        _asegurar_tabla(cursor)
+        aplicadas = migraciones_aplicadas(cursor)
+        conexion.commit()
+        cursor.close()
+    finally:
+        if propia:
+            conexion.close()
+
+    for migracion in listar_migraciones(directorio):
+        registro = aplicadas.get(migracion.version)
+        if registro is None:
+            print(f"  ⚠ {migracion.version:04d}_{migracion.nombre:<40} pendiente")
+        elif registro[1] != migracion.checksum:
+            print(f"  ✗ {migracion.version:04d}_{migracion.nombre:<40} modificada después de aplicarse")
+        else:
+            print(f"  ✓ {migracion.version:04d}_{migracion.nombre:<40} {registro[2]:%Y-%m-%d %H:%M}")
+
+
+# ----------------------------------------------------------------------
+# Verificación de planes
+# ----------------------------------------------------------------------
+
+# Consultas frecuentes de Menu (las mismas constantes que usa
+# modelo_restaurante.py), los parámetros de ejemplo con que se explican y los
+# índices que debe usar cada tabla filtrada. Si una de estas tablas aparece en
+# el plan con Seq Scan, o con un índice que no está en la lista, falla.
+CONSULTAS_CRITICAS = [
+    {
+        'nombre': 'menu_del_dia',
+        'sql': CONSULTA_MENU_DEL_DIA,
+        'params': ('dia',),
+        'indices': {'menu_producto': {'idx_menu_producto_dia_activo'}},
+    },
+    {
+        'nombre': 'productos_en_menu_dia',
+        'sql': CONSULTA_PRODUCTOS_EN_MENU_DIA,
+        'params': ('dia',),
+        'indices': {'menu_producto': {'idx_menu_producto_dia_activo'}},
+    },
+    {
+        'nombre': 'excepciones_activas',
+        'sql': CONSULTA_EXCEPCIONES_ACTIVAS,
+        'params': ('fecha', 'fecha'),
+        'indices': {'menu_excepcion': {'idx_menu_excepcion_vigente'}},
+    },
+    {
+        'nombre': 'productos_con_descuento',
+        'sql': CONSULTA_PRODUCTOS_CON_DESCUENTO,
+        'params': ('fecha',),
+        'indices': {'precio_efectivo': {'idx_precio_efectivo_fecha'}},
+    },
+    {
+        'nombre': 'productos_con_descuento_excepcion',
+        'sql': CONSULTA_PRODUCTOS_CON_DESCUENTO_EXCEPCION,
+        'params': ('excepcion', 'fecha', 'fecha'),
+        'indices': {
+            'menu_excepcion': {'menu_excepcion_pkey'},
+            'excepcion_producto': {'excepcion_producto_idexcepcion_idproducto_key',
+                                   'idx_excepcion_producto_producto'},
+        },
+    },
+    {
+        'nombre': 'precios_productos',
+        'sql': CONSULTA_PRECIOS_PRODUCTOS,
+        'params': ('fecha', 'ids'),
+        'indices': {
+            'precio_efectivo': {'precio_efectivo_pkey'},
+            'menu_producto': {'menu_producto_idproducto_idtipo_iddiamenu_key'},
+        },
+    },
+    {
+        # Lo que hace refrescar_precio_efectivo (DB.sql) al cambiar una promoción
+        'nombre': 'refrescar_precio_efectivo',
+        'sql': """
+            SELECT ep.idProducto, me.descuento_porcentaje, me.fecha_inicio, me.fecha_fin
+            FROM EXCEPCION_PRODUCTO ep
+            JOIN MENU_EXCEPCION me ON me.idExcepcion = ep.idExcepcion
+            WHERE ep.idProducto = ANY(%s)
+              AND me.activo = TRUE
+        """,
+        'params': ('ids',),
+        'indices': {
+            'excepcion_producto': {'idx_excepcion_producto_producto'},
+            'menu_excepcion': {'idx_menu_excepcion_vigente', 'menu_excepcion_pkey'},
+        },
+    },
+]
+
+
+def _nodos(plan: dict):
+    yield plan
+    for hijo in plan.get('Plans', ()):
+        yield from _nodos(hijo)
+
+
+def _lecturas(plan: dict):
+    """(tabla, tipo de nodo, índice) por cada lectura de tabla del plan"""
+    for nodo in _nodos(plan):
+        tabla = nodo.get('Relation Name')
+        if tabla is None:
+            continue
+        if nodo['Node Type'] == 'Bitmap Heap Scan':
+            # El índice está en los Bitmap Index Scan hijos (uno por índice combinado)
+            for hijo in _nodos(nodo):
+                if hijo['Node Type'] == 'Bitmap Index Scan':
+                    yield tabla, nodo['Node Type'], hijo['Index Name']
+        else:
+            yield tabla, nodo['Node Type'], nodo.get('Index Name')
+
+
+def verificar_planes(conexion=None, consultas: List[dict] = None) -> List[str]:
+    """
+    Ejecuta EXPLAIN sobre las consultas críticas y revisa cómo se lee cada tabla
+
+    Con los datos de ejemplo las tablas son tan chicas que PostgreSQL prefiere
+    leerlas enteras, así que el EXPLAIN se hace con enable_seqscan = off: el
+    planificador igual usa Seq Scan si no existe ningún índice aplicable, que
+    es justo la regresión que se quiere detectar.
+
+    Returns:
+        Lista de fallos (vacía si todas las consultas usan sus índices)
+    """
+    propia = conexion is None
+    conexion = conexion or conectar()
+    parametros = {
+        'dia': datetime.now().isoweekday(),
+        'fecha': datetime.now().strftime('%Y-%m-%d'),
+        'excepcion': 1,
+        'ids': ['PROD2025CaféAmericano', 'PROD2025PizzaMargherita'],
+    }
+    fallos = []
+    try:
+        cursor = conexion.cursor()
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        for consulta in consultas or CONSULTAS_CRITICAS:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + consulta['sql'],
+                           tuple(parametros[nombre] for nombre in consulta['params']))
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            for tabla, tipo, indice in _lecturas(plan[0]['Plan']):
+                esperados = consulta['indices'].get(tabla)
+                if esperados is None:
+                    continue
+                if tipo == 'Seq Scan':
+                    fallos.append(f"{consulta['nombre']}: Seq Scan sobre {tabla}")
+                elif indice not in esperados:
+                    fallos.append(f"{consulta['nombre']}: {tabla} usa {indice} "
+                                  f"(se esperaba {', '.join(sorted(esperados))})")
+        cursor.close()
+    finally:
+        conexion.rollback()
+        if propia:
+            conexion.close()
+    return fallos
+
+
+def main():
+    accion = sys.argv[1] if len(sys.argv) > 1 else 'aplicar'
+
+    try:
+        if accion == 'estado':
+            mostrar_estado()
+        elif accion == 'aplicar':
+            nuevas = aplicar_migraciones()
+            if not nuevas:
+                print("✓ El esquema ya está al día")
+        elif accion == 'verificar':
+            fallos = verificar_planes()
+            for fallo in fallos:
+                print(f"✗ {fallo}")
+            if fallos:
+                sys.exit(1)
+            print(f"✓ {len(CONSULTAS_CRITICAS)} consultas críticas usan sus índices")
+        else:
+            print(__doc__)
+            sys.exit(2)
+    except (MigracionError, psycopg2.Error) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
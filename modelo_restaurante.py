@@ -3,9 +3,169 @@ modelo_restaurante.py - Clases de modelo de datos para el sistema POS de restaur
 """
 
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, Any, Iterator
+import threading
+import time
 import uuid
-from conexionDB import db_manager
+from conexionDB import db_manager, registro_para, CursorCatalogo
+from espejo_local import espejo_local, ERRORES_CONEXION
+from instantanea_catalogo import InstantaneaCatalogo, escribir_instantanea, firma
+from plantilla_factura import PLANTILLA_FACTURA
+
+
+def _consultar(nombre: str, query: str, params: tuple = (), registros: bool = False) -> List[tuple]:
+    """
+    Ejecuta una consulta fija del modelo como sentencia preparada
+
+    La primera llamada la registra en db_manager; cada conexión del pool la
+    prepara una vez y las siguientes ejecuciones se saltan el parseo.
+    Con registros=True las filas son Registro y los NUMERIC llegan como
+    float (CursorCatalogo, ver conexionDB).
+    """
+    db_manager.preparar(nombre, query)
+    return db_manager.ejecutar_preparada(nombre, params,
+                                         cursor_factory=CursorCatalogo if registros else None)
+
+
+# Último día en que se corrió el horizonte de PRECIO_EFECTIVO desde este proceso
+_precio_efectivo_extendido: Optional[str] = None
+
+
+def _extender_precio_efectivo(fecha_hoy: str):
+    """
+    Corre el horizonte de PRECIO_EFECTIVO una vez por día (ver
+    extender_precio_efectivo en DB.sql) antes de leer precios.
+
+    Los errores de conexión se propagan para que con_respaldo use la copia
+    local; cualquier otro (p. ej. migración 0006 sin aplicar) se avisa y no
+    se reintenta hasta el día siguiente.
+    """
+    global _precio_efectivo_extendido
+    if _precio_efectivo_extendido == fecha_hoy:
+        return
+    try:
+        db_manager.ejecutar_query("SELECT extender_precio_efectivo()", fetch=False)
+    except ERRORES_CONEXION:
+        raise
+    except Exception as e:
+        print(f"⚠ No se pudo extender PRECIO_EFECTIVO: {e}")
+    _precio_efectivo_extendido = fecha_hoy
+
+
+# Filas que el modelo entrega a la interfaz: se leen por nombre como los
+# diccionarios de antes (producto['nombre'], .get()) pero son tuplas. Las
+# consultas usan alias con estos nombres, así el cursor ya las arma con la
+# misma clase; las filas de la copia local se convierten con .convertir()
+RegistroProducto = registro_para(['id_producto', 'nombre', 'precio', 'imagen', 'descripcion'])
+RegistroMenuAsignado = registro_para(['id_producto', 'nombre', 'precio', 'tipo'])
+RegistroMenuDia = registro_para(['id_producto', 'nombre', 'precio', 'descripcion', 'tipo', 'id_tipo'])
+RegistroDescuento = registro_para(['id_producto', 'nombre', 'precio_original', 'precio_especial',
+                                   'descuento', 'promocion', 'tipo'])
+
+
+# Consultas fijas del catálogo. migraciones.py (verificar) hace EXPLAIN de
+# estas mismas constantes, así el plan que se revisa es el de la aplicación.
+_MENU_DEL_DIA = """
+    SELECT DISTINCT p.idProducto AS id_producto, p.nombre, p.precio, p.descripcion,
+           tc.nombre AS tipo, tc.idTipo AS id_tipo
+    FROM PRODUCTO p
+    INNER JOIN MENU_PRODUCTO mp ON p.idProducto = mp.idProducto
+    INNER JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
+    WHERE mp.idDiaMenu = %s AND mp.activo = TRUE
+"""
+CONSULTA_MENU_DEL_DIA = _MENU_DEL_DIA + " ORDER BY tc.idTipo, p.nombre"
+CONSULTA_MENU_DEL_DIA_TIPO = _MENU_DEL_DIA + " AND tc.nombre = %s ORDER BY tc.idTipo, p.nombre"
+
+CONSULTA_PRODUCTOS_EN_MENU_DIA = """
+    SELECT p.idProducto AS id_producto, p.nombre, p.precio, tc.nombre AS tipo
+    FROM MENU_PRODUCTO mp
+    JOIN PRODUCTO p ON mp.idProducto = p.idProducto
+    JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
+    WHERE mp.idDiaMenu = %s AND mp.activo = TRUE
+    ORDER BY tc.idTipo, p.nombre
+"""
+
+CONSULTA_EXCEPCIONES_ACTIVAS = """
+    SELECT idExcepcion, nombre, descripcion, descuento_porcentaje
+    FROM MENU_EXCEPCION
+    WHERE activo = TRUE
+      AND fecha_inicio <= %s
+      AND fecha_fin >= %s
+    ORDER BY descuento_porcentaje DESC
+"""
+
+# Promoción que se aplica hoy a cada producto (params: fecha)
+CONSULTA_PRODUCTOS_CON_DESCUENTO = """
+    SELECT p.idProducto AS id_producto, p.nombre, p.precio AS precio_original,
+           pe.precio_final AS precio_especial, pe.descuento_porcentaje AS descuento,
+           pe.promocion, COALESCE(NULLIF(tc.nombre, ''), 'General') AS tipo
+    FROM PRECIO_EFECTIVO pe
+    INNER JOIN PRODUCTO p ON p.idProducto = pe.idProducto
+    LEFT JOIN MENU_PRODUCTO mp ON p.idProducto = mp.idProducto
+    LEFT JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
+    WHERE pe.fecha = %s
+    GROUP BY p.idProducto, p.nombre, p.precio, pe.precio_final,
+             pe.descuento_porcentaje, pe.promocion, tc.nombre
+    ORDER BY pe.descuento_porcentaje DESC, p.nombre
+"""
+
+# Todos los productos de una promoción (params: idExcepcion, fecha, fecha)
+CONSULTA_PRODUCTOS_CON_DESCUENTO_EXCEPCION = """
+    SELECT p.idProducto AS id_producto, p.nombre, p.precio AS precio_original,
+           COALESCE(ep.precio_especial,
+                    ROUND(p.precio * (100 - COALESCE(me.descuento_porcentaje, 0)) / 100, 2))
+               AS precio_especial,
+           me.descuento_porcentaje AS descuento, me.nombre AS promocion,
+           COALESCE(NULLIF(tc.nombre, ''), 'General') AS tipo
+    FROM EXCEPCION_PRODUCTO ep
+    INNER JOIN MENU_EXCEPCION me ON ep.idExcepcion = me.idExcepcion
+    INNER JOIN PRODUCTO p ON p.idProducto = ep.idProducto
+    LEFT JOIN MENU_PRODUCTO mp ON p.idProducto = mp.idProducto
+    LEFT JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
+    WHERE me.idExcepcion = %s
+      AND me.activo = TRUE
+      AND me.fecha_inicio <= %s
+      AND me.fecha_fin >= %s
+    GROUP BY p.idProducto, p.nombre, p.precio, ep.precio_especial,
+             me.descuento_porcentaje, me.nombre, tc.nombre
+    ORDER BY p.nombre
+"""
+
+# Precio de hoy de varios productos (params: fecha, lista de ids)
+CONSULTA_PRECIOS_PRODUCTOS = """
+    SELECT p.idProducto, p.precio, pe.precio_final,
+           pe.descuento_porcentaje, pe.promocion, tipo.nombre
+    FROM PRODUCTO p
+    LEFT JOIN PRECIO_EFECTIVO pe
+           ON pe.idProducto = p.idProducto AND pe.fecha = %s
+    LEFT JOIN LATERAL (
+        SELECT tc.nombre
+        FROM MENU_PRODUCTO mp
+        JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
+        WHERE mp.idProducto = p.idProducto
+        ORDER BY tc.idTipo
+        LIMIT 1
+    ) tipo ON TRUE
+    WHERE p.idProducto = ANY(%s)
+"""
+
+
+def exportar_productos_csv(archivo, itersize: int = 2000) -> int:
+    """
+    Catálogo en CSV con un cursor del servidor (memoria constante)
+    
+    No necesita una instancia de Menu (ver exportar.py); Menu.exportar_productos_csv
+    delega aquí.
+    
+    Returns:
+        Número de productos exportados
+    """
+    query = """
+        SELECT idProducto, nombre, precio, imagen, descripcion
+        FROM PRODUCTO
+        ORDER BY nombre, idProducto
+    """
+    return db_manager.exportar_csv(query, archivo, list(RegistroProducto._campos), itersize=itersize)
 
 
 class MenuItem:
@@ -99,42 +259,41 @@ class Factura:
     
     def generar_texto(self, nombre_negocio: str = "RESTAURANTE", nit: str = "123456789") -> str:
         """Genera factura en formato de texto"""
-        
-        texto = []
-        texto.append("=" * 50)
-        texto.append(nombre_negocio.center(50))
-        texto.append("=" * 50)
-        texto.append("")
-        texto.append(f"NIT: {nit}")
-        texto.append(f"FACTURA Nº: {self.numero}")
-        texto.append(f"FECHA: {self.fecha.strftime('%d/%m/%Y %H:%M:%S')}")
-        texto.append("")
-        texto.append("-" * 50)
-        texto.append("DESCRIPCIÓN                      CANT   PRECIO    TOTAL")
-        texto.append("-" * 50)
-        
-        # Items
-        for linea in self.pedido.lineas:
-            nombre = linea.menu_item.nombre[:30]
-            cantidad = linea.cantidad
-            precio = linea.menu_item.precio
-            total = linea.subtotal
-            
-            texto.append(f"{nombre:<30} {cantidad:>4} ${precio:>8.2f} ${total:>8.2f}")
-        
-        texto.append("-" * 50)
-        texto.append(f"SUBTOTAL: {'':>36} ${self.pedido.subtotal:>8.2f}")
-        texto.append(f"IVA 19%:  {'':>36} ${self.pedido.impuesto:>8.2f}")
-        texto.append("=" * 50)
-        texto.append(f"TOTAL:    {'':>36} ${self.pedido.total:>8.2f}")
-        texto.append("=" * 50)
-        texto.append("")
-        texto.append(f"FORMA DE PAGO: {self.forma_pago}")
-        texto.append("")
-        texto.append("¡GRACIAS POR SU COMPRA!".center(50))
-        texto.append("")
-        
-        return "\n".join(texto)
+        return PLANTILLA_FACTURA.texto(*self._datos_plantilla(nombre_negocio, nit))
+    
+    def generar_escpos(self, nombre_negocio: str = "RESTAURANTE", nit: str = "123456789") -> bytes:
+        """Genera factura como flujo ESC/POS para impresoras térmicas"""
+        return PLANTILLA_FACTURA.escpos(*self._datos_plantilla(nombre_negocio, nit))
+    
+    def generar_pdf(self, nombre_negocio: str = "RESTAURANTE", nit: str = "123456789",
+                    papel: str = 'A4') -> bytes:
+        """Genera factura en PDF"""
+        return PLANTILLA_FACTURA.pdf(*self._datos_plantilla(nombre_negocio, nit), papel=papel)
+    
+    def _datos_plantilla(self, nombre_negocio: str, nit: str):
+        """Campos de la plantilla de factura: (datos, items)"""
+        subtotal = self.pedido.subtotal
+        impuesto = subtotal * 0.19
+        datos = {
+            'negocio': nombre_negocio.center(50),
+            'nit': nit,
+            'numero': self.numero,
+            'fecha': self.fecha.strftime('%d/%m/%Y %H:%M:%S'),
+            'subtotal': subtotal,
+            'impuesto': impuesto,
+            'total': subtotal + impuesto,
+            'forma_pago': self.forma_pago,
+        }
+        items = [
+            {
+                'nombre': linea.menu_item.nombre,
+                'cantidad': linea.cantidad,
+                'precio': linea.menu_item.precio,
+                'total': linea.subtotal,
+            }
+            for linea in self.pedido.lineas
+        ]
+        return datos, items
     
     def guardar_factura(self, ruta: str = "/tmp/factura.txt") -> bool:
         """Guardar factura a archivo"""
@@ -150,39 +309,389 @@ class Factura:
         return f"Factura #{self.numero} - Total: ${self.pedido.total:.2f}"
 
 
+class CacheCatalogo:
+    """
+    Caché en memoria del catálogo (productos, tipos, menús del día y promociones).
+    
+    Cada entidad tiene su propio TTL. Además, los triggers de la base de datos
+    emiten NOTIFY en el canal `catalogo_cambios` con el nombre de la tabla
+    modificada, y solo se invalidan las entidades que dependen de esa tabla.
+    Los valores cacheados se comparten entre llamadas: no deben modificarse.
+    """
+    
+    CANAL = "catalogo_cambios"
+    
+    # Segundos de vida por entidad (respaldo si no llegan notificaciones)
+    TTL = {
+        'productos': 300,
+        'tipos': 3600,
+        'menu_dia': 300,
+        'promociones': 120,
+        'tipos_producto': 600,
+    }
+    
+    # Tabla modificada -> entidades a invalidar
+    DEPENDENCIAS = {
+        'producto': ('productos', 'menu_dia', 'promociones', 'tipos_producto'),
+        'menu_producto': ('menu_dia', 'promociones', 'tipos_producto'),
+        'menu_excepcion': ('promociones',),
+        'excepcion_producto': ('promociones',),
+        'tipo_comida': ('tipos', 'menu_dia', 'promociones', 'tipos_producto'),
+    }
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # entidad -> {clave: (valor, expira_en)}
+        self._datos: Dict[str, Dict[Any, tuple]] = {entidad: {} for entidad in self.TTL}
+        self._aciertos = {entidad: 0 for entidad in self.TTL}
+        self._fallos = {entidad: 0 for entidad in self.TTL}
+        # Cambia con cada invalidación: una carga iniciada antes no se guarda
+        self._generacion = {entidad: 0 for entidad in self.TTL}
+        self._invalidaciones = 0
+        self._escucha = None
+        self._oyentes: List[Callable[[Optional[str]], None]] = []
+    
+    def obtener(self, entidad: str, clave, cargar: Callable[[], Any]):
+        """
+        Retorna el valor cacheado o lo carga con `cargar()` si no existe o expiró.
+        Las excepciones de `cargar` se propagan y no se cachea nada.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos[entidad].get(clave)
+            if entrada is not None and entrada[1] > ahora:
+                self._aciertos[entidad] += 1
+                return entrada[0]
+            self._fallos[entidad] += 1
+            generacion = self._generacion[entidad]
+        
+        valor = cargar()
+        self.guardar(entidad, clave, valor, generacion)
+        return valor
+    
+    def guardar(self, entidad: str, clave, valor, generacion: int = None):
+        """
+        Guarda un valor ya calculado. Si se indica `generacion` y la entidad fue
+        invalidada desde entonces, el valor se descarta por estar desactualizado.
+        """
+        with self._lock:
+            if generacion is not None and generacion != self._generacion[entidad]:
+                return
+            self._datos[entidad][clave] = (valor, time.monotonic() + self.TTL[entidad])
+    
+    def obtener_varios(self, entidad: str, claves: List, cargar_faltantes: Callable[[List], Dict]) -> Dict:
+        """
+        Versión por lotes de obtener(): las claves que no están en caché se
+        cargan con una sola llamada a `cargar_faltantes(claves)`, que debe
+        retornar un dict clave -> valor.
+        """
+        ahora = time.monotonic()
+        resultado = {}
+        faltantes = []
+        with self._lock:
+            datos = self._datos[entidad]
+            for clave in claves:
+                entrada = datos.get(clave)
+                if entrada is not None and entrada[1] > ahora:
+                    resultado[clave] = entrada[0]
+                else:
+                    faltantes.append(clave)
+            self._aciertos[entidad] += len(resultado)
+            self._fallos[entidad] += len(faltantes)
+            generacion = self._generacion[entidad]
+        
+        if faltantes:
+            cargados = cargar_faltantes(faltantes)
+            expira = time.monotonic() + self.TTL[entidad]
+            with self._lock:
+                if generacion == self._generacion[entidad]:
+                    for clave, valor in cargados.items():
+                        self._datos[entidad][clave] = (valor, expira)
+            resultado.update(cargados)
+        return resultado
+    
+    def generacion(self, entidad: str) -> int:
+        """Generación actual de la entidad (para usar con guardar())"""
+        with self._lock:
+            return self._generacion[entidad]
+    
+    def invalidar(self, *entidades: str):
+        """Descarta las entidades indicadas (todas si no se indica ninguna)"""
+        with self._lock:
+            for entidad in entidades or tuple(self._datos):
+                self._datos[entidad].clear()
+                self._generacion[entidad] += 1
+            self._invalidaciones += 1
+    
+    def agregar_oyente(self, callback: Callable[[Optional[str]], None]):
+        """Registra otra función que recibe cada aviso de cambio (tabla o None)"""
+        self._oyentes.append(callback)
+    
+    def _al_notificar(self, tabla: Optional[str]):
+        """Callback de LISTEN: None significa (re)conexión, invalidar todo"""
+        for oyente in self._oyentes:
+            oyente(tabla)
+        if tabla is None:
+            self.invalidar()
+            return
+        entidades = self.DEPENDENCIAS.get(tabla.lower())
+        if entidades:
+            self.invalidar(*entidades)
+    
+    def activar_invalidacion(self):
+        """Inicia (una sola vez) la escucha de notificaciones de la base de datos"""
+        with self._lock:
+            if self._escucha is not None:
+                return
+            try:
+                self._escucha = db_manager.escuchar(self.CANAL, self._al_notificar)
+            except Exception as e:
+                print(f"⚠ Invalidación por NOTIFY no disponible, solo TTL: {e}")
+    
+    def estadisticas(self) -> Dict:
+        """Aciertos y fallos por entidad, para verificar el uso de la caché"""
+        with self._lock:
+            return {
+                'aciertos': sum(self._aciertos.values()),
+                'fallos': sum(self._fallos.values()),
+                'invalidaciones': self._invalidaciones,
+                'escuchando': bool(self._escucha and self._escucha.conectado.is_set()),
+                'por_entidad': {
+                    entidad: {'aciertos': self._aciertos[entidad], 'fallos': self._fallos[entidad],
+                              'entradas': len(self._datos[entidad])}
+                    for entidad in self._datos
+                },
+            }
+
+
+class IndiceTipos:
+    """
+    Índice en memoria producto -> tipo de comida.
+    
+    Se carga completo con una sola consulta y se guarda en la caché del
+    catálogo (entidad `tipos_producto`). Las escrituras locales no lo
+    invalidan: marcan los productos afectados y en el siguiente acceso se
+    consultan solo esos. Un NOTIFY de otra terminal sí lo recarga completo.
+    Si un producto tiene varios tipos se usa el de menor idTipo.
+    """
+    
+    ENTIDAD = 'tipos_producto'
+    
+    QUERY = """
+        SELECT DISTINCT ON (mp.idProducto) mp.idProducto, tc.nombre
+        FROM MENU_PRODUCTO mp
+        JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
+    """
+    
+    def __init__(self, cache: CacheCatalogo):
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._pendientes = set()
+    
+    def obtener(self) -> Dict[str, str]:
+        """Retorna el índice completo (no modificar el dict retornado)"""
+        indice = self._cache.obtener(self.ENTIDAD, 'indice', self._cargar_todo)
+        
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, set()
+        if not pendientes:
+            return indice
+        
+        generacion = self._cache.generacion(self.ENTIDAD)
+        try:
+            filas = _consultar(
+                'indice_tipos_productos',
+                self.QUERY + " WHERE mp.idProducto = ANY(%s) ORDER BY mp.idProducto, tc.idTipo",
+                (list(pendientes),)
+            )
+        except Exception as e:
+            with self._lock:
+                self._pendientes |= pendientes
+            if isinstance(e, ERRORES_CONEXION):
+                # Sin servidor: el índice anterior sigue siendo la mejor respuesta
+                return indice
+            raise
+        
+        # Copia nueva: quien ya tiene el índice anterior no lo ve cambiar
+        indice = {id_producto: tipo for id_producto, tipo in indice.items()
+                  if id_producto not in pendientes}
+        indice.update(filas or [])
+        self._cache.guardar(self.ENTIDAD, 'indice', indice, generacion)
+        return indice
+    
+    def marcar(self, *ids_productos: str):
+        """Marca productos cuyo tipo cambió para refrescarlos en el próximo acceso"""
+        with self._lock:
+            self._pendientes.update(ids_productos)
+    
+    def _cargar_todo(self) -> Dict[str, str]:
+        with self._lock:
+            self._pendientes.clear()
+        filas = espejo_local.con_respaldo(
+            lambda: _consultar('indice_tipos', self.QUERY + " ORDER BY mp.idProducto, tc.idTipo"),
+            espejo_local.indice_tipos
+        )
+        return dict(filas or [])
+
+
+# Caché compartida por todas las instancias de Menu
+cache_catalogo = CacheCatalogo()
+indice_tipos = IndiceTipos(cache_catalogo)
+# Los mismos avisos refrescan la copia local del catálogo
+cache_catalogo.agregar_oyente(espejo_local.marcar)
+
+
 class Menu:
     """Almacena y gestiona los items del menú desde la base de datos"""
     
-    def __init__(self):
+    AVISO_CATALOGO_VACIO = "El catálogo está vacío: agrega productos en la pestaña Productos."
+    
+    def __init__(self, revalidar: bool = True):
+        """
+        Args:
+            revalidar: Si el catálogo sale de la instantánea en disco,
+                compararlo con la BD en un hilo y actualizarlo si cambió
+        """
         self.items: Dict[str, MenuItem] = {}
-        self._cargar_menu_desde_db()
+        # Aumenta cada vez que la revalidación reemplaza self.items
+        self.version_catalogo = 0
+        self._firma_instantanea = None
+        # Mensaje para el usuario cuando el catálogo quedó vacío al arrancar
+        self.aviso_catalogo: Optional[str] = None
+        self.cache = cache_catalogo
+        self.indice_tipos = indice_tipos
+        espejo_local.iniciar()
+        self.cache.activar_invalidacion()
+        
+        # Arranque en caliente: el último catálogo guardado, sin esperar a la BD
+        if self._cargar_menu_desde_instantanea():
+            if revalidar:
+                threading.Thread(target=self.revalidar_catalogo, name="revalidar-catalogo",
+                                 daemon=True).start()
+        else:
+            self._cargar_menu_desde_db()
+    
+    def _cargar_menu_desde_instantanea(self) -> bool:
+        """Carga el catálogo desde la instantánea en disco (False si no hay una válida)"""
+        instantanea = InstantaneaCatalogo.abrir()
+        if instantanea is None:
+            return False
+        try:
+            self.items = {id_producto: MenuItem(id_producto, nombre, precio, categoria, descripcion)
+                          for id_producto, nombre, precio, categoria, descripcion in instantanea}
+            self._firma_instantanea = instantanea.firma
+        finally:
+            instantanea.cerrar()
+        print(f"✓ Cargados {len(self.items)} productos desde la instantánea del catálogo")
+        return bool(self.items)
+    
+    def _consultar_catalogo(self) -> Dict[str, MenuItem]:
+        """Consulta todos los productos (copia local si no hay conexión)"""
+        query = """
+            SELECT idProducto, nombre, precio, descripcion
+            FROM PRODUCTO
+            ORDER BY nombre, idProducto
+        """
+        productos = espejo_local.con_respaldo(
+            lambda: _consultar('catalogo', query),
+            lambda: [(p[0], p[1], p[2], p[4]) for p in espejo_local.productos()]
+        )
+        
+        items = {}
+        for id_producto, nombre, precio, descripcion in productos or []:
+            # Determinar categoría basada en el tipo de producto
+            categoria = self._obtener_categoria_por_nombre(nombre)
+            items[id_producto] = MenuItem(id_producto, nombre, float(precio), categoria, descripcion)
+        return items
+    
+    @staticmethod
+    def _registros_instantanea(items: Dict[str, MenuItem]) -> List[tuple]:
+        return [(item.id, item.nombre, item.precio, item.categoria, item.descripcion)
+                for item in items.values()]
+    
+    def _guardar_instantanea(self):
+        """Guarda el catálogo actual para el próximo arranque"""
+        try:
+            self._firma_instantanea = escribir_instantanea(self._registros_instantanea(self.items))
+        except (OSError, ValueError) as e:
+            print(f"⚠ No se pudo guardar la instantánea del catálogo: {e}")
     
     def _cargar_menu_desde_db(self):
-        """Carga el menú desde la base de datos PostgreSQL"""
+        """
+        Carga el menú desde la base de datos PostgreSQL
+        
+        Si no hay productos, o no se pueden leer ni de la BD ni de la copia
+        local, el catálogo queda vacío y aviso_catalogo explica por qué.
+        """
         try:
-            # Obtener todos los productos de la base de datos
-            query = """
-                SELECT idProducto, nombre, precio, descripcion
-                FROM PRODUCTO
-                ORDER BY nombre
-            """
-            productos = db_manager.ejecutar_query(query, fetch=True)
-            
-            if productos:
-                for producto in productos:
-                    id_producto, nombre, precio, descripcion = producto
-                    # Determinar categoría basada en el tipo de producto
-                    categoria = self._obtener_categoria_por_nombre(nombre)
-                    item = MenuItem(id_producto, nombre, float(precio), categoria, descripcion)
-                    self.items[id_producto] = item
-                print(f"✓ Cargados {len(self.items)} productos desde la base de datos")
-            else:
-                print("⚠ No se encontraron productos en la base de datos")
-                self._cargar_menu_ejemplo()
+            items = self._consultar_catalogo()
         except Exception as e:
             print(f"✗ Error al cargar menú desde BD: {e}")
-            print("  Cargando menú de ejemplo...")
-            self._cargar_menu_ejemplo()
+            self.aviso_catalogo = ("No se pudo cargar el catálogo: no hay conexión con la base de datos "
+                                   "ni copia local. Revisa la conexión y vuelve a abrir la aplicación.")
+            return
+        
+        if items:
+            self.items = items
+            origen = "la copia local" if espejo_local.conectado is False else "la base de datos"
+            print(f"✓ Cargados {len(self.items)} productos desde {origen}")
+            self._guardar_instantanea()
+        else:
+            print("⚠ No se encontraron productos en la base de datos")
+            self.aviso_catalogo = self.AVISO_CATALOGO_VACIO
+    
+    def revalidar_catalogo(self) -> bool:
+        """
+        Compara el catálogo cargado con la BD y lo reemplaza si cambió
+        
+        Se puede llamar desde otro hilo: self.items se reemplaza de una vez,
+        nunca se modifica a medias.
+        
+        Returns:
+            True si el catálogo cambió
+        """
+        try:
+            items = self._consultar_catalogo()
+        except Exception as e:
+            print(f"⚠ No se pudo revalidar el catálogo: {e}")
+            return False
+        if not items:
+            return False
+        
+        if firma(self._registros_instantanea(items)) == self._firma_instantanea:
+            print("✓ Catálogo al día con la base de datos")
+            return False
+        
+        self._reemplazar_catalogo(items)
+        print(f"✓ Catálogo actualizado desde la base de datos ({len(items)} productos)")
+        return True
+    
+    def recargar_catalogo(self) -> bool:
+        """
+        Vuelve a leer el catálogo después de crear, editar o eliminar productos
+        
+        A diferencia de revalidar_catalogo, siempre reemplaza self.items,
+        aunque la BD ya no tenga productos (así no queda a la venta uno
+        eliminado), y actualiza aviso_catalogo. Se puede llamar desde otro hilo.
+        
+        Returns:
+            True si se pudo leer el catálogo
+        """
+        try:
+            items = self._consultar_catalogo()
+        except Exception as e:
+            print(f"⚠ No se pudo recargar el catálogo: {e}")
+            return False
+        self._reemplazar_catalogo(items)
+        print(f"✓ Catálogo recargado ({len(items)} productos)")
+        return True
+    
+    def _reemplazar_catalogo(self, items: Dict[str, MenuItem]):
+        """Reemplaza self.items de una vez y guarda la instantánea"""
+        self.items = items
+        self.aviso_catalogo = None if items else self.AVISO_CATALOGO_VACIO
+        self.version_catalogo += 1
+        self._guardar_instantanea()
     
     def _obtener_categoria_por_nombre(self, nombre: str) -> str:
         """Determina la categoría del producto basándose en su nombre"""
@@ -202,106 +711,6 @@ class Menu:
         else:
             return "Platos Principales"
     
-    def _cargar_menu_ejemplo(self):
-        """Carga un menú completo de restaurante premium (fallback)"""
-        items_ejemplo = [
-            # ENTRADAS
-            MenuItem("1", "Bruschetta Italiana", 15000, "Entradas", "Pan tostado con tomate, albahaca y mozzarella"),
-            MenuItem("2", "Aros de Cebolla", 12000, "Entradas", "Crujientes aros de cebolla con salsa BBQ"),
-            MenuItem("3", "Tabla de Quesos", 25000, "Entradas", "Selección de quesos nacionales e importados"),
-            MenuItem("4", "Alitas Buffalo", 18000, "Entradas", "8 alitas picantes con salsa ranch"),
-            MenuItem("5", "Nachos Supremos", 20000, "Entradas", "Con guacamole, pico de gallo y queso derretido"),
-            MenuItem("49", "Tabla de Embutidos", 28000, "Entradas", "Jamón serrano, salami y quesos variados"),
-            MenuItem("50", "Camarones al Ajillo", 22000, "Entradas", "Camarones frescos con ajo y mantequilla"),
-            MenuItem("51", "Tabla de Crudités", 16000, "Entradas", "Vegetales frescos con dips caseros"),
-            MenuItem("52", "Tabla Mixta Premium", 45000, "Entradas", "Quesos, embutidos, camarones y vegetales"),
-            
-            # PLATOS PRINCIPALES
-            MenuItem("6", "Hamburguesa Gourmet", 28000, "Platos Principales", "Carne angus, queso brie, rúgula y tomate"),
-            MenuItem("7", "Pizza Margherita", 24000, "Platos Principales", "Tomate, mozzarella, albahaca fresca"),
-            MenuItem("8", "Pizza Pepperoni", 26000, "Platos Principales", "Pepperoni, mozzarella y orégano"),
-            MenuItem("9", "Lasaña Boloñesa", 32000, "Platos Principales", "Pasta, carne, bechamel y queso gratinado"),
-            MenuItem("10", "Salmón Grillado", 38000, "Platos Principales", "Con vegetales salteados y arroz"),
-            MenuItem("11", "Churrasco Premium", 45000, "Platos Principales", "500g de carne con papas y ensalada"),
-            MenuItem("12", "Pollo a la Parrilla", 25000, "Platos Principales", "Pechuga marinada con hierbas"),
-            MenuItem("13", "Paella Valenciana", 35000, "Platos Principales", "Arroz con mariscos y pollo"),
-            MenuItem("14", "Pasta Carbonara", 22000, "Platos Principales", "Pasta con bacon, crema y parmesano"),
-            MenuItem("15", "Filete de Pescado", 30000, "Platos Principales", "Con salsa de limón y vegetales"),
-            MenuItem("53", "Steak Argentino", 50000, "Platos Principales", "500g de carne de res premium"),
-            MenuItem("54", "Costillas BBQ", 40000, "Platos Principales", "Costillas a la parrilla con salsa BBQ"),
-            MenuItem("55", "Pechuga Rellena", 32000, "Platos Principales", "Pechuga rellena de jamón y queso"),
-            MenuItem("56", "Camarones a la Criolla", 36000, "Platos Principales", "Camarones en salsa de cebolla y tomate"),
-            MenuItem("57", "Robalo a la Sal", 42000, "Platos Principales", "Pescado entero cocido en sal marina"),
-            MenuItem("58", "Fettuccine Alfredo", 26000, "Platos Principales", "Pasta fresca con salsa de crema y queso"),
-            MenuItem("59", "Ravioles de Ricotta", 28000, "Platos Principales", "Ravioles caseros con salsa boloñesa"),
-            
-            # ENSALADAS
-            MenuItem("16", "Ensalada César", 18000, "Ensaladas", "Lechuga, pollo, crutones y parmesano"),
-            MenuItem("17", "Ensalada Griega", 16000, "Ensaladas", "Tomate, aceitunas, queso feta y orégano"),
-            MenuItem("18", "Ensalada de Salmón", 22000, "Ensaladas", "Mix de verdes con salmón ahumado"),
-            MenuItem("19", "Ensalada Tropical", 15000, "Ensaladas", "Frutas frescas con vinagreta de mango"),
-            MenuItem("60", "Ensalada de Remolacha", 17000, "Ensaladas", "Remolacha, queso de cabra y nueces"),
-            MenuItem("61", "Ensalada de Espinacas", 16000, "Ensaladas", "Espinacas frescas, fresas y almendras"),
-            MenuItem("62", "Ensalada Caprese", 19000, "Ensaladas", "Tomate, mozzarella fresca y albahaca"),
-            
-            # BEBIDAS SIN ALCOHOL
-            MenuItem("20", "Jugo Natural", 8000, "Bebidas", "Naranja, manzana, fresa o mango"),
-            MenuItem("21", "Limonada Natural", 7000, "Bebidas", "Limón fresco con hierbabuena"),
-            MenuItem("22", "Smoothie Tropical", 12000, "Bebidas", "Mango, piña y maracuyá"),
-            MenuItem("23", "Coca-Cola", 5000, "Bebidas", "350ml - Regular o Zero"),
-            MenuItem("24", "Agua con Gas", 4000, "Bebidas", "500ml - San Pellegrino"),
-            MenuItem("25", "Café Americano", 6000, "Bebidas", "Café premium colombiano"),
-            MenuItem("26", "Cappuccino", 8000, "Bebidas", "Espresso con leche vaporizada"),
-            MenuItem("27", "Té Chai Latte", 9000, "Bebidas", "Té especiado con leche y canela"),
-            MenuItem("63", "Batido de Fresa", 10000, "Bebidas", "Fresas frescas con leche y hielo"),
-            MenuItem("64", "Horchata", 6000, "Bebidas", "Bebida tradicional con arroz"),
-            MenuItem("65", "Frappé de Vainilla", 11000, "Bebidas", "Café congelado con crema"),
-            MenuItem("66", "Té Helado", 7000, "Bebidas", "Té refrescante con limón"),
-            
-            # BEBIDAS CON ALCOHOL
-            MenuItem("28", "Cerveza Nacional", 8000, "Bebidas Alcohólicas", "Poker, Águila o Club Colombia"),
-            MenuItem("29", "Cerveza Importada", 12000, "Bebidas Alcohólicas", "Stella Artois, Corona o Heineken"),
-            MenuItem("30", "Vino Tinto", 15000, "Bebidas Alcohólicas", "Copa de vino tinto reserva"),
-            MenuItem("31", "Vino Blanco", 15000, "Bebidas Alcohólicas", "Copa de vino blanco seco"),
-            MenuItem("32", "Mojito Clásico", 18000, "Bebidas Alcohólicas", "Ron, hierbabuena, limón y soda"),
-            MenuItem("33", "Piña Colada", 20000, "Bebidas Alcohólicas", "Ron, piña, coco y hielo"),
-            MenuItem("34", "Margarita", 19000, "Bebidas Alcohólicas", "Tequila, triple sec y limón"),
-            MenuItem("67", "Daiquirí", 18000, "Bebidas Alcohólicas", "Ron blanco, limón y azúcar"),
-            MenuItem("68", "Caipirinha", 16000, "Bebidas Alcohólicas", "Cachaça, limón fresco y azúcar"),
-            MenuItem("69", "Cosmopolitan", 20000, "Bebidas Alcohólicas", "Vodka, naranja y cranberry"),
-            MenuItem("70", "Cuba Libre", 15000, "Bebidas Alcohólicas", "Ron, Coca-Cola y limón"),
-            
-            # POSTRES
-            MenuItem("35", "Tiramisú", 16000, "Postres", "Clásico postre italiano con café"),
-            MenuItem("36", "Cheesecake de Frutos", 14000, "Postres", "Con salsa de frutos rojos"),
-            MenuItem("37", "Brownie con Helado", 12000, "Postres", "Brownie caliente con helado de vainilla"),
-            MenuItem("38", "Flan de Caramelo", 10000, "Postres", "Tradicional flan casero"),
-            MenuItem("39", "Tres Leches", 11000, "Postres", "Torta húmeda con tres leches"),
-            MenuItem("40", "Helado Artesanal", 8000, "Postres", "Vainilla, chocolate o fresa - 2 bolas"),
-            MenuItem("41", "Torta de Chocolate", 13000, "Postres", "Torta húmeda con ganache"),
-            MenuItem("42", "Crème Brûlée", 15000, "Postres", "Crema quemada con azúcar caramelizada"),
-            MenuItem("71", "Mousse de Chocolate", 12000, "Postres", "Mousse ligero y delicioso"),
-            MenuItem("72", "Pavlova", 14000, "Postres", "Merengue crujiente con frutas"),
-            MenuItem("73", "Fresa con Champaña", 18000, "Postres", "Fresas frescas con champaña"),
-            MenuItem("74", "Sorbet de Limón", 9000, "Postres", "Granizado refrescante de limón"),
-            MenuItem("75", "Churros con Chocolate", 11000, "Postres", "Churros recién hechos con chocolate caliente"),
-            
-            # ACOMPAÑAMIENTOS
-            MenuItem("43", "Papas Francesas", 8000, "Acompañamientos", "Papas crujientes con sal de mar"),
-            MenuItem("44", "Papas Rústicas", 9000, "Acompañamientos", "Con romero y ajo"),
-            MenuItem("45", "Arroz Blanco", 6000, "Acompañamientos", "Arroz jazmín cocido"),
-            MenuItem("46", "Vegetales Grillados", 10000, "Acompañamientos", "Mix de vegetales de temporada"),
-            MenuItem("47", "Pan de Ajo", 7000, "Acompañamientos", "Pan tostado con mantequilla y ajo"),
-            MenuItem("48", "Ensalada Mixta", 8000, "Acompañamientos", "Lechuga, tomate y cebolla"),
-            MenuItem("76", "Macarrones con Queso", 9000, "Acompañamientos", "Pasta con queso cheddar"),
-            MenuItem("77", "Puré de Papa", 7000, "Acompañamientos", "Cremoso puré casero"),
-            MenuItem("78", "Papas al Horno", 8000, "Acompañamientos", "Con cáscara, crema agria y cebollín"),
-            MenuItem("79", "Plátano Maduro Frito", 6000, "Acompañamientos", "Plátano caramelizado"),
-            MenuItem("80", "Yuca Frita", 8000, "Acompañamientos", "Yuca crujiente con salsa de ajo"),
-        ]
-        for item in items_ejemplo:
-            self.items[item.id] = item
-    
     def agregar_item(self, nombre: str, precio: float, categoria: str = "General", descripcion: str = ""):
         """Agregar un nuevo item al menú"""
         item_id = str(len(self.items) + 1)
@@ -362,31 +771,37 @@ class Menu:
             timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
             id_producto = f"PROD{timestamp}{nombre[:10].replace(' ', '')}"
             
-            # Obtener el ID del tipo de comida
-            query_tipo = "SELECT idTipo FROM TIPO_COMIDA WHERE nombre = %s"
-            resultado = db_manager.ejecutar_query_uno(query_tipo, (tipo,))
-            
-            if not resultado:
-                print(f"✗ Tipo de comida '{tipo}' no encontrado")
-                return None
-            
-            id_tipo = resultado[0]
-            
-            # Insertar producto
-            query_producto = """
-                INSERT INTO PRODUCTO (idProducto, nombre, precio, imagen, descripcion)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            db_manager.ejecutar_query(query_producto, (id_producto, nombre, precio, imagen, descripcion), fetch=False)
-            
-            # Agregar a todos los días del menú (disponible siempre)
-            query_menu = """
-                INSERT INTO MENU_PRODUCTO (idProducto, idTipo, idDiaMenu, activo)
-                SELECT %s, %s, idDiaMenu, TRUE
-                FROM MENU_DIA
-            """
-            db_manager.ejecutar_query(query_menu, (id_producto, id_tipo), fetch=False)
+            # Todo en una transacción: si falla un paso no queda un producto a medias
+            with db_manager.transaccion() as tx:
+                # Obtener el ID del tipo de comida
+                resultado = tx.consultar_uno("SELECT idTipo FROM TIPO_COMIDA WHERE nombre = %s", (tipo,))
+                
+                if not resultado:
+                    print(f"✗ Tipo de comida '{tipo}' no encontrado")
+                    return None
+                
+                id_tipo = resultado[0]
+                
+                # Insertar producto (el trigger de la BD puede reasignar el ID)
+                query_producto = """
+                    INSERT INTO PRODUCTO (idProducto, nombre, precio, imagen, descripcion)
+                    VALUES (%s, %s, %s, %s, %s)
+                    RETURNING idProducto
+                """
+                id_producto = tx.consultar_uno(query_producto,
+                                               (id_producto, nombre, precio, imagen, descripcion))[0]
+                
+                # Agregar a todos los días del menú (disponible siempre)
+                query_menu = """
+                    INSERT INTO MENU_PRODUCTO (idProducto, idTipo, idDiaMenu, activo)
+                    SELECT %s, %s, idDiaMenu, TRUE
+                    FROM MENU_DIA
+                """
+                tx.ejecutar(query_menu, (id_producto, id_tipo))
             
+            # No esperar al NOTIFY para ver el cambio en esta misma instancia
+            self.cache.invalidar('productos', 'menu_dia', 'promociones')
+            self.indice_tipos.marcar(id_producto)
             print(f"✓ Producto '{nombre}' creado con ID: {id_producto}")
             return id_producto
             
@@ -409,8 +824,14 @@ class Menu:
                 SET nombre = %s, precio = %s, descripcion = %s, imagen = %s
                 WHERE idProducto = %s
             """
-            db_manager.ejecutar_query(query, (nombre, precio, descripcion, imagen, id_producto), fetch=False)
+            with db_manager.transaccion() as tx:
+                filas = tx.ejecutar(query, (nombre, precio, descripcion, imagen, id_producto))
+            
+            if filas == 0:
+                print(f"⚠ Producto {id_producto} no encontrado")
+                return False
             
+            self.cache.invalidar('productos', 'menu_dia', 'promociones')
             print(f"✓ Producto {id_producto} actualizado")
             return True
             
@@ -426,18 +847,18 @@ class Menu:
             True si se eliminó correctamente, False si falla
         """
         try:
-            # Primero eliminar referencias en MENU_PRODUCTO
-            query_menu = "DELETE FROM MENU_PRODUCTO WHERE idProducto = %s"
-            db_manager.ejecutar_query(query_menu, (id_producto,), fetch=False)
-            
-            # Eliminar referencias en EXCEPCION_PRODUCTO si existen
-            query_exc = "DELETE FROM EXCEPCION_PRODUCTO WHERE idProducto = %s"
-            db_manager.ejecutar_query(query_exc, (id_producto,), fetch=False)
-            
-            # Finalmente eliminar el producto
-            query_prod = "DELETE FROM PRODUCTO WHERE idProducto = %s"
-            db_manager.ejecutar_query(query_prod, (id_producto,), fetch=False)
+            with db_manager.transaccion() as tx:
+                # Primero eliminar referencias en MENU_PRODUCTO
+                tx.ejecutar("DELETE FROM MENU_PRODUCTO WHERE idProducto = %s", (id_producto,))
+                
+                # Eliminar referencias en EXCEPCION_PRODUCTO si existen
+                tx.ejecutar("DELETE FROM EXCEPCION_PRODUCTO WHERE idProducto = %s", (id_producto,))
+                
+                # Finalmente eliminar el producto
+                tx.ejecutar("DELETE FROM PRODUCTO WHERE idProducto = %s", (id_producto,))
             
+            self.cache.invalidar('productos', 'menu_dia', 'promociones')
+            self.indice_tipos.marcar(id_producto)
             print(f"✓ Producto {id_producto} eliminado")
             return True
             
@@ -445,37 +866,37 @@ class Menu:
             print(f"✗ Error al eliminar producto: {e}")
             return False
     
+    @staticmethod
+    def clave_producto(producto: Dict) -> tuple:
+        """
+        Clave de orden del catálogo (nombre, id_producto)
+        
+        Es única, así sirve de cursor para la paginación keyset: la página
+        siguiente empieza después de la clave del último producto recibido.
+        """
+        return (producto['nombre'], producto['id_producto'])
+    
     def obtener_todos_productos(self) -> List[Dict]:
         """
-        Obtiene TODOS los productos de la base de datos sin límite
+        Obtiene TODOS los productos de la base de datos
+        
+        La lista completa queda en memoria (y en la caché): crece con el
+        catálogo. Para selectores usar buscar_productos y para recorrer o
+        exportar el catálogo, iterar_productos o exportar_productos_csv.
         
         Returns:
-            Lista de diccionarios con todos los productos
+            Lista de RegistroProducto (acceso como diccionario) con todos los productos
         """
-        try:
-            # Query sin LIMIT para traer TODOS los productos
-            query = """
-                SELECT idProducto, nombre, precio, imagen, descripcion
-                FROM PRODUCTO
-                ORDER BY nombre ASC
-            """
-            productos = db_manager.ejecutar_query(query, fetch=True)
-            
-            resultado = []
-            if productos:
-                print(f"✓ Se obtuvieron {len(productos)} productos de la base de datos")
-                for prod in productos:
-                    resultado.append({
-                        'id_producto': prod[0],
-                        'nombre': prod[1],
-                        'precio': float(prod[2]),
-                        'imagen': prod[3],
-                        'descripcion': prod[4]
-                    })
+        def cargar():
+            resultado = list(self.iterar_productos(1000))
+            if resultado:
+                print(f"✓ Se obtuvieron {len(resultado)} productos de la base de datos")
             else:
                 print("⚠ No se encontraron productos en la base de datos")
-            
             return resultado
+        
+        try:
+            return list(self.cache.obtener('productos', 'todos', cargar))
             
         except Exception as e:
             print(f"✗ Error al obtener productos: {e}")
@@ -483,6 +904,147 @@ class Menu:
             traceback.print_exc()
             return []
     
+    def obtener_pagina_productos(self, despues_de: tuple = None, limite: int = 100) -> List[Dict]:
+        """
+        Obtiene una página de productos ordenados por nombre (paginación keyset)
+        
+        Args:
+            despues_de: Tupla (nombre, id_producto) del último producto de la
+                página anterior (None = primera página)
+            limite: Tamaño de la página
+        
+        Returns:
+            Lista de RegistroProducto, el mismo formato que obtener_todos_productos
+        """
+        def cargar():
+            return self._consultar_pagina_productos(despues_de, limite)
+        
+        try:
+            return list(self.cache.obtener('productos', ('pagina', despues_de, limite), cargar))
+        except Exception as e:
+            print(f"✗ Error al obtener página de productos: {e}")
+            return []
+    
+    def _consultar_pagina_productos(self, despues_de: Optional[tuple], limite: int) -> List[tuple]:
+        """RegistroProducto de una página keyset del catálogo (copia local si no hay conexión)"""
+        # Orden por (nombre, idProducto): estable aunque haya nombres repetidos
+        if despues_de is None:
+            sentencia = 'pagina_productos_inicio'
+            query = """
+                SELECT idProducto AS id_producto, nombre, precio, imagen, descripcion
+                FROM PRODUCTO
+                ORDER BY nombre, idProducto
+                LIMIT %s
+            """
+            params = (limite,)
+        else:
+            sentencia = 'pagina_productos_despues'
+            query = """
+                SELECT idProducto AS id_producto, nombre, precio, imagen, descripcion
+                FROM PRODUCTO
+                WHERE (nombre, idProducto) > (%s, %s)
+                ORDER BY nombre, idProducto
+                LIMIT %s
+            """
+            params = (despues_de[0], despues_de[1], limite)
+        
+        return RegistroProducto.convertir(espejo_local.con_respaldo(
+            lambda: _consultar(sentencia, query, params, registros=True),
+            lambda: espejo_local.pagina_productos(despues_de, limite)
+        ))
+    
+    def buscar_productos(self, texto: str = '', tipo: Optional[str] = None,
+                         limite: int = 50) -> List[Dict]:
+        """
+        Productos cuyo nombre contiene `texto`, para selectores con búsqueda
+        
+        Nunca trae más de `limite` filas, así el selector no depende del
+        tamaño del catálogo (sin caché: cada texto es una consulta distinta).
+        
+        Args:
+            texto: Parte del nombre (sin distinguir mayúsculas; vacío = todos)
+            tipo: Solo productos asignados a ese tipo de comida (None = todos)
+            limite: Máximo de productos
+        
+        Returns:
+            Lista de RegistroProducto ordenada por nombre
+        """
+        # % y _ del texto se buscan literalmente
+        patron = '%' + texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        query = """
+            SELECT p.idProducto AS id_producto, p.nombre, p.precio, p.imagen, p.descripcion
+            FROM PRODUCTO p
+            WHERE p.nombre ILIKE %s
+              AND (%s::text IS NULL OR EXISTS (
+                  SELECT 1 FROM MENU_PRODUCTO mp
+                  JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
+                  WHERE mp.idProducto = p.idProducto AND tc.nombre = %s))
+            ORDER BY p.nombre, p.idProducto
+            LIMIT %s
+        """
+        try:
+            return RegistroProducto.convertir(espejo_local.con_respaldo(
+                lambda: _consultar('buscar_productos', query, (patron, tipo, tipo, limite),
+                                   registros=True),
+                lambda: espejo_local.buscar_productos(patron, tipo, limite)
+            ))
+        except Exception as e:
+            print(f"✗ Error al buscar productos: {e}")
+            return []
+    
+    def iterar_productos(self, tamano_pagina: int = 500,
+                         despues_de: tuple = None) -> Iterator[Dict]:
+        """
+        Recorre el catálogo completo por páginas keyset, sin caché
+        
+        En memoria solo hay una página a la vez y entre páginas no se retiene
+        ninguna conexión, así se puede procesar cada producto con calma.
+        Cada página es una consulta aparte: si el catálogo cambia durante el
+        recorrido se ven los cambios posteriores a la clave actual.
+        
+        Args:
+            tamano_pagina: Productos por consulta
+            despues_de: Clave (nombre, id_producto) desde la que continuar
+        """
+        while True:
+            pagina = self._consultar_pagina_productos(despues_de, tamano_pagina)
+            yield from pagina
+            if len(pagina) < tamano_pagina:
+                return
+            despues_de = (pagina[-1][1], pagina[-1][0])
+    
+    def exportar_productos_csv(self, archivo, itersize: int = 2000) -> int:
+        """
+        Exporta el catálogo a CSV leyendo con un cursor del servidor
+        
+        A diferencia de iterar_productos, toda la exportación sale de una
+        sola consulta (una foto consistente del catálogo) con memoria
+        constante. Requiere conexión con la BD.
+        
+        Args:
+            archivo: Objeto de texto abierto con newline=''
+            itersize: Filas por viaje al servidor
+        
+        Returns:
+            Número de productos exportados
+        """
+        return exportar_productos_csv(archivo, itersize)
+    
+    def contar_productos(self) -> int:
+        """Número total de productos en la base de datos"""
+        try:
+            resultado = self.cache.obtener(
+                'productos', 'total',
+                lambda: espejo_local.con_respaldo(
+                    lambda: next(iter(_consultar('contar_productos', "SELECT COUNT(*) FROM PRODUCTO")), None),
+                    espejo_local.contar_productos
+                )
+            )
+            return resultado[0] if resultado else 0
+        except Exception as e:
+            print(f"✗ Error al contar productos: {e}")
+            return 0
+    
     def obtener_tipo_producto(self, id_producto: str) -> str:
         """
         Obtiene el tipo de comida de un producto
@@ -490,21 +1052,23 @@ class Menu:
         Returns:
             Nombre del tipo de comida o None
         """
+        return self.obtener_indice_tipos().get(id_producto)
+    
+    def obtener_indice_tipos(self) -> Dict[str, str]:
+        """
+        Obtiene el mapa id_producto -> tipo de comida de todo el catálogo
+        
+        Usar este índice para filtrar o agrupar muchos productos en memoria
+        en lugar de llamar a obtener_tipo_producto por cada uno.
+        
+        Returns:
+            Diccionario de solo lectura (vacío si falla la consulta)
+        """
         try:
-            query = """
-                SELECT tc.nombre
-                FROM MENU_PRODUCTO mp
-                JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
-                WHERE mp.idProducto = %s
-                LIMIT 1
-            """
-            resultado = db_manager.ejecutar_query_uno(query, (id_producto,))
-            
-            return resultado[0] if resultado else None
-            
+            return self.indice_tipos.obtener()
         except Exception as e:
-            print(f"✗ Error al obtener tipo de producto: {e}")
-            return None
+            print(f"✗ Error al obtener tipos de producto: {e}")
+            return {}
     
     def obtener_productos_en_menu_dia(self, dia_id: int) -> List[Dict]:
         """
@@ -513,28 +1077,15 @@ class Menu:
         Returns:
             Lista de productos del menú del día
         """
+        def cargar():
+            return RegistroMenuAsignado.convertir(espejo_local.con_respaldo(
+                lambda: _consultar('productos_en_menu_dia', CONSULTA_PRODUCTOS_EN_MENU_DIA, (dia_id,),
+                                   registros=True),
+                lambda: espejo_local.productos_en_menu_dia(dia_id)
+            ))
+        
         try:
-            query = """
-                SELECT p.idProducto, p.nombre, p.precio, tc.nombre as tipo
-                FROM MENU_PRODUCTO mp
-                JOIN PRODUCTO p ON mp.idProducto = p.idProducto
-                JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
-                WHERE mp.idDiaMenu = %s AND mp.activo = TRUE
-                ORDER BY tc.idTipo, p.nombre
-            """
-            productos = db_manager.ejecutar_query(query, (dia_id,), fetch=True)
-            
-            resultado = []
-            if productos:
-                for prod in productos:
-                    resultado.append({
-                        'id_producto': prod[0],
-                        'nombre': prod[1],
-                        'precio': float(prod[2]),
-                        'tipo': prod[3]
-                    })
-            
-            return resultado
+            return list(self.cache.obtener('menu_dia', ('asignados', dia_id), cargar))
             
         except Exception as e:
             print(f"✗ Error al obtener productos del menú del día: {e}")
@@ -548,39 +1099,23 @@ class Menu:
             True si se agregó correctamente
         """
         try:
-            # Obtener ID del tipo
-            query_tipo = "SELECT idTipo FROM TIPO_COMIDA WHERE nombre = %s"
-            resultado = db_manager.ejecutar_query_uno(query_tipo, (tipo,))
+            # Insertar o reactivar en una sola sentencia (tipo resuelto por nombre)
+            query = """
+                INSERT INTO MENU_PRODUCTO (idProducto, idTipo, idDiaMenu, activo)
+                SELECT %s, idTipo, %s, TRUE
+                FROM TIPO_COMIDA
+                WHERE nombre = %s
+                ON CONFLICT (idProducto, idTipo, idDiaMenu) DO UPDATE SET activo = TRUE
+            """
+            with db_manager.transaccion() as tx:
+                filas = tx.ejecutar(query, (id_producto, dia_id, tipo))
             
-            if not resultado:
+            if filas == 0:
                 print(f"✗ Tipo '{tipo}' no encontrado")
                 return False
             
-            id_tipo = resultado[0]
-            
-            # Verificar si ya existe
-            query_existe = """
-                SELECT 1 FROM MENU_PRODUCTO 
-                WHERE idProducto = %s AND idTipo = %s AND idDiaMenu = %s
-            """
-            existe = db_manager.ejecutar_query_uno(query_existe, (id_producto, id_tipo, dia_id))
-            
-            if existe:
-                # Actualizar a activo si ya existe
-                query_update = """
-                    UPDATE MENU_PRODUCTO 
-                    SET activo = TRUE
-                    WHERE idProducto = %s AND idTipo = %s AND idDiaMenu = %s
-                """
-                db_manager.ejecutar_query(query_update, (id_producto, id_tipo, dia_id), fetch=False)
-            else:
-                # Insertar nuevo registro
-                query_insert = """
-                    INSERT INTO MENU_PRODUCTO (idProducto, idTipo, idDiaMenu, activo)
-                    VALUES (%s, %s, %s, TRUE)
-                """
-                db_manager.ejecutar_query(query_insert, (id_producto, id_tipo, dia_id), fetch=False)
-            
+            self.cache.invalidar('menu_dia', 'promociones')
+            self.indice_tipos.marcar(id_producto)
             print(f"✓ Producto agregado al menú del día {dia_id}")
             return True
             
@@ -590,6 +1125,62 @@ class Menu:
             traceback.print_exc()
             return False
     
+    def reemplazar_menu_dia(self, dia_id: int, productos: List[tuple]) -> int:
+        """
+        Reemplaza el menú de un día con una carga por lotes
+        
+        Args:
+            dia_id: Día del menú (1=Lunes ... 7=Domingo)
+            productos: Lista de tuplas (id_producto, nombre_tipo)
+        
+        Returns:
+            Número de productos guardados en el menú del día
+        """
+        try:
+            # Una sola transacción: el día nunca queda con el menú a medio guardar
+            with db_manager.transaccion() as tx:
+                tipos = tx.consultar("SELECT nombre, idTipo FROM TIPO_COMIDA")
+                id_por_tipo = {nombre: id_tipo for nombre, id_tipo in tipos}
+                
+                filas = []
+                for id_producto, tipo in productos:
+                    if tipo not in id_por_tipo:
+                        print(f"✗ Tipo '{tipo}' no encontrado para {id_producto}")
+                        continue
+                    filas.append((id_producto, id_por_tipo[tipo], dia_id, True))
+                
+                # Quitar del día lo que ya no forma parte del menú
+                quitados = tx.consultar(
+                    """
+                    DELETE FROM MENU_PRODUCTO
+                    WHERE idDiaMenu = %s
+                      AND (idProducto, idTipo) NOT IN (
+                          SELECT * FROM unnest(%s::varchar[], %s::integer[])
+                      )
+                    RETURNING idProducto
+                    """,
+                    (dia_id, [fila[0] for fila in filas], [fila[1] for fila in filas])
+                )
+                
+                guardados = tx.upsert_lote(
+                    "MENU_PRODUCTO",
+                    ["idProducto", "idTipo", "idDiaMenu", "activo"],
+                    filas,
+                    conflicto=["idProducto", "idTipo", "idDiaMenu"],
+                    actualizar=["activo"]
+                )
+            
+            self.cache.invalidar('menu_dia', 'promociones')
+            self.indice_tipos.marcar(*(fila[0] for fila in filas), *(fila[0] for fila in quitados))
+            print(f"✓ Menú del día {dia_id} reemplazado: {guardados} productos")
+            return guardados
+            
+        except Exception as e:
+            print(f"✗ Error al reemplazar menú del día: {e}")
+            import traceback
+            traceback.print_exc()
+            return 0
+    
     def quitar_producto_de_menu_dia(self, id_producto: str, dia_id: int) -> bool:
         """
         Quita un producto del menú de un día específico
@@ -602,8 +1193,11 @@ class Menu:
                 DELETE FROM MENU_PRODUCTO
                 WHERE idProducto = %s AND idDiaMenu = %s
             """
-            db_manager.ejecutar_query(query, (id_producto, dia_id), fetch=False)
+            with db_manager.transaccion() as tx:
+                tx.ejecutar(query, (id_producto, dia_id))
             
+            self.cache.invalidar('menu_dia', 'promociones')
+            self.indice_tipos.marcar(id_producto)
             print(f"✓ Producto quitado del menú del día {dia_id}")
             return True
             
@@ -620,7 +1214,7 @@ class Menu:
             tipo_comida: Nombre del tipo ("Desayuno", "Almuerzo", etc.) (None = todos)
         
         Returns:
-            Lista de diccionarios con productos del menú del día
+            Lista de RegistroMenuDia (acceso como diccionario) con productos del menú del día
         """
         try:
             # Si no se especifica día, usar el día actual
@@ -628,48 +1222,41 @@ class Menu:
                 from datetime import datetime
                 dia_semana = datetime.now().isoweekday()  # 1=Lunes, 7=Domingo
             
-            # Construir query con JOIN a TIPO_COMIDA para obtener el nombre
-            query = """
-                SELECT DISTINCT p.idProducto, p.nombre, p.precio, p.descripcion, tc.nombre as tipo, tc.idTipo
-                FROM PRODUCTO p
-                INNER JOIN MENU_PRODUCTO mp ON p.idProducto = mp.idProducto
-                INNER JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
-                WHERE mp.idDiaMenu = %s AND mp.activo = TRUE
-            """
-            params = [dia_semana]
-            
-            if tipo_comida is not None and tipo_comida != "Todos":
-                query += " AND tc.nombre = %s"
-                params.append(tipo_comida)
-            
-            query += " ORDER BY tc.idTipo, p.nombre"
-            
-            productos = db_manager.ejecutar_query(query, tuple(params), fetch=True)
-            
-            menu_items = []
-            if productos:
-                for producto in productos:
-                    id_producto, nombre, precio, descripcion, tipo, id_tipo = producto
-                    menu_items.append({
-                        'id_producto': id_producto,
-                        'nombre': nombre,
-                        'precio': float(precio),
-                        'descripcion': descripcion,
-                        'tipo': tipo
-                    })
+            if tipo_comida == "Todos":
+                tipo_comida = None
             
-            return menu_items
+            return list(self.cache.obtener('menu_dia', (dia_semana, tipo_comida),
+                                           lambda: self._cargar_menu_del_dia(dia_semana, tipo_comida)))
         except Exception as e:
             print(f"✗ Error al obtener menú del día: {e}")
             import traceback
             traceback.print_exc()
             return []
     
+    def _cargar_menu_del_dia(self, dia_semana: int, tipo_comida: Optional[str]) -> List[Dict]:
+        """Consulta el menú del día en la base de datos (sin caché)"""
+        # Una sentencia preparada por variante: con y sin filtro de tipo
+        if tipo_comida is None:
+            sentencia, query, params = 'menu_del_dia', CONSULTA_MENU_DEL_DIA, (dia_semana,)
+        else:
+            sentencia, query, params = 'menu_del_dia_tipo', CONSULTA_MENU_DEL_DIA_TIPO, (dia_semana, tipo_comida)
+        
+        return RegistroMenuDia.convertir(espejo_local.con_respaldo(
+            lambda: _consultar(sentencia, query, params, registros=True),
+            lambda: espejo_local.menu_del_dia(dia_semana, tipo_comida)
+        ))
+    
     def obtener_tipos_comida(self) -> List[str]:
         """Obtiene los nombres de tipos de comida desde la base de datos"""
         try:
             query = "SELECT nombre FROM TIPO_COMIDA ORDER BY idTipo"
-            tipos = db_manager.ejecutar_query(query, fetch=True)
+            tipos = self.cache.obtener(
+                'tipos', 'nombres',
+                lambda: espejo_local.con_respaldo(
+                    lambda: _consultar('tipos_comida', query),
+                    espejo_local.tipos_comida
+                )
+            )
             
             return [tipo[0] for tipo in tipos] if tipos else []
         except Exception as e:
@@ -680,6 +1267,9 @@ class Menu:
         """
         Verifica las credenciales de login desde la base de datos
         
+        Sin conexión, solo pueden entrar los usuarios que ya iniciaron sesión
+        en esta terminal con el servidor disponible (ver espejo_local).
+        
         Returns:
             Diccionario con datos del usuario si login exitoso, None si falla
         """
@@ -689,21 +1279,27 @@ class Menu:
                 FROM USUARIO
                 WHERE usuario = %s AND contrasen = %s
             """
-            resultado = db_manager.ejecutar_query_uno(query, (usuario, contrasena))
-            
-            if resultado:
-                return {
-                    "id": resultado[0],
-                    "usuario": resultado[1],
-                    "nombre": resultado[2]
-                }
-            return None
+            filas = _consultar('verificar_login', query, (usuario, contrasena))
+            resultado = filas[0] if filas else None
+        except ERRORES_CONEXION as e:
+            print(f"⚠ Sin conexión a la BD, verificando con credenciales guardadas: {e}")
+            return espejo_local.verificar_credencial(usuario, contrasena)
         except Exception as e:
             print(f"✗ Error al verificar login: {e}")
-            # Fallback para desarrollo
-            if usuario == "admin" and contrasena == "123":
-                return {"id": "USR001", "usuario": "admin", "nombre": "Administrador"}
             return None
+        
+        if not resultado:
+            return None
+        datos = {
+            "id": resultado[0],
+            "usuario": resultado[1],
+            "nombre": resultado[2]
+        }
+        try:
+            espejo_local.guardar_credencial(usuario, contrasena, datos)
+        except Exception as e:
+            print(f"⚠ No se pudo guardar la credencial local: {e}")
+        return datos
     
     def obtener_excepciones_activas(self, fecha: str = None) -> List[Dict]:
         """
@@ -720,15 +1316,13 @@ class Menu:
                 from datetime import datetime
                 fecha = datetime.now().strftime('%Y-%m-%d')
             
-            query = """
-                SELECT idExcepcion, nombre, descripcion, descuento_porcentaje
-                FROM MENU_EXCEPCION
-                WHERE activo = TRUE
-                  AND fecha_inicio <= %s
-                  AND fecha_fin >= %s
-                ORDER BY descuento_porcentaje DESC
-            """
-            excepciones = db_manager.ejecutar_query(query, (fecha, fecha), fetch=True)
+            excepciones = self.cache.obtener(
+                'promociones', ('excepciones', fecha),
+                lambda: espejo_local.con_respaldo(
+                    lambda: _consultar('excepciones_activas', CONSULTA_EXCEPCIONES_ACTIVAS, (fecha, fecha)),
+                    lambda: espejo_local.excepciones_activas(fecha)
+                )
+            )
             
             resultado = []
             if excepciones:
@@ -749,6 +1343,11 @@ class Menu:
         """
         Obtiene productos con sus precios especiales de promoción
         
+        Sin id_excepcion cada producto aparece con la promoción que se le
+        aplica hoy (PRECIO_EFECTIVO), la misma que usa obtener_precios_productos.
+        Con id_excepcion se listan todos los productos de esa promoción con su
+        precio en ella, aunque otra promoción activa les deje un precio menor.
+        
         Args:
             id_excepcion: ID de la excepción (None = todas las activas hoy)
         
@@ -760,59 +1359,27 @@ class Menu:
             fecha_hoy = datetime.now().strftime('%Y-%m-%d')
             
             if id_excepcion:
-                query = """
-                    SELECT p.idProducto, p.nombre, p.precio, 
-                           ep.precio_especial, me.descuento_porcentaje, me.nombre,
-                           tc.nombre as tipo
-                    FROM PRODUCTO p
-                    INNER JOIN EXCEPCION_PRODUCTO ep ON p.idProducto = ep.idProducto
-                    INNER JOIN MENU_EXCEPCION me ON ep.idExcepcion = me.idExcepcion
-                    LEFT JOIN MENU_PRODUCTO mp ON p.idProducto = mp.idProducto
-                    LEFT JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
-                    WHERE me.idExcepcion = %s
-                      AND me.activo = TRUE
-                      AND me.fecha_inicio <= %s
-                      AND me.fecha_fin >= %s
-                    GROUP BY p.idProducto, p.nombre, p.precio, ep.precio_especial, 
-                             me.descuento_porcentaje, me.nombre, tc.nombre
-                    ORDER BY p.nombre
-                """
+                sentencia = 'productos_con_descuento_excepcion'
+                query = CONSULTA_PRODUCTOS_CON_DESCUENTO_EXCEPCION
                 params = (id_excepcion, fecha_hoy, fecha_hoy)
             else:
-                query = """
-                    SELECT p.idProducto, p.nombre, p.precio, 
-                           ep.precio_especial, me.descuento_porcentaje, me.nombre,
-                           tc.nombre as tipo
-                    FROM PRODUCTO p
-                    INNER JOIN EXCEPCION_PRODUCTO ep ON p.idProducto = ep.idProducto
-                    INNER JOIN MENU_EXCEPCION me ON ep.idExcepcion = me.idExcepcion
-                    LEFT JOIN MENU_PRODUCTO mp ON p.idProducto = mp.idProducto
-                    LEFT JOIN TIPO_COMIDA tc ON mp.idTipo = tc.idTipo
-                    WHERE me.activo = TRUE
-                      AND me.fecha_inicio <= %s
-                      AND me.fecha_fin >= %s
-                    GROUP BY p.idProducto, p.nombre, p.precio, ep.precio_especial,
-                             me.descuento_porcentaje, me.nombre, tc.nombre
-                    ORDER BY me.descuento_porcentaje DESC, p.nombre
-                """
-                params = (fecha_hoy, fecha_hoy)
+                sentencia = 'productos_con_descuento'
+                query = CONSULTA_PRODUCTOS_CON_DESCUENTO
+                params = (fecha_hoy,)
             
-            productos = db_manager.ejecutar_query(query, params, fetch=True)
-            
-            resultado = []
-            if productos:
-                for prod in productos:
-                    resultado.append({
-                        "id_producto": prod[0],
-                        "nombre": prod[1],
-                        "precio_original": float(prod[2]),
-                        "precio_especial": float(prod[3]),
-                        "descuento": float(prod[4]),
-                        "promocion": prod[5],
-                        "tipo": prod[6] if prod[6] else "General"
-                    })
+            def remota():
+                if not id_excepcion:
+                    _extender_precio_efectivo(fecha_hoy)
+                return _consultar(sentencia, query, params, registros=True)
             
-            return resultado
+            productos = self.cache.obtener(
+                'promociones', ('descuentos', id_excepcion, fecha_hoy),
+                lambda: RegistroDescuento.convertir(espejo_local.con_respaldo(
+                    remota,
+                    lambda: espejo_local.productos_con_descuento(id_excepcion, fecha_hoy)
+                ))
+            )
+            return list(productos)
         except Exception as e:
             print(f"✗ Error al obtener productos con descuento: {e}")
             return []
@@ -822,57 +1389,78 @@ class Menu:
         Obtiene el precio actual de un producto (con descuento si aplica)
         
         Returns:
-            Dict con precio_original, precio_final, tiene_descuento, descuento_porcentaje
+            Dict con precio_original, precio_final, tiene_descuento, descuento_porcentaje,
+            promocion y tipo
+        """
+        precios = self.obtener_precios_productos([id_producto])
+        return precios.get(id_producto) or self._precio_vacio()
+    
+    def obtener_precios_productos(self, ids_productos: List[str]) -> Dict[str, Dict]:
+        """
+        Obtiene el precio actual de varios productos con una sola consulta
+        
+        El precio con promoción sale de PRECIO_EFECTIVO (una fila por
+        producto y fecha, mantenida por triggers con la mejor promoción
+        activa), así que es una búsqueda por clave primaria.
+        
+        Returns:
+            Dict id_producto -> mismo formato que obtener_precio_producto.
+            Los productos inexistentes no aparecen en el resultado.
         """
         try:
             from datetime import datetime
             fecha_hoy = datetime.now().strftime('%Y-%m-%d')
             
-            # Verificar si tiene descuento activo
-            query = """
-                SELECT p.precio, ep.precio_especial, me.descuento_porcentaje, me.nombre
-                FROM PRODUCTO p
-                LEFT JOIN EXCEPCION_PRODUCTO ep ON p.idProducto = ep.idProducto
-                LEFT JOIN MENU_EXCEPCION me ON ep.idExcepcion = me.idExcepcion
-                    AND me.activo = TRUE
-                    AND me.fecha_inicio <= %s
-                    AND me.fecha_fin >= %s
-                WHERE p.idProducto = %s
-                ORDER BY me.descuento_porcentaje DESC
-                LIMIT 1
-            """
-            resultado = db_manager.ejecutar_query_uno(query, (fecha_hoy, fecha_hoy, id_producto))
+            # Sin duplicados y conservando el orden
+            ids = list(dict.fromkeys(ids_productos))
+            if not ids:
+                return {}
             
-            if resultado:
-                precio_original = float(resultado[0])
-                precio_especial = float(resultado[1]) if resultado[1] else None
-                descuento = float(resultado[2]) if resultado[2] else 0
-                promocion = resultado[3] if resultado[3] else None
+            claves = [('precio', id_producto, fecha_hoy) for id_producto in ids]
+            
+            def cargar(faltantes):
+                ids_faltantes = [clave[1] for clave in faltantes]
+                
+                def remota():
+                    _extender_precio_efectivo(fecha_hoy)
+                    return _consultar('precios_productos', CONSULTA_PRECIOS_PRODUCTOS, (fecha_hoy, ids_faltantes))
+                
+                filas = espejo_local.con_respaldo(
+                    remota,
+                    lambda: espejo_local.precios_productos(ids_faltantes, fecha_hoy)
+                )
                 
-                return {
-                    "precio_original": precio_original,
-                    "precio_final": precio_especial if precio_especial else precio_original,
-                    "tiene_descuento": precio_especial is not None,
-                    "descuento_porcentaje": descuento,
-                    "promocion": promocion
-                }
+                cargados = {}
+                for id_producto, precio, precio_final, descuento, promocion, tipo in filas or []:
+                    precio_original = float(precio)
+                    cargados[('precio', id_producto, fecha_hoy)] = {
+                        "precio_original": precio_original,
+                        "precio_final": float(precio_final) if precio_final is not None else precio_original,
+                        "tiene_descuento": precio_final is not None,
+                        "descuento_porcentaje": float(descuento) if descuento else 0,
+                        "promocion": promocion,
+                        "tipo": tipo
+                    }
+                return cargados
+            
+            precios = self.cache.obtener_varios('promociones', claves, cargar)
+            return {clave[1]: precios[clave] for clave in claves if clave in precios}
             
-            return {
-                "precio_original": 0,
-                "precio_final": 0,
-                "tiene_descuento": False,
-                "descuento_porcentaje": 0,
-                "promocion": None
-            }
         except Exception as e:
-            print(f"✗ Error al obtener precio: {e}")
-            return {
-                "precio_original": 0,
-                "precio_final": 0,
-                "tiene_descuento": False,
-                "descuento_porcentaje": 0,
-                "promocion": None
-            }
+            print(f"✗ Error al obtener precios: {e}")
+            return {}
+    
+    @staticmethod
+    def _precio_vacio() -> Dict:
+        """Precio por defecto cuando el producto no existe o la consulta falla"""
+        return {
+            "precio_original": 0,
+            "precio_final": 0,
+            "tiene_descuento": False,
+            "descuento_porcentaje": 0,
+            "promocion": None,
+            "tipo": None
+        }
 
 
 class PedidoRestaurante:
@@ -882,7 +1470,7 @@ class PedidoRestaurante:
         self.items = []
         self.numero = None
     
-    def agregar_item(self, nombre: str, precio: float, cantidad: int):
+    def agregar_item(self, nombre: str, precio: float, cantidad: int, id_producto: str = None):
         """Agregar item al carrito con nombre, precio y cantidad"""
         # Buscar si el item ya existe
         for item in self.items:
@@ -894,7 +1482,8 @@ class PedidoRestaurante:
         self.items.append({
             'nombre': nombre,
             'precio': precio,
-            'cantidad': cantidad
+            'cantidad': cantidad,
+            'id_producto': id_producto
         })
     
     def calcular_total(self) -> float:
@@ -16,8 +16,11 @@ a = Analysis(
         'interfaz_restaurante',
         'modelo_restaurante',
         'dialogo_impresion',
+        'dialogo_ventas',
         'dialogo_login',
         'visor_productos',
+        'ejecutor_db', 'servicio_impresion', 'cola_impresion', 'pdf_factura', 'plantilla_factura', 'impresora_termica',
+        'ventas', 'espejo_local', 'instantanea_catalogo', 'arranque',
         'verificar_menu_dia',
         'tkinter',
         'tkinter.ttk',
@@ -0,0 +1,193 @@
+"""
+Generador de PDF para facturas (Python puro, sin dependencias externas)
+
+Las facturas son texto monoespaciado, así que basta con la fuente estándar
+Courier de PDF (no se incrusta: todo lector la trae). Como todos los glifos
+de Courier miden 600/1000 em, las métricas son una multiplicación y las
+partes fijas del archivo (catálogo, fuente, diccionario de página) se
+precalculan una vez por tamaño de papel. Generar una factura es escapar las
+líneas, unir un flujo de contenido y escribir la tabla xref.
+"""
+from typing import BinaryIO, Dict, List, Tuple, Union
+import os
+
+# Tamaños de página en puntos (1/72")
+PAPELES: Dict[str, Tuple[float, float]] = {
+    'A4': (595.28, 841.89),
+    'Letter': (612.0, 792.0),
+    'Legal': (612.0, 1008.0),
+    # Rollo térmico de 80 mm: el alto se ajusta al contenido
+    'Recibo80': (226.77, 0.0),
+}
+
+ANCHO_GLIFO_COURIER = 0.6   # Ancho de cualquier glifo de Courier en em
+
+# Escape de cadenas literales de PDF: \ ( ) y caracteres de control comunes.
+# Se aplica con str.replace encadenado (mucho más rápido que str.translate
+# con un dict, que resuelve carácter por carácter en Python)
+_ESCAPES = (('\\', '\\\\'), ('(', '\\('), (')', '\\)'), ('\r', ''), ('\t', '    '))
+
+
+def _escapar(texto: str) -> str:
+    for original, escapado in _ESCAPES:
+        if original in texto:
+            texto = texto.replace(original, escapado)
+    return texto
+
+
+class EscritorPDF:
+    """
+    Escritor de PDF para texto monoespaciado con plantillas precalculadas.
+
+    Una instancia por combinación de papel/fuente; es reutilizable y no
+    guarda estado entre documentos (puede compartirse entre hilos).
+    """
+
+    def __init__(self, papel: str = 'A4', tamano_fuente: float = 9, margen: float = 36):
+        if papel not in PAPELES:
+            raise ValueError(f"Papel desconocido: {papel}. Opciones: {', '.join(PAPELES)}")
+        self.papel = papel
+        self.ancho, self.alto = PAPELES[papel]
+        self.tamano_fuente = tamano_fuente
+        self.margen = margen
+        self.interlineado = round(tamano_fuente * 1.2, 2)
+
+        # Métricas: caracteres por línea y líneas por página
+        ancho_caracter = tamano_fuente * ANCHO_GLIFO_COURIER
+        self.columnas = max(1, int((self.ancho - 2 * margen) // ancho_caracter))
+        self.filas = (max(1, int((self.alto - 2 * margen) // self.interlineado))
+                      if self.alto else None)
+
+        # Objetos fijos: 1 catálogo, 2 árbol de páginas (se completa por documento), 3 fuente
+        self._cabecera = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        self._catalogo = b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n"
+        self._fuente = (b"3 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Courier"
+                        b" /Encoding /WinAnsiEncoding >>\nendobj\n")
+        self._inicio_texto = (f"BT /F1 {tamano_fuente:g} Tf {self.interlineado:g} TL "
+                              f"{margen:g} ").encode('ascii')
+
+    # ------------------------------------------------------------------
+    # Maquetación
+    # ------------------------------------------------------------------
+
+    def _paginar(self, contenido: str) -> List[List[bytes]]:
+        """Divide el texto en páginas de líneas ya escapadas y codificadas"""
+        columnas = self.columnas
+        lineas = contenido.split('\n')
+        if max(map(len, lineas)) > columnas:
+            # Cortar líneas más anchas que la página (antes de escapar, para no
+            # partir una secuencia de escape)
+            cortadas = []
+            for linea in lineas:
+                while len(linea) > columnas:
+                    cortadas.append(linea[:columnas])
+                    linea = linea[columnas:]
+                cortadas.append(linea)
+            lineas = cortadas
+        # Quitar líneas vacías al final (el contenido suele terminar en \n)
+        while len(lineas) > 1 and not lineas[-1]:
+            lineas.pop()
+
+        # Escapar y codificar de una vez (WinAnsi: lo que no exista sale como '?')
+        codificadas = _escapar("\n".join(lineas)).encode('cp1252', 'replace').split(b'\n')
+        if self.filas is None:
+            return [codificadas]
+        return [codificadas[i:i + self.filas] for i in range(0, len(codificadas), self.filas)] or [[]]
+
+    def _flujo(self, lineas: List[bytes], alto: float) -> bytes:
+        """Flujo de contenido de una página: una línea por operador '"""
+        # Td deja el cursor una línea arriba de la primera: ' avanza antes de escribir
+        y = alto - self.margen - self.tamano_fuente + self.interlineado
+        return b"".join((
+            self._inicio_texto, f"{y:.2f} Td\n(".encode('ascii'),
+            b") '\n(".join(lineas), b") '\nET",
+        ))
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def _partes(self, contenido: str) -> List[bytes]:
+        """Fragmentos del archivo en orden (sin unir, para escribirlos tal cual)"""
+        paginas = self._paginar(contenido)
+        if self.filas is None:
+            # Recibo: una sola página tan alta como el texto
+            alto = round(2 * self.margen + len(paginas[0]) * self.interlineado, 2)
+        else:
+            alto = self.alto
+
+        partes = [self._cabecera, self._catalogo]
+        offsets = [len(self._cabecera)]
+        posicion = offsets[0] + len(self._catalogo)
+
+        # Objetos 4, 6, 8... son páginas; 5, 7, 9... sus flujos de contenido
+        kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(paginas)))
+        objeto = (f"2 0 obj\n<< /Type /Pages /Kids [{kids}] /Count {len(paginas)} >>\nendobj\n"
+                  .encode('ascii'))
+        offsets.append(posicion)
+        partes.append(objeto)
+        posicion += len(objeto)
+
+        offsets.append(posicion)
+        partes.append(self._fuente)
+        posicion += len(self._fuente)
+
+        pagina_tpl = ("{n} 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %g %g]"
+                      " /Resources << /Font << /F1 3 0 R >> >> /Contents {c} 0 R >>\nendobj\n"
+                      % (self.ancho, alto))
+        for i, lineas in enumerate(paginas):
+            numero = 4 + 2 * i
+            objeto = pagina_tpl.format(n=numero, c=numero + 1).encode('ascii')
+            offsets.append(posicion)
+            partes.append(objeto)
+            posicion += len(objeto)
+
+            flujo = self._flujo(lineas, alto)
+            objeto = b"".join((f"{numero + 1} 0 obj\n<< /Length {len(flujo)} >>\nstream\n".encode('ascii'),
+                               flujo, b"\nendstream\nendobj\n"))
+            offsets.append(posicion)
+            partes.append(objeto)
+            posicion += len(objeto)
+
+        total = len(offsets) + 1
+        xref = "".join(f"{o:010d} 00000 n \n" for o in offsets)
+        partes.append(
+            (f"xref\n0 {total}\n0000000000 65535 f \n{xref}"
+             f"trailer\n<< /Size {total} /Root 1 0 R >>\nstartxref\n{posicion}\n%%EOF\n").encode('ascii')
+        )
+        return partes
+
+    def generar(self, contenido: str) -> bytes:
+        """Retorna el PDF completo en memoria"""
+        return b"".join(self._partes(contenido))
+
+    def escribir(self, contenido: str, destino: Union[str, os.PathLike, BinaryIO]) -> int:
+        """
+        Escribe el PDF en una ruta o en un flujo binario abierto
+        (archivo, stdin de `lp`, socket...). Retorna los bytes escritos.
+        """
+        partes = self._partes(contenido)
+        if hasattr(destino, 'write'):
+            destino.writelines(partes)
+        else:
+            with open(destino, 'wb') as f:
+                f.writelines(partes)
+        return sum(map(len, partes))
+
+
+_escritores: Dict[Tuple[str, float], EscritorPDF] = {}
+
+
+def escritor_pdf(papel: str = 'A4', tamano_fuente: float = 9) -> EscritorPDF:
+    """Escritor compartido para el papel dado (las plantillas se calculan una vez)"""
+    clave = (papel, tamano_fuente)
+    escritor = _escritores.get(clave)
+    if escritor is None:
+        escritor = _escritores[clave] = EscritorPDF(papel, tamano_fuente)
+    return escritor
+
+
+def generar_pdf(contenido: str, destino: Union[str, os.PathLike, BinaryIO],
+                papel: str = 'A4', tamano_fuente: float = 9) -> int:
+    """Atajo: escribe `contenido` como PDF en `destino`"""
+    return escritor_pdf(papel, tamano_fuente).escribir(contenido, destino)
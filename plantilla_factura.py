@@ -0,0 +1,281 @@
+"""
+Motor de plantillas de factura
+
+Una plantilla describe la factura en tres bloques (encabezado, línea de item
+y pie) con campos de `str.format`. Se compila una sola vez: las constantes
+(separadores, textos fijos) se resuelven en ese momento y cada bloque se
+convierte en una f-string compilada, así renderizar es evaluar el encabezado,
+una comprensión con un único join para los items y el pie.
+
+La misma plantilla compilada sirve para texto plano, ESC/POS y PDF. Una línea
+que empieza con `**` se imprime en negrita donde el formato lo permite (el
+texto plano simplemente quita la marca).
+"""
+from string import Formatter
+from typing import Any, Callable, Iterable, List, Mapping, Tuple
+import ast
+import codecs
+import encodings.cp858
+
+from pdf_factura import escritor_pdf
+
+ANCHO = 50
+MARCA_NEGRITA = '**'
+
+# Comandos ESC/POS básicos
+ESC_INICIAR = b'\x1b@'
+ESC_PAGINA_858 = b'\x1bt\x13'      # Tabla de caracteres PC858 (español + €)
+ESC_NEGRITA_ON = b'\x1bE\x01'
+ESC_NEGRITA_OFF = b'\x1bE\x00'
+GS_CORTE_PARCIAL = b'\x1dVB\x04'  # Avanza 4 líneas y hace corte parcial
+ESC_ABRIR_CAJON = b'\x1bp\x00\x19\xfa'  # Pulso al cajón (pin 2): 50 ms on, 500 ms off
+# Tabla de codificación rápida para PC858: el codec 'cp858' de Python usa un
+# dict como mapa de codificación y es ~6 veces más lento que una tabla compilada
+_TABLA_858 = codecs.charmap_build(encodings.cp858.decoding_table)
+
+
+def codificar_escpos(texto: str) -> bytes:
+    """Codifica texto para la impresora (PC858; lo que no exista sale como '?')"""
+    return codecs.charmap_encode(texto, 'replace', _TABLA_858)[0]
+
+
+class _CampoAItem(ast.NodeTransformer):
+    """Reescribe los nombres de una expresión de cálculo como `_i["nombre"]`"""
+
+    def visit_Name(self, nodo):
+        return ast.copy_location(
+            ast.Subscript(value=ast.Name(id='_i', ctx=ast.Load()),
+                          slice=ast.Constant(value=nodo.id), ctx=ast.Load()),
+            nodo)
+
+
+class PlantillaFactura:
+    """
+    Plantilla de factura compilada.
+
+    Args:
+        encabezado: Líneas antes de los items (campos de `datos`)
+        item: Formato de una línea de item (campos de cada item)
+        pie: Líneas después de los items (campos de `datos`)
+        constantes: Campos que se resuelven al compilar; siempre existen
+            `sep` ('-' * ancho) y `sep2` ('=' * ancho)
+        calculos: Campos de item calculados a partir de otros campos del
+            mismo item, como expresiones (ej. {'subtotal': 'precio * cantidad'})
+    """
+
+    def __init__(self, encabezado: str, item: str, pie: str,
+                 constantes: Mapping[str, Any] = None,
+                 calculos: Mapping[str, str] = None, ancho: int = ANCHO):
+        self.ancho = ancho
+        self._constantes = {'sep': '-' * ancho, 'sep2': '=' * ancho}
+        self._constantes.update(constantes or {})
+        self._calculos = {campo: self._compilar_calculo(expresion)
+                          for campo, expresion in (calculos or {}).items()}
+
+        negrita_item, partes_item = self._analizar_linea(item)
+        if '\n' in item or negrita_item:
+            raise ValueError("La línea de item debe ser una sola línea sin estilo")
+        encabezado = [self._analizar_linea(linea) for linea in encabezado.split('\n')]
+        pie = [self._analizar_linea(linea) for linea in pie.split('\n')]
+
+        # Texto: cada bloque es una sola f-string con los saltos ya incluidos;
+        # los items se formatean en una comprensión y un único join
+        self._texto_encabezado = self._compilar(self._fstring(encabezado, '_d'), '_d')
+        self._texto_pie = self._compilar(self._fstring(pie, '_d'), '_d')
+        self._texto_items = self._compilar(
+            '"\\n".join([%s for _i in _items])' % self._fstring([(False, partes_item)], '_i'),
+            '_items')
+
+        # ESC/POS: mismas líneas, pero separadas para intercalar los estilos
+        self._negritas_encabezado = [negrita for negrita, _ in encabezado]
+        self._negritas_pie = [negrita for negrita, _ in pie]
+        self._lineas_encabezado = self._compilar(self._lista_fstrings(encabezado, '_d'), '_d')
+        self._lineas_pie = self._compilar(self._lista_fstrings(pie, '_d'), '_d')
+
+    # ------------------------------------------------------------------
+    # Compilación
+    # ------------------------------------------------------------------
+
+    def _analizar_linea(self, linea: str) -> Tuple[bool, list]:
+        """
+        Separa la marca de estilo y resuelve constantes.
+
+        Retorna (negrita, partes): cada parte es un literal (str) o un
+        campo (nombre, conversion, especificacion).
+        """
+        negrita = linea.startswith(MARCA_NEGRITA)
+        if negrita:
+            linea = linea[len(MARCA_NEGRITA):]
+
+        partes = []
+        for literal, campo, especificacion, conversion in Formatter().parse(linea):
+            if literal:
+                partes.append(literal)
+            if campo is None:
+                continue
+            if not campo.isidentifier() or '{' in (especificacion or ''):
+                raise ValueError(f"Campo no soportado en la plantilla: {{{campo}:{especificacion}}}")
+            if campo in self._constantes:
+                valor = self._constantes[campo]
+                if conversion:
+                    valor = {'r': repr, 's': str, 'a': ascii}[conversion](valor)
+                partes.append(format(valor, especificacion or ''))
+            else:
+                partes.append((campo, conversion, especificacion))
+        return negrita, partes
+
+    @staticmethod
+    def _compilar_calculo(expresion: str) -> str:
+        arbol = _CampoAItem().visit(ast.parse(expresion, mode='eval'))
+        return '(' + ast.unparse(ast.fix_missing_locations(arbol)) + ')'
+
+    def _fuente_linea(self, partes: list, variable: str) -> str:
+        """Contenido de una f-string (sin comillas) para las partes de una línea"""
+        fuente = []
+        for parte in partes:
+            if isinstance(parte, str):
+                fuente.append(parte.replace('{', '{{').replace('}', '}}'))
+                continue
+            campo, conversion, especificacion = parte
+            if variable == '_i' and campo in self._calculos:
+                expresion = self._calculos[campo]
+            else:
+                expresion = f'{variable}[{campo!r}]'
+            fuente.append('{' + expresion + (f'!{conversion}' if conversion else '')
+                          + (f':{especificacion}' if especificacion else '') + '}')
+        return "".join(fuente)
+
+    def _fstring(self, lineas: List[Tuple[bool, list]], variable: str) -> str:
+        contenido = "\n".join(self._fuente_linea(partes, variable) for _, partes in lineas)
+        return 'f' + repr(contenido)
+
+    def _lista_fstrings(self, lineas: List[Tuple[bool, list]], variable: str) -> str:
+        return '[' + ", ".join('f' + repr(self._fuente_linea(partes, variable))
+                               for _, partes in lineas) + ']'
+
+    @staticmethod
+    def _compilar(expresion: str, parametro: str) -> Callable:
+        """Convierte una expresión generada en una función de un parámetro"""
+        return eval(compile(f'lambda {parametro}: {expresion}', '<plantilla_factura>', 'eval'), {})
+
+    # ------------------------------------------------------------------
+    # Backends
+    # ------------------------------------------------------------------
+
+    def texto(self, datos: Mapping[str, Any], items: Iterable[Mapping[str, Any]]) -> str:
+        """Factura en texto plano"""
+        lineas = self._texto_items(items)
+        if lineas:
+            return "\n".join((self._texto_encabezado(datos), lineas, self._texto_pie(datos)))
+        return self._texto_encabezado(datos) + "\n" + self._texto_pie(datos)
+
+    def escpos(self, datos: Mapping[str, Any], items: Iterable[Mapping[str, Any]],
+               cortar: bool = False, abrir_cajon: bool = False) -> bytes:
+        """
+        Factura como flujo ESC/POS (negritas incluidas)
+
+        Args:
+            cortar: Avanzar el papel y cortar al final del ticket
+            abrir_cajon: Enviar el pulso de apertura del cajón de dinero
+        """
+        salida = [ESC_INICIAR, ESC_PAGINA_858]
+        self._escpos_bloque(salida, self._negritas_encabezado, self._lineas_encabezado(datos))
+        lineas = self._texto_items(items)
+        if lineas:
+            salida.append(codificar_escpos(lineas + '\n'))
+        self._escpos_bloque(salida, self._negritas_pie, self._lineas_pie(datos))
+        if cortar:
+            salida.append(GS_CORTE_PARCIAL)
+        if abrir_cajon:
+            salida.append(ESC_ABRIR_CAJON)
+        return b"".join(salida)
+
+    @staticmethod
+    def _escpos_bloque(salida: List[bytes], negritas: List[bool], lineas: List[str]):
+        # Las líneas normales consecutivas se codifican juntas
+        normales = []
+        for negrita, linea in zip(negritas, lineas):
+            if negrita:
+                if normales:
+                    salida.append(codificar_escpos("\n".join(normales) + "\n"))
+                    normales = []
+                salida.extend((ESC_NEGRITA_ON, codificar_escpos(linea + "\n"),
+                               ESC_NEGRITA_OFF))
+            else:
+                normales.append(linea)
+        if normales:
+            salida.append(codificar_escpos("\n".join(normales) + "\n"))
+
+    def pdf(self, datos: Mapping[str, Any], items: Iterable[Mapping[str, Any]],
+            papel: str = 'A4') -> bytes:
+        """Factura en PDF (texto monoespaciado)"""
+        return escritor_pdf(papel).generar(self.texto(datos, items))
+
+    def renderizar(self, formato: str, datos: Mapping[str, Any],
+                   items: Iterable[Mapping[str, Any]], **opciones):
+        """Renderiza en 'texto', 'escpos' o 'pdf'"""
+        backends = {'texto': self.texto, 'escpos': self.escpos, 'pdf': self.pdf}
+        if formato not in backends:
+            raise ValueError(f"Formato desconocido: {formato}. Opciones: {', '.join(backends)}")
+        return backends[formato](datos, items, **opciones)
+
+
+# Ticket de la interfaz (carrito -> factura)
+PLANTILLA_TICKET = PlantillaFactura(
+    encabezado="""
+{sep2}
+                    FACTURA
+{sep2}
+
+Fecha: {fecha}
+Cliente: {cliente}
+
+{sep}
+ITEMS:
+{sep}""",
+    item="{nombre:<30} x{cantidad:>2}  ${subtotal:>8,.0f}",
+    calculos={'subtotal': 'precio * cantidad'},
+    pie="""
+{sep}
+Subtotal:          ${subtotal:>10,.0f}
+ITBMS (19%):       ${itbms:>10,.0f}
+Descuento:         ${descuento:>10,.0f}
+{sep}
+**TOTAL:             ${total:>10,.0f}
+{sep}
+
+Método de Pago: {metodo_pago}
+
+{sep2}
+         Gracias por su compra
+{sep2}
+""",
+)
+
+# Factura del modelo (Factura.generar_texto)
+PLANTILLA_FACTURA = PlantillaFactura(
+    encabezado="""{sep2}
+{negocio}
+{sep2}
+
+NIT: {nit}
+FACTURA Nº: {numero}
+FECHA: {fecha}
+
+{sep}
+DESCRIPCIÓN                      CANT   PRECIO    TOTAL
+{sep}""",
+    item="{nombre:<30.30} {cantidad:>4} ${precio:>8.2f} ${total:>8.2f}",
+    pie="""{sep}
+SUBTOTAL: {vacio:>36} ${subtotal:>8.2f}
+IVA 19%:  {vacio:>36} ${impuesto:>8.2f}
+{sep2}
+**TOTAL:    {vacio:>36} ${total:>8.2f}
+{sep2}
+
+FORMA DE PAGO: {forma_pago}
+
+{gracias}
+""",
+    constantes={'vacio': '', 'gracias': "¡GRACIAS POR SU COMPRA!".center(ANCHO)},
+)
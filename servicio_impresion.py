@@ -0,0 +1,167 @@
+"""
+Servicio de impresoras: descubrimiento de impresoras CUPS en segundo plano
+
+Consulta `lpstat` y `lpoptions` en un hilo y guarda el resultado en memoria
+con un TTL, para que el diálogo de impresión abra al instante y nunca
+lance subprocesos desde el hilo de Tk.
+"""
+from typing import Dict, List, Optional, Tuple
+import logging
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _ejecutar(cmd: List[str], timeout: float = 5) -> Optional[str]:
+    """Ejecuta un comando de CUPS y retorna su salida (None si falla)"""
+    try:
+        resultado = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"{cmd[0]} no disponible: {e}")
+        return None
+    if resultado.returncode != 0:
+        return None
+    return resultado.stdout
+
+
+def listar_impresoras() -> List[str]:
+    """Nombres de las impresoras configuradas (lpstat -p)"""
+    salida = _ejecutar(['lpstat', '-p'])
+    impresoras = []
+    for linea in (salida or '').strip().split('\n'):
+        # Buscar líneas que empiecen con "printer" (formato: "printer NombreImpresora...")
+        if linea.startswith('printer '):
+            partes = linea.split()
+            if len(partes) > 1:
+                impresoras.append(partes[1])
+    return impresoras
+
+
+def impresora_predeterminada() -> Optional[str]:
+    """Impresora predeterminada del sistema (lpstat -d)"""
+    salida = _ejecutar(['lpstat', '-d'])
+    for linea in (salida or '').strip().split('\n'):
+        if 'system default' in linea or 'destination' in linea:
+            partes = linea.split(':')
+            if len(partes) > 1:
+                return partes[1].strip()
+    return None
+
+
+def consultar_capacidades(impresora: str) -> Tuple[List[str], bool]:
+    """
+    Consulta CUPS (lpoptions) para obtener medias soportadas y soporte de dúplex
+
+    Returns:
+        (medias, soporta_duplex)
+    """
+    salida = _ejecutar(['lpoptions', '-p', impresora, '-l'])
+    medias = []
+    soporta_duplex = False
+
+    for linea in (salida or '').splitlines():
+        linea = linea.strip()
+        if not linea or ':' not in linea:
+            continue
+        left, right = linea.split(':', 1)
+        left = left.strip()
+        right = right.strip()
+
+        # Detectar opción de tamaño de página
+        lname = left.lower()
+        if 'pagesize' in lname or 'page' in lname and ('size' in lname or 'media' in lname) or 'media' in lname:
+            # right contiene valores como "*A4 Letter Legal"
+            tokens = [t.strip().lstrip('*') for t in right.split() if t.strip()]
+            # Filtrar tokens que parezcan media
+            candidate = [t for t in tokens if any(c.isalpha() for c in t)]
+            if candidate:
+                medias = candidate
+
+        # Detectar opción de duplex
+        if 'duplex' in lname or 'sides' in lname:
+            # Si hay más de una opción y no es solo "None", asumimos soporte
+            tokens = [t.strip().lstrip('*') for t in right.split() if t.strip()]
+            if len(tokens) > 1 or any('two' in t.lower() or 'duplex' in t.lower() for t in tokens):
+                soporta_duplex = True
+
+    return (medias, soporta_duplex)
+
+
+class RegistroImpresoras:
+    """
+    Caché de impresoras y sus capacidades, refrescada en segundo plano.
+
+    Las lecturas nunca bloquean: devuelven lo último conocido y, si está
+    vencido, agendan un refresco. `version` aumenta con cada refresco
+    terminado para que la interfaz pueda detectar cambios sondeando con
+    `after` sin tocar widgets desde otro hilo.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._impresoras: List[str] = []
+        self._predeterminada: Optional[str] = None
+        self._capacidades: Dict[str, Tuple[List[str], bool]] = {}
+        self._actualizado = 0.0
+        self._hilo: Optional[threading.Thread] = None
+        self.version = 0
+
+    def iniciar(self):
+        """Descubre impresoras en segundo plano (llamar al arrancar la app)"""
+        self.refrescar()
+
+    def refrescar(self):
+        """Fuerza un nuevo descubrimiento en segundo plano (no bloquea)"""
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._descubrir, name="impresoras", daemon=True)
+            self._hilo.start()
+
+    @property
+    def descubriendo(self) -> bool:
+        hilo = self._hilo
+        return hilo is not None and hilo.is_alive()
+
+    @property
+    def listo(self) -> bool:
+        """True si ya hubo al menos un descubrimiento completo"""
+        return self._actualizado > 0
+
+    def impresoras(self) -> Tuple[List[str], Optional[str]]:
+        """Impresoras conocidas y la predeterminada (sin ejecutar comandos)"""
+        self._refrescar_si_vencido()
+        with self._lock:
+            return list(self._impresoras), self._predeterminada
+
+    def capacidades(self, impresora: str) -> Optional[Tuple[List[str], bool]]:
+        """Medias y dúplex de la impresora, o None si aún no se conocen"""
+        self._refrescar_si_vencido()
+        with self._lock:
+            return self._capacidades.get(impresora)
+
+    def _refrescar_si_vencido(self):
+        if time.monotonic() - self._actualizado > self.ttl:
+            self.refrescar()
+
+    def _descubrir(self):
+        inicio = time.monotonic()
+        impresoras = listar_impresoras()
+        predeterminada = impresora_predeterminada()
+        capacidades = {nombre: consultar_capacidades(nombre) for nombre in impresoras}
+
+        with self._lock:
+            self._impresoras = impresoras
+            self._predeterminada = predeterminada
+            self._capacidades = capacidades
+            self._actualizado = time.monotonic()
+            self.version += 1
+        logger.info(f"Impresoras detectadas: {len(impresoras)} "
+                    f"({time.monotonic() - inicio:.2f}s)")
+
+
+# Registro compartido por toda la aplicación
+registro_impresoras = RegistroImpresoras()
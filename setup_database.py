@@ -9,6 +9,8 @@ from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 import sys
 import os
 
+from migraciones import aplicar_migraciones, MigracionError
+
 # Configuración de conexión
 DB_CONFIG = {
     'host': 'localhost',
@@ -111,6 +113,22 @@ def ejecutar_script_sql():
         print(f"✗ No se encontró el archivo DB/DB.sql")
         return False
 
+def registrar_migraciones():
+    """
+    Aplica DB/migraciones sobre la base recién creada
+
+    DB.sql ya trae el esquema completo, así que las migraciones (idempotentes)
+    no cambian nada: solo quedan registradas en ESQUEMA_MIGRACION para que
+    `python3 migraciones.py` aplique únicamente las que se agreguen después.
+    """
+    try:
+        aplicar_migraciones()
+        print("✓ Migraciones registradas")
+        return True
+    except (MigracionError, psycopg2.Error) as e:
+        print(f"✗ Error al registrar las migraciones: {e}")
+        return False
+
 def verificar_conexion():
     """Verifica que PostgreSQL esté accesible"""
     try:
@@ -156,6 +174,12 @@ def main():
         sys.exit(1)
     print()
     
+    # Paso 4: Registrar migraciones
+    print("Paso 4: Registrando migraciones...")
+    if not registrar_migraciones():
+        sys.exit(1)
+    print()
+    
     print("=" * 60)
     print("✓ CONFIGURACIÓN COMPLETADA EXITOSAMENTE")
     print("=" * 60)
@@ -0,0 +1,77 @@
+"""Pruebas de Menu.recargar_catalogo y revalidar_catalogo (sin BD ni instantánea en disco)"""
+
+import pytest
+
+import modelo_restaurante
+from modelo_restaurante import Menu, MenuItem
+
+
+@pytest.fixture
+def menu(monkeypatch):
+    """Menu sin __init__ (no arranca el espejo ni la caché); la BD es self.bd"""
+    monkeypatch.setattr(modelo_restaurante, 'escribir_instantanea',
+                        lambda registros: modelo_restaurante.firma(registros))
+    menu = Menu.__new__(Menu)
+    menu.items = {'P1': MenuItem('P1', 'Café', 2.5)}
+    menu.version_catalogo = 0
+    menu._firma_instantanea = None
+    menu.aviso_catalogo = None
+    menu.bd = {'P1': MenuItem('P1', 'Café', 2.5)}
+    monkeypatch.setattr(menu, '_consultar_catalogo', lambda: dict(menu.bd))
+    return menu
+
+
+def test_recargar_con_productos_quita_el_aviso(menu):
+    menu.items = {}
+    menu.aviso_catalogo = Menu.AVISO_CATALOGO_VACIO
+
+    assert menu.recargar_catalogo()
+
+    assert list(menu.items) == ['P1']
+    assert menu.aviso_catalogo is None
+    assert menu.version_catalogo == 1
+
+
+def test_recargar_sin_productos_vacia_el_catalogo(menu):
+    menu.bd.clear()   # Se eliminó el último producto
+
+    assert menu.recargar_catalogo()
+
+    assert menu.items == {}
+    assert menu.aviso_catalogo == Menu.AVISO_CATALOGO_VACIO
+    assert menu.version_catalogo == 1
+
+
+def test_recargar_sin_conexion_conserva_el_catalogo(menu, monkeypatch):
+    def sin_conexion():
+        raise OSError("could not connect")
+    monkeypatch.setattr(menu, '_consultar_catalogo', sin_conexion)
+
+    assert not menu.recargar_catalogo()
+
+    assert list(menu.items) == ['P1']
+    assert menu.version_catalogo == 0
+
+
+def test_revalidar_solo_reemplaza_si_cambio(menu):
+    menu._firma_instantanea = modelo_restaurante.firma(Menu._registros_instantanea(menu.bd))
+    assert not menu.revalidar_catalogo()
+
+    menu.bd['P2'] = MenuItem('P2', 'Té', 2.0)
+    assert menu.revalidar_catalogo()
+    assert sorted(menu.items) == ['P1', 'P2']
+    assert menu.version_catalogo == 1
+
+
+def test_buscar_productos_acota_y_escapa_el_texto(menu, monkeypatch):
+    llamadas = []
+    
+    def consultar(nombre, query, params=(), registros=False):
+        llamadas.append((nombre, params))
+        return [('P1', 'Café 100%', 3.0, '', '')]
+    monkeypatch.setattr(modelo_restaurante, '_consultar', consultar)
+    
+    productos = menu.buscar_productos('100%_', 'Bebidas', limite=5)
+    
+    assert llamadas == [('buscar_productos', ('%100\\%\\_%', 'Bebidas', 'Bebidas', 5))]
+    assert productos[0]['nombre'] == 'Café 100%'
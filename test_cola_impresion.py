@@ -0,0 +1,145 @@
+"""Pruebas de ColaImpresion: reintentos, backoff, recuperación del spool y poda (sin CUPS)"""
+
+import os
+import time
+
+import pytest
+
+from cola_impresion import ColaImpresion, ENVIADO, ERROR, PENDIENTE
+
+
+class EnvioFalso:
+    """Reemplaza ColaImpresion._enviar: falla las primeras veces y registra los envíos"""
+    
+    def __init__(self, fallos=0):
+        self.fallos = fallos
+        self.envios = []
+        self.instantes = []
+    
+    def __call__(self, trabajo):
+        self.instantes.append(time.monotonic())
+        if self.fallos:
+            self.fallos -= 1
+            return False, 'lp: scheduler not responding'
+        self.envios.append(trabajo['id'])
+        return True, f"HP-{len(self.envios)}"
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    return str(tmp_path / 'spool')
+
+
+def _esperar(cola, condicion, timeout=5):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicion(cola.trabajos()):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _cola(directorio, monkeypatch, envio, esperas=(0.01,)):
+    monkeypatch.setattr(ColaImpresion, 'ESPERAS', esperas)
+    cola = ColaImpresion(directorio)
+    monkeypatch.setattr(cola, '_enviar', envio)
+    return cola
+
+
+def test_reintenta_hasta_enviar(directorio, monkeypatch):
+    envio = EnvioFalso(fallos=3)
+    cola = _cola(directorio, monkeypatch, envio)
+    cola.iniciar()
+    try:
+        id_trabajo = cola.encolar('Factura 1', 'HP')
+        assert _esperar(cola, lambda ts: ts[0]['estado'] == ENVIADO)
+    finally:
+        cola.detener()
+
+    trabajo = cola.trabajos()[0]
+    assert envio.envios == [id_trabajo]
+    assert trabajo['intentos'] == 4
+    assert trabajo['id_cups'] == 'HP-1'
+    assert trabajo['error'] is None
+
+
+def test_backoff_creciente_entre_intentos(directorio, monkeypatch):
+    envio = EnvioFalso(fallos=2)
+    cola = _cola(directorio, monkeypatch, envio, esperas=(0.05, 0.2))
+    cola.iniciar()
+    try:
+        cola.encolar('Factura 1', 'HP')
+        assert _esperar(cola, lambda ts: ts[0]['estado'] == ENVIADO)
+    finally:
+        cola.detener()
+
+    primera = envio.instantes[1] - envio.instantes[0]
+    segunda = envio.instantes[2] - envio.instantes[1]
+    assert primera >= 0.05
+    assert segunda >= 0.2
+
+
+def test_pasa_a_error_tras_max_intentos_y_se_puede_reintentar(directorio, monkeypatch):
+    monkeypatch.setattr(ColaImpresion, 'MAX_INTENTOS', 3)
+    envio = EnvioFalso(fallos=3)
+    cola = _cola(directorio, monkeypatch, envio)
+    cola.iniciar()
+    try:
+        id_trabajo = cola.encolar('Factura 1', 'HP')
+        assert _esperar(cola, lambda ts: ts[0]['estado'] == ERROR)
+        assert cola.trabajos()[0]['error'] == 'lp: scheduler not responding'
+
+        cola.reintentar(id_trabajo)
+        assert _esperar(cola, lambda ts: ts[0]['estado'] == ENVIADO)
+    finally:
+        cola.detener()
+
+    assert envio.envios == [id_trabajo]
+
+
+def test_recupera_pendientes_del_spool(directorio, monkeypatch):
+    # Primera sesión: el trabajo queda pendiente porque el hilo nunca arranca
+    anterior = _cola(directorio, monkeypatch, EnvioFalso())
+    id_trabajo = anterior.encolar('Factura 1', 'HP')
+    anterior._trabajos[id_trabajo]['proximo_intento'] = time.time() + 3600
+    anterior._guardar(anterior._trabajos[id_trabajo])
+
+    envio = EnvioFalso()
+    cola = _cola(directorio, monkeypatch, envio)
+    cola.iniciar()
+    try:
+        assert _esperar(cola, lambda ts: ts and ts[0]['estado'] == ENVIADO)
+    finally:
+        cola.detener()
+
+    assert envio.envios == [id_trabajo]
+
+
+def test_poda_enviados_y_errores_con_topes_propios(directorio, monkeypatch):
+    monkeypatch.setattr(ColaImpresion, 'MAX_HISTORIAL', 2)
+    monkeypatch.setattr(ColaImpresion, 'MAX_ERRORES', 1)
+    cola = ColaImpresion(directorio)
+    ids = [cola.encolar(f'Factura {i}', 'HP') for i in range(6)]
+    for i, id_trabajo in enumerate(ids):
+        cola._trabajos[id_trabajo]['creado'] = i
+        cola._trabajos[id_trabajo]['estado'] = ENVIADO if i < 3 else ERROR
+
+    cola._podar()
+
+    assert {t['id']: t['estado'] for t in cola.trabajos()} == {
+        ids[1]: ENVIADO, ids[2]: ENVIADO, ids[5]: ERROR,
+    }
+    assert sorted(os.listdir(directorio)) == sorted(
+        f"{i}.{ext}" for i in (ids[1], ids[2], ids[5]) for ext in ('json', 'txt'))
+
+
+def test_poda_no_toca_pendientes(directorio, monkeypatch):
+    monkeypatch.setattr(ColaImpresion, 'MAX_HISTORIAL', 0)
+    monkeypatch.setattr(ColaImpresion, 'MAX_ERRORES', 0)
+    cola = ColaImpresion(directorio)
+    ids = [cola.encolar(f'Factura {i}', 'HP') for i in range(3)]
+
+    cola._podar()
+
+    assert sorted(t['id'] for t in cola.trabajos()) == sorted(ids)
+    assert all(t['estado'] == PENDIENTE for t in cola.trabajos())
@@ -0,0 +1,138 @@
+"""Pruebas de EjecutorDB: entrega en el hilo de Tk y descarte de peticiones obsoletas (sin Tk)"""
+
+import threading
+import time
+
+import pytest
+
+from ejecutor_db import EjecutorDB
+
+
+class WidgetFalso:
+    """Imita after/after_cancel de Tk: los callbacks se corren a mano con tick()"""
+    
+    def __init__(self):
+        self.agendados = {}
+        self._siguiente = 0
+    
+    def after(self, ms, callback):
+        self._siguiente += 1
+        self.agendados[self._siguiente] = callback
+        return self._siguiente
+    
+    def after_cancel(self, job):
+        self.agendados.pop(job, None)
+    
+    def tick(self):
+        agendados, self.agendados = self.agendados, {}
+        for callback in agendados.values():
+            callback()
+
+
+@pytest.fixture
+def widget():
+    return WidgetFalso()
+
+
+@pytest.fixture
+def ejecutor(widget):
+    ejecutor = EjecutorDB(widget, max_hilos=2)
+    yield ejecutor
+    ejecutor.cerrar()
+
+
+def _esperar(ejecutor, terminados, timeout=5):
+    """Espera a que los callbacks de los Future hayan encolado `terminados` tareas"""
+    limite = time.monotonic() + timeout
+    while ejecutor._terminados.qsize() < terminados and time.monotonic() < limite:
+        time.sleep(0.01)
+
+
+def test_entrega_el_resultado_en_el_hilo_de_tk(widget, ejecutor):
+    recibidos = []
+    ejecutor.enviar(lambda a, b: a + b, 2, 3,
+                    al_terminar=lambda r: recibidos.append((r, threading.get_ident())))
+    _esperar(ejecutor, 1)
+    assert recibidos == []   # Nada se entrega fuera de _despachar
+
+    widget.tick()
+
+    assert recibidos == [(5, threading.get_ident())]
+
+
+def test_descarta_la_peticion_obsoleta_que_ya_corria(widget, ejecutor):
+    liberar = threading.Event()
+    empezo = threading.Event()
+
+    def lenta():
+        empezo.set()
+        liberar.wait(5)
+        return 'vieja'
+
+    recibidos = []
+    ejecutor.enviar(lenta, al_terminar=recibidos.append, clave='grid')
+    assert empezo.wait(5)
+    ejecutor.enviar(lambda: 'nueva', al_terminar=recibidos.append, clave='grid')
+    liberar.set()
+    _esperar(ejecutor, 2)
+
+    widget.tick()
+
+    assert recibidos == ['nueva']
+    assert not ejecutor.ocupado('grid')
+
+
+def test_cancela_la_peticion_obsoleta_que_no_empezo(widget):
+    ejecutor = EjecutorDB(widget, max_hilos=1)
+    liberar = threading.Event()
+    try:
+        ejecutor.enviar(liberar.wait, 5)
+        llamadas = []
+        vieja = ejecutor.enviar(llamadas.append, 'vieja', clave='grid')
+        ejecutor.enviar(llamadas.append, 'nueva', clave='grid')
+
+        assert vieja.cancelled()
+        liberar.set()
+        _esperar(ejecutor, 3)
+        widget.tick()
+
+        assert llamadas == ['nueva']
+    finally:
+        ejecutor.cerrar()
+
+
+def test_ocupado_hasta_entregar(widget, ejecutor):
+    ejecutor.enviar(lambda: 1, clave='tipos')
+    _esperar(ejecutor, 1)
+
+    assert ejecutor.ocupado('tipos')
+    widget.tick()
+    assert not ejecutor.ocupado('tipos')
+
+
+def test_errores_van_a_al_fallar_y_no_cortan_el_despacho(widget, ejecutor):
+    def falla():
+        raise ValueError('sin conexión')
+
+    def callback_roto(_):
+        raise RuntimeError('error en la interfaz')
+
+    errores, recibidos = [], []
+    ejecutor.enviar(falla, al_fallar=errores.append)
+    ejecutor.enviar(lambda: 1, al_terminar=callback_roto)
+    ejecutor.enviar(lambda: 2, al_terminar=recibidos.append)
+    _esperar(ejecutor, 3)
+
+    widget.tick()
+
+    assert [str(e) for e in errores] == ['sin conexión']
+    assert recibidos == [2]
+
+
+def test_cerrar_detiene_el_despacho(widget):
+    ejecutor = EjecutorDB(widget)
+    assert len(widget.agendados) == 1
+
+    ejecutor.cerrar()
+
+    assert widget.agendados == {}
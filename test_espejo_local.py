@@ -0,0 +1,63 @@
+"""Pruebas de EspejoLocal.con_respaldo: qué errores pasan la aplicación a la copia local"""
+
+import psycopg2
+import pytest
+
+from conexionDB import PoolAgotadoError
+from espejo_local import EspejoLocal
+
+
+@pytest.fixture
+def espejo(tmp_path):
+    espejo = EspejoLocal(str(tmp_path / 'espejo.sqlite3'))
+    espejo._completo = True   # Como si ya se hubiera sincronizado todo
+    return espejo
+
+
+def _falla(error):
+    def remota():
+        raise error
+    return remota
+
+
+def test_error_de_conexion_usa_la_copia_local(espejo):
+    resultado = espejo.con_respaldo(_falla(psycopg2.OperationalError("could not connect")),
+                                    lambda: 'local')
+
+    assert resultado == 'local'
+    assert espejo.conectado is False
+
+
+def test_pool_agotado_no_pasa_a_sin_conexion(espejo):
+    with pytest.raises(PoolAgotadoError):
+        espejo.con_respaldo(_falla(PoolAgotadoError("Sin conexiones libres")), lambda: 'local')
+
+    assert espejo.conectado is None
+    assert espejo.con_respaldo(lambda: 'remota', lambda: 'local') == 'remota'
+
+
+def test_sin_copia_completa_propaga_el_error(espejo):
+    espejo._completo = False
+
+    with pytest.raises(psycopg2.InterfaceError):
+        espejo.con_respaldo(_falla(psycopg2.InterfaceError("connection already closed")),
+                            lambda: 'local')
+    assert espejo.conectado is None
+
+
+def test_buscar_productos_en_la_copia_local(tmp_path):
+    espejo = EspejoLocal(str(tmp_path / 'espejo.sqlite3'))
+    espejo._abrir()
+    espejo._conexion.executemany("INSERT INTO producto VALUES (?, ?, ?, '', '')", [
+        ('P1', 'Café', 2.5), ('P2', 'Café 100%', 3.0), ('P3', 'Té', 2.0), ('P4', 'cafetera', 9.0),
+    ])
+    espejo._conexion.execute("INSERT INTO tipo_comida VALUES (1, 'Bebidas')")
+    espejo._conexion.execute("INSERT INTO menu_producto VALUES (1, 'P2', 1, 1, 1)")
+    
+    def ids(patron, tipo=None, limite=10):
+        return [fila[0] for fila in espejo.buscar_productos(patron, tipo, limite)]
+    
+    assert ids('%caf%') == ['P1', 'P2', 'P4']
+    assert ids('%caf%', limite=2) == ['P1', 'P2']
+    assert ids('%100\\%%') == ['P2']
+    assert ids('%caf%', tipo='Bebidas') == ['P2']
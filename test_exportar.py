@@ -0,0 +1,60 @@
+"""Pruebas de exportar.py: CSV del catálogo y de ventas sin BD (iterar_query falso)"""
+
+import csv
+
+import pytest
+
+import exportar
+from conexionDB import db_manager
+
+
+@pytest.fixture
+def consultas(monkeypatch):
+    """Reemplaza db_manager.iterar_query: registra la consulta y devuelve self.filas"""
+    class Registro:
+        filas = []
+        llamadas = []
+    
+    def iterar_query(query, params=None, itersize=None, **kwargs):
+        Registro.llamadas.append((query, params))
+        yield from Registro.filas
+    
+    monkeypatch.setattr(db_manager, 'iterar_query', iterar_query)
+    Registro.llamadas = []
+    return Registro
+
+
+def _leer(ruta):
+    with open(ruta, encoding='utf-8', newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_exporta_productos(consultas, tmp_path):
+    consultas.filas = [('P1', 'Café, grande', 2.5, 'cafe.png', 'Con "espuma"')]
+    ruta = tmp_path / 'productos.csv'
+
+    assert exportar.exportar(['productos', str(ruta)]) == 0
+
+    assert _leer(ruta) == [['id_producto', 'nombre', 'precio', 'imagen', 'descripcion'],
+                           ['P1', 'Café, grande', '2.5', 'cafe.png', 'Con "espuma"']]
+    assert 'FROM PRODUCTO' in consultas.llamadas[0][0]
+
+
+def test_exporta_ventas_entre_fechas(consultas, tmp_path):
+    consultas.filas = [('2026-01-02 10:00', 'V1', 'Ana', 'Efectivo', 1, 'P1', 'Café', 2.5, 2, 5.0)]
+    ruta = tmp_path / 'ventas.csv'
+
+    assert exportar.exportar(['ventas', '2026-01-01', '2026-01-31', str(ruta)]) == 0
+
+    filas = _leer(ruta)
+    assert filas[0][:3] == ['fecha', 'idVenta', 'cliente']
+    assert filas[1][1] == 'V1'
+    assert consultas.llamadas[0][1] == ('2026-01-01', '2026-01-31')
+
+
+@pytest.mark.parametrize('argumentos', [
+    [], ['clientes'], ['ventas', '2026-01-01'], ['ventas', '01/01/2026', '2026-01-31'],
+])
+def test_argumentos_invalidos(consultas, argumentos):
+    assert exportar.exportar(argumentos) == 2
+    assert consultas.llamadas == []
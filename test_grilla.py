@@ -0,0 +1,130 @@
+"""Pruebas de la reconciliación de GrillaTarjetas con widgets falsos (sin Tk)"""
+
+import time
+
+from visor_productos import ElementoGrilla, GrillaTarjetas
+
+
+class WidgetFalso:
+    def __init__(self, contador):
+        self.contador = contador
+        self.celda = None
+        self.destruido = False
+    
+    def grid(self, row, column, columnspan, **opciones):
+        self.contador['grid'] += 1
+        self.celda = (row, column, columnspan)
+    
+    def grid_remove(self):
+        self.contador['grid_remove'] += 1
+        self.celda = None
+    
+    def destroy(self):
+        self.contador['destroy'] += 1
+        self.destruido = True
+
+
+class FrameFalso:
+    def grid_columnconfigure(self, indice, **opciones):
+        pass
+
+
+def _grilla():
+    contador = {'creadas': 0, 'grid': 0, 'grid_remove': 0, 'destroy': 0}
+    
+    def elemento(clave, firma=None, ancho_completo=False):
+        def crear(parent):
+            contador['creadas'] += 1
+            return WidgetFalso(contador)
+        return ElementoGrilla(clave, firma if firma is not None else clave, crear, ancho_completo)
+    
+    return GrillaTarjetas(FrameFalso()), contador, elemento
+
+
+def _reiniciar(contador):
+    for clave in contador:
+        contador[clave] = 0
+
+
+def test_reconciliar_la_misma_lista_no_toca_widgets():
+    grilla, contador, elemento = _grilla()
+    elementos = [elemento(i) for i in range(500)]
+    grilla.reconciliar(elementos, 4)
+    assert contador['creadas'] == 500 and len(grilla) == 500
+    
+    _reiniciar(contador)
+    grilla.reconciliar([elemento(i) for i in range(500)], 4)
+    
+    assert contador == {'creadas': 0, 'grid': 0, 'grid_remove': 0, 'destroy': 0}
+
+
+def test_redimensionar_reubica_sin_crear_ni_destruir():
+    grilla, contador, elemento = _grilla()
+    grilla.reconciliar([elemento(i) for i in range(500)], 4)
+    widgets = {clave: datos[0] for clave, datos in grilla._tarjetas.items()}
+    
+    _reiniciar(contador)
+    grilla.cambiar_columnas(5)
+    
+    assert contador['creadas'] == 0 and contador['destroy'] == 0
+    # Las primeras 4 tarjetas siguen en la fila 0: solo se mueven las demás
+    assert contador['grid'] == 496
+    assert {clave: datos[0] for clave, datos in grilla._tarjetas.items()} == widgets
+    assert widgets[5].celda == (1, 0, 1)
+    
+    _reiniciar(contador)
+    grilla.cambiar_columnas(5)
+    assert contador['grid'] == 0
+
+
+def test_solo_recrea_lo_que_cambio():
+    grilla, contador, elemento = _grilla()
+    grilla.reconciliar([elemento(i) for i in range(10)], 3)
+    quitado = grilla._tarjetas[9][0]
+    cambiado = grilla._tarjetas[4][0]
+    
+    _reiniciar(contador)
+    nuevos = [elemento(i, firma=('nuevo precio',) if i == 4 else None) for i in range(9)]
+    grilla.reconciliar(nuevos + [elemento('extra')], 3)
+    
+    assert contador['creadas'] == 2      # La tarjeta 4 y 'extra'
+    assert contador['destroy'] == 2      # La tarjeta 9 y la vieja 4
+    assert quitado.destruido and cambiado.destruido
+    assert len(grilla) == 10
+
+
+def test_ancho_completo_ocupa_una_fila():
+    grilla, contador, elemento = _grilla()
+    elementos = [elemento('titulo', ancho_completo=True), elemento(1), elemento(2),
+                 elemento('otro', ancho_completo=True), elemento(3)]
+    grilla.reconciliar(elementos, 3)
+    
+    celdas = {clave: datos[0].celda for clave, datos in grilla._tarjetas.items()}
+    assert celdas == {'titulo': (0, 0, 3), 1: (1, 0, 1), 2: (1, 1, 1),
+                      'otro': (2, 0, 3), 3: (3, 0, 1)}
+
+
+def test_creacion_por_tandas():
+    grilla, contador, elemento = _grilla()
+    elementos = [elemento(i) for i in range(25)]
+    
+    assert grilla.reconciliar(elementos, 4, max_nuevas=10) is True
+    assert contador['creadas'] == 10
+    assert grilla.reconciliar(elementos, 4, max_nuevas=10) is True
+    assert grilla.reconciliar(elementos, 4, max_nuevas=10) is False
+    assert contador['creadas'] == 25 and contador['destroy'] == 0
+
+
+def test_redimensionar_500_tarjetas_en_menos_de_un_cuadro():
+    grilla, contador, elemento = _grilla()
+    grilla.reconciliar([elemento(i) for i in range(500)], 4)
+    
+    tiempos = []
+    for columnas in (5, 3, 6, 4, 2, 5):
+        inicio = time.perf_counter()
+        grilla.cambiar_columnas(columnas)
+        tiempos.append(time.perf_counter() - inicio)
+    
+    # Lógica de la grilla, sin el costo de Tk (ver benchmark_grilla.py)
+    assert sorted(tiempos)[len(tiempos) // 2] < 0.016
+    assert contador['destroy'] == 0
@@ -0,0 +1,112 @@
+"""Pruebas de la salida ESC/POS: bytes de la plantilla, decodificador y envío al dispositivo"""
+
+import time
+
+import pytest
+
+import impresora_termica
+from cola_impresion import ColaImpresion, ENVIADO
+from impresora_termica import DispositivoFalso, OPCIONES_RAW, decodificar_escpos, encolar_ticket
+from plantilla_factura import (ESC_ABRIR_CAJON, ESC_INICIAR, ESC_NEGRITA_OFF, ESC_NEGRITA_ON,
+                               ESC_PAGINA_858, GS_CORTE_PARCIAL, PlantillaFactura,
+                               codificar_escpos)
+
+
+@pytest.fixture
+def plantilla():
+    return PlantillaFactura(
+        encabezado="**{negocio}\nCliente: {cliente}",
+        item="{nombre:<6}{subtotal:>5.2f}",
+        calculos={'subtotal': 'precio * cantidad'},
+        pie="**TOTAL {total:.2f}\nGracias",
+        ancho=12,
+    )
+
+
+DATOS = {'negocio': 'Café', 'cliente': 'Ñoño', 'total': 7.5}
+ITEMS = [{'nombre': 'Té', 'precio': 2.5, 'cantidad': 1},
+         {'nombre': 'Pan', 'precio': 2.5, 'cantidad': 2}]
+
+
+@pytest.fixture
+def cola(tmp_path, monkeypatch):
+    cola = ColaImpresion(str(tmp_path / 'spool'))
+    monkeypatch.setattr(impresora_termica, 'cola_impresion', cola)
+    cola.iniciar()
+    yield cola
+    cola.detener()
+
+
+def _esperar_enviado(cola, timeout=5):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        trabajos = cola.trabajos()
+        if trabajos and all(t['estado'] == ENVIADO for t in trabajos):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_bytes_exactos_de_la_plantilla(plantilla):
+    datos = plantilla.escpos(DATOS, ITEMS, cortar=True, abrir_cajon=True)
+
+    assert datos == b"".join((
+        ESC_INICIAR, ESC_PAGINA_858,
+        ESC_NEGRITA_ON, 'Café\n'.encode('cp858'), ESC_NEGRITA_OFF,
+        'Cliente: Ñoño\n'.encode('cp858'),
+        b'T\x82     2.50\nPan    5.00\n',
+        ESC_NEGRITA_ON, b'TOTAL 7.50\n', ESC_NEGRITA_OFF,
+        b'Gracias\n',
+        GS_CORTE_PARCIAL, ESC_ABRIR_CAJON,
+    ))
+
+
+def test_sin_corte_ni_cajon(plantilla):
+    datos = plantilla.escpos(DATOS, [])
+
+    assert datos.startswith(ESC_INICIAR + ESC_PAGINA_858)
+    assert GS_CORTE_PARCIAL not in datos
+    assert ESC_ABRIR_CAJON not in datos
+
+
+def test_codifica_en_pc858():
+    assert codificar_escpos('€ ñ á ✓') == '€ ñ á ?'.encode('cp858')
+
+
+def test_decodificar_marca_los_comandos(plantilla):
+    texto = decodificar_escpos(plantilla.escpos(DATOS, ITEMS, cortar=True, abrir_cajon=True))
+
+    assert texto == ("[INICIO]\n[N]Café\n[/N]Cliente: Ñoño\nTé     2.50\nPan    5.00\n"
+                     "[N]TOTAL 7.50\n[/N]Gracias\n[CORTE]\n[CAJÓN]\n")
+
+
+def test_decodificar_comando_desconocido_en_hexadecimal():
+    assert decodificar_escpos(b'\x1da\x01hola') == '[1d61]\x01hola'
+
+
+def test_encolar_ticket_escribe_los_bytes_en_el_dispositivo(cola, plantilla, tmp_path):
+    datos = plantilla.escpos(DATOS, ITEMS, cortar=True)
+    with DispositivoFalso(str(tmp_path)) as falso:
+        id_trabajo = encolar_ticket(datos, 'Ticketera', copias=2, dispositivo=falso.ruta)
+        assert _esperar_enviado(cola)
+
+        assert falso.datos() == datos * 2
+        assert falso.texto().count('[CORTE]') == 2
+
+    trabajo = cola.trabajos()[0]
+    assert trabajo['id'] == id_trabajo
+    assert trabajo['binario'] is True
+    assert trabajo['opciones'] == OPCIONES_RAW
+    assert trabajo['id_cups'] == falso.ruta
+
+
+def test_encolar_ticket_sin_dispositivo_usa_lp_raw(cola, monkeypatch):
+    monkeypatch.setattr(impresora_termica, 'DISPOSITIVO_TICKETERA', None)
+    cola.detener()   # Solo se inspecciona el comando, no se envía
+    encolar_ticket(b'\x1b@hola', 'Ticketera', titulo='Ticket 7')
+
+    trabajo = cola.trabajos()[0]
+    assert trabajo['dispositivo'] is None
+    assert cola._comando(trabajo) == ['lp', '-d', 'Ticketera', '-n', '1', '-t', 'Ticket 7',
+                                      '-o', 'raw']
+    assert cola._leer_contenido(trabajo) == b'\x1b@hola'
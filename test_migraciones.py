@@ -0,0 +1,127 @@
+"""Pruebas de migraciones.py: listado, checksums y aplicación (sin BD)"""
+
+import hashlib
+import os
+
+import psycopg2
+import pytest
+
+import migraciones
+from migraciones import MigracionError, aplicar_migraciones, listar_migraciones
+
+
+class CursorFalso:
+    def __init__(self, bd):
+        self.bd = bd
+        self.resultado = []
+    
+    def execute(self, sql, params=None):
+        self.bd.sentencias.append(sql)
+        if sql.startswith("SELECT version, nombre, checksum"):
+            self.resultado = [(v, n, c, None) for v, (n, c) in sorted(self.bd.aplicadas.items())]
+        elif sql.startswith("INSERT INTO ESQUEMA_MIGRACION"):
+            version, nombre, checksum = params
+            self.bd.pendientes[version] = (nombre, checksum)
+        elif 'FALLA' in sql:
+            raise psycopg2.ProgrammingError("syntax error")
+    
+    def fetchall(self):
+        return self.resultado
+    
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    """Registra las sentencias; ESQUEMA_MIGRACION vive en `aplicadas`"""
+    
+    def __init__(self, aplicadas=None):
+        self.aplicadas = dict(aplicadas or {})
+        self.pendientes = {}
+        self.sentencias = []
+    
+    def cursor(self):
+        return CursorFalso(self)
+    
+    def commit(self):
+        self.aplicadas.update(self.pendientes)
+        self.pendientes.clear()
+    
+    def rollback(self):
+        self.pendientes.clear()
+
+
+def _escribir(directorio, archivo, sql):
+    ruta = os.path.join(directorio, archivo)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(sql)
+    return hashlib.sha256(sql.encode('utf-8')).hexdigest()
+
+
+def test_lista_en_orden_con_checksum(tmp_path):
+    directorio = str(tmp_path)
+    checksum_2 = _escribir(directorio, '0002_segunda.sql', 'SELECT 2;')
+    checksum_1 = _escribir(directorio, '0001_primera.sql', 'SELECT 1;')
+    _escribir(directorio, 'notas.sql', 'ignorado')
+    _escribir(directorio, '12_corto.sql', 'ignorado')
+    
+    lista = listar_migraciones(directorio)
+    
+    assert [(m.version, m.nombre, m.checksum) for m in lista] == [
+        (1, 'primera', checksum_1), (2, 'segunda', checksum_2)]
+
+
+def test_version_repetida_falla(tmp_path):
+    _escribir(str(tmp_path), '0001_a.sql', 'SELECT 1;')
+    _escribir(str(tmp_path), '0001_b.sql', 'SELECT 1;')
+    
+    with pytest.raises(MigracionError):
+        listar_migraciones(str(tmp_path))
+
+
+def test_aplica_solo_las_pendientes(tmp_path):
+    directorio = str(tmp_path)
+    checksum_1 = _escribir(directorio, '0001_primera.sql', 'CREATE TABLE uno ();')
+    checksum_2 = _escribir(directorio, '0002_segunda.sql', 'CREATE TABLE dos ();')
+    conexion = ConexionFalsa({1: ('primera', checksum_1)})
+    
+    nuevas = aplicar_migraciones(conexion, directorio)
+    
+    assert [m.version for m in nuevas] == [2]
+    assert conexion.aplicadas[2] == ('segunda', checksum_2)
+    assert 'CREATE TABLE uno ();' not in conexion.sentencias
+    assert 'CREATE TABLE dos ();' in conexion.sentencias
+
+
+def test_migracion_editada_despues_de_aplicarse_falla(tmp_path):
+    directorio = str(tmp_path)
+    _escribir(directorio, '0001_primera.sql', 'CREATE TABLE uno (id INT);')
+    conexion = ConexionFalsa({1: ('primera', hashlib.sha256(b'CREATE TABLE uno ();').hexdigest())})
+    
+    with pytest.raises(MigracionError, match='cambió'):
+        aplicar_migraciones(conexion, directorio)
+
+
+def test_migracion_que_falla_no_se_registra(tmp_path):
+    directorio = str(tmp_path)
+    _escribir(directorio, '0001_primera.sql', 'CREATE TABLE uno ();')
+    _escribir(directorio, '0002_rota.sql', 'FALLA;')
+    _escribir(directorio, '0003_tercera.sql', 'CREATE TABLE tres ();')
+    conexion = ConexionFalsa()
+    
+    with pytest.raises(MigracionError, match='0002_rota'):
+        aplicar_migraciones(conexion, directorio)
+    
+    assert sorted(conexion.aplicadas) == [1]
+    assert 'CREATE TABLE tres ();' not in conexion.sentencias
+
+
+def test_migraciones_del_proyecto_son_correlativas():
+    versiones = [m.version for m in listar_migraciones()]
+    
+    assert versiones == list(range(1, len(versiones) + 1))
+
+
+def test_consultas_criticas_declaran_sus_parametros():
+    for consulta in migraciones.CONSULTAS_CRITICAS:
+        assert consulta['sql'].count('%s') == len(consulta['params']), consulta['nombre']
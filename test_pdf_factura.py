@@ -0,0 +1,103 @@
+"""Pruebas de EscritorPDF: estructura del archivo (xref, flujos) y maquetación"""
+
+import io
+import re
+
+import pytest
+
+from pdf_factura import EscritorPDF, escritor_pdf, generar_pdf
+
+
+def _objetos(pdf):
+    """Offsets de la tabla xref y posición de startxref"""
+    inicio = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', pdf).group(1))
+    assert pdf[inicio:].startswith(b'xref\n')
+    entradas = re.findall(rb'(\d{10}) 00000 n \n', pdf[inicio:])
+    return [int(e) for e in entradas], inicio
+
+
+def _flujos(pdf):
+    return [(int(largo), flujo) for largo, flujo in
+            re.findall(rb'<< /Length (\d+) >>\nstream\n(.*?)\nendstream', pdf, re.S)]
+
+
+def _alto(pdf):
+    return float(re.search(rb'/MediaBox \[0 0 [\d.]+ ([\d.]+)\]', pdf).group(1))
+
+
+def test_xref_apunta_a_cada_objeto():
+    pdf = EscritorPDF().generar("Factura 1\nTotal: 10.00\n")
+    offsets, inicio = _objetos(pdf)
+
+    assert pdf.startswith(b'%PDF-1.4\n')
+    assert len(offsets) == 5   # catálogo, páginas, fuente, página y su flujo
+    for numero, offset in enumerate(offsets, start=1):
+        assert pdf[offset:].startswith(f"{numero} 0 obj\n".encode('ascii'))
+    assert f"/Size {len(offsets) + 1}".encode('ascii') in pdf[inicio:]
+
+
+def test_largo_declarado_de_cada_flujo():
+    pdf = EscritorPDF().generar("\n".join(f"Línea {i}" for i in range(200)))
+    flujos = _flujos(pdf)
+
+    assert len(flujos) > 1
+    for largo, flujo in flujos:
+        assert largo == len(flujo)
+
+
+def test_pagina_segun_filas():
+    escritor = EscritorPDF('A4')
+    pdf = escritor.generar("\n".join("x" for _ in range(escritor.filas * 2 + 1)))
+
+    assert b'/Count 3' in pdf
+    assert b'/Kids [4 0 R 6 0 R 8 0 R]' in pdf
+
+
+def test_escapa_parentesis_y_barras():
+    pdf = EscritorPDF().generar("Promo (2x1) \\ fin\tok")
+    flujo = _flujos(pdf)[0][1]
+
+    assert b"(Promo \\(2x1\\) \\\\ fin    ok) '" in flujo
+
+
+def test_codifica_en_winansi():
+    flujo = _flujos(EscritorPDF().generar("Café ñandú €5 ✓"))[0][1]
+
+    assert "(Café ñandú €5 ?) '".encode('cp1252') in flujo
+
+
+def test_corta_lineas_mas_anchas_que_la_pagina():
+    escritor = EscritorPDF('Recibo80')
+    flujo = _flujos(escritor.generar("a" * (escritor.columnas * 2 + 3)))[0][1]
+
+    lineas = re.findall(rb"\((a*)\) '", flujo)
+    assert [len(l) for l in lineas] == [escritor.columnas, escritor.columnas, 3]
+
+
+def test_recibo_ajusta_el_alto_al_contenido():
+    escritor = EscritorPDF('Recibo80')
+    corto = escritor.generar("una\n")
+    largo = escritor.generar("\n".join("linea" for _ in range(50)))
+
+    assert _alto(largo) - _alto(corto) == pytest.approx(49 * escritor.interlineado, abs=0.02)
+    assert b'/Count 1' in largo
+
+
+def test_escribir_en_flujo_y_ruta_igual_a_generar(tmp_path):
+    escritor = escritor_pdf('Letter')
+    contenido = "Factura\nTotal: 1.00\n"
+    esperado = escritor.generar(contenido)
+
+    buffer = io.BytesIO()
+    assert escritor.escribir(contenido, buffer) == len(esperado)
+    assert buffer.getvalue() == esperado
+
+    ruta = tmp_path / 'factura.pdf'
+    assert generar_pdf(contenido, ruta, papel='Letter') == len(esperado)
+    assert ruta.read_bytes() == esperado
+
+
+def test_escritor_compartido_y_papel_desconocido():
+    assert escritor_pdf('A4', 9) is escritor_pdf('A4', 9)
+    with pytest.raises(ValueError):
+        EscritorPDF('A3')
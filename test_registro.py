@@ -0,0 +1,79 @@
+"""Pruebas de Registro y registro_para (filas de las consultas)"""
+
+import json
+
+import pytest
+
+from conexionDB import Registro, registro_para
+
+
+def test_acceso_por_nombre_indice_y_atributo():
+    Producto = registro_para(('id_producto', 'nombre', 'precio'))
+    fila = Producto((7, 'Arroz con pollo', 3.5))
+    
+    assert fila['nombre'] == 'Arroz con pollo'
+    assert fila[0] == 7
+    assert fila[-1] == 3.5
+    assert fila.precio == 3.5
+    assert fila[1:] == ('Arroz con pollo', 3.5)
+
+
+def test_se_comporta_como_mapeo_de_solo_lectura():
+    Producto = registro_para(('id_producto', 'nombre'))
+    fila = Producto((1, 'Sopa'))
+    
+    assert 'nombre' in fila
+    assert 'precio' not in fila
+    assert fila.get('precio', 0) == 0
+    assert fila.keys() == ('id_producto', 'nombre')
+    assert list(fila.items()) == [('id_producto', 1), ('nombre', 'Sopa')]
+    assert dict(fila) == {'id_producto': 1, 'nombre': 'Sopa'}
+    assert fila.a_dict() == {'id_producto': 1, 'nombre': 'Sopa'}
+    with pytest.raises(KeyError):
+        fila['precio']
+    with pytest.raises(TypeError):
+        fila['nombre'] = 'Otra'
+
+
+def test_json_requiere_a_dict():
+    fila = registro_para(('a', 'b'))((1, 2))
+    
+    assert json.loads(json.dumps(fila)) == [1, 2]
+    assert json.loads(json.dumps(fila.a_dict())) == {'a': 1, 'b': 2}
+
+
+def test_clase_compartida_y_sin_dict():
+    Primera = registro_para(['x', 'y'])
+    
+    assert registro_para(('x', 'y')) is Primera
+    assert registro_para(('y', 'x')) is not Primera
+    assert not hasattr(Primera((1, 2)), '__dict__')
+
+
+def test_convertir_reutiliza_registros_existentes():
+    Par = registro_para(('x', 'y'))
+    existente = Par((1, 2))
+    
+    filas = Par.convertir([existente, (3, 4)])
+    
+    assert filas[0] is existente
+    assert isinstance(filas[1], Par) and filas[1].x == 3
+    assert Par.convertir(None) == []
+
+
+@pytest.mark.parametrize('campos', [
+    ('count',), ('index',), ('keys',), ('get',),
+    ('_privado',), ('?column?',), ('a', 'a'),
+])
+def test_nombres_reservados_o_repetidos_fallan(campos):
+    with pytest.raises(ValueError):
+        registro_para(campos)
+
+
+def test_es_una_tupla():
+    fila = registro_para(('a', 'b'))((1, 2))
+    
+    assert isinstance(fila, Registro)
+    assert isinstance(fila, tuple)
+    assert tuple(fila) == (1, 2)
+    assert fila == (1, 2)
@@ -0,0 +1,225 @@
+"""Pruebas de RegistroVentas: WAL, reintentos y ventas rechazadas (sin BD)"""
+
+import contextlib
+import json
+
+import psycopg2
+import pytest
+
+import ventas
+from ventas import RegistroVentas, nueva_venta
+
+
+class BDFalsa:
+    """Reemplaza db_manager.transaccion: guarda los lotes o falla a pedido"""
+    
+    def __init__(self):
+        self.ventas = {}
+        self.caidas = 0          # Próximas transacciones que fallan por conexión
+        self.invalidas = set()   # idVenta que la BD rechaza por sus datos
+    
+    @contextlib.contextmanager
+    def transaccion(self):
+        if self.caidas:
+            self.caidas -= 1
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        escritas = {}
+        yield _Tx(self, escritas)
+        self.ventas.update(escritas)
+
+
+class _Tx:
+    def __init__(self, bd, escritas):
+        self.bd = bd
+        self.escritas = escritas
+    
+    def upsert_lote(self, tabla, columnas, filas, conflicto, actualizar=None):
+        if tabla != 'VENTA':
+            return
+        for fila in filas:
+            if fila[0] in self.bd.invalidas:
+                raise psycopg2.IntegrityError("new row violates check constraint")
+            self.escritas[fila[0]] = fila
+
+
+@pytest.fixture
+def bd(monkeypatch):
+    falsa = BDFalsa()
+    monkeypatch.setattr(ventas.db_manager, 'transaccion', falsa.transaccion)
+    monkeypatch.setattr(RegistroVentas, 'ESPERAS', (0.01,))
+    return falsa
+
+
+@pytest.fixture
+def ruta_wal(tmp_path):
+    return str(tmp_path / 'ventas.wal')
+
+
+def _venta(cliente='Ana'):
+    return nueva_venta(cliente, 'Efectivo', [{'nombre': 'Café', 'precio': 2.5, 'cantidad': 2}],
+                       5.0, 0.0, 0.0, 5.0)
+
+
+def _lineas(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f]
+
+
+def test_registra_en_lote_y_compacta_el_wal(bd, ruta_wal):
+    registro = RegistroVentas(ruta_wal, ventana_ms=50)
+    registro.iniciar()
+    try:
+        ids = [registro.registrar(_venta()) for _ in range(20)]
+        assert registro.esperar(5)
+    finally:
+        registro.detener()
+    
+    assert set(bd.ventas) == set(ids)
+    assert registro.estadisticas()['lotes'] < 20
+    assert _lineas(ruta_wal) == []
+
+
+def test_recupera_ventas_sin_confirmar_al_arrancar(bd, ruta_wal):
+    confirmada, pendiente = _venta('A'), _venta('B')
+    with open(ruta_wal, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'t': 'venta', 'venta': confirmada}) + '\n')
+        f.write(json.dumps({'t': 'venta', 'venta': pendiente}) + '\n')
+        f.write(json.dumps({'t': 'ok', 'ids': [confirmada['idVenta']]}) + '\n')
+        f.write('{"t": "ok", "ids"')  # Línea cortada por un corte de luz
+    
+    registro = RegistroVentas(ruta_wal)
+    registro.iniciar()
+    try:
+        assert registro.esperar(5)
+    finally:
+        registro.detener()
+    
+    assert list(bd.ventas) == [pendiente['idVenta']]
+    assert registro.estadisticas()['recuperadas'] == 1
+
+
+def test_reintenta_si_la_bd_no_responde(bd, ruta_wal):
+    bd.caidas = 3
+    registro = RegistroVentas(ruta_wal)
+    registro.iniciar()
+    try:
+        id_venta = registro.registrar(_venta())
+        assert registro.esperar(5)
+    finally:
+        registro.detener()
+    
+    assert id_venta in bd.ventas
+    assert registro.estadisticas()['reintentos'] == 3
+
+
+def test_venta_pendiente_queda_en_el_wal_al_detener(bd, ruta_wal):
+    bd.caidas = 10 ** 6
+    registro = RegistroVentas(ruta_wal)
+    registro.iniciar()
+    venta = _venta()
+    registro.registrar(venta)
+    assert not registro.detener(0.1)
+    
+    pendientes, rechazadas = RegistroVentas(ruta_wal)._leer_wal()
+    assert [v['idVenta'] for v in pendientes] == [venta['idVenta']]
+    assert rechazadas == {}
+
+
+def test_venta_invalida_no_bloquea_el_lote(bd, ruta_wal):
+    buenas = [_venta() for _ in range(5)]
+    mala = _venta('Mala')
+    bd.invalidas.add(mala['idVenta'])
+    
+    registro = RegistroVentas(ruta_wal, ventana_ms=100)
+    registro.iniciar()
+    try:
+        for venta in buenas[:2] + [mala] + buenas[2:]:
+            registro.registrar(venta)
+        assert registro.esperar(5)
+    finally:
+        registro.detener()
+    
+    assert set(bd.ventas) == {venta['idVenta'] for venta in buenas}
+    estadisticas = registro.estadisticas()
+    assert estadisticas['rechazadas'] == 1
+    assert estadisticas['reintentos'] == 0
+    
+    # La rechazada sobrevive a la compactación y al reinicio, sin reenviarse
+    assert [(l['t'], l['venta']['idVenta']) for l in _lineas(ruta_wal)] == [('rechazada', mala['idVenta'])]
+    siguiente = RegistroVentas(ruta_wal)
+    siguiente.iniciar()
+    try:
+        assert siguiente.pendientes == 0
+        assert [r['venta']['idVenta'] for r in siguiente.ventas_rechazadas()] == [mala['idVenta']]
+        assert 'IntegrityError' in siguiente.ventas_rechazadas()[0]['error']
+    finally:
+        siguiente.detener()
+    assert len(_lineas(ruta_wal)) == 1
+
+
+def test_registro_incompleto_en_el_wal_se_rechaza(bd, ruta_wal):
+    incompleta = _venta()
+    del incompleta['items']
+    with open(ruta_wal, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'t': 'venta', 'venta': incompleta}) + '\n')
+    
+    registro = RegistroVentas(ruta_wal)
+    registro.iniciar()
+    try:
+        assert registro.esperar(5)
+        assert registro.estadisticas()['rechazadas'] == 1
+    finally:
+        registro.detener()
+
+
+@pytest.fixture
+def con_rechazada(bd, ruta_wal):
+    """Registro iniciado con una venta ya rechazada por la BD"""
+    mala = _venta('Mala')
+    bd.invalidas.add(mala['idVenta'])
+    registro = RegistroVentas(ruta_wal)
+    registro.iniciar()
+    registro.registrar(mala)
+    assert registro.esperar(5)
+    yield registro, mala
+    registro.detener(0.1)
+
+
+def test_reintentar_rechazada_la_envia_y_la_quita_del_wal(bd, ruta_wal, con_rechazada):
+    registro, mala = con_rechazada
+    bd.invalidas.clear()   # Se corrigió lo que la BD no aceptaba
+    
+    assert registro.reintentar_rechazadas() == 1
+    assert registro.esperar(5)
+    
+    assert mala['idVenta'] in bd.ventas
+    assert registro.ventas_rechazadas() == []
+    assert _lineas(ruta_wal) == []
+
+
+def test_rechazada_reencolada_no_reaparece_tras_un_corte(bd, ruta_wal, con_rechazada):
+    registro, mala = con_rechazada
+    bd.caidas = 10 ** 6
+    registro.reintentar_rechazadas([mala['idVenta']])
+    
+    pendientes, rechazadas = RegistroVentas(ruta_wal)._leer_wal()
+    assert [v['idVenta'] for v in pendientes] == [mala['idVenta']]
+    assert rechazadas == {}
+
+
+def test_exportar_y_descartar_rechazadas(bd, ruta_wal, con_rechazada, tmp_path):
+    registro, mala = con_rechazada
+    
+    ruta = tmp_path / 'rechazadas.json'
+    with open(ruta, 'w', encoding='utf-8') as f:
+        assert registro.exportar_rechazadas(f) == 1
+    exportadas = json.loads(ruta.read_text(encoding='utf-8'))
+    assert exportadas[0]['venta'] == mala
+    assert 'IntegrityError' in exportadas[0]['error']
+    
+    descartadas = registro.descartar_rechazadas([mala['idVenta']])
+    
+    assert [r['venta']['idVenta'] for r in descartadas] == [mala['idVenta']]
+    assert registro.ventas_rechazadas() == []
+    assert RegistroVentas(ruta_wal)._leer_wal() == ([], {})
+    assert mala['idVenta'] not in bd.ventas
@@ -0,0 +1,473 @@
+"""
+Registro de ventas con escritura agrupada (group commit)
+
+Cobrar no espera a PostgreSQL: `registrar()` escribe la venta en un archivo
+local de escritura anticipada (WAL, una línea JSON con fsync) y la encola.
+Un hilo junta las ventas que llegan en la misma ventana de tiempo y las
+inserta en VENTA / VENTA_DETALLE con un único COMMIT. Al confirmar, se
+anota en el WAL; al arrancar, las ventas sin confirmar se vuelven a enviar.
+Los ids se generan en el cliente y la inserción usa ON CONFLICT DO NOTHING,
+así reenviar una venta que sí había llegado no la duplica.
+
+Si la BD rechaza un lote por los datos (no por la conexión), sus ventas se
+reintentan de a una; la que vuelve a fallar queda en el WAL como rechazada
+(ventas_rechazadas()) y no bloquea a las siguientes. Una rechazada sale del
+WAL al reintentarla (reintentar_rechazadas) o al descartarla
+(descartar_rechazadas, normalmente después de exportar_rechazadas).
+"""
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+import psycopg2
+
+from conexionDB import db_manager
+
+logger = logging.getLogger(__name__)
+
+RUTA_WAL = os.environ.get(
+    'PARCIAL2_WAL_VENTAS',
+    os.path.join(os.path.expanduser('~'), '.local', 'share', 'parcial2', 'ventas.wal')
+)
+
+COLUMNAS_VENTA = ['idVenta', 'fecha', 'cliente', 'metodo_pago',
+                  'subtotal', 'impuesto', 'descuento', 'total']
+COLUMNAS_DETALLE = ['idVenta', 'linea', 'idProducto', 'nombre', 'precio', 'cantidad', 'subtotal']
+
+# Errores que reintentar no arregla: la venta tiene datos que la BD no acepta
+# (o el registro del WAL está incompleto)
+ERRORES_PERMANENTES = (psycopg2.DataError, psycopg2.IntegrityError, KeyError, TypeError)
+
+
+def nueva_venta(cliente: str, metodo_pago: str, items: List[dict],
+                subtotal: float, impuesto: float, descuento: float, total: float) -> dict:
+    """
+    Arma el registro de una venta a partir del carrito
+
+    Args:
+        items: Items del carrito (nombre, precio, cantidad e id_producto opcional)
+    """
+    return {
+        'idVenta': str(uuid.uuid4()),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'cliente': cliente,
+        'metodo_pago': metodo_pago,
+        'subtotal': round(subtotal, 2),
+        'impuesto': round(impuesto, 2),
+        'descuento': round(descuento, 2),
+        'total': round(total, 2),
+        'items': [
+            {
+                'idProducto': item.get('id_producto'),
+                'nombre': item['nombre'],
+                'precio': round(item['precio'], 2),
+                'cantidad': item['cantidad'],
+                'subtotal': round(item['precio'] * item['cantidad'], 2),
+            }
+            for item in items
+        ],
+    }
+
+
+def exportar_ventas_csv(archivo, desde: str, hasta: str, itersize: int = 2000) -> int:
+    """
+    Reporte de ventas en CSV: una fila por línea vendida entre dos fechas
+
+    Lee con un cursor del servidor (db_manager.iterar_query): la memoria no
+    depende de cuántas ventas haya en el rango.
+
+    Args:
+        archivo: Objeto de texto abierto con newline=''
+        desde: Fecha inicial YYYY-MM-DD (incluida)
+        hasta: Fecha final YYYY-MM-DD (incluida)
+
+    Returns:
+        Número de líneas exportadas
+    """
+    query = """
+        SELECT v.fecha, v.idVenta, v.cliente, v.metodo_pago,
+               d.linea, d.idProducto, d.nombre, d.precio, d.cantidad, d.subtotal
+        FROM VENTA v
+        JOIN VENTA_DETALLE d ON d.idVenta = v.idVenta
+        WHERE v.fecha >= %s AND v.fecha < %s::date + 1
+        ORDER BY v.fecha, v.idVenta, d.linea
+    """
+    encabezados = ['fecha', 'idVenta', 'cliente', 'metodo_pago',
+                   'linea', 'idProducto', 'nombre', 'precio', 'cantidad', 'subtotal']
+    return db_manager.exportar_csv(query, archivo, encabezados, (desde, hasta), itersize)
+
+
+class RegistroVentas:
+    """
+    Escritor de ventas en segundo plano con group commit y WAL local.
+
+    Args:
+        ruta_wal: Archivo de escritura anticipada
+        max_lote: Máximo de ventas por transacción
+        ventana_ms: Cuánto esperar más ventas después de la primera del lote
+    """
+
+    ESPERAS = (1, 2, 5, 10, 30)  # Segundos entre reintentos si la BD no responde
+
+    def __init__(self, ruta_wal: Optional[str] = None, max_lote: int = 100, ventana_ms: int = 20):
+        self.ruta_wal = ruta_wal or RUTA_WAL
+        self.max_lote = max_lote
+        self.ventana = ventana_ms / 1000
+        self._cola = queue.SimpleQueue()
+        # Ventas de un lote rechazado por sus datos: se reintentan de a una
+        self._sueltas: deque = deque()
+        # Registros 'rechazada' del WAL (sobreviven a la compactación)
+        self._rechazadas: Dict[str, dict] = {}
+        self._lock_wal = threading.Lock()
+        self._wal = None
+        self._pendientes = 0
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self._despertar = threading.Event()
+        self._vacio = threading.Condition()
+        self._estadisticas = {'ventas': 0, 'lotes': 0, 'reintentos': 0, 'recuperadas': 0,
+                              'rechazadas': 0}
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def iniciar(self):
+        """Recupera las ventas sin confirmar del WAL y arranca el hilo"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        os.makedirs(os.path.dirname(self.ruta_wal) or '.', exist_ok=True)
+        pendientes, self._rechazadas = self._leer_wal()
+
+        with self._lock_wal:
+            # Compactar: el WAL nuevo solo contiene lo que falta confirmar y
+            # las ventas rechazadas
+            self._reescribir_wal(pendientes)
+            self._wal = open(self.ruta_wal, 'a', encoding='utf-8')
+
+        for venta in pendientes:
+            self._encolar(venta)
+        if pendientes:
+            self._estadisticas['recuperadas'] += len(pendientes)
+            logger.info(f"Ventas: {len(pendientes)} venta(s) sin confirmar recuperada(s) del WAL")
+
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._procesar, name="ventas", daemon=True)
+        self._hilo.start()
+
+    def detener(self, esperar: float = 5.0) -> bool:
+        """
+        Intenta vaciar la cola y detiene el hilo
+
+        Returns:
+            True si no quedaron ventas pendientes (las que queden siguen en el
+            WAL y se envían en el próximo arranque)
+        """
+        vacio = self.esperar(esperar)
+        self._detener.set()
+        self._despertar.set()
+        self._cola.put(None)
+        if self._hilo is not None:
+            self._hilo.join(timeout=1)
+        with self._lock_wal:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+        return vacio
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def registrar(self, venta: dict) -> str:
+        """
+        Registra una venta (durable en disco local al retornar) y la encola
+
+        Returns:
+            idVenta
+        """
+        # Contar la venta antes de anotarla: así el hilo no puede vaciar el
+        # WAL entre la escritura y el encolado
+        with self._vacio:
+            self._pendientes += 1
+        try:
+            self._anotar({'t': 'venta', 'venta': venta})
+        except Exception:
+            with self._vacio:
+                self._pendientes -= 1
+                self._vacio.notify_all()
+            raise
+        self._cola.put(venta)
+        return venta['idVenta']
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que todas las ventas encoladas estén confirmadas"""
+        with self._vacio:
+            return self._vacio.wait_for(lambda: self._pendientes == 0, timeout)
+
+    def reintentar_ahora(self):
+        """Corta la espera entre reintentos (ej. al recuperar la conexión)"""
+        self._despertar.set()
+    
+    @property
+    def pendientes(self) -> int:
+        return self._pendientes
+
+    def ventas_rechazadas(self) -> List[dict]:
+        """Registros {'venta', 'error', 'fecha'} de las ventas que la BD no aceptó"""
+        return list(self._rechazadas.values())
+
+    def reintentar_rechazadas(self, ids: Optional[List[str]] = None) -> int:
+        """
+        Vuelve a encolar ventas rechazadas (ej. después de corregir la BD)
+
+        Args:
+            ids: idVenta a reintentar; None = todas
+
+        Returns:
+            Cantidad de ventas encoladas (las ilegibles siguen rechazadas)
+        """
+        encoladas = 0
+        for id_venta in self._ids_rechazadas(ids):
+            registro = self._rechazadas.pop(id_venta, None)
+            venta = registro.get('venta') if registro else None
+            if not isinstance(venta, dict) or 'idVenta' not in venta:
+                if registro is not None:
+                    self._rechazadas[id_venta] = registro
+                continue
+            try:
+                # La línea 'venta' nueva anula la rechazada al releer el WAL
+                self.registrar(venta)
+            except Exception:
+                self._rechazadas[id_venta] = registro
+                raise
+            encoladas += 1
+        return encoladas
+
+    def descartar_rechazadas(self, ids: Optional[List[str]] = None) -> List[dict]:
+        """
+        Quita ventas rechazadas del WAL (exportarlas antes para no perderlas)
+
+        Args:
+            ids: idVenta a descartar; None = todas
+
+        Returns:
+            Registros descartados
+        """
+        descartadas = {}
+        for id_venta in self._ids_rechazadas(ids):
+            registro = self._rechazadas.pop(id_venta, None)
+            if registro is not None:
+                descartadas[id_venta] = registro
+        if descartadas:
+            try:
+                self._anotar({'t': 'descartada', 'ids': list(descartadas)})
+            except Exception:
+                self._rechazadas.update(descartadas)
+                raise
+            logger.info(f"Ventas: {len(descartadas)} venta(s) rechazada(s) descartada(s)")
+        return list(descartadas.values())
+
+    def exportar_rechazadas(self, archivo, ids: Optional[List[str]] = None) -> int:
+        """
+        Escribe las ventas rechazadas como JSON (venta completa, error y fecha)
+
+        Args:
+            archivo: Objeto de texto abierto para escritura
+            ids: idVenta a exportar; None = todas
+
+        Returns:
+            Cantidad de ventas exportadas
+        """
+        registros = [self._rechazadas[i] for i in self._ids_rechazadas(ids) if i in self._rechazadas]
+        json.dump(registros, archivo, ensure_ascii=False, indent=2)
+        return len(registros)
+
+    def _ids_rechazadas(self, ids: Optional[List[str]]) -> List[str]:
+        return list(self._rechazadas) if ids is None else [str(i) for i in ids]
+
+    def estadisticas(self) -> Dict[str, float]:
+        datos = dict(self._estadisticas)
+        datos['pendientes'] = self._pendientes
+        datos['ventas_por_lote'] = datos['ventas'] / datos['lotes'] if datos['lotes'] else 0
+        return datos
+
+    # ------------------------------------------------------------------
+    # Hilo de escritura
+    # ------------------------------------------------------------------
+
+    def _encolar(self, venta: dict):
+        with self._vacio:
+            self._pendientes += 1
+        self._cola.put(venta)
+
+    def _procesar(self):
+        reintentos = 0
+        lote: List[dict] = []
+        while not self._detener.is_set():
+            if not lote:
+                lote = [self._sueltas.popleft()] if self._sueltas else self._juntar_lote()
+                if not lote:
+                    continue
+            try:
+                self._escribir(lote)
+            except ERRORES_PERMANENTES as e:
+                if len(lote) > 1:
+                    # No se sabe cuál venta falló: probarlas de a una
+                    logger.warning(f"La BD rechazó un lote de {len(lote)} venta(s) ({e}); "
+                                   f"se reintentan por separado")
+                    self._sueltas.extend(lote)
+                else:
+                    self._rechazar(lote[0], e)
+                lote = []
+                continue
+            except Exception as e:
+                espera = self.ESPERAS[min(reintentos, len(self.ESPERAS) - 1)]
+                reintentos += 1
+                self._estadisticas['reintentos'] += 1
+                logger.warning(f"No se pudo guardar un lote de {len(lote)} venta(s) ({e}); "
+                               f"reintento en {espera}s")
+                self._despertar.wait(espera)
+                self._despertar.clear()
+                if self._detener.is_set():
+                    return
+                continue
+
+            reintentos = 0
+            self._anotar({'t': 'ok', 'ids': [venta['idVenta'] for venta in lote]})
+            self._estadisticas['ventas'] += len(lote)
+            self._estadisticas['lotes'] += 1
+            self._descontar(len(lote))
+            lote = []
+
+    def _rechazar(self, venta: dict, error: Exception):
+        """Deja la venta en el WAL como rechazada y sigue con las demás"""
+        id_venta = venta.get('idVenta') if isinstance(venta, dict) else None
+        registro = {'t': 'rechazada', 'venta': venta, 'error': f"{type(error).__name__}: {error}",
+                    'fecha': datetime.now().isoformat(timespec='seconds')}
+        self._anotar(registro)
+        self._rechazadas[str(id_venta)] = registro
+        self._estadisticas['rechazadas'] += 1
+        logger.error(f"Venta {id_venta} rechazada por la BD, queda en el WAL: {error}")
+        self._descontar(1)
+
+    def _descontar(self, cantidad: int):
+        with self._vacio:
+            self._pendientes -= cantidad
+            if self._pendientes == 0:
+                self._compactar()
+                self._vacio.notify_all()
+
+    def _juntar_lote(self) -> List[dict]:
+        """Espera la primera venta y junta las que lleguen en la ventana"""
+        primera = self._cola.get()
+        if primera is None:
+            return []
+        lote = [primera]
+        limite = time.monotonic() + self.ventana
+        while len(lote) < self.max_lote:
+            restante = limite - time.monotonic()
+            try:
+                venta = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if venta is None:
+                break
+            lote.append(venta)
+        return lote
+
+    def _escribir(self, lote: List[dict]):
+        """Inserta el lote completo en una sola transacción"""
+        ventas = [tuple(venta[c] for c in COLUMNAS_VENTA) for venta in lote]
+        detalles = [
+            (venta['idVenta'], numero, item['idProducto'], item['nombre'],
+             item['precio'], item['cantidad'], item['subtotal'])
+            for venta in lote
+            for numero, item in enumerate(venta['items'], 1)
+        ]
+        with db_manager.transaccion() as tx:
+            tx.upsert_lote("VENTA", COLUMNAS_VENTA, ventas, conflicto=['idVenta'])
+            tx.upsert_lote("VENTA_DETALLE", COLUMNAS_DETALLE, detalles, conflicto=['idVenta', 'linea'])
+
+    # ------------------------------------------------------------------
+    # WAL
+    # ------------------------------------------------------------------
+
+    def _anotar(self, registro: dict):
+        linea = json.dumps(registro, ensure_ascii=False) + '\n'
+        with self._lock_wal:
+            if self._wal is None:
+                raise RuntimeError("RegistroVentas no iniciado")
+            self._wal.write(linea)
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+
+    def _leer_wal(self) -> Tuple[List[dict], Dict[str, dict]]:
+        """Ventas del WAL que no tienen confirmación y registros de las rechazadas"""
+        ventas: Dict[str, dict] = {}
+        rechazadas: Dict[str, dict] = {}
+        try:
+            with open(self.ruta_wal, encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:
+                        continue  # Última línea cortada por un corte de luz
+                    if registro.get('t') == 'venta':
+                        # Una venta rechazada que se volvió a encolar
+                        rechazadas.pop(str(registro['venta']['idVenta']), None)
+                        ventas[registro['venta']['idVenta']] = registro['venta']
+                    elif registro.get('t') == 'ok':
+                        for id_venta in registro['ids']:
+                            ventas.pop(id_venta, None)
+                    elif registro.get('t') == 'rechazada':
+                        id_venta = str((registro.get('venta') or {}).get('idVenta'))
+                        ventas.pop(id_venta, None)
+                        rechazadas[id_venta] = registro
+                    elif registro.get('t') == 'descartada':
+                        for id_venta in registro['ids']:
+                            rechazadas.pop(id_venta, None)
+        except FileNotFoundError:
+            pass
+        return list(ventas.values()), rechazadas
+
+    def _lineas_rechazadas(self) -> str:
+        # Copia: la interfaz puede reintentar o descartar mientras se compacta
+        return ''.join(json.dumps(registro, ensure_ascii=False) + '\n'
+                       for registro in list(self._rechazadas.values()))
+
+    def _reescribir_wal(self, ventas: List[dict]):
+        temporal = self.ruta_wal + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(self._lineas_rechazadas())
+            for venta in ventas:
+                f.write(json.dumps({'t': 'venta', 'venta': venta}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.ruta_wal)
+
+    def _compactar(self):
+        """
+        Vacía el WAL cuando todo está confirmado (llamar con _vacio tomado);
+        solo conserva las ventas rechazadas
+        """
+        with self._lock_wal:
+            if self._wal is None:
+                return
+            self._wal.truncate(0)
+            self._wal.seek(0)
+            if self._rechazadas:
+                self._wal.write(self._lineas_rechazadas())
+                self._wal.flush()
+                os.fsync(self._wal.fileno())
+
+
+# Registro compartido por toda la aplicación
+registro_ventas = RegistroVentas()
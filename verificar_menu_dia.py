@@ -32,7 +32,7 @@ def verificar_productos_por_dia():
             ORDER BY tc.idTipo, p.nombre
         """
         
-        productos = db_manager.ejecutar_query(query, (dia_id,), fetch=True)
+        productos = db_manager.ejecutar_query(query, (dia_id,), fetch=True, solo_lectura=True)
         
         print(f"\n📅 {dia_nombre.upper()}")
         print("-" * 70)
@@ -64,7 +64,7 @@ def verificar_productos_por_dia():
 def contar_total_productos():
     """Cuenta el total de productos en la base de datos"""
     query = "SELECT COUNT(*) FROM PRODUCTO"
-    resultado = db_manager.ejecutar_query_uno(query)
+    resultado = db_manager.ejecutar_query_uno(query, solo_lectura=True)
     
     print(f"📦 Total de productos en la base de datos: {resultado[0]}")
 
@@ -77,7 +77,7 @@ def verificar_integridad():
         WHERE mp.idProducto IS NULL
     """
     
-    productos_sin_menu = db_manager.ejecutar_query(query, fetch=True)
+    productos_sin_menu = db_manager.ejecutar_query(query, fetch=True, solo_lectura=True)
     
     if productos_sin_menu:
         print(f"\n⚠️  Advertencia: {len(productos_sin_menu)} productos no tienen tipo asignado:")
@@ -5,95 +5,477 @@ import tkinter as tk
 from tkinter import ttk
 
 
+class ElementoGrilla:
+    """
+    Elemento a mostrar en una GrillaTarjetas
+    
+    Args:
+        clave: Identificador estable (p. ej. ('promo', id_producto))
+        firma: Datos visibles; si cambian, la tarjeta se vuelve a crear
+        crear: Función crear(parent) que construye el widget (sin ubicarlo)
+        ancho_completo: Ocupa una fila entera (títulos de sección, mensajes)
+        opciones_grid: Opciones extra para widget.grid()
+    """
+    
+    __slots__ = ('clave', 'firma', 'crear', 'ancho_completo', 'opciones_grid')
+    
+    def __init__(self, clave, firma, crear, ancho_completo=False, **opciones_grid):
+        self.clave = clave
+        self.firma = firma
+        self.crear = crear
+        self.ancho_completo = ancho_completo
+        self.opciones_grid = opciones_grid or {'padx': 8, 'pady': 8, 'sticky': 'nsew'}
+
+
+class GrillaTarjetas:
+    """
+    Pool de tarjetas reutilizables sobre un frame con layout grid.
+    
+    Mantiene los widgets indexados por clave y en cada reconciliación solo
+    crea las tarjetas nuevas, destruye las que desaparecieron (o cuyos datos
+    cambiaron) y vuelve a ubicar con grid() únicamente las que cambian de
+    celda, por ejemplo cuando cambia el número de columnas.
+    """
+    
+    def __init__(self, parent):
+        self.parent = parent
+        self.columnas = 0
+        # clave -> (widget, firma, (fila, columna, columnspan) o None si no está ubicada)
+        self._tarjetas = {}
+        self._elementos = []
+        # Cuántos elementos (en orden) tienen widget y se muestran
+        self._mostrados = 0
+    
+    def reconciliar(self, elementos, columnas, max_nuevas=None):
+        """
+        Sincroniza los widgets con la lista de elementos (en orden)
+        
+        Args:
+            max_nuevas: Máximo de tarjetas a crear en esta llamada; el resto
+                se crea en llamadas siguientes con la misma lista
+        
+        Returns:
+            True si quedaron tarjetas pendientes de crear
+        """
+        self._elementos = list(elementos)
+        claves = {elemento.clave for elemento in self._elementos}
+        
+        # Lo que ya no está en la lista
+        for clave in [clave for clave in self._tarjetas if clave not in claves]:
+            self._tarjetas.pop(clave)[0].destroy()
+        
+        creadas = 0
+        self._mostrados = len(self._elementos)
+        for indice, elemento in enumerate(self._elementos):
+            actual = self._tarjetas.get(elemento.clave)
+            if actual is not None and actual[1] != elemento.firma:
+                actual[0].destroy()
+                actual = None
+            if actual is None:
+                if max_nuevas is not None and creadas >= max_nuevas:
+                    self._mostrados = indice
+                    break
+                self._tarjetas[elemento.clave] = (elemento.crear(self.parent), elemento.firma, None)
+                creadas += 1
+        
+        self._ubicar(columnas)
+        return self._mostrados < len(self._elementos)
+    
+    def cambiar_columnas(self, columnas):
+        """Reubica las tarjetas existentes si cambió el número de columnas"""
+        if columnas != self.columnas:
+            self._ubicar(columnas)
+    
+    def _ubicar(self, columnas):
+        for i in range(max(columnas, self.columnas)):
+            if i < columnas:
+                self.parent.grid_columnconfigure(i, weight=1, uniform='col')
+            else:
+                self.parent.grid_columnconfigure(i, weight=0, uniform='')
+        self.columnas = columnas
+        
+        fila, columna = 0, 0
+        for elemento in self._elementos[:self._mostrados]:
+            widget, firma, celda = self._tarjetas[elemento.clave]
+            if elemento.ancho_completo:
+                if columna > 0:
+                    fila, columna = fila + 1, 0
+                nueva = (fila, 0, columnas)
+                fila += 1
+            else:
+                nueva = (fila, columna, 1)
+                columna += 1
+                if columna >= columnas:
+                    fila, columna = fila + 1, 0
+            
+            if nueva != celda:
+                widget.grid(row=nueva[0], column=nueva[1], columnspan=nueva[2],
+                            **elemento.opciones_grid)
+                self._tarjetas[elemento.clave] = (widget, firma, nueva)
+        
+        # Tarjetas que existen pero quedan detrás de una todavía no creada
+        for elemento in self._elementos[self._mostrados:]:
+            actual = self._tarjetas.get(elemento.clave)
+            if actual is not None and actual[2] is not None:
+                actual[0].grid_remove()
+                self._tarjetas[elemento.clave] = (actual[0], actual[1], None)
+    
+    def __len__(self):
+        return len(self._tarjetas)
+
+
+class ListaVirtual:
+    """
+    Lista vertical virtualizada sobre un Canvas con scrollbar.
+    
+    Solo existen widgets para las filas visibles más un margen (overscan)
+    arriba y abajo; al desplazarse, las filas que salen de la vista se
+    reutilizan para las que entran. La memoria no depende del número de
+    elementos, solo del alto de la ventana.
+    
+    Args:
+        canvas: Canvas donde se dibujan las filas
+        scrollbar: Scrollbar vertical asociada al canvas
+        alto_fila: Alto fijo de cada fila en píxeles (incluye separación)
+        crear_fila: crear_fila(parent) -> widget vacío reutilizable
+        llenar_fila: llenar_fila(widget, indice, dato) rellena la fila
+        overscan: Filas extra materializadas fuera de la vista
+        separacion: Espacio vertical entre filas
+        margen_x: Margen horizontal de las filas
+        al_desplazar: Función sin argumentos llamada en cada desplazamiento
+    """
+    
+    def __init__(self, canvas, scrollbar, alto_fila, crear_fila, llenar_fila,
+                 overscan=4, separacion=10, margen_x=10, al_desplazar=None):
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.alto_fila = alto_fila
+        self.crear_fila = crear_fila
+        self.llenar_fila = llenar_fila
+        self.overscan = overscan
+        self.separacion = separacion
+        self.margen_x = margen_x
+        self.al_desplazar = al_desplazar
+        self._datos = []
+        # Cada fila: [widget, id_item_canvas, indice_mostrado o None]
+        self._filas = []
+        self._pendiente = None
+        
+        canvas.configure(yscrollcommand=self._al_desplazar)
+        canvas.bind('<Configure>', self._al_redimensionar, add='+')
+    
+    def mostrar(self, datos):
+        """Reemplaza los datos de la lista y vuelve al inicio"""
+        self._datos = list(datos)
+        for fila in self._filas:
+            fila[2] = None
+        self._actualizar_scrollregion()
+        self.canvas.yview_moveto(0)
+        self._refrescar()
+    
+    def extender(self, datos):
+        """Agrega datos al final sin mover el scroll (p. ej. una página más)"""
+        self._datos.extend(datos)
+        self._actualizar_scrollregion()
+        self._refrescar()
+    
+    def refrescar(self):
+        """Vuelve a llenar las filas visibles (los datos cambiaron en su lugar)"""
+        for fila in self._filas:
+            fila[2] = None
+        self._refrescar()
+    
+    @property
+    def filas_materializadas(self):
+        return len(self._filas)
+    
+    def _ancho_fila(self):
+        return max(1, self.canvas.winfo_width() - 2 * self.margen_x)
+    
+    def _actualizar_scrollregion(self):
+        alto_total = len(self._datos) * self.alto_fila
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), alto_total))
+    
+    def _al_desplazar(self, primero, ultimo):
+        self.scrollbar.set(primero, ultimo)
+        self._programar()
+        if self.al_desplazar is not None:
+            self.al_desplazar()
+    
+    def _al_redimensionar(self, event):
+        ancho = self._ancho_fila()
+        for _, item, _ in self._filas:
+            self.canvas.itemconfigure(item, width=ancho)
+        self._actualizar_scrollregion()
+        self._programar()
+    
+    def _programar(self):
+        # Varios eventos de scroll seguidos se resuelven en un solo refresco
+        if self._pendiente is None:
+            self._pendiente = self.canvas.after_idle(self._refrescar)
+    
+    def _refrescar(self):
+        if self._pendiente is not None:
+            self.canvas.after_cancel(self._pendiente)
+            self._pendiente = None
+        
+        alto_visible = max(self.canvas.winfo_height(), self.alto_fila)
+        y_inicio = self.canvas.canvasy(0)
+        primero = max(0, int(y_inicio // self.alto_fila) - self.overscan)
+        ultimo = min(len(self._datos),
+                     int((y_inicio + alto_visible) // self.alto_fila) + 1 + self.overscan)
+        
+        # El pool solo crece hasta el número de filas que caben en la vista
+        ancho = self._ancho_fila()
+        while len(self._filas) < ultimo - primero:
+            widget = self.crear_fila(self.canvas)
+            item = self.canvas.create_window(self.margen_x, 0, window=widget, anchor='nw',
+                                             width=ancho,
+                                             height=self.alto_fila - self.separacion,
+                                             state='hidden')
+            self._filas.append([widget, item, None])
+        
+        # Las filas que siguen en rango conservan su contenido
+        en_rango = {fila[2] for fila in self._filas
+                    if fila[2] is not None and primero <= fila[2] < ultimo}
+        libres = [fila for fila in self._filas
+                  if fila[2] is None or not primero <= fila[2] < ultimo]
+        
+        for indice in range(primero, ultimo):
+            if indice in en_rango:
+                continue
+            fila = libres.pop()
+            self.llenar_fila(fila[0], indice, self._datos[indice])
+            self.canvas.coords(fila[1], self.margen_x, indice * self.alto_fila)
+            self.canvas.itemconfigure(fila[1], state='normal')
+            fila[2] = indice
+        
+        for fila in libres:
+            self.canvas.itemconfigure(fila[1], state='hidden')
+            fila[2] = None
+
+
+class PaginadorKeyset:
+    """
+    Recorre un conjunto ordenado por páginas usando la clave del último
+    elemento visto (keyset), sin OFFSET: cada página cuesta lo mismo sin
+    importar cuánto se haya avanzado.
+    
+    Args:
+        cargar_pagina: cargar_pagina(despues_de, limite) -> lista de elementos
+            con clave mayor que `despues_de` (None = desde el inicio)
+        clave: clave(elemento) -> tupla de orden (p. ej. (nombre, id))
+        tamano: Elementos por página
+    """
+    
+    def __init__(self, cargar_pagina, clave, tamano=100):
+        self.cargar_pagina = cargar_pagina
+        self.clave = clave
+        self.tamano = tamano
+        self.reiniciar()
+    
+    def reiniciar(self):
+        self.elementos = []
+        self.agotado = False
+        self._ultima = None
+    
+    def siguiente(self):
+        """Carga y retorna la siguiente página (lista vacía si no hay más)"""
+        if self.agotado:
+            return []
+        return self.agregar(self.pedir()())
+    
+    def pedir(self):
+        """
+        Retorna una función sin argumentos que consulta la siguiente página,
+        para ejecutarla en otro hilo; el resultado se entrega con agregar()
+        """
+        ultima, tamano = self._ultima, self.tamano
+        return lambda: self.cargar_pagina(ultima, tamano)
+    
+    def agregar(self, pagina):
+        """Registra una página ya consultada y la retorna"""
+        if len(pagina) < self.tamano:
+            self.agotado = True
+        if pagina:
+            self._ultima = self.clave(pagina[-1])
+            self.elementos.extend(pagina)
+        return pagina
+
+
 class VisorProductosOptimizado:
-    """Visor de productos con carga optimizada"""
+    """
+    Motor compartido para mostrar productos con scroll.
+    
+    Crea el canvas y la scrollbar dentro de `parent` y dibuja en uno de dos
+    modos:
+    - Grilla (por defecto): tarjetas en GrillaTarjetas con columnas según
+      el ancho disponible; las tarjetas nuevas se crean por lotes con
+      after_idle para no congelar la ventana.
+    - Lista (`fila_lista=(alto, crear, llenar)`): filas en ListaVirtual.
+    
+    Con mostrar_paginado() las páginas se piden a un PaginadorKeyset a
+    medida que el usuario se acerca al final del scroll. Si se indica un
+    `ejecutor` (EjecutorDB), las páginas se consultan en segundo plano.
+    """
     
-    def __init__(self, parent, colores, productos, callback_agregar):
+    def __init__(self, parent, colores, ancho_tarjeta=360, max_columnas=6, lote=12,
+                 fila_lista=None, umbral_scroll=0.8, ejecutor=None):
         self.parent = parent
         self.colores = colores
-        self.productos = productos
-        self.callback_agregar = callback_agregar
-        self.visible_items = []
-        self.max_items_visible = 30
-        
-    def crear_grid(self, categoria="Todos"):
-        """Crear grid de productos de forma optimizada"""
-        # Limpiar widgets previos
-        for widget in self.parent.winfo_children():
-            widget.destroy()
-        
-        # Filtrar productos por categoría
-        items_filtrados = self._filtrar_productos(categoria)
-        
-        if not items_filtrados:
-            self._mostrar_vacio()
+        self.ejecutor = ejecutor
+        self._clave_pagina = ('pagina', id(self))
+        self.ancho_tarjeta = ancho_tarjeta
+        self.max_columnas = max_columnas
+        self.lote = lote
+        self.umbral_scroll = umbral_scroll
+        
+        self._elementos = []
+        self._paginador = None
+        self._a_elemento = None
+        self._job_render = None
+        self._job_columnas = None
+        self._job_scroll = None
+        
+        self.canvas = tk.Canvas(parent, bg=colores['fondo_principal'], highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        
+        if fila_lista is None:
+            self.lista = None
+            self.frame = tk.Frame(self.canvas, bg=colores['fondo_principal'])
+            # Cuando el contenido cambie, actualizar scrollregion
+            self.frame.bind(
+                "<Configure>",
+                lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+            )
+            self._ventana = self.canvas.create_window((0, 0), window=self.frame, anchor="nw")
+            self.grilla = GrillaTarjetas(self.frame)
+            self.canvas.bind('<Configure>', self._al_redimensionar)
+            self.canvas.configure(yscrollcommand=self._al_desplazar)
+        else:
+            alto_fila, crear_fila, llenar_fila = fila_lista
+            self.frame = None
+            self.grilla = None
+            self.lista = ListaVirtual(self.canvas, self.scrollbar, alto_fila, crear_fila, llenar_fila,
+                                      al_desplazar=self._programar_scroll)
+        
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    
+    def columnas(self):
+        """Número de columnas que caben en el ancho actual del canvas"""
+        ancho = self.canvas.winfo_width()
+        if ancho > 1:
+            return max(1, min(self.max_columnas, ancho // self.ancho_tarjeta))
+        return 3
+    
+    def mostrar(self, elementos):
+        """Muestra una lista fija (ElementoGrilla en modo grilla, datos en modo lista)"""
+        self._paginador = None
+        if self.ejecutor is not None:
+            self.ejecutor.cancelar(self._clave_pagina)
+        if self.lista is not None:
+            self.lista.mostrar(list(elementos))
+            return
+        self._elementos = list(elementos)
+        self._renderizar()
+    
+    def mostrar_paginado(self, paginador, a_elemento=None, encabezado=()):
+        """
+        Muestra un conjunto paginado desde el principio
+        
+        Args:
+            paginador: PaginadorKeyset con la fuente de datos
+            a_elemento: En modo grilla, convierte cada dato en ElementoGrilla
+            encabezado: ElementoGrilla fijos antes de los datos (modo grilla)
+        """
+        self._paginador = paginador
+        self._a_elemento = a_elemento
+        paginador.reiniciar()
+        
+        def mostrar_primera(pagina):
+            if self.lista is not None:
+                self.lista.mostrar(list(pagina))
+            else:
+                self._elementos = list(encabezado) + [a_elemento(dato) for dato in pagina]
+                self._renderizar()
+            # Si la primera página no llena la vista, seguir cargando
+            self._programar_scroll()
+        
+        self._cargar_pagina(mostrar_primera)
+    
+    def _cargar_pagina(self, al_cargar):
+        """Pide la siguiente página (en segundo plano si hay ejecutor)"""
+        paginador = self._paginador
+        if self.ejecutor is None:
+            al_cargar(paginador.siguiente())
             return
         
-        # Crear canvas scrollable para mejor rendimiento
-        canvas = tk.Canvas(self.parent, bg=self.colores['fondo_principal'], 
-                          highlightthickness=0)
-        scrollbar = ttk.Scrollbar(self.parent, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg=self.colores['fondo_principal'])
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Crear grid de productos en batches
-        row = 0
-        col = 0
-        for idx, item in enumerate(items_filtrados):
-            if idx >= self.max_items_visible:
-                break
-            
-            self._crear_card_optimizada(scrollable_frame, item, row, col)
-            col += 1
-            if col >= 3:
-                col = 0
-                row += 1
-        
-        # Empacar canvas y scrollbar
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-    
-    def _filtrar_productos(self, categoria):
-        """Filtrar productos por categoría"""
-        if categoria == "Todos":
-            return self.productos
-        return [p for p in self.productos if p.get('categoria') == categoria]
-    
-    def _crear_card_optimizada(self, parent, item, row, col):
-        """Crear card de producto de forma optimizada"""
-        card = tk.Frame(parent, bg=self.colores['fondo_card'], relief=tk.FLAT)
-        card.grid(row=row, column=col, padx=8, pady=8, sticky="nsew")
-        
-        # Nombre (sin truncate excesivo)
-        nombre = item.get('nombre', 'Producto')
-        tk.Label(card, text=nombre, font=('Inter', 10, 'bold'),
-                fg=self.colores['texto_principal'],
-                bg=self.colores['fondo_card'], 
-                wraplength=150, justify=tk.CENTER).pack(pady=(10, 3), padx=10)
-        
-        # Precio
-        precio = item.get('precio', 0)
-        tk.Label(card, text=f"${precio:,.0f}", font=('Inter', 11, 'bold'),
-                fg=self.colores['acento_dorado'],
-                bg=self.colores['fondo_card']).pack(pady=3)
-        
-        # Botón
-        tk.Button(card, text="Agregar", bg=self.colores['verde_success'],
-                 fg='white', font=('Inter', 8, 'bold'), relief='flat',
-                 padx=15, pady=6,
-                 command=lambda: self.callback_agregar(item)).pack(fill=tk.X, padx=8, pady=(3, 8))
-    
-    def _mostrar_vacio(self):
-        """Mostrar mensaje de sin productos"""
-        msg_frame = tk.Frame(self.parent, bg=self.colores['fondo_principal'])
-        msg_frame.pack(fill=tk.BOTH, expand=True, pady=50)
-        tk.Label(msg_frame, text="❌ Sin productos en esta categoría",
-                font=('Inter', 14), fg=self.colores['texto_secundario'],
-                bg=self.colores['fondo_principal']).pack()
+        def recibir(pagina):
+            # Si mientras tanto se mostró otro conjunto, la página ya no sirve
+            if self._paginador is paginador:
+                al_cargar(paginador.agregar(pagina))
+        
+        self.ejecutor.enviar(paginador.pedir(), al_terminar=recibir, clave=self._clave_pagina)
+    
+    @property
+    def total_cargados(self):
+        if self._paginador is not None:
+            return len(self._paginador.elementos)
+        return len(self._elementos)
+    
+    def _renderizar(self):
+        """Crea la siguiente tanda de tarjetas y agenda la próxima si faltan"""
+        self._job_render = None
+        pendiente = self.grilla.reconciliar(self._elementos, self.columnas(), max_nuevas=self.lote)
+        if pendiente:
+            self._job_render = self.canvas.after_idle(self._renderizar)
+    
+    def _al_redimensionar(self, event):
+        try:
+            self.canvas.itemconfig(self._ventana, width=event.width)
+        except Exception:
+            pass
+        # Agrupar los eventos del redimensionado: solo reubicar al terminar
+        if self._job_columnas is not None:
+            self.canvas.after_cancel(self._job_columnas)
+        self._job_columnas = self.canvas.after(80, self._reubicar)
+    
+    def _reubicar(self):
+        self._job_columnas = None
+        self.grilla.cambiar_columnas(self.columnas())
+    
+    def _al_desplazar(self, primero, ultimo):
+        self.scrollbar.set(primero, ultimo)
+        self._programar_scroll()
+    
+    def _programar_scroll(self):
+        if self._paginador is not None and not self._paginador.agotado and self._job_scroll is None:
+            self._job_scroll = self.canvas.after_idle(self._verificar_scroll)
+    
+    def _verificar_scroll(self):
+        """Pide la siguiente página si el scroll está cerca del final"""
+        self._job_scroll = None
+        if self._paginador is None or self._paginador.agotado:
+            return
+        # En modo grilla, esperar a que termine de dibujar la página anterior
+        if self._job_render is not None:
+            self._job_scroll = self.canvas.after(50, self._verificar_scroll)
+            return
+        # Ya hay una página en camino: al llegar vuelve a verificar
+        if self.ejecutor is not None and self.ejecutor.ocupado(self._clave_pagina):
+            return
+        if self.canvas.yview()[1] < self.umbral_scroll:
+            return
+        
+        def agregar(pagina):
+            if not pagina:
+                return
+            if self.lista is not None:
+                self.lista.extender(pagina)
+            else:
+                self._elementos.extend(self._a_elemento(dato) for dato in pagina)
+                self._renderizar()
+            self._programar_scroll()
+        
+        self._cargar_pagina(agregar)